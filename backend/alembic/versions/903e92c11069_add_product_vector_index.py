@@ -0,0 +1,55 @@
+"""add_product_vector_index
+
+Revision ID: 903e92c11069
+Revises: e8afbb20c4d6
+Create Date: 2026-10-19 10:12:41.305512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '903e92c11069'
+down_revision: Union[str, None] = 'e8afbb20c4d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 数据库提供pgvector扩展时，将description_vector转换为vector(1536)并创建HNSW索引
+    # 否则保持Text存储，由应用层NumPy索引检索
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'vector') THEN
+                CREATE EXTENSION IF NOT EXISTS vector;
+
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'products' AND column_name = 'description_vector') = 'text' THEN
+                    ALTER TABLE products
+                        ALTER COLUMN description_vector TYPE vector(1536)
+                        USING NULLIF(description_vector, '')::vector;
+                END IF;
+
+                CREATE INDEX IF NOT EXISTS ix_products_description_vector_hnsw
+                    ON products USING hnsw (description_vector vector_cosine_ops);
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_products_description_vector_hnsw")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF (SELECT udt_name FROM information_schema.columns
+                WHERE table_name = 'products' AND column_name = 'description_vector') = 'vector' THEN
+                ALTER TABLE products
+                    ALTER COLUMN description_vector TYPE text
+                    USING description_vector::text;
+            END IF;
+        END $$;
+    """)
@@ -0,0 +1,63 @@
+"""add_catalog_trigram_indexes
+
+Revision ID: b7d4e1a9c352
+Revises: 903e92c11069
+Create Date: 2026-10-19 14:05:27.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d4e1a9c352'
+down_revision: Union[str, None] = '903e92c11069'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (表名, 列名)：需要关键词检索与自动完成前缀检索的列
+SEARCH_COLUMNS = [
+    ('products', 'product_code'),
+    ('products', 'product_name'),
+    ('pricing_model', 'model_code'),
+    ('pricing_model', 'model_name'),
+    ('pricing_model', 'display_name'),
+]
+
+
+def upgrade() -> None:
+    # pricing_model由同步脚本建表，表不存在时跳过对应索引
+    # 数据库提供pg_trgm扩展时创建GIN三元组索引，加速 ILIKE '%kw%' 与 similarity 排序
+    for table, column in SEARCH_COLUMNS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')
+                   AND to_regclass('{table}') IS NOT NULL THEN
+                    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                    CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm
+                        ON {table} USING gin ({column} gin_trgm_ops);
+                END IF;
+            END $$;
+        """)
+
+    # 前缀检索使用 lower(col) LIKE 'kw%'，text_pattern_ops 索引与排序规则无关
+    for table, column in SEARCH_COLUMNS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{table}') IS NOT NULL THEN
+                    CREATE INDEX IF NOT EXISTS ix_{table}_{column}_prefix
+                        ON {table} (lower({column}) text_pattern_ops);
+                END IF;
+            END $$;
+        """)
+
+
+def downgrade() -> None:
+    for table, column in SEARCH_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_prefix")
+    for table, column in SEARCH_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_trgm")
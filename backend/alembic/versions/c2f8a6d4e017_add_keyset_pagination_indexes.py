@@ -0,0 +1,43 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: c2f8a6d4e017
+Revises: b7d4e1a9c352
+Create Date: 2026-10-19 16:32:08.547210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f8a6d4e017'
+down_revision: Union[str, None] = 'b7d4e1a9c352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (索引名, 表名, 列定义)：与各列表接口的排序键一致，键集分页可直接走索引定位
+KEYSET_INDEXES = [
+    ('ix_quote_sheets_created_at_quote_id', 'quote_sheets', 'created_at DESC, quote_id DESC'),
+    ('ix_products_vendor_name_code', 'products', 'vendor, product_name, product_code'),
+    ('ix_pricing_model_model_name_id', 'pricing_model', 'model_name, id'),
+]
+
+
+def upgrade() -> None:
+    # pricing_model由同步脚本建表，表不存在时跳过
+    for name, table, columns in KEYSET_INDEXES:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{table}') IS NOT NULL THEN
+                    CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});
+                END IF;
+            END $$;
+        """)
+
+
+def downgrade() -> None:
+    for name, _, _ in KEYSET_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,62 @@
+"""add_product_classification_columns
+
+Revision ID: d5a3b9c71e42
+Revises: c2f8a6d4e017
+Create Date: 2026-10-19 18:20:45.903317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a3b9c71e42'
+down_revision: Union[str, None] = 'c2f8a6d4e017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CLASSIFICATION_COLUMNS = [
+    ('modality', '模态'),
+    ('capability', '能力类型'),
+    ('model_type', '模型类型'),
+]
+
+
+def upgrade() -> None:
+    for column, comment in CLASSIFICATION_COLUMNS:
+        op.add_column('products', sa.Column(column, sa.String(length=50), nullable=True, comment=comment))
+        op.create_index(op.f(f'ix_products_{column}'), 'products', [column], unique=False)
+
+    # 按类别回填已有数据：冻结迁移时 app.models.product.classify_category 的规则，
+    # 之后应用代码中的分类规则变化不影响本迁移；category为NULL时模态为unknown
+    op.execute("""
+        UPDATE products
+        SET modality = CASE COALESCE(category, '')
+                WHEN 'AI-大模型-文本生成' THEN 'text'
+                WHEN 'AI-大模型-视觉理解' THEN 'image'
+                WHEN 'AI-大模型-语音' THEN 'audio'
+                WHEN 'AI-大模型-多模态' THEN 'multimodal'
+                WHEN 'AI-大模型-向量' THEN 'text_embedding'
+                WHEN 'AI-大模型-重排序' THEN 'rerank'
+                ELSE 'unknown'
+            END,
+            capability = CASE
+                WHEN category LIKE '%生成%' THEN 'generation'
+                WHEN category LIKE '%理解%' THEN 'understanding'
+                WHEN category LIKE '%大模型%' THEN 'both'
+            END,
+            model_type = CASE
+                WHEN category LIKE '%向量%' OR lower(category) LIKE '%embedding%' THEN
+                    CASE WHEN category LIKE '%多模态%' THEN 'multimodal_embedding' ELSE 'text_embedding' END
+                WHEN category LIKE '%重排序%' OR lower(category) LIKE '%rerank%' THEN 'rerank'
+                WHEN category LIKE '%大模型%' OR lower(category) LIKE '%llm%' THEN 'llm'
+            END
+    """)
+
+
+def downgrade() -> None:
+    for column, _ in reversed(CLASSIFICATION_COLUMNS):
+        op.drop_index(op.f(f'ix_products_{column}'), table_name='products')
+        op.drop_column('products', column)
@@ -0,0 +1,122 @@
+"""add_pricing_model_documents
+
+Revision ID: e7c1f3a96b20
+Revises: d5a3b9c71e42
+Create Date: 2026-10-19 19:05:12.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c1f3a96b20'
+down_revision: Union[str, None] = 'd5a3b9c71e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 按model_code整体重建定价文档；p_model_codes为NULL时重建全部
+REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION refresh_pricing_model_documents(p_model_codes TEXT[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_snapshot_id INTEGER;
+    v_count INTEGER;
+BEGIN
+    -- 串行化并发重建
+    PERFORM pg_advisory_xact_lock(hashtext('pricing_model_document'));
+
+    SELECT MAX(id) INTO v_snapshot_id FROM pricing_snapshot WHERE is_latest = TRUE;
+
+    DELETE FROM pricing_model_document
+    WHERE p_model_codes IS NULL OR model_code = ANY(p_model_codes);
+
+    WITH models AS (
+        SELECT pm.*
+        FROM pricing_model pm
+        WHERE pm.model_code IS NOT NULL
+          AND (p_model_codes IS NULL OR pm.model_code = ANY(p_model_codes))
+    ),
+    prices AS (
+        SELECT pmp.model_id,
+               jsonb_agg(jsonb_build_object(
+                   'dimension_code', pmp.dimension_code,
+                   'unit_price', NULLIF(pmp.unit_price, 0)::float8,
+                   'unit', pmp.unit,
+                   'currency', pmp.currency,
+                   'mode', pmp.mode,
+                   'token_tier', pmp.token_tier,
+                   'resolution', pmp.resolution
+               ) ORDER BY pmp.id) AS prices
+        FROM pricing_model_price pmp
+        JOIN models m ON m.id = pmp.model_id
+        GROUP BY pmp.model_id
+    )
+    INSERT INTO pricing_model_document (model_code, snapshot_id, document, built_at)
+    SELECT m.model_code,
+           v_snapshot_id,
+           jsonb_build_object(
+               'model_code', m.model_code,
+               'category', (array_agg(
+                   CASE WHEN pc.id IS NULL THEN NULL
+                        ELSE jsonb_build_object('code', pc.code, 'name', pc.name) END
+                   ORDER BY m.id))[1],
+               'variants', jsonb_agg(jsonb_build_object(
+                   'id', m.id,
+                   'model_name', m.model_name,
+                   'display_name', m.display_name,
+                   'sub_category', m.sub_category,
+                   'mode', m.mode,
+                   'token_tier', m.token_tier,
+                   'resolution', m.resolution,
+                   'supports_batch', m.supports_batch,
+                   'supports_cache', m.supports_cache,
+                   'remark', m.remark,
+                   'rule_text', m.rule_text,
+                   'status', m.status,
+                   'prices', COALESCE(p.prices, '[]'::jsonb)
+               ) ORDER BY m.id)
+           ),
+           NOW()
+    FROM models m
+    LEFT JOIN pricing_category pc ON pc.id = m.category_id
+    LEFT JOIN prices p ON p.model_id = m.id
+    GROUP BY m.model_code;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pricing_model_document',
+        sa.Column('model_code', sa.String(length=100), nullable=False, comment='模型代码'),
+        sa.Column('snapshot_id', sa.Integer(), nullable=True, comment='构建时的最新快照ID'),
+        sa.Column('document', postgresql.JSONB(astext_type=sa.Text()), nullable=False, comment='定价文档'),
+        sa.Column('built_at', sa.DateTime(), nullable=True, comment='构建时间'),
+        sa.PrimaryKeyConstraint('model_code')
+    )
+    op.execute(REFRESH_FUNCTION)
+
+    # pricing_*表由SQL脚本创建，存在时立即构建一次
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('pricing_model') IS NOT NULL THEN
+                PERFORM refresh_pricing_model_documents();
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS refresh_pricing_model_documents(TEXT[])")
+    op.drop_table('pricing_model_document')
@@ -0,0 +1,37 @@
+"""add_crawler_task_created_at
+
+Revision ID: f3b8d2a61c94
+Revises: e7c1f3a96b20
+Create Date: 2026-10-19 21:14:37.902518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2a61c94'
+down_revision: Union[str, None] = 'e7c1f3a96b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # crawler_tasks由 import_data.py 建表，表不存在时跳过；
+    # 手动触发时据此判断待执行记录是否超过宽限期仍未入队
+    op.execute("""
+        ALTER TABLE IF EXISTS crawler_tasks
+        ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('crawler_tasks') IS NOT NULL THEN
+                COMMENT ON COLUMN crawler_tasks.created_at IS '创建时间';
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE IF EXISTS crawler_tasks DROP COLUMN IF EXISTS created_at")
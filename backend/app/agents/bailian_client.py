@@ -1,20 +1,27 @@
 """
 百炼API客户端封装
 """
-import dashscope
+import asyncio
 import time
 from typing import Dict, Any, List, Optional
 from loguru import logger
 
 from app.core.config import settings
-
-# 配置API Key
-dashscope.api_key = settings.DASHSCOPE_API_KEY
+from app.core.metrics import LLM_REQUEST_DURATION, record_llm_tokens, track_duration
 
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAY = 1  # seconds
 
+# Embedding configuration
+EMBEDDING_BATCH_SIZE = 25  # text-embedding-v1 单次请求最多25条
+
+
+def configure_dashscope():
+    """导入dashscope并配置API Key（dashscope导入较慢，首次调用模型时才加载）"""
+    import dashscope
+    dashscope.api_key = settings.DASHSCOPE_API_KEY
+
 
 class BailianClient:
     """百炼API客户端"""
@@ -39,6 +46,7 @@ class BailianClient:
         Returns:
             模型响应
         """
+        configure_dashscope()
         from dashscope import Generation
         
         kwargs = {
@@ -60,7 +68,9 @@ class BailianClient:
         last_error = None
         for attempt in range(MAX_RETRIES):
             try:
-                response = Generation.call(**kwargs)
+                with track_duration(LLM_REQUEST_DURATION, client="bailian", model=self.model):
+                    response = Generation.call(**kwargs)
+                self._record_usage(self.model, response)
                 return self._parse_response(response)
             except Exception as e:
                 last_error = e
@@ -80,6 +90,7 @@ class BailianClient:
     
     async def _chat_stream(self, **kwargs):
         """流式对话"""
+        configure_dashscope()
         from dashscope import Generation
         
         responses = Generation.call(stream=True, **kwargs)
@@ -90,6 +101,20 @@ class BailianClient:
                 logger.error(f"流式响应错误: {response}")
                 break
     
+    @staticmethod
+    def _record_usage(model: str, response):
+        """记录响应中的token用量"""
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return
+        if isinstance(usage, dict):
+            input_tokens = usage.get("input_tokens") or usage.get("total_tokens")
+            output_tokens = usage.get("output_tokens")
+        else:
+            input_tokens = getattr(usage, "input_tokens", None) or getattr(usage, "total_tokens", None)
+            output_tokens = getattr(usage, "output_tokens", None)
+        record_llm_tokens("bailian", model, input_tokens, output_tokens)
+    
     def _parse_response(self, response) -> Dict[str, Any]:
         """解析响应"""
         if response.status_code != 200:
@@ -223,22 +248,47 @@ class BailianClient:
         Returns:
             向量表示
         """
+        vectors = await self.embed_texts([text])
+        return vectors[0]
+    
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量文本向量化
+        
+        按EMBEDDING_BATCH_SIZE分批请求，SDK调用在线程中执行，不阻塞事件循环
+        
+        Args:
+            texts: 输入文本列表
+        
+        Returns:
+            与输入顺序一致的向量列表
+        """
+        configure_dashscope()
+        from dashscope import TextEmbedding
+        
+        vectors: List[List[float]] = []
         try:
-            from dashscope import TextEmbedding
-            
-            response = TextEmbedding.call(
-                model=TextEmbedding.Models.text_embedding_v1,
-                input=text
-            )
-            
-            if response.status_code == 200:
-                return response.output.embeddings[0].embedding
-            else:
-                raise Exception(f"向量化失败: {response.message}")
+            for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+                batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+                with track_duration(LLM_REQUEST_DURATION, client="bailian", model=TextEmbedding.Models.text_embedding_v1):
+                    response = await asyncio.to_thread(
+                        TextEmbedding.call,
+                        model=TextEmbedding.Models.text_embedding_v1,
+                        input=batch
+                    )
+                self._record_usage(TextEmbedding.Models.text_embedding_v1, response)
+                
+                if response.status_code != 200:
+                    raise Exception(f"向量化失败: {response.message}")
+                
+                embeddings = sorted(response.output["embeddings"], key=lambda item: item["text_index"])
+                vectors.extend(item["embedding"] for item in embeddings)
         
         except Exception as e:
             logger.error(f"文本向量化失败: {e}")
             raise
+        
+        return vectors
 
 
 # 创建全局客户端实例
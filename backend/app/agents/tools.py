@@ -628,6 +628,23 @@ class FunctionTools:
     @staticmethod
     async def get_model_price(model_name: str) -> Dict[str, Any]:
         """查询模型价格"""
+        prices = await FunctionTools.get_model_prices([model_name])
+        return prices[model_name]
+    
+    @staticmethod
+    async def get_model_prices(model_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量查询模型价格
+        
+        一次查询取回所有候选产品，再按 精确 > 前缀 > 包含 的顺序为每个名称选出最佳匹配
+        
+        Returns:
+            名称到价格信息的映射，结构与get_model_price一致
+        """
+        names = list(dict.fromkeys(model_names))
+        if not names:
+            return {}
+        
         try:
             async with async_session_maker() as session:
                 sql = """
@@ -635,33 +652,74 @@ class FunctionTools:
                            pp.unit_price, pp.unit, pp.billing_mode, pp.pricing_variables
                     FROM products p
                     LEFT JOIN product_prices pp ON p.product_code = pp.product_code
-                    WHERE p.product_code ILIKE :name OR p.product_name ILIKE :name
+                    WHERE p.product_code ILIKE ANY(:patterns) OR p.product_name ILIKE ANY(:patterns)
+                    ORDER BY p.product_code, pp.effective_date DESC NULLS LAST
                 """
-                result = await session.execute(text(sql), {"name": f"%{model_name}%"})
+                result = await session.execute(
+                    text(sql), {"patterns": [f"%{name}%" for name in names]}
+                )
                 rows = result.fetchall()
-                
-                if not rows:
-                    return {"found": False, "message": f"未找到模型: {model_name}"}
-                
-                row = rows[0]
-                pricing_vars = row.pricing_variables or {}
-                
-                return {
-                    "found": True,
-                    "model_id": row.product_code,
-                    "model_name": row.product_name,
-                    "category": row.category,
-                    "pricing": {
-                        "input_price": pricing_vars.get("input_price"),
-                        "output_price": pricing_vars.get("output_price"),
-                        "unit": row.unit or "千Token",
-                        "billing_mode": row.billing_mode
-                    },
-                    "message": f"{row.product_name} 价格: 输入 {pricing_vars.get('input_price', 'N/A')}元/{row.unit or '千Token'}, 输出 {pricing_vars.get('output_price', 'N/A')}元/{row.unit or '千Token'}"
-                }
         except Exception as e:
             logger.error(f"查询价格失败: {e}")
-            return {"found": False, "error": str(e)}
+            return {name: {"found": False, "error": str(e)} for name in names}
+        
+        # 每个产品只保留最新的价格行
+        products = {}
+        for row in rows:
+            products.setdefault(row.product_code, row)
+        
+        return {
+            name: FunctionTools._format_price_info(FunctionTools._match_product(name, products.values()), name)
+            for name in names
+        }
+    
+    @staticmethod
+    def _match_product(model_name: str, rows) -> Optional[Any]:
+        """按 精确 > 前缀 > 包含 选出最佳匹配，同级取代码最短者"""
+        needle = model_name.lower()
+        best = None
+        best_key = None
+        
+        for row in rows:
+            code = (row.product_code or "").lower()
+            name = (row.product_name or "").lower()
+            
+            if needle in (code, name):
+                rank = 0
+            elif code.startswith(needle) or name.startswith(needle):
+                rank = 1
+            elif needle in code or needle in name:
+                rank = 2
+            else:
+                continue
+            
+            key = (rank, len(code), code)
+            if best_key is None or key < best_key:
+                best, best_key = row, key
+        
+        return best
+    
+    @staticmethod
+    def _format_price_info(row, model_name: str) -> Dict[str, Any]:
+        """将查询行转换为价格信息"""
+        if row is None:
+            return {"found": False, "message": f"未找到模型: {model_name}"}
+        
+        pricing_vars = row.pricing_variables or {}
+        
+        return {
+            "found": True,
+            "model_id": row.product_code,
+            "model_name": row.product_name,
+            "category": row.category,
+            "pricing": {
+                "input_price": pricing_vars.get("input_price"),
+                "output_price": pricing_vars.get("output_price"),
+                "unit": row.unit or "千Token",
+                "billing_mode": row.billing_mode
+            },
+            "message": f"{row.product_name} 价格: 输入 {pricing_vars.get('input_price', 'N/A')}元/{row.unit or '千Token'}, 输出 {pricing_vars.get('output_price', 'N/A')}元/{row.unit or '千Token'}"
+        }
     
     @staticmethod
     async def calculate_monthly_cost(
@@ -676,6 +734,16 @@ class FunctionTools:
         if not price_info.get("found"):
             return price_info
         
+        return FunctionTools._monthly_cost(price_info, daily_calls, avg_input_tokens, avg_output_tokens)
+    
+    @staticmethod
+    def _monthly_cost(
+        price_info: Dict[str, Any],
+        daily_calls: int,
+        avg_input_tokens: int,
+        avg_output_tokens: int
+    ) -> Dict[str, Any]:
+        """根据已查询的价格信息计算月费用"""
         pricing = price_info.get("pricing", {})
         input_price = pricing.get("input_price", 0) or 0
         output_price = pricing.get("output_price", 0) or 0
@@ -705,35 +773,19 @@ class FunctionTools:
         priority: str = "balanced"
     ) -> Dict[str, Any]:
         """推荐模型（含竞品对比优势）"""
-        # 场景到模型的推荐映射
-        recommendations = {
-            "客服": ["qwen-plus", "qwen-turbo"],
-            "智能客服": ["qwen-plus", "qwen-turbo"],
-            "对话": ["qwen-plus", "qwen-max"],
-            "内容生成": ["qwen-max", "qwen-plus"],
-            "写作": ["qwen-max", "qwen-plus"],
-            "代码": ["qwen-coder-plus", "qwen-max"],
-            "代码助手": ["qwen-coder-plus", "qwen-max"],
-            "数据分析": ["qwen-max", "qwen-plus"],
-            "图像理解": ["qwen-vl-max", "qwen-vl-plus"],
-            "视觉": ["qwen-vl-max", "qwen-vl-plus"],
-            "语音": ["cosyvoice-v2", "paraformer-v2"],
-        }
-        
-        # 匹配场景
-        matched_models = []
-        for key, models in recommendations.items():
-            if key in use_case:
-                matched_models = models
-                break
+        # 优先使用产品描述向量做语义匹配
+        matched_models = await FunctionTools._semantic_candidates(use_case)
         
+        # 向量未生成或检索不可用时，回退到场景关键词映射
         if not matched_models:
-            matched_models = ["qwen-plus", "qwen-max"]  # 默认推荐
+            matched_models = FunctionTools._keyword_candidates(use_case)
+        
+        # 一次查询所有推荐模型的价格
+        prices = await FunctionTools.get_model_prices(matched_models)
         
-        # 查询推荐模型的详细信息
         result_models = []
         for model_id in matched_models:
-            price_info = await FunctionTools.get_model_price(model_id)
+            price_info = prices[model_id]
             if price_info.get("found"):
                 # 获取竞品优势信息
                 competitor_insight = competitor_service.get_insight_for_ai(model_id)
@@ -759,6 +811,42 @@ class FunctionTools:
             "message": f"为'{use_case}'场景推荐以下模型" if result_models else "暂无推荐模型"
         }
     
+    @staticmethod
+    async def _semantic_candidates(use_case: str, top_k: int = 2) -> List[str]:
+        """基于产品描述向量检索与场景最相关的模型"""
+        from app.services.product_vector_service import product_vector_service
+        
+        try:
+            async with async_session_maker() as session:
+                models = await product_vector_service.search(session, use_case, top_k=top_k)
+            return [m["model_id"] for m in models]
+        except Exception as e:
+            logger.warning(f"[Tools] 语义检索不可用，使用关键词推荐: {e}")
+            return []
+    
+    @staticmethod
+    def _keyword_candidates(use_case: str) -> List[str]:
+        """场景关键词到模型的推荐映射"""
+        recommendations = {
+            "客服": ["qwen-plus", "qwen-turbo"],
+            "智能客服": ["qwen-plus", "qwen-turbo"],
+            "对话": ["qwen-plus", "qwen-max"],
+            "内容生成": ["qwen-max", "qwen-plus"],
+            "写作": ["qwen-max", "qwen-plus"],
+            "代码": ["qwen-coder-plus", "qwen-max"],
+            "代码助手": ["qwen-coder-plus", "qwen-max"],
+            "数据分析": ["qwen-max", "qwen-plus"],
+            "图像理解": ["qwen-vl-max", "qwen-vl-plus"],
+            "视觉": ["qwen-vl-max", "qwen-vl-plus"],
+            "语音": ["cosyvoice-v2", "paraformer-v2"],
+        }
+        
+        for key, models in recommendations.items():
+            if key in use_case:
+                return models
+        
+        return ["qwen-plus", "qwen-max"]  # 默认推荐
+    
     @staticmethod
     async def generate_quote_item(
         model_name: str,
@@ -774,9 +862,9 @@ class FunctionTools:
         if not price_info.get("found"):
             return {"success": False, "error": f"未找到模型: {model_name}"}
         
-        # 计算月费用
-        cost_info = await FunctionTools.calculate_monthly_cost(
-            model_name, daily_calls, avg_input_tokens, avg_output_tokens
+        # 计算月费用（复用已查询的价格）
+        cost_info = FunctionTools._monthly_cost(
+            price_info, daily_calls, avg_input_tokens, avg_output_tokens
         )
         
         monthly_cost = cost_info.get("total_monthly_cost", 0)
@@ -205,26 +205,30 @@ async def extract_from_multiple_files(files: List[UploadFile] = File(...)):
     """
     Extract information from multiple files at once.
     
+    Files are extracted concurrently (bounded by the extractor's worker
+    limit); previously seen files are served from the result cache.
+    
     Returns a list of extraction results, one per file.
     """
     logger.info(f"[AI Chat] Extracting from {len(files)} files")
     
-    results = []
-    for file in files:
+    payloads = []
+    read_errors = {}
+    for index, file in enumerate(files):
         try:
-            content = await file.read()
-            result = await multimodal_extractor.extract_from_file(
-                file_content=content,
-                filename=file.filename,
-                mime_type=file.content_type
-            )
-            results.append(result)
+            payloads.append((await file.read(), file.filename, file.content_type))
         except Exception as e:
-            results.append({
+            read_errors[index] = {
                 "success": False,
                 "filename": file.filename,
                 "error": str(e)
-            })
+            }
+    
+    extracted = iter(await multimodal_extractor.extract_many(payloads))
+    results = [
+        read_errors[index] if index in read_errors else next(extracted)
+        for index in range(len(files))
+    ]
     
     return {
         "total": len(files),
@@ -3,17 +3,24 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, func, literal
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 
 from app.core.database import get_db
+from app.core.jobs import JobQueueUnavailable, JobStatus, job_queue
+from app.core.pagination import SortKey, InvalidCursorError, paginate, count_total, CountMode
 from app.models.crawler import CrawlerTask, TaskStatus
-from app.services.crawler_scheduler import get_crawler_scheduler
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/crawler", tags=["爬虫管理"])
 
+# 未开始任务的排序时间
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# 待执行记录在提交后、入队前没有后台任务，创建超过该时长仍无后台任务才视为失效
+PENDING_GRACE_PERIOD = timedelta(seconds=60)
+
 
 # ========== Schemas ==========
 class CrawlerTaskResponse(BaseModel):
@@ -34,7 +41,8 @@ class CrawlerTaskResponse(BaseModel):
 class CrawlerTaskListResponse(BaseModel):
     """爬虫任务列表响应"""
     tasks: List[CrawlerTaskResponse]
-    total: int
+    total: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class TriggerTaskRequest(BaseModel):
@@ -44,7 +52,7 @@ class TriggerTaskRequest(BaseModel):
 
 class TriggerTaskResponse(BaseModel):
     """触发任务响应"""
-    task_id: str
+    task_id: str  # 爬虫任务ID，同时也是后台任务ID（/jobs/{task_id}查询进度）
     message: str
 
 
@@ -58,6 +66,24 @@ class CrawlerStatsResponse(BaseModel):
     last_volcano_crawl: Optional[datetime]
 
 
+async def _is_stale(task: CrawlerTask, past_grace_period: bool) -> bool:
+    """
+    排队中/运行中的任务记录是否已失效
+    
+    手动触发的任务ID同时是后台任务ID：后台任务已结束（成功或失败）时记录失效；
+    后台任务不存在时，创建超过 PENDING_GRACE_PERIOD 的待执行记录失效（任务已过期或从未入队），
+    未超过的可能正在入队，运行中记录可能来自定时调度，均不视为失效。
+    任务队列不可用时无法判断，不视为失效。
+    """
+    try:
+        job = await job_queue.get(task.task_id)
+    except JobQueueUnavailable:
+        return False
+    if job is None:
+        return task.status == TaskStatus.PENDING and past_grace_period
+    return job["status"] in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value)
+
+
 # ========== API Endpoints ==========
 @router.post("/tasks", response_model=TriggerTaskResponse)
 async def trigger_crawler_task(
@@ -80,29 +106,45 @@ async def trigger_crawler_task(
             detail="无效的任务类型,支持: aliyun, volcano"
         )
     
-    # 检查是否有正在运行的任务
+    # 检查是否有排队中或正在运行的任务（后台任务已结束或已过期的记录视为失效，标记为失败）
     result = await db.execute(
-        select(CrawlerTask).where(
+        select(CrawlerTask, CrawlerTask.created_at < func.now() - PENDING_GRACE_PERIOD).where(
             CrawlerTask.task_type == request.task_type,
-            CrawlerTask.status == TaskStatus.RUNNING
+            CrawlerTask.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING])
         )
     )
-    running_task = result.scalar_one_or_none()
+    for active_task, past_grace_period in result.all():
+        if not await _is_stale(active_task, bool(past_grace_period)):
+            raise HTTPException(
+                status_code=409,
+                detail=f"任务类型 {request.task_type} 已有正在运行的任务"
+            )
+        active_task.status = TaskStatus.FAILED
+        active_task.end_time = datetime.now()
+        active_task.error_message = "任务已失效（后台任务已结束或已过期）"
     
-    if running_task:
-        raise HTTPException(
-            status_code=409,
-            detail=f"任务类型 {request.task_type} 已有正在运行的任务"
-        )
+    # 先提交待执行记录，worker领取任务时记录已存在
+    task_id = str(uuid4())
+    task = CrawlerTask(task_id=task_id, task_type=request.task_type, status=TaskStatus.PENDING)
+    db.add(task)
+    await db.commit()
     
-    # 异步触发任务
-    scheduler = get_crawler_scheduler()
-    import asyncio
-    asyncio.create_task(scheduler.run_crawler(request.task_type))
+    # 加入后台任务队列，由worker执行
+    try:
+        await job_queue.enqueue(
+            "crawler.run",
+            {"task_type": request.task_type, "task_id": task_id},
+            job_id=task_id
+        )
+    except JobQueueUnavailable as e:
+        task.status = TaskStatus.FAILED
+        task.error_message = str(e)
+        await db.commit()
+        raise HTTPException(status_code=503, detail="任务队列不可用,请稍后重试")
     
     return TriggerTaskResponse(
-        task_id="pending",
-        message=f"爬虫任务 {request.task_type} 已触发,正在执行"
+        task_id=task_id,
+        message=f"爬虫任务 {request.task_type} 已加入队列"
     )
 
 
@@ -112,6 +154,8 @@ async def get_crawler_tasks(
     status: Optional[str] = Query(None, description="状态过滤"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -122,6 +166,8 @@ async def get_crawler_tasks(
         status: 状态过滤
         page: 页码
         size: 每页数量
+        cursor: 分页游标，传入后按键集分页
+        count: 总数统计方式
         db: 数据库会话
     
     Returns:
@@ -144,17 +190,18 @@ async def get_crawler_tasks(
             )
     
     # 总数查询
-    from sqlalchemy import func
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页查询
-    query = query.order_by(desc(CrawlerTask.start_time))
-    query = query.offset((page - 1) * size).limit(size)
+    total = await count_total(db, query, count)
     
-    result = await db.execute(query)
-    tasks = result.scalars().all()
+    # 分页查询：start_time可能为空，按纪元时间参与排序；task_id保证排序键唯一
+    sort_keys = [
+        SortKey(func.coalesce(CrawlerTask.start_time, literal(EPOCH)), descending=True),
+        SortKey(CrawlerTask.task_id, descending=True)
+    ]
+    try:
+        rows, next_cursor = await paginate(db, query, sort_keys, size, cursor=cursor, page=page)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tasks = [row[0] for row in rows]
     
     return CrawlerTaskListResponse(
         tasks=[
@@ -170,7 +217,8 @@ async def get_crawler_tasks(
             )
             for task in tasks
         ],
-        total=total
+        total=total,
+        next_cursor=next_cursor
     )
 
 
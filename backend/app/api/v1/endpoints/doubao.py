@@ -8,15 +8,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_, and_
 from loguru import logger
 
-from app.core.database import get_db
-from app.models.doubao import DoubaoSnapshot, DoubaoCategory, DoubaoModel, DoubaoCompetitorMapping, DebateList
+from app.core.database import get_db, get_read_db
+from app.core.pagination import SortKey, InvalidCursorError, paginate, count_total, CountMode
+from app.core.responses import FastJSONResponse
+from app.models.doubao import DoubaoCategory, DoubaoModel, DoubaoCompetitorMapping, DebateList
+from app.services.doubao_catalog_service import doubao_catalog_service
 
 router = APIRouter()
 
 
 @router.get("/categories")
 async def get_doubao_categories(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取豆包模型分类列表
@@ -24,36 +27,15 @@ async def get_doubao_categories(
     返回所有可用的模型分类，包含各分类下的模型数量
     """
     try:
-        # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        ).order_by(DoubaoSnapshot.crawl_time.desc())
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
+        catalog = await doubao_catalog_service.get_catalog(db)
+        snapshot = catalog["snapshot"]
         
         if not snapshot:
             return {"categories": [], "message": "暂无数据，请先导入豆包定价数据"}
         
-        # 获取分类列表
-        query = select(DoubaoCategory).where(
-            DoubaoCategory.snapshot_id == snapshot.id,
-            DoubaoCategory.is_active == True
-        ).order_by(DoubaoCategory.sort_order)
-        
-        result = await db.execute(query)
-        categories = result.scalars().all()
-        
         return {
-            "categories": [
-                {
-                    "id": cat.id,
-                    "code": cat.code,
-                    "name": cat.name,
-                    "model_count": cat.model_count
-                }
-                for cat in categories
-            ],
-            "snapshot_time": snapshot.crawl_time.isoformat() if snapshot.crawl_time else None
+            "categories": catalog["categories"],
+            "snapshot_time": snapshot["crawl_time"]
         }
     except Exception as e:
         logger.error(f"获取豆包分类失败: {str(e)}")
@@ -68,7 +50,9 @@ async def get_doubao_models(
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=200, description="每页数量"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取豆包模型定价列表
@@ -77,13 +61,9 @@ async def get_doubao_models(
     """
     try:
         # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
+        snapshot_id = await doubao_catalog_service.get_snapshot_id(db)
         
-        if not snapshot:
+        if snapshot_id is None:
             return {
                 "total": 0,
                 "page": page,
@@ -96,7 +76,7 @@ async def get_doubao_models(
         query = select(DoubaoModel, DoubaoCategory.name.label('category_name')).join(
             DoubaoCategory, DoubaoModel.category_id == DoubaoCategory.id
         ).where(
-            DoubaoModel.snapshot_id == snapshot.id,
+            DoubaoModel.snapshot_id == snapshot_id,
             DoubaoModel.status == 'active'
         )
         
@@ -122,22 +102,22 @@ async def get_doubao_models(
             )
         
         # 计算总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # 分页
-        offset = (page - 1) * page_size
-        query = query.order_by(DoubaoCategory.sort_order, DoubaoModel.model_name)
-        query = query.offset(offset).limit(page_size)
-        
-        result = await db.execute(query)
-        rows = result.all()
-        
-        return {
+        total = await count_total(db, query, count)
+        
+        # 分页：DoubaoModel.id保证排序键唯一
+        sort_keys = [
+            SortKey(func.coalesce(DoubaoCategory.sort_order, 0)),
+            SortKey(DoubaoModel.model_name),
+            SortKey(DoubaoModel.id)
+        ]
+        rows, next_cursor = await paginate(db, query, sort_keys, page_size, cursor=cursor, page=page)
+        
+        # 直接输出已构造好的dict
+        return FastJSONResponse({
             "total": total,
             "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor,
             "data": [
                 {
                     "id": row.DoubaoModel.id,
@@ -152,7 +132,9 @@ async def get_doubao_models(
                 }
                 for row in rows
             ]
-        }
+        })
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"查询豆包模型失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
@@ -162,7 +144,7 @@ async def get_doubao_models(
 async def search_doubao_models(
     keyword: str = Query(..., description="搜索关键词"),
     limit: int = Query(20, ge=1, le=100, description="返回数量"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     搜索豆包模型（用于自动完成）
@@ -171,19 +153,15 @@ async def search_doubao_models(
     """
     try:
         # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
+        snapshot_id = await doubao_catalog_service.get_snapshot_id(db)
         
-        if not snapshot:
+        if snapshot_id is None:
             return {"results": []}
         
         query = select(DoubaoModel, DoubaoCategory.name.label('category_name')).join(
             DoubaoCategory, DoubaoModel.category_id == DoubaoCategory.id
         ).where(
-            DoubaoModel.snapshot_id == snapshot.id,
+            DoubaoModel.snapshot_id == snapshot_id,
             DoubaoModel.status == 'active',
             or_(
                 DoubaoModel.model_name.ilike(f"%{keyword}%"),
@@ -215,7 +193,7 @@ async def search_doubao_models(
 @router.get("/models/{model_id}")
 async def get_doubao_model_detail(
     model_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取豆包模型详情
@@ -257,7 +235,7 @@ async def get_doubao_model_detail(
 
 @router.get("/providers")
 async def get_doubao_providers(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取豆包平台上的供应商列表
@@ -265,30 +243,8 @@ async def get_doubao_providers(
     返回火山引擎平台上所有模型供应商
     """
     try:
-        # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
-        
-        if not snapshot:
-            return {"providers": []}
-        
-        query = select(DoubaoModel.provider, func.count(DoubaoModel.id).label('model_count')).where(
-            DoubaoModel.snapshot_id == snapshot.id,
-            DoubaoModel.status == 'active'
-        ).group_by(DoubaoModel.provider)
-        
-        result = await db.execute(query)
-        rows = result.all()
-        
-        return {
-            "providers": [
-                {"name": row.provider, "model_count": row.model_count}
-                for row in rows
-            ]
-        }
+        catalog = await doubao_catalog_service.get_catalog(db)
+        return {"providers": catalog["providers"]}
     except Exception as e:
         logger.error(f"获取供应商列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取供应商失败: {str(e)}")
@@ -296,7 +252,7 @@ async def get_doubao_providers(
 
 @router.get("/service-types")
 async def get_doubao_service_types(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取服务类型列表
@@ -304,27 +260,8 @@ async def get_doubao_service_types(
     返回所有可用的服务类型选项
     """
     try:
-        # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
-        
-        if not snapshot:
-            return {"service_types": []}
-        
-        query = select(DoubaoModel.service_type).where(
-            DoubaoModel.snapshot_id == snapshot.id,
-            DoubaoModel.service_type.isnot(None)
-        ).distinct()
-        
-        result = await db.execute(query)
-        types = result.scalars().all()
-        
-        return {
-            "service_types": sorted([t for t in types if t])
-        }
+        catalog = await doubao_catalog_service.get_catalog(db)
+        return {"service_types": catalog["service_types"]}
     except Exception as e:
         logger.error(f"获取服务类型失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取服务类型失败: {str(e)}")
@@ -332,57 +269,21 @@ async def get_doubao_service_types(
 
 @router.get("/filters")
 async def get_doubao_filters(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取所有筛选选项
     
-    一次性返回所有筛选维度的可用选项
+    一次性返回所有筛选维度的可用选项，facets为各选项下上架模型的数量
     """
     try:
-        # 获取最新快照
-        snapshot_query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        snapshot_result = await db.execute(snapshot_query)
-        snapshot = snapshot_result.scalars().first()
-        
-        if not snapshot:
-            return {
-                "categories": [],
-                "providers": [],
-                "service_types": [],
-                "snapshot_time": None
-            }
-        
-        # 获取分类
-        cat_query = select(DoubaoCategory.name).where(
-            DoubaoCategory.snapshot_id == snapshot.id,
-            DoubaoCategory.is_active == True
-        ).distinct()
-        cat_result = await db.execute(cat_query)
-        categories = cat_result.scalars().all()
-        
-        # 获取供应商
-        provider_query = select(DoubaoModel.provider).where(
-            DoubaoModel.snapshot_id == snapshot.id
-        ).distinct()
-        provider_result = await db.execute(provider_query)
-        providers = provider_result.scalars().all()
-        
-        # 获取服务类型
-        type_query = select(DoubaoModel.service_type).where(
-            DoubaoModel.snapshot_id == snapshot.id,
-            DoubaoModel.service_type.isnot(None)
-        ).distinct()
-        type_result = await db.execute(type_query)
-        service_types = type_result.scalars().all()
+        catalog = await doubao_catalog_service.get_catalog(db)
+        snapshot = catalog["snapshot"]
         
         return {
-            "categories": sorted([c for c in categories if c]),
-            "providers": sorted([p for p in providers if p]),
-            "service_types": sorted([t for t in service_types if t]),
-            "snapshot_time": snapshot.crawl_time.isoformat() if snapshot.crawl_time else None
+            **catalog["filters"],
+            "facets": catalog["facets"],
+            "snapshot_time": snapshot["crawl_time"] if snapshot else None
         }
     except Exception as e:
         logger.error(f"获取筛选选项失败: {str(e)}")
@@ -391,7 +292,7 @@ async def get_doubao_filters(
 
 @router.get("/snapshot/latest")
 async def get_latest_snapshot(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取最新快照信息
@@ -399,24 +300,12 @@ async def get_latest_snapshot(
     返回最新数据快照的元信息
     """
     try:
-        query = select(DoubaoSnapshot).where(
-            DoubaoSnapshot.is_latest == True
-        )
-        result = await db.execute(query)
-        snapshot = result.scalars().first()
+        snapshot = (await doubao_catalog_service.get_catalog(db))["snapshot"]
         
         if not snapshot:
             return {"snapshot": None, "message": "暂无数据快照"}
         
-        return {
-            "snapshot": {
-                "id": snapshot.id,
-                "source_url": snapshot.source_url,
-                "crawl_time": snapshot.crawl_time.isoformat() if snapshot.crawl_time else None,
-                "total_count": snapshot.total_count,
-                "status": snapshot.status
-            }
-        }
+        return {"snapshot": snapshot}
     except Exception as e:
         logger.error(f"获取快照信息失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取快照失败: {str(e)}")
@@ -426,7 +315,7 @@ async def get_latest_snapshot(
 
 @router.get("/debate-list")
 async def get_debate_list(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取所有已保存的模型映射关系
@@ -5,11 +5,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Callable, Awaitable
 from io import BytesIO
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_db, async_session_maker
+from app.core.jobs import JobContext, JobQueueUnavailable, job_handler, job_queue
+from app.core.metrics import EXPORT_JOB_DURATION, timed
 from app.crud.quote import QuoteCRUD
 from app.services.excel_exporter import get_excel_exporter
 from app.services.oss_uploader import get_oss_uploader
@@ -293,6 +295,12 @@ class BatchExportResult(BaseModel):
     results: List[dict]
 
 
+class ExportJobResponse(BaseModel):
+    """后台导出任务响应"""
+    job_id: str
+    message: str
+
+
 class QuotePreviewRequest(BaseModel):
     """报价预览导出请求"""
     customerInfo: dict  # 客户信息
@@ -303,6 +311,80 @@ class QuotePreviewRequest(BaseModel):
     priceUnit: Optional[str] = 'thousand'  # 价格单位: 'thousand'(千Token) 或 'million'(百万Token)
 
 
+async def _batch_export(
+    db: AsyncSession,
+    quote_ids: List[str],
+    template_type: str,
+    progress: Optional[Callable[[float, str], Awaitable[None]]] = None
+) -> BatchExportResult:
+    """逐个生成报价单并上传到OSS，单个失败不影响其余报价单"""
+    results = []
+    success_count = 0
+    failed_count = 0
+    
+    exporter = get_excel_exporter()
+    
+    for index, quote_id in enumerate(quote_ids):
+        if progress:
+            await progress(index * 100 / len(quote_ids), f"正在导出 {index + 1}/{len(quote_ids)}")
+        try:
+            quote = await QuoteCRUD.get_quote(db, quote_id)
+            if not quote:
+                results.append({
+                    "quote_id": quote_id,
+                    "success": False,
+                    "error": "报价单不存在"
+                })
+                failed_count += 1
+                continue
+            
+            items = await QuoteCRUD.get_quote_items(db, quote_id)
+            if not items:
+                results.append({
+                    "quote_id": quote_id,
+                    "success": False,
+                    "error": "报价单无明细数据"
+                })
+                failed_count += 1
+                continue
+            
+            # 生成并上传
+            excel_bytes, oss_url = await exporter.generate_and_upload(
+                quote, items, template_type
+            )
+            
+            results.append({
+                "quote_id": quote_id,
+                "quote_no": quote.quote_no,
+                "success": True,
+                "download_url": oss_url,
+                "file_size": len(excel_bytes)
+            })
+            success_count += 1
+            
+        except Exception as e:
+            results.append({
+                "quote_id": quote_id,
+                "success": False,
+                "error": str(e)
+            })
+            failed_count += 1
+    
+    return BatchExportResult(
+        success_count=success_count,
+        failed_count=failed_count,
+        results=results
+    )
+
+
+@job_handler("export.batch")
+async def batch_export_job(ctx: JobContext, quote_ids: List[str], template_type: str = "standard") -> dict:
+    """后台任务队列中的批量导出"""
+    async with async_session_maker() as db:
+        result = await _batch_export(db, quote_ids, template_type, progress=ctx.report_progress)
+    return result.model_dump()
+
+
 @router.post("/batch", response_model=BatchExportResult)
 async def batch_export(
     request: BatchExportRequest,
@@ -321,69 +403,45 @@ async def batch_export(
         批量导出结果
     """
     try:
-        results = []
-        success_count = 0
-        failed_count = 0
-        
-        exporter = get_excel_exporter()
-        uploader = get_oss_uploader()
-        
-        for quote_id in request.quote_ids:
-            try:
-                quote = await QuoteCRUD.get_quote(db, quote_id)
-                if not quote:
-                    results.append({
-                        "quote_id": quote_id,
-                        "success": False,
-                        "error": "报价单不存在"
-                    })
-                    failed_count += 1
-                    continue
-                
-                items = await QuoteCRUD.get_quote_items(db, quote_id)
-                if not items:
-                    results.append({
-                        "quote_id": quote_id,
-                        "success": False,
-                        "error": "报价单无明细数据"
-                    })
-                    failed_count += 1
-                    continue
-                
-                # 生成并上传
-                excel_bytes, oss_url = await exporter.generate_and_upload(
-                    quote, items, request.template_type
-                )
-                
-                results.append({
-                    "quote_id": quote_id,
-                    "quote_no": quote.quote_no,
-                    "success": True,
-                    "download_url": oss_url,
-                    "file_size": len(excel_bytes)
-                })
-                success_count += 1
-                
-            except Exception as e:
-                results.append({
-                    "quote_id": quote_id,
-                    "success": False,
-                    "error": str(e)
-                })
-                failed_count += 1
-        
-        return BatchExportResult(
-            success_count=success_count,
-            failed_count=failed_count,
-            results=results
-        )
+        return await _batch_export(db, request.quote_ids, request.template_type)
     
     except Exception as e:
         logger.error(f"批量导出失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"批量导出失败: {str(e)}")
 
 
+@router.post("/batch/jobs", response_model=ExportJobResponse)
+async def batch_export_async(request: BatchExportRequest):
+    """
+    后台批量导出报价单
+    
+    立即返回任务ID，通过 /jobs/{job_id} 查询进度与导出结果
+    
+    Args:
+        request: 批量导出请求
+    
+    Returns:
+        任务ID和消息
+    """
+    if not request.quote_ids:
+        raise HTTPException(status_code=400, detail="报价单列表不能为空")
+    
+    try:
+        job_id = await job_queue.enqueue(
+            "export.batch",
+            {"quote_ids": request.quote_ids, "template_type": request.template_type}
+        )
+    except JobQueueUnavailable:
+        raise HTTPException(status_code=503, detail="任务队列不可用,请稍后重试")
+    
+    return ExportJobResponse(
+        job_id=job_id,
+        message=f"已加入导出队列,共 {len(request.quote_ids)} 个报价单"
+    )
+
+
 @router.post("/preview")
+@timed(EXPORT_JOB_DURATION, template="preview")
 async def export_quote_preview(
     request: QuotePreviewRequest
 ):
@@ -0,0 +1,53 @@
+"""
+后台任务API端点
+"""
+from typing import Any, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from app.core.jobs import JobQueueUnavailable, job_queue
+
+router = APIRouter()
+
+
+# ========== Schemas ==========
+class JobResponse(BaseModel):
+    """后台任务状态"""
+    job_id: str
+    name: str
+    status: str  # queued/running/retrying/succeeded/failed
+    progress: float
+    message: str
+    attempts: int
+    max_attempts: int
+    created_at: float
+    updated_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    retry_at: Optional[float] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+# ========== API Endpoints ==========
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    查询后台任务状态、进度与结果
+    
+    Args:
+        job_id: 任务ID
+    
+    Returns:
+        任务状态
+    """
+    try:
+        job = await job_queue.get(job_id)
+    except JobQueueUnavailable:
+        raise HTTPException(status_code=503, detail="任务队列不可用,请稍后重试")
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    
+    return JobResponse(**{field: job.get(field) for field in JobResponse.model_fields if field in job})
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
+from app.core.pagination import InvalidCursorError, CountMode
 from app.schemas.pricing_admin import (
     PricingModelCreateRequest,
     PricingModelUpdateRequest,
@@ -39,6 +40,8 @@ async def list_models(
     status: Optional[str] = Query("active", description="状态"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -57,8 +60,12 @@ async def list_models(
             keyword=keyword,
             status=status,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            count=count
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取模型列表失败: {str(e)}")
 
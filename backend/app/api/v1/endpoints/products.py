@@ -5,117 +5,45 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.pagination import InvalidCursorError, CountMode
+from app.core.responses import FastJSONResponse
 from app.schemas.product import ProductResponse, ProductPriceResponse, PaginatedProductListResponse
 from app.schemas.quote import (
     FilterOptionsResponse, PaginatedModelListResponse,
     ModelDetailResponse, ProductSearchRequest, ProductSearchResponse
 )
 from app.services.product_filter_service import product_filter_service
+from app.services.catalog_search_service import catalog_search_service
+from app.services.spec_assembly_service import spec_assembly_service
 
 router = APIRouter()
 
-# 中文显示名称到数据库product_code的映射
-MODEL_NAME_MAPPING = {
-    # 通义千问系列
-    '通义千问Max': 'qwen-max',
-    '通义千问Plus': 'qwen-plus',
-    '通义千问Turbo': 'qwen-turbo',
-    '通义千问Long': 'qwen-long',
-    '通义千问Flash': 'qwen-flash',
-    'QwQ': 'qwq-plus',
-    'QVQ': 'qvq-max',
-    '通义千问数学模型': 'qwen-math-plus',
-    '通义千问Coder': 'qwen-coder-plus',
-    '通义千问翻译模型': 'qwen-mt-turbo',
-    '通义千问数据挖掘模型': 'qwen-doc-turbo',
-    '通义千问深入研究模型': 'qwen-plus',
-    '通义法睿': 'farui-plus',
-    # 行业模型
-    '意图理解': 'tongyi-intent-detect-v3',
-    '角色扮演': 'qwen-plus-character',
-    '界面交互': 'gui-plus',
-    # 开源版模型
-    'Qwen3': 'qwen3-',
-    'QwQ-开源版': 'qwq-32b',
-    'QwQ-Preview': 'qwq-32b-preview',
-    'Qwen2.5': 'qwen2.5-',
-    'Qwen2': 'qwen2-',
-    'Qwen1.5': 'qwen1.5-',
-    'Qwen-Math': 'qwen-math-',
-    'Qwen-Coder': 'qwen-coder-',
-    # 向量模型
-    '通用文本向量': 'text-embedding-v3',
-    '文本向量': 'text-embedding-',
-    '多模态向量': 'multimodal-embedding-one-peace-v1',
-    'OpenNLU': 'opennlu-',
-    '文本排序模型': 'gte-rerank-',
-    # 语音模型 - 语音合成
-    'CosyVoice': 'cosyvoice-',
-    'Qwen-TTS': 'qwen-tts-',
-    'Qwen-TTS-RealTime': 'qwen-tts-realtime',
-    'Qwen-TTS声音复刻': 'cosyvoice-clone',
-    'Qwen-TTS声音设计': 'cosyvoice-',
-    # 语音模型 - 语音识别
-    '通义千问ASR': 'qwen3-asr-flash',
-    '通义千问ASR-Realtime': 'qwen3-asr-flash-realtime',
-    'Paraformer': 'paraformer-',
-    'SenseVoice': 'sensevoice-',
-    'Fun-ASR': 'fun-asr',
-    'Gummy语音识别/翻译': 'gummy-',
-    # Omni多模态
-    '通义千问Omni': 'qwen3-omni-flash',
-    '通义千问Omni-Realtime': 'qwen3-omni-flash-realtime',
-    'Qwen-Omni(开源)': 'qwen-omni-',
-    'Qwen3-Omni-Captioner(开源)': 'qwen3-omni-',
-    '通义千问3-LiveTranslate-Flash-Realtime': 'qwen3-livetranslate-flash-realtime',
-    # 视觉理解
-    '通义千问VL': 'qwen-vl-',
-    '通义千问OCR': 'qwen-vl-ocr',
-    'Qwen-VL(开源)': 'qwen2-vl-',
-    # 图像生成
-    '通义千问文生图': 'qwen-image-',
-    '通义千问图像编辑': 'qwen-image-edit',
-    '通义千问图像翻译': 'qwen-vl-translate',
-    '通义-文生图-Z-Image': 'z-image-',
-    '通义万相文生图': 'wanx-v1',
-    '通义万相': 'wanx-',
-    '通义万相图像生成与编辑': 'wanx-',
-    '通义万相通用图像编辑': 'wanx2.1-imageedit',
-    '通义万相涂鸦作画': 'wanx-sketch-',
-    '人像风格重绘': 'wanx-style-repaint-',
-    '图像背景生成': 'image-background-generation',
-    '图像画面扩展': 'image-outpainting',
-    '人物写真生成-FaceChain': 'facechain-',
-    '创意文字生成-WordArt锦书': 'wordart-',
-    'FLUX': 'flux-',
-    # 视频生成
-    '通义万相-文生视频': 'wanx2.1-t2v-',
-    '文生视频': 'wanx2.1-t2v-',
-    '通义万相-图生视频-基于首帧': 'wanx2.1-i2v-',
-    '通义万相-图生视频-基于首尾帧': 'wanx2.1-i2v-plus',
-    '图生视频': 'wanx2.1-i2v-',
-    '通义万相-参考生视频': 'wanx-ref2v',
-    '通义万相-通用视频编辑': 'wanx-video-',
-    '通义万相-数字人': 'wanx-digital-human',
-    '通义万相-图生动作': 'wanx-motion-',
-    '通义万相-视频换人': 'wanx-video-faceswap',
-    '舞动人像AnimateAnyone': 'animate-anyone',
-    '灵动人像LivePortrait': 'liveportrait-',
-}
 
 
 @router.get("/filters", response_model=FilterOptionsResponse)
 async def get_filter_options(
-    db: AsyncSession = Depends(get_db)
+    modality: Optional[str] = Query(None, description="当前选中的模态（逗号分隔多选）"),
+    capability: Optional[str] = Query(None, description="当前选中的能力类型（逗号分隔多选）"),
+    model_type: Optional[str] = Query(None, description="当前选中的模型类型（逗号分隔多选）"),
+    vendor: Optional[str] = Query(None, description="当前选中的厂商"),
+    keyword: Optional[str] = Query(None, description="当前搜索关键词"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取筛选条件选项
     
-    返回所有可用的筛选维度及其选项
+    返回所有可用的筛选维度及其选项，每个选项附带按当前筛选条件计算的模型数量
     """
     try:
-        return await product_filter_service.get_filter_options(db)
+        return await product_filter_service.get_filter_options(
+            db,
+            modality=modality,
+            capability=capability,
+            model_type=model_type,
+            vendor=vendor,
+            keyword=keyword
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取筛选选项失败: {str(e)}")
 
@@ -130,7 +58,9 @@ async def get_models(
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取大模型商品列表
@@ -147,8 +77,12 @@ async def get_models(
             vendor=vendor,
             keyword=keyword,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            count=count
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询模型列表失败: {str(e)}")
 
@@ -177,7 +111,7 @@ async def search_products(
 async def get_model_detail(
     model_id: str,
     region: Optional[str] = Query("cn-beijing", description="地域"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取模型详情
@@ -204,7 +138,7 @@ async def get_products(
     status: Optional[str] = Query("active", description="状态"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取产品列表
@@ -212,7 +146,7 @@ async def get_products(
     支持按类别、厂商和关键词搜索，返回分页结果
     """
     try:
-        from sqlalchemy import select, func, or_
+        from sqlalchemy import select, func
         from app.models.product import Product
         
         # 构建查询
@@ -226,10 +160,8 @@ async def get_products(
             query = query.where(Product.vendor == vendor)
         if keyword:
             query = query.where(
-                or_(
-                    Product.product_name.ilike(f"%{keyword}%"),
-                    Product.product_code.ilike(f"%{keyword}%"),
-                    Product.description.ilike(f"%{keyword}%")
+                catalog_search_service.keyword_condition(
+                    (Product.product_name, Product.product_code, Product.description), keyword
                 )
             )
         
@@ -274,7 +206,7 @@ async def get_products(
 @router.get("/specs")
 async def get_model_specs_by_name(
     model_name: str = Query(..., description="模型名称"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     根据模型名称获取规格配置
@@ -283,144 +215,52 @@ async def get_model_specs_by_name(
     支持中文显示名称自动映射到数据库product_code
     """
     try:
-        from sqlalchemy import select, or_, text
-        from app.models.product import Product, ProductPrice, ProductSpec
-        
-        # 首先尝试映射中文名称到product_code
-        mapped_code = MODEL_NAME_MAPPING.get(model_name)
-        
-        # 构建查询条件
-        if mapped_code:
-            # 如果有映射，优先使用映射的code查询
-            query = select(Product).where(
-                or_(
-                    Product.product_code == mapped_code,
-                    Product.product_code.ilike(f"{mapped_code}%")
-                )
-            )
-        else:
-            # 否则使用原有的名称匹配逻辑
-            query = select(Product).where(
-                or_(
-                    Product.product_name == model_name,
-                    Product.product_name.ilike(f"%{model_name}%"),
-                    Product.product_code.ilike(f"%{model_name}%")
-                )
-            )
-        
-        result = await db.execute(query)
-        products = result.scalars().all()
-        
-        # 如果在products表找不到，尝试从pricing_model表查询
-        if not products:
-            pricing_query = text("""
-                SELECT pm.id, pm.model_code, pm.model_name, pm.display_name,
-                       pmp.dimension_code, pmp.unit_price, pmp.unit, pmp.rule_text,
-                       pc.name as category_name
-                FROM pricing_model pm
-                JOIN pricing_model_price pmp ON pm.id = pmp.model_id
-                JOIN pricing_category pc ON pm.category_id = pc.id
-                WHERE pm.display_name ILIKE :search_pattern
-                   OR pm.model_name ILIKE :search_pattern
-                   OR pm.model_code ILIKE :code_pattern
-                ORDER BY pm.model_name, pmp.dimension_code
-            """)
-            
-            code_pattern = f"{mapped_code}%" if mapped_code else f"%{model_name}%"
-            pricing_result = await db.execute(
-                pricing_query, 
-                {"search_pattern": f"%{model_name}%", "code_pattern": code_pattern}
-            )
-            pricing_rows = pricing_result.fetchall()
-            
-            if pricing_rows:
-                # 按模型分组价格
-                model_prices = {}
-                for row in pricing_rows:
-                    model_key = row.model_code or row.model_name
-                    if model_key not in model_prices:
-                        model_prices[model_key] = {
-                            'model_name': row.display_name or row.model_name,
-                            'model_code': row.model_code,
-                            'category': row.category_name,
-                            'prices': {}
-                        }
-                    model_prices[model_key]['prices'][row.dimension_code] = {
-                        'unit_price': float(row.unit_price) if row.unit_price else None,
-                        'unit': row.unit,
-                        'rule_text': row.rule_text
-                    }
-                
-                specs_list = []
-                for idx, (model_key, model_data) in enumerate(model_prices.items()):
-                    prices = model_data['prices']
-                    spec_item = {
-                        "id": f"pricing_{model_key}_{idx}",
-                        "product_code": model_data['model_code'],
-                        "model_name": model_data['model_name'],
-                        "region": "中国内地",
-                        "mode": "标准",
-                        "token_range": prices.get('input_token', {}).get('rule_text') or "无阶梯计价",
-                        "input_price": prices.get('input_token', {}).get('unit_price'),
-                        "output_price": prices.get('output_token', {}).get('unit_price'),
-                        "unit": prices.get('input_token', {}).get('unit') or "千Token",
-                        "billing_mode": "token",
-                        "remark": "",
-                        "display_config": {
-                            "show_mode": True,
-                            "show_token_range": True,
-                            "price_unit": f"/{prices.get('input_token', {}).get('unit') or '千Token'}"
-                        }
-                    }
-                    specs_list.append(spec_item)
-                
-                return {"specs": specs_list}
-        
-        if not products:
-            return {"specs": [], "message": f"未找到模型: {model_name}"}
-        
-        specs_list = []
-        for product in products:
-            # 获取价格信息
-            price_query = select(ProductPrice).where(
-                ProductPrice.product_code == product.product_code
-            )
-            price_result = await db.execute(price_query)
-            prices = price_result.scalars().all()
-            
-            for price in prices:
-                pricing_vars = price.pricing_variables or {}
-                
-                # 构建规格配置
-                spec_item = {
-                    "id": str(price.price_id),
-                    "product_code": product.product_code,
-                    "model_name": product.product_name,
-                    "region": price.region,
-                    "mode": pricing_vars.get("mode", "标准"),
-                    "token_range": pricing_vars.get("token_range", "无阶梯计价"),
-                    "input_price": pricing_vars.get("input_price"),
-                    "output_price": pricing_vars.get("output_price"),
-                    "unit": price.unit or "千Token",
-                    "billing_mode": price.billing_mode,
-                    "remark": pricing_vars.get("remark", ""),
-                    "display_config": {
-                        "show_mode": pricing_vars.get("mode") is not None,
-                        "show_token_range": pricing_vars.get("token_range") is not None,
-                        "price_unit": f"/{price.unit or '千Token'}"
-                    }
-                }
-                specs_list.append(spec_item)
-        
-        return {"specs": specs_list}
+        return await spec_assembly_service.get_specs(db, model_name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取模型规格失败: {str(e)}")
 
 
+@router.get("/semantic-search")
+async def semantic_search_models(
+    query: str = Query(..., min_length=1, description="使用场景描述，如：智能客服多轮对话"),
+    top_k: int = Query(10, ge=1, le=50, description="返回数量"),
+    category: Optional[str] = Query(None, description="产品类别"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    语义检索模型
+    
+    根据使用场景描述，按产品描述向量的余弦相似度返回最相关的模型
+    """
+    try:
+        from app.services.product_vector_service import product_vector_service
+        models = await product_vector_service.search(db, query, top_k=top_k, category=category)
+        return {"query": query, "total": len(models), "models": models}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"语义检索失败: {str(e)}")
+
+
+@router.post("/embeddings/refresh")
+async def refresh_product_embeddings(
+    only_missing: bool = Query(True, description="仅为尚未生成向量的产品生成"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量生成产品描述向量
+    
+    分块读取产品并批量调用向量化接口，回写description_vector
+    """
+    try:
+        from app.services.product_vector_service import product_vector_service
+        return await product_vector_service.refresh_embeddings(db, only_missing=only_missing)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"生成产品向量失败: {str(e)}")
+
+
 @router.get("/{product_code}", response_model=ProductResponse)
 async def get_product(
     product_code: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取产品详情
@@ -459,7 +299,7 @@ async def get_product_price(
     product_code: str,
     region: Optional[str] = Query("cn-beijing", description="地域"),
     spec_type: Optional[str] = Query(None, description="规格类型"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取产品价格信息
@@ -523,7 +363,7 @@ async def get_product_price(
 @router.get("/{product_code}/prices", response_model=List[ProductPriceResponse])
 async def get_product_prices(
     product_code: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取产品所有地域的价格信息
@@ -569,7 +409,7 @@ async def get_product_prices(
 
 @router.get("/categories/list")
 async def get_product_categories(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取所有产品类别
@@ -596,7 +436,7 @@ async def get_product_categories(
 
 @router.get("/vendors/list")
 async def get_product_vendors(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取所有厂商列表
@@ -624,16 +464,33 @@ async def get_product_vendors(
 
 @router.get("/pricing/filters")
 async def get_pricing_filter_options(
-    db: AsyncSession = Depends(get_db)
+    category: Optional[str] = Query(None, description="分类代码"),
+    mode: Optional[str] = Query(None, description="模式"),
+    token_tier: Optional[str] = Query(None, description="Token阶梯"),
+    resolution: Optional[str] = Query(None, description="分辨率（视频模型）"),
+    supports_batch: Optional[bool] = Query(None, description="是否支持Batch半价"),
+    supports_cache: Optional[bool] = Query(None, description="是否支持上下文缓存"),
+    keyword: Optional[str] = Query(None, description="关键词搜索"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取定价筛选选项（多维度）
     
-    返回所有可用的定价筛选维度：分类、模式、Token阶梯、分辨率等
+    返回所有可用的定价筛选维度：分类、模式、Token阶梯、分辨率等，
+    每个选项附带按当前筛选条件计算的模型数量
     """
     try:
         from app.services.pricing_data_service import pricing_data_service
-        return await pricing_data_service.get_filter_options(db)
+        return await pricing_data_service.get_filter_options(
+            db,
+            category=category,
+            mode=mode,
+            token_tier=token_tier,
+            resolution=resolution,
+            supports_batch=supports_batch,
+            supports_cache=supports_cache,
+            keyword=keyword
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取定价筛选选项失败: {str(e)}")
 
@@ -649,7 +506,9 @@ async def get_pricing_models(
     keyword: Optional[str] = Query(None, description="关键词搜索"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=200, description="每页数量"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取定价模型列表（多维度筛选）
@@ -658,7 +517,7 @@ async def get_pricing_models(
     """
     try:
         from app.services.pricing_data_service import pricing_data_service
-        return await pricing_data_service.filter_models(
+        result = await pricing_data_service.filter_models(
             db=db,
             category=category,
             mode=mode,
@@ -668,8 +527,14 @@ async def get_pricing_models(
             supports_cache=supports_cache,
             keyword=keyword,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            count=count
         )
+        # 结果已是可序列化的dict，直接输出
+        return FastJSONResponse(result)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询定价模型失败: {str(e)}")
 
@@ -677,7 +542,7 @@ async def get_pricing_models(
 @router.get("/pricing/model/{model_code}")
 async def get_model_pricing_detail(
     model_code: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取模型完整定价信息
@@ -699,7 +564,7 @@ async def get_model_pricing_detail(
 @router.get("/pricing/summary/{model_code}")
 async def get_pricing_summary(
     model_code: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取模型定价摘要
@@ -717,7 +582,7 @@ async def get_pricing_summary(
 async def search_pricing_models(
     keyword: str = Query(..., description="搜索关键词"),
     limit: int = Query(20, ge=1, le=100, description="返回数量"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     搜索模型（用于自动完成）
@@ -733,7 +598,7 @@ async def search_pricing_models(
 
 @router.get("/pricing/categories")
 async def get_pricing_categories_tree(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取分类及模型树
@@ -7,7 +7,9 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.core.pagination import InvalidCursorError, CountMode
+from app.core.responses import FastJSONResponse
 from app.schemas.quote import (
     QuoteCreateRequest, QuoteUpdateRequest,
     QuoteItemCreateRequest, QuoteItemUpdateRequest,
@@ -23,7 +25,7 @@ router = APIRouter()
 
 @router.get("/statistics")
 async def get_quote_statistics(
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取报价统计数据
@@ -106,7 +108,9 @@ async def get_quotes(
     end_date: Optional[date] = Query(None, description="创建时间止"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor），传入后忽略page"),
+    count: str = CountMode,
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取报价单列表
@@ -114,14 +118,20 @@ async def get_quotes(
     支持多条件筛选和分页
     """
     try:
-        return await quote_service.list_quotes(
+        result = await quote_service.list_quotes(
             db=db,
             customer_name=customer_name,
             status=status,
             created_by=created_by,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            count=count
         )
+        # 服务层已返回PaginatedQuoteListResponse，跳过response_model的二次校验
+        return FastJSONResponse(result)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取报价单列表失败: {str(e)}")
 
@@ -129,7 +139,7 @@ async def get_quotes(
 @router.get("/{quote_id}", response_model=QuoteDetailResponse)
 async def get_quote(
     quote_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取报价单详情
@@ -306,7 +316,7 @@ async def clone_quote(
 @router.get("/{quote_id}/versions", response_model=List[QuoteVersionResponse])
 async def get_quote_versions(
     quote_id: UUID,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取报价单版本历史
@@ -3,9 +3,10 @@
 """
 import os
 from typing import Optional
-from openai import AsyncOpenAI
 from loguru import logger
 
+from app.core.metrics import LLM_REQUEST_DURATION, record_llm_tokens, track_duration
+
 
 # 百炼配置
 BAILIAN_EXPRESS_CONFIG = {
@@ -19,12 +20,20 @@ class BailianExpressClient:
     """百炼客户端 - 极速报价专用"""
     
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=BAILIAN_EXPRESS_CONFIG["api_key"],
-            base_url=BAILIAN_EXPRESS_CONFIG["base_url"]
-        )
+        self._client = None
         self.model = BAILIAN_EXPRESS_CONFIG["model"]
     
+    @property
+    def client(self):
+        """OpenAI兼容客户端（openai导入较慢，首次调用时创建）"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=BAILIAN_EXPRESS_CONFIG["api_key"],
+                base_url=BAILIAN_EXPRESS_CONFIG["base_url"]
+            )
+        return self._client
+    
     async def chat(
         self,
         messages: list,
@@ -56,7 +65,12 @@ class BailianExpressClient:
                 kwargs["tools"] = tools
                 kwargs["tool_choice"] = "auto"
             
-            response = await self.client.chat.completions.create(**kwargs)
+            with track_duration(LLM_REQUEST_DURATION, client="bailian_express", model=self.model):
+                response = await self.client.chat.completions.create(**kwargs)
+            
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                record_llm_tokens("bailian_express", self.model, usage.prompt_tokens, usage.completion_tokens)
             
             message = response.choices[0].message
             result = {
@@ -1,7 +1,7 @@
 """
 配置管理模块
 """
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,6 +19,10 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DATABASE_POOL_SIZE: int = 20
     DATABASE_MAX_OVERFLOW: int = 10
+    # 只读副本（为空时读请求使用主库）
+    DATABASE_READ_URL: str = ""
+    DATABASE_READ_POOL_SIZE: int = 20
+    DATABASE_READ_STICKY_SECONDS: float = 5  # 客户端写入后该时长内读请求仍走主库
     
     # Redis配置
     REDIS_URL: str
@@ -37,6 +41,20 @@ class Settings(BaseSettings):
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
+    LOG_JSON: bool = False  # 输出结构化JSON日志
+    LOG_QUEUE_SIZE: int = 10000  # 日志队列容量，队列满时丢弃并计数
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0  # 访问日志默认采样率
+    LOG_ACCESS_SAMPLE_ROUTES: Dict[str, float] = {"/health": 0.01, "/metrics": 0.01}  # 按路由前缀的采样率
+    
+    # SQL查询分析：同一语句形态在一个请求内执行达到该次数时视为疑似N+1
+    SQL_REPEAT_THRESHOLD: int = 5
+    
+    # 后台健康检查：按间隔探测依赖，健康检查接口返回缓存结果
+    HEALTH_CHECK_INTERVAL: float = 10
+    HEALTH_CHECK_TIMEOUT: float = 3
+    HEALTH_HISTORY_SIZE: int = 30  # 每个依赖保留的探测记录数
+    HEALTH_LOOP_LAG_THRESHOLD_MS: float = 500  # 事件循环延迟超过该值时降级
+    HEALTH_POOL_SATURATION_THRESHOLD: float = 0.9  # 连接池占用率超过该值时降级
     
     # CORS配置
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -45,13 +63,36 @@ class Settings(BaseSettings):
     CRAWLER_USER_AGENT: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
     CRAWLER_DELAY: int = 2
     CRAWLER_CONCURRENT_REQUESTS: int = 5
+    # 多worker部署时通过Redis租约选出唯一运行定时调度的进程
+    CRAWLER_LEADER_ELECTION: bool = True
+    CRAWLER_LEADER_LEASE_SECONDS: float = 30  # 主节点失联后最长该时长内由其他进程接管
+    
+    # 后台任务队列（Redis Streams）
+    JOB_WORKER_ENABLED: bool = False  # API进程内运行worker（仅限单进程开发调试）；默认由scripts/run_worker.py独立运行，爬虫与Playwright不进入API进程
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_VISIBILITY_TIMEOUT: float = 300  # worker失联后未确认的任务经过该时长由其他worker接管
+    JOB_RETRY_BACKOFF: float = 10  # 首次重试延迟（秒），之后每次加倍
+    JOB_RESULT_TTL: int = 604800  # 任务状态与结果保留时长（秒）
     
     # 编排服务配置
     AGENTGO_API_KEY: str = ""
     
-    # 限流配置
+    # 限流配置：每个IP在滑动窗口（秒）内的额度，按路由前缀计费（0为不限流）
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_IP: int = 100
     RATE_LIMIT_WINDOW: int = 60
+    RATE_LIMIT_ROUTE_COSTS: Dict[str, int] = {
+        "/health": 0,
+        "/metrics": 0,
+        "/api/docs": 0,
+        "/api/openapi.json": 0,
+        "/api/v1/ai/chat": 10,
+        "/api/v1/ai/parse-requirement": 10,
+        "/api/v1/ai/extract": 10,
+        "/api/v1/express-quote/chat": 10,
+        "/api/v1/express-quote/export": 5,
+        "/api/v1/export": 5,
+    }
     
     model_config = SettingsConfigDict(
         env_file=".env",
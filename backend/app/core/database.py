@@ -1,11 +1,29 @@
 """
 数据库连接管理
+
+- get_db: 主库会话，用于写操作及需要强一致读的接口
+- get_read_db: 只读会话，配置了DATABASE_READ_URL时路由到只读副本；
+  客户端写入后的一段时间内（写后读）或副本不可用时使用主库
+
+写后读按客户端令牌（X-Client-Token头或Cookie，首次写入时签发）识别客户端，
+请求未携带令牌时按IP识别。
 """
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import Session, declarative_base
 from loguru import logger
 
+from app.core import redis_client as redis_module
 from app.core.config import settings
+from app.core.metrics import register_pool, DB_READ_SESSIONS
+from app.core.middleware import RequestContext
+from app.core.query_profiler import install_query_profiler
 
 # 创建异步引擎
 engine = create_async_engine(
@@ -15,6 +33,10 @@ engine = create_async_engine(
     echo=settings.APP_DEBUG,
     future=True
 )
+register_pool("primary", engine)
+
+# 按请求统计查询次数与耗时
+install_query_profiler()
 
 # 创建会话工厂
 async_session_maker = async_sessionmaker(
@@ -23,10 +45,147 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False
 )
 
+# 只读副本（未配置时读请求使用主库）
+read_engine = None
+read_session_maker = None
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        settings.DATABASE_READ_URL,
+        pool_size=settings.DATABASE_READ_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_pre_ping=True,  # 副本可能重启或切换，借出连接前检测
+        echo=settings.APP_DEBUG,
+        future=True
+    )
+    register_pool("replica", read_engine)
+    read_session_maker = async_sessionmaker(
+        read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+
 # 基础模型类
 Base = declarative_base()
 
 
+# ==================== 读写分离 ====================
+
+def _mark_writes_on_flush(session, flush_context):
+    session.info["has_writes"] = True
+
+
+def _mark_writes_on_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+# 记录会话是否执行过写操作（flush或ORM的insert/update/delete语句）
+event.listen(Session, "after_flush", _mark_writes_on_flush)
+event.listen(Session, "do_orm_execute", _mark_writes_on_execute)
+
+
+class ReadAfterWriteTracker:
+    """
+    写后读标记
+    
+    客户端写入后的seconds秒内，其读请求使用主库，避免读到复制延迟前的旧数据。
+    标记同时记在本进程与Redis（多worker共享），Redis不可用时只在本进程生效。
+    """
+    
+    KEY_PREFIX = "db:sticky:"
+    # 本进程标记超过该数量时清理过期项
+    MAX_KEYS = 10000
+    
+    def __init__(
+        self,
+        seconds: float,
+        redis_getter: Callable[[], object] = lambda: redis_module.redis_client,
+        clock: Callable[[], float] = time.time
+    ):
+        self.seconds = seconds
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self._local: Dict[str, float] = {}
+    
+    async def mark(self, key: str):
+        now = self._clock()
+        if len(self._local) >= self.MAX_KEYS:
+            self._local = {k: expires for k, expires in self._local.items() if expires > now}
+        self._local[key] = now + self.seconds
+        
+        client = self._redis_getter()
+        if client is None:
+            return
+        try:
+            await client.set(self.KEY_PREFIX + key, 1, px=int(self.seconds * 1000))
+        except (RedisError, OSError) as e:
+            logger.warning(f"写后读标记写入Redis失败: {e}")
+    
+    async def is_sticky(self, key: str) -> bool:
+        if self._local.get(key, 0) > self._clock():
+            return True
+        
+        client = self._redis_getter()
+        if client is None:
+            return False
+        try:
+            return bool(await client.exists(self.KEY_PREFIX + key))
+        except (RedisError, OSError):
+            return False
+
+
+class ReadReplicaRouter:
+    """只读会话路由：副本可用且客户端不在写后读窗口内时使用副本，否则使用主库"""
+    
+    # 副本连接失败后，该时长（秒）内读请求直接使用主库
+    REPLICA_RETRY_INTERVAL = 30.0
+    
+    def __init__(
+        self,
+        primary_maker: async_sessionmaker,
+        replica_maker: Optional[async_sessionmaker] = None,
+        tracker: Optional[ReadAfterWriteTracker] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.primary_maker = primary_maker
+        self.replica_maker = replica_maker
+        self.tracker = tracker
+        self._clock = clock
+        self._replica_retry_at = 0.0
+    
+    async def mark_written(self, client_key: Optional[str]):
+        """客户端完成写入后调用"""
+        if self.replica_maker is not None and self.tracker is not None and client_key:
+            await self.tracker.mark(client_key)
+    
+    async def read_session(self, client_key: Optional[str] = None) -> AsyncSession:
+        """创建只读会话，session.info["db_role"] 为 replica 或 primary"""
+        if self.replica_maker is None:
+            reason = "no_replica"
+        elif self._clock() < self._replica_retry_at:
+            reason = "replica_down"
+        elif client_key and self.tracker is not None and await self.tracker.is_sticky(client_key):
+            reason = "read_after_write"
+        else:
+            session = self.replica_maker()
+            try:
+                # 立即借出连接，副本不可用时在进入接口前退回主库
+                await session.connection()
+                session.info["db_role"] = "replica"
+                DB_READ_SESSIONS.labels(target="replica", reason="ok").inc()
+                return session
+            except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+                await session.close()
+                self._replica_retry_at = self._clock() + self.REPLICA_RETRY_INTERVAL
+                logger.warning(f"只读副本连接失败，{self.REPLICA_RETRY_INTERVAL}秒内读请求使用主库: {e}")
+                reason = "replica_down"
+        
+        session = self.primary_maker()
+        session.info["db_role"] = "primary"
+        DB_READ_SESSIONS.labels(target="primary", reason=reason).inc()
+        return session
+
+
 async def init_db():
     """初始化数据库"""
     try:
@@ -39,14 +198,60 @@ async def init_db():
         raise
 
 
+read_router = ReadReplicaRouter(
+    async_session_maker,
+    read_session_maker,
+    tracker=ReadAfterWriteTracker(settings.DATABASE_READ_STICKY_SECONDS)
+)
+
+
+def _read_client_key() -> Optional[str]:
+    """只读请求的写后读键：有令牌时按令牌，否则按IP"""
+    token = RequestContext.get("client_token")
+    if token:
+        return f"token:{token}"
+    client_ip = RequestContext.get("client_ip")
+    return f"ip:{client_ip}" if client_ip else None
+
+
+def _written_client_keys() -> List[str]:
+    """写入后需要标记的键：携带令牌时只标记令牌；否则签发令牌，同时标记IP（兼容不回传令牌的客户端）"""
+    token = RequestContext.get("client_token")
+    if token:
+        return [f"token:{token}"]
+    
+    keys = []
+    token = RequestContext.issue_client_token()
+    if token:
+        keys.append(f"token:{token}")
+    client_ip = RequestContext.get("client_ip")
+    if client_ip:
+        keys.append(f"ip:{client_ip}")
+    return keys
+
+
 async def get_db() -> AsyncSession:
     """获取数据库会话"""
     async with async_session_maker() as session:
         try:
             yield session
             await session.commit()
+            if session.info.get("has_writes"):
+                for client_key in _written_client_keys():
+                    await read_router.mark_written(client_key)
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+
+async def get_read_db() -> AsyncSession:
+    """获取只读数据库会话（不提交，用于只读接口）"""
+    session = await read_router.read_session(_read_client_key())
+    try:
+        yield session
+    finally:
+        if session.info.get("has_writes"):
+            logger.warning("只读会话中执行了写操作，已回滚")
+        await session.close()
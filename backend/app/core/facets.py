@@ -0,0 +1,139 @@
+"""
+分面计数工具
+
+一次查询计算多个筛选维度（分面）的取值及各取值下的记录数：
+- PostgreSQL 使用 GROUP BY GROUPING SETS，每个维度一个分组集
+- 其他数据库（如测试用SQLite）取回各维度取值与条件标记，在内存中单遍统计
+
+计数支持"按当前筛选条件"计算：某维度的计数应用除该维度自身以外的全部筛选条件，
+这样已选中某个取值时，同维度的其他取值仍显示切换过去后的结果数。
+"""
+from collections import defaultdict
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, case, distinct, func, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+
+FacetCounts = Dict[str, Dict[Any, int]]
+
+
+class Facet(NamedTuple):
+    """分面维度：name为结果中的键，expression为取值表达式"""
+    name: str
+    expression: Any
+
+
+def _count_conditions(
+    facets: Sequence[Facet],
+    conditions: Sequence[ColumnElement],
+    filters: Mapping[str, ColumnElement]
+) -> list:
+    """每个维度的计数条件：公共条件 + 其他维度的筛选条件"""
+    result = []
+    for facet in facets:
+        clauses = list(conditions) + [clause for name, clause in filters.items() if name != facet.name]
+        result.append(and_(*clauses) if clauses else None)
+    return result
+
+
+async def facet_counts(
+    db: AsyncSession,
+    query: Select,
+    facets: Sequence[Facet],
+    conditions: Sequence[ColumnElement] = (),
+    filters: Optional[Mapping[str, ColumnElement]] = None,
+    count_key: Any = None
+) -> FacetCounts:
+    """
+    计算分面计数
+    
+    Args:
+        db: 数据库会话
+        query: 定义取值范围的查询（FROM、JOIN与WHERE生效，选择列被忽略）；
+            范围内出现的取值都会返回，即使计数为0
+        facets: 分面维度
+        conditions: 所有计数都应用的条件（如只统计上架记录）
+        filters: 维度名到当前筛选条件的映射，计数时排除该维度自身的条件；
+            也可包含不属于任何维度的筛选（如关键词），对所有维度生效
+        count_key: 去重计数的键（关联查询导致一条记录多行时使用），默认按行计数
+    
+    Returns:
+        {维度名: {取值: 记录数}}
+    """
+    filters = filters or {}
+    count_conditions = _count_conditions(facets, conditions, filters)
+    
+    if db.bind is not None and db.bind.dialect.name == "postgresql":
+        return await _grouping_sets_counts(db, query, facets, count_conditions, count_key)
+    return await _in_memory_counts(db, query, facets, count_conditions, count_key)
+
+
+async def _grouping_sets_counts(
+    db: AsyncSession,
+    query: Select,
+    facets: Sequence[Facet],
+    count_conditions: list,
+    count_key: Any
+) -> FacetCounts:
+    """GROUPING SETS：每个维度一个分组集，计数通过FILTER应用各自的条件"""
+    columns = []
+    for i, (facet, condition) in enumerate(zip(facets, count_conditions)):
+        aggregate = func.count(distinct(count_key)) if count_key is not None else func.count()
+        if condition is not None:
+            aggregate = aggregate.filter(condition)
+        columns += [
+            facet.expression.label(f"value_{i}"),
+            func.grouping(facet.expression).label(f"grouping_{i}"),
+            aggregate.label(f"count_{i}"),
+        ]
+    
+    stmt = query.with_only_columns(*columns).order_by(None).group_by(
+        func.grouping_sets(*[facet.expression for facet in facets])
+    )
+    result = await db.execute(stmt)
+    
+    counts: FacetCounts = {facet.name: {} for facet in facets}
+    for row in result.all():
+        mapping = row._mapping
+        for i, facet in enumerate(facets):
+            # 每行只属于一个分组集：该维度的GROUPING()为0
+            if mapping[f"grouping_{i}"] == 0:
+                counts[facet.name][mapping[f"value_{i}"]] = mapping[f"count_{i}"]
+                break
+    return counts
+
+
+async def _in_memory_counts(
+    db: AsyncSession,
+    query: Select,
+    facets: Sequence[Facet],
+    count_conditions: list,
+    count_key: Any
+) -> FacetCounts:
+    """取回各维度取值与条件标记，单遍统计"""
+    columns = [facet.expression.label(f"value_{i}") for i, facet in enumerate(facets)]
+    columns += [
+        case((condition if condition is not None else true(), 1), else_=0).label(f"match_{i}")
+        for i, condition in enumerate(count_conditions)
+    ]
+    if count_key is not None:
+        columns.append(count_key.label("count_key"))
+    
+    result = await db.execute(query.with_only_columns(*columns).order_by(None))
+    
+    keys: Dict[str, Dict[Any, set]] = {facet.name: defaultdict(set) for facet in facets}
+    for index, row in enumerate(result.all()):
+        mapping = row._mapping
+        key = mapping["count_key"] if count_key is not None else index
+        for i, facet in enumerate(facets):
+            matched = keys[facet.name][mapping[f"value_{i}"]]
+            if mapping[f"match_{i}"]:
+                matched.add(key)
+    
+    return {
+        name: {value: len(matched) for value, matched in values.items()}
+        for name, values in keys.items()
+    }
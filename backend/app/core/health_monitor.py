@@ -0,0 +1,286 @@
+"""
+后台健康检查
+
+编排系统在每个实例上每隔几秒探测一次健康检查接口，若每次都开启数据库事务并ping Redis，
+系统繁忙时探测本身会加重连接池压力。
+
+HealthMonitor 在后台按固定间隔探测依赖，记录状态、耗时与最近的历史，
+并采样事件循环延迟与连接池占用率；/health/detailed 与 /health/ready 直接返回缓存结果。
+缓存过期（后台任务未启动或卡住）时由请求触发一次探测，并发请求共享同一次探测结果。
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+from app.core.database import engine, read_engine
+from app.core.metrics import register_callback, pool_usage
+
+
+HEALTHY = "healthy"
+UNHEALTHY = "unhealthy"
+DEGRADED = "degraded"
+
+# 探测函数：成功时返回None或说明文字，失败时抛出异常
+Probe = Callable[[], Awaitable[Optional[str]]]
+
+
+@dataclass
+class CheckResult:
+    """一次探测结果"""
+    status: str
+    message: str
+    latency_ms: float
+    checked_at: float
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "message": self.message,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at,
+        }
+
+
+@dataclass
+class _Check:
+    probe: Probe
+    critical: bool
+    history: Deque[CheckResult]
+
+
+class HealthMonitor:
+    """依赖健康状态的后台探测与缓存"""
+    
+    # 事件循环延迟采样间隔（秒）
+    LAG_SAMPLE_INTERVAL = 0.5
+    # 结果超过 interval * STALE_FACTOR 秒未更新视为过期
+    STALE_FACTOR = 3
+    
+    def __init__(
+        self,
+        interval: float = 10,
+        timeout: float = 3,
+        history_size: int = 30,
+        lag_threshold_ms: float = 500,
+        pool_threshold: float = 0.9,
+        pools: Callable[[], Dict[str, Dict[str, Any]]] = pool_usage,
+        clock: Callable[[], float] = time.time
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.history_size = history_size
+        self.lag_threshold_ms = lag_threshold_ms
+        self.pool_threshold = pool_threshold
+        self._pools = pools
+        self._clock = clock
+        self._checks: Dict[str, _Check] = {}
+        self.last_run: Optional[float] = None
+        self._lag_samples: Deque[float] = deque(maxlen=max(1, int(60 / self.LAG_SAMPLE_INTERVAL)))
+        self._lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+    
+    def add_check(self, name: str, probe: Probe, critical: bool = True):
+        """
+        登记依赖探测
+        
+        critical=False 的依赖（如只读副本，故障时自动回退主库）失败只降级，不影响就绪
+        """
+        self._checks[name] = _Check(probe, critical, deque(maxlen=self.history_size))
+    
+    # ==================== 探测 ====================
+    
+    async def _run_check(self, name: str, check: _Check) -> CheckResult:
+        start = time.perf_counter()
+        try:
+            message = await asyncio.wait_for(check.probe(), self.timeout)
+            status, message = HEALTHY, message or "连接正常"
+        except asyncio.TimeoutError:
+            status, message = UNHEALTHY, f"探测超时（{self.timeout}s）"
+        except Exception as e:
+            status, message = UNHEALTHY, str(e) or type(e).__name__
+        
+        result = CheckResult(status, message, round((time.perf_counter() - start) * 1000, 2), self._clock())
+        previous = check.history[-1] if check.history else None
+        if previous and previous.status != result.status:
+            logger.warning(f"健康检查 {name}: {previous.status} -> {result.status}（{message}）")
+        check.history.append(result)
+        return result
+    
+    async def _run_all(self):
+        await asyncio.gather(*(self._run_check(name, check) for name, check in self._checks.items()))
+        self.last_run = self._clock()
+    
+    async def run_checks(self):
+        """立即探测全部依赖"""
+        async with self._lock:
+            await self._run_all()
+    
+    def is_stale(self) -> bool:
+        return self.last_run is None or self._clock() - self.last_run > self.interval * self.STALE_FACTOR
+    
+    async def ensure_fresh(self):
+        """结果过期时探测一次；并发调用等待同一次探测，不重复访问依赖"""
+        if not self.is_stale():
+            return
+        async with self._lock:
+            if self.is_stale():
+                await self._run_all()
+    
+    # ==================== 后台任务 ====================
+    
+    async def _probe_loop(self):
+        while True:
+            try:
+                await self.run_checks()
+            except Exception as e:
+                logger.exception(f"健康检查执行失败: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def _lag_loop(self):
+        """事件循环延迟：sleep实际耗时超出预期的部分"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.LAG_SAMPLE_INTERVAL)
+            self._lag_samples.append(max(0.0, loop.time() - start - self.LAG_SAMPLE_INTERVAL))
+    
+    def start(self):
+        """启动后台探测与事件循环延迟采样"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._probe_loop()),
+            asyncio.create_task(self._lag_loop()),
+        ]
+    
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # ==================== 状态 ====================
+    
+    def latest(self, name: str) -> Optional[CheckResult]:
+        check = self._checks.get(name)
+        return check.history[-1] if check and check.history else None
+    
+    def is_ready(self) -> bool:
+        """关键依赖在最近一次探测中均正常，且结果未过期"""
+        if self.is_stale():
+            return False
+        for name, check in self._checks.items():
+            result = self.latest(name)
+            if check.critical and (result is None or result.status != HEALTHY):
+                return False
+        return True
+    
+    def event_loop_lag(self) -> Dict[str, Any]:
+        lag_ms = round(self._lag_samples[-1] * 1000, 2) if self._lag_samples else None
+        max_lag_ms = round(max(self._lag_samples) * 1000, 2) if self._lag_samples else None
+        return {
+            "status": DEGRADED if lag_ms is not None and lag_ms >= self.lag_threshold_ms else HEALTHY,
+            "lag_ms": lag_ms,
+            "max_lag_ms": max_lag_ms,
+        }
+    
+    def db_pools(self) -> Dict[str, Dict[str, Any]]:
+        pools = {}
+        for name, usage in self._pools().items():
+            saturation = usage.get("saturation")
+            saturated = saturation is not None and saturation >= self.pool_threshold
+            pools[name] = {**usage, "status": DEGRADED if saturated else HEALTHY}
+        return pools
+    
+    def snapshot(self, include_history: bool = False) -> Dict[str, Any]:
+        """缓存的健康状态；任一依赖、事件循环或连接池异常时status为degraded"""
+        checks = {}
+        for name, check in self._checks.items():
+            result = self.latest(name)
+            entry = result.to_dict() if result else {"status": UNHEALTHY, "message": "尚未探测"}
+            entry["critical"] = check.critical
+            if check.history:
+                entry["healthy_ratio"] = round(
+                    sum(item.status == HEALTHY for item in check.history) / len(check.history), 4
+                )
+                entry["max_latency_ms"] = max(item.latency_ms for item in check.history)
+            if include_history:
+                entry["history"] = [
+                    {"status": item.status, "latency_ms": item.latency_ms, "checked_at": item.checked_at}
+                    for item in check.history
+                ]
+            checks[name] = entry
+        
+        event_loop = self.event_loop_lag()
+        db_pools = self.db_pools()
+        statuses = [entry["status"] for entry in checks.values()]
+        statuses += [event_loop["status"]] + [pool["status"] for pool in db_pools.values()]
+        
+        return {
+            "status": HEALTHY if all(status == HEALTHY for status in statuses) else DEGRADED,
+            "ready": self.is_ready(),
+            "checked_at": self.last_run,
+            "age_seconds": round(self._clock() - self.last_run, 3) if self.last_run else None,
+            "checks": checks,
+            "event_loop": event_loop,
+            "db_pools": db_pools,
+        }
+
+
+# ==================== 依赖探测 ====================
+
+def database_probe(db_engine) -> Probe:
+    """SELECT 1（只借用连接，不开启事务）"""
+    async def probe():
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    return probe
+
+
+async def redis_probe():
+    client = redis_module.redis_client
+    if client is None:
+        raise RuntimeError("客户端未初始化")
+    await client.ping()
+
+
+# 全局实例
+health_monitor = HealthMonitor(
+    interval=settings.HEALTH_CHECK_INTERVAL,
+    timeout=settings.HEALTH_CHECK_TIMEOUT,
+    history_size=settings.HEALTH_HISTORY_SIZE,
+    lag_threshold_ms=settings.HEALTH_LOOP_LAG_THRESHOLD_MS,
+    pool_threshold=settings.HEALTH_POOL_SATURATION_THRESHOLD
+)
+health_monitor.add_check("database", database_probe(engine))
+health_monitor.add_check("redis", redis_probe)
+if read_engine is not None:
+    health_monitor.add_check("database_replica", database_probe(read_engine), critical=False)
+
+
+def _check_values(field: str) -> Dict[tuple, float]:
+    values = {}
+    for name in health_monitor._checks:
+        result = health_monitor.latest(name)
+        if result is not None:
+            values[(name,)] = (result.status == HEALTHY) if field == "up" else result.latency_ms / 1000
+    return values
+
+
+register_callback(
+    "health_check_up", "最近一次依赖探测是否正常（1/0）", ["check"], lambda: _check_values("up")
+)
+register_callback(
+    "health_check_latency_seconds", "最近一次依赖探测耗时（秒）", ["check"], lambda: _check_values("latency")
+)
+register_callback(
+    "event_loop_lag_seconds", "事件循环延迟（秒，最近一次采样）", [],
+    lambda: {(): health_monitor._lag_samples[-1]} if health_monitor._lag_samples else {}
+)
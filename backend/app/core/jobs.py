@@ -0,0 +1,416 @@
+"""
+后台任务队列
+
+基于Redis Streams的轻量任务队列，爬虫、批量导出等长耗时工作不在API请求的生命周期内执行：
+- enqueue(): 写入任务状态（Redis hash）并加入流，立即返回任务ID
+- JobWorker: 以消费组读取任务，并发数受限；处理函数通过 JobContext.report_progress() 上报进度
+- 失败按指数退避重试（延迟队列为有序集合，到期后重新加入流），超过最大次数标记为failed
+- 处理中的任务定期续期；worker崩溃或重启时，未确认的任务在可见性超时后由其他worker接管
+
+任务处理函数用 @job_handler("名称") 注册，所在模块列入 HANDLER_MODULES，worker启动或入队时导入；
+on_failure 回调在任务最终失败（重试耗尽、超过最大次数或处理函数未注册）时调用，用于同步业务记录的状态。
+worker默认由 scripts/run_worker.py 独立运行，爬虫（Playwright）与导出不占用API进程；
+JOB_WORKER_ENABLED=true 时API进程内也运行worker（仅限开发调试）。
+"""
+import asyncio
+import importlib
+import json
+import os
+import socket
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
+from loguru import logger
+from redis.exceptions import RedisError, ResponseError
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+from app.core.metrics import JOB_DURATION, JOBS_ENQUEUED
+
+
+class JobStatus(str, Enum):
+    """任务状态"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobQueueUnavailable(RuntimeError):
+    """Redis不可用，任务无法入队或查询"""
+
+
+JobHandler = Callable[..., Awaitable[Any]]
+# async def on_failure(job_id, payload, error)
+FailureHook = Callable[[str, Dict[str, Any], str], Awaitable[None]]
+
+# 任务名称 -> 处理函数
+_handlers: Dict[str, JobHandler] = {}
+# 任务名称 -> 最终失败回调
+_failure_hooks: Dict[str, FailureHook] = {}
+
+# 注册处理函数的模块，worker启动时导入
+HANDLER_MODULES = (
+    "app.services.crawler_scheduler",
+    "app.api.v1.endpoints.export",
+)
+
+
+def job_handler(name: str, on_failure: Optional[FailureHook] = None):
+    """
+    注册任务处理函数：async def handler(ctx: JobContext, **payload) -> 可JSON序列化的结果
+    
+    on_failure: 任务最终失败时的回调 async def on_failure(job_id, payload, error)
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[name] = func
+        if on_failure is not None:
+            _failure_hooks[name] = on_failure
+        else:
+            _failure_hooks.pop(name, None)
+        return func
+    return decorator
+
+
+def load_handlers():
+    """导入 HANDLER_MODULES，注册全部任务处理函数"""
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+# 将到期的重试任务从延迟队列移回流（原子操作，多个worker不会重复入队）
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('XADD', KEYS[2], '*', 'job_id', job_id)
+end
+return due
+"""
+
+_INT_FIELDS = ("attempts", "max_attempts")
+_FLOAT_FIELDS = ("progress", "created_at", "updated_at", "started_at", "finished_at", "retry_at")
+_JSON_FIELDS = ("payload", "result")
+
+
+class JobQueue:
+    """任务入队与状态存储"""
+    
+    def __init__(
+        self,
+        stream: str = "jobs:stream",
+        group: str = "jobs:workers",
+        ttl: int = 7 * 86400,
+        redis_getter: Callable = lambda: redis_module.redis_client,
+        clock: Callable[[], float] = time.time
+    ):
+        self.stream = stream
+        self.group = group
+        self.delayed_key = f"{stream}:delayed"
+        self.ttl = ttl
+        self._redis_getter = redis_getter
+        self._clock = clock
+    
+    def now(self) -> float:
+        return self._clock()
+    
+    def client(self):
+        client = self._redis_getter()
+        if client is None:
+            raise JobQueueUnavailable("Redis客户端未初始化")
+        return client
+    
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+    
+    async def enqueue(
+        self,
+        name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        max_attempts: int = 3
+    ) -> str:
+        """加入队列，返回任务ID"""
+        if name not in _handlers:
+            load_handlers()
+        if name not in _handlers:
+            raise ValueError(f"未注册的任务类型: {name}")
+        
+        job_id = job_id or uuid4().hex
+        now = self._clock()
+        client = self.client()
+        try:
+            await client.hset(self._key(job_id), mapping={
+                "job_id": job_id,
+                "name": name,
+                "payload": json.dumps(payload or {}, ensure_ascii=False, default=str),
+                "status": JobStatus.QUEUED.value,
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "progress": 0,
+                "message": "",
+                "created_at": now,
+                "updated_at": now,
+            })
+            await client.expire(self._key(job_id), self.ttl)
+            await client.xadd(self.stream, {"job_id": job_id})
+        except (RedisError, OSError) as e:
+            raise JobQueueUnavailable(f"任务入队失败: {e}") from e
+        
+        JOBS_ENQUEUED.labels(name=name).inc()
+        return job_id
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务状态，不存在或已过期时返回None"""
+        try:
+            data = await self.client().hgetall(self._key(job_id))
+        except (RedisError, OSError) as e:
+            raise JobQueueUnavailable(f"查询任务失败: {e}") from e
+        if not data:
+            return None
+        
+        job: Dict[str, Any] = dict(data)
+        for field in _INT_FIELDS:
+            if field in job:
+                job[field] = int(job[field])
+        for field in _FLOAT_FIELDS:
+            if field in job:
+                job[field] = float(job[field])
+        for field in _JSON_FIELDS:
+            if field in job:
+                job[field] = json.loads(job[field])
+        return job
+    
+    async def update(self, job_id: str, **fields):
+        """更新任务状态字段"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False, default=str)
+        if isinstance(fields.get("status"), JobStatus):
+            fields["status"] = fields["status"].value
+        fields["updated_at"] = self._clock()
+        await self.client().hset(self._key(job_id), mapping=fields)
+
+
+class JobContext:
+    """传给任务处理函数的上下文"""
+    
+    def __init__(self, queue: JobQueue, job_id: str, attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.attempt = attempt
+    
+    async def report_progress(self, progress: float, message: str = ""):
+        """上报进度（0-100）；Redis短暂不可用时忽略，不中断任务"""
+        try:
+            await self.queue.update(self.job_id, progress=round(progress, 1), message=message)
+        except (RedisError, OSError, JobQueueUnavailable) as e:
+            logger.warning(f"任务 {self.job_id} 进度上报失败: {e}")
+
+
+class JobWorker:
+    """以消费组方式执行队列中的任务"""
+    
+    # Redis不可用时的重试间隔（秒）
+    REDIS_RETRY_INTERVAL = 5
+    
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 4,
+        visibility_timeout: float = 300,
+        retry_backoff: float = 10,
+        block_ms: int = 5000,
+        consumer: Optional[str] = None,
+        handlers: Optional[Dict[str, JobHandler]] = None,
+        failure_hooks: Optional[Dict[str, FailureHook]] = None
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.block_ms = block_ms
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._handlers = _handlers if handlers is None else handlers
+        self._failure_hooks = _failure_hooks if failure_hooks is None else failure_hooks
+        self._running: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._group_ready = False
+    
+    async def _ensure_group(self, client):
+        if self._group_ready:
+            return
+        try:
+            await client.xgroup_create(self.queue.stream, self.queue.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+    
+    async def poll(self, block_ms: Optional[int] = None) -> int:
+        """领取并启动任务，返回本次启动的任务数"""
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        
+        client = self.queue.client()
+        await self._ensure_group(client)
+        await client.eval(
+            _PROMOTE_SCRIPT, 2, self.queue.delayed_key, self.queue.stream, self.queue.now(), 100
+        )
+        
+        # 先接管超时未确认的任务（原worker崩溃或重启），再读取新任务
+        _, messages, *_ = await client.xautoclaim(
+            self.queue.stream, self.queue.group, self.consumer,
+            min_idle_time=int(self.visibility_timeout * 1000), count=free
+        )
+        if not messages:
+            response = await client.xreadgroup(
+                self.queue.group, self.consumer, {self.queue.stream: ">"}, count=free, block=block_ms
+            )
+            messages = response[0][1] if response else []
+        
+        for message_id, fields in messages:
+            # 已被删除的消息（Redis 6.2的XAUTOCLAIM）没有字段
+            task = asyncio.create_task(self._process(message_id, (fields or {}).get("job_id")))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        return len(messages)
+    
+    async def _ack(self, message_id: str):
+        client = self.queue.client()
+        await client.xack(self.queue.stream, self.queue.group, message_id)
+        await client.xdel(self.queue.stream, message_id)
+    
+    async def _heartbeat(self, message_id: str):
+        """处理期间定期认领消息，重置空闲时间，避免被其他worker接管"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                await self.queue.client().xclaim(
+                    self.queue.stream, self.queue.group, self.consumer,
+                    min_idle_time=0, message_ids=[message_id], justid=True
+                )
+            except (RedisError, OSError, JobQueueUnavailable) as e:
+                logger.warning(f"任务消息 {message_id} 续期失败: {e}")
+    
+    async def _process(self, message_id: str, job_id: Optional[str]):
+        try:
+            job = await self.queue.get(job_id) if job_id else None
+            if job is None or job["status"] in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value):
+                # 任务已过期，或已完成但上次确认失败
+                await self._ack(message_id)
+                return
+            
+            handler = self._handlers.get(job["name"])
+            attempt = job["attempts"] + 1
+            if handler is None or attempt > job["max_attempts"]:
+                error = f"未注册的任务类型: {job['name']}" if handler is None else "超过最大重试次数"
+                await self.queue.update(
+                    job_id, status=JobStatus.FAILED, error=error, finished_at=self.queue.now()
+                )
+                await self._on_failure(job, error)
+                await self._ack(message_id)
+                return
+            
+            await self.queue.update(
+                job_id, status=JobStatus.RUNNING, attempts=attempt,
+                started_at=self.queue.now(), worker=self.consumer
+            )
+            await self._execute(message_id, job, handler, attempt)
+            await self._ack(message_id)
+        except (RedisError, OSError, JobQueueUnavailable) as e:
+            # 未确认的消息在可见性超时后重新投递
+            logger.warning(f"任务 {job_id} 状态更新失败，稍后重新投递: {e}")
+    
+    async def _on_failure(self, job: Dict[str, Any], error: str):
+        """调用任务的最终失败回调；回调异常只记录日志"""
+        hook = self._failure_hooks.get(job["name"])
+        if hook is None:
+            return
+        try:
+            await hook(job["job_id"], job.get("payload") or {}, error)
+        except Exception as e:
+            logger.exception(f"任务 {job['name']}/{job['job_id']} 失败回调执行异常: {e}")
+    
+    async def _execute(self, message_id: str, job: Dict[str, Any], handler: JobHandler, attempt: int):
+        job_id, name = job["job_id"], job["name"]
+        heartbeat = asyncio.create_task(self._heartbeat(message_id))
+        start = time.perf_counter()
+        status = JobStatus.FAILED
+        try:
+            result = await handler(JobContext(self.queue, job_id, attempt), **job["payload"])
+        except Exception as e:
+            if attempt < job["max_attempts"]:
+                status = JobStatus.RETRYING
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                retry_at = self.queue.now() + delay
+                logger.warning(f"任务 {name}/{job_id} 第{attempt}次执行失败，{delay:.0f}秒后重试: {e}")
+                await self.queue.update(job_id, status=status, error=str(e), retry_at=retry_at)
+                await self.queue.client().zadd(self.queue.delayed_key, {job_id: retry_at})
+            else:
+                logger.error(f"任务 {name}/{job_id} 执行失败: {e}", exc_info=True)
+                await self.queue.update(
+                    job_id, status=status, error=str(e), finished_at=self.queue.now()
+                )
+                await self._on_failure(job, str(e))
+        else:
+            status = JobStatus.SUCCEEDED
+            await self.queue.update(
+                job_id, status=status, result=result, progress=100, finished_at=self.queue.now()
+            )
+        finally:
+            heartbeat.cancel()
+            JOB_DURATION.labels(name=name, status=status.value).observe(time.perf_counter() - start)
+    
+    async def _loop(self):
+        while True:
+            try:
+                if len(self._running) >= self.concurrency:
+                    await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                await self.poll(block_ms=self.block_ms)
+            except (RedisError, OSError, JobQueueUnavailable) as e:
+                logger.warning(f"任务队列读取失败，{self.REDIS_RETRY_INTERVAL}秒后重试: {e}")
+                self._group_ready = False
+                await asyncio.sleep(self.REDIS_RETRY_INTERVAL)
+            except Exception as e:
+                logger.exception(f"任务队列执行异常: {e}")
+                await asyncio.sleep(self.REDIS_RETRY_INTERVAL)
+    
+    async def drain(self):
+        """等待已领取的任务执行完成"""
+        while self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+    
+    def start(self):
+        load_handlers()
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(f"任务worker已启动: {self.consumer}（并发 {self.concurrency}）")
+    
+    async def stop(self, timeout: float = 10):
+        """停止领取新任务；超时未完成的任务取消，未确认的消息由其他worker接管"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        running: List[asyncio.Task] = list(self._running)
+        if running:
+            _, pending = await asyncio.wait(running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+# 全局实例
+job_queue = JobQueue(ttl=settings.JOB_RESULT_TTL)
+job_worker = JobWorker(
+    job_queue,
+    concurrency=settings.JOB_WORKER_CONCURRENCY,
+    visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+    retry_backoff=settings.JOB_RETRY_BACKOFF
+)
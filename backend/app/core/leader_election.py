@@ -0,0 +1,165 @@
+"""
+主节点选举
+
+多worker、多实例部署时，定时任务等只应由一个进程执行的工作通过Redis租约选出主节点：
+- 选举：SET key identity NX PX lease，成功者成为主节点
+- 续约：主节点每 lease/3 秒检查key仍属于自己并延长租约（Lua脚本保证原子性）
+- 故障转移：主节点进程退出或卡住时租约过期，其他进程在下一次尝试时接管
+- 主动退出：stop()时释放租约，其他进程无需等待过期
+
+续约因Redis故障失败时，主节点在本地记录的租约到期前保持身份，
+在下一次续约赶不上租约过期时让出，避免与新主节点同时执行。
+"""
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.core import redis_client as redis_module
+from app.core.metrics import LEADER_STATUS, LEADER_TRANSITIONS
+
+
+# 仅当租约仍属于自己时续约
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# 仅当租约仍属于自己时释放
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+Callback = Callable[[], Awaitable[None]]
+
+
+class LeaderElection:
+    """基于Redis租约的主节点选举"""
+    
+    def __init__(
+        self,
+        name: str,
+        lease_seconds: float = 30,
+        on_elected: Optional[Callback] = None,
+        on_revoked: Optional[Callback] = None,
+        redis_getter: Callable = lambda: redis_module.redis_client,
+        identity: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.key = f"leader:{name}"
+        self.lease_seconds = lease_seconds
+        # 租约期内至少续约两次，单次续约失败不会丢失身份
+        self.renew_interval = lease_seconds / 3
+        self.identity = identity or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._on_elected = on_elected
+        self._on_revoked = on_revoked
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self.is_leader = False
+        self._lease_expires_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def run_once(self) -> bool:
+        """执行一次选举或续约，返回当前是否为主节点"""
+        client = self._redis_getter()
+        lease_ms = int(self.lease_seconds * 1000)
+        try:
+            if client is None:
+                raise RedisError("Redis客户端未初始化")
+            if self.is_leader:
+                renewed = await client.eval(_RENEW_SCRIPT, 1, self.key, self.identity, lease_ms)
+                if renewed:
+                    self._lease_expires_at = self._clock() + self.lease_seconds
+                else:
+                    logger.warning(f"主节点租约 {self.key} 已被其他进程持有")
+                    await self._step_down()
+            else:
+                started = self._clock()
+                if await client.set(self.key, self.identity, px=lease_ms, nx=True):
+                    self._lease_expires_at = started + self.lease_seconds
+                    await self._become_leader()
+        except (RedisError, OSError) as e:
+            # 下一次续约前租约就会过期时让出，保证不与新主节点重叠
+            if self.is_leader and self._clock() + self.renew_interval >= self._lease_expires_at:
+                logger.warning(f"主节点租约 {self.key} 续约失败且即将过期，让出主节点: {e}")
+                await self._step_down()
+            else:
+                logger.warning(f"主节点选举 {self.key} 访问Redis失败: {e}")
+        return self.is_leader
+    
+    async def _become_leader(self):
+        self.is_leader = True
+        LEADER_STATUS.labels(name=self.name).set(1)
+        LEADER_TRANSITIONS.labels(name=self.name, event="elected").inc()
+        logger.info(f"{self.identity} 成为 {self.name} 主节点")
+        if self._on_elected:
+            try:
+                await self._on_elected()
+            except Exception as e:
+                logger.exception(f"{self.name} 主节点启动失败，释放租约: {e}")
+                await self.release()
+    
+    async def _step_down(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        LEADER_STATUS.labels(name=self.name).set(0)
+        LEADER_TRANSITIONS.labels(name=self.name, event="revoked").inc()
+        logger.info(f"{self.identity} 不再是 {self.name} 主节点")
+        if self._on_revoked:
+            try:
+                await self._on_revoked()
+            except Exception as e:
+                logger.exception(f"{self.name} 主节点停止失败: {e}")
+    
+    async def release(self):
+        """让出主节点并释放租约，其他进程可立即接管"""
+        was_leader = self.is_leader
+        await self._step_down()
+        client = self._redis_getter()
+        if not was_leader or client is None:
+            return
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, self.key, self.identity)
+        except (RedisError, OSError) as e:
+            logger.warning(f"释放主节点租约 {self.key} 失败，将在租约过期后由其他进程接管: {e}")
+    
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.exception(f"主节点选举 {self.key} 执行失败: {e}")
+    
+    async def start(self):
+        """立即参与一次选举，之后在后台定期续约或重新竞选"""
+        if self._task is not None:
+            return
+        await self.run_once()
+        self._task = asyncio.create_task(self._loop())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.release()
+    
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "identity": self.identity,
+            "is_leader": self.is_leader,
+        }
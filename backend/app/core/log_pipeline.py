@@ -0,0 +1,270 @@
+"""
+日志管道
+
+请求路径上只做格式化和入队，文件与控制台写出由后台线程完成：
+- LogQueue: 有界队列 + 单个后台写线程；队列满时丢弃并计数，记录日志不会阻塞调用方
+- DailyFileWriter: 按天切分的日志文件，跨天后gzip压缩旧文件并按保留天数清理
+- AccessLogSampler: 按路由前缀配置访问日志采样率
+- LogStats: 入队、写出、丢弃、采样跳过、写出失败计数
+"""
+import atexit
+import gzip
+import queue
+import random
+import shutil
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+LogWriter = Callable[[str], None]
+
+# 停止后台写线程的标记
+_STOP = object()
+
+
+class LogStats:
+    """日志管道计数（线程安全）"""
+    
+    FIELDS = ("enqueued", "written", "dropped", "sampled_out", "write_errors")
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+    
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] += amount
+    
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+    
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+
+class LogQueue:
+    """
+    有界日志队列
+    
+    sink(writer) 返回可直接传给 logger.add 的sink：调用时只把格式化后的消息入队，
+    由后台线程调用writer写出。队列满时丢弃该条日志并计入dropped，调用方从不等待I/O。
+    """
+    
+    def __init__(self, maxsize: int = 10000, stats: Optional[LogStats] = None):
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self.stats = stats or LogStats()
+        self._writers: List[LogWriter] = []
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+    
+    @property
+    def maxsize(self) -> int:
+        return self._queue.maxsize
+    
+    @maxsize.setter
+    def maxsize(self, value: int):
+        self._queue.maxsize = value
+    
+    def qsize(self) -> int:
+        return self._queue.qsize()
+    
+    def sink(self, writer: LogWriter) -> Callable[[str], None]:
+        """包装writer为入队sink，并确保后台写线程已启动"""
+        self._writers.append(writer)
+        self.start()
+        
+        def enqueue(message: str):
+            try:
+                self._queue.put_nowait((writer, str(message)))
+            except queue.Full:
+                self.stats.incr("dropped")
+                return
+            self.stats.incr("enqueued")
+        
+        return enqueue
+    
+    def start(self):
+        """启动后台写线程（已运行时忽略）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                writer, message = item
+                try:
+                    writer(message)
+                    self.stats.incr("written")
+                except Exception:
+                    self.stats.incr("write_errors")
+            finally:
+                self._queue.task_done()
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待已入队的日志写出，超时返回False"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline or self._thread is None or not self._thread.is_alive():
+                return False
+            time.sleep(0.005)
+        return True
+    
+    def close_writers(self):
+        """写出剩余日志后关闭并移除所有writer（重新配置日志前调用）"""
+        self.flush()
+        for writer in self._writers:
+            close = getattr(writer, "close", None)
+            if close:
+                close()
+        self._writers = []
+    
+    def stop(self, timeout: float = 5.0):
+        """写出剩余日志并停止后台写线程"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        for writer in self._writers:
+            close = getattr(writer, "close", None)
+            if close:
+                close()
+
+
+def write_stderr(message: str):
+    """控制台writer"""
+    sys.stderr.write(message)
+    sys.stderr.flush()
+
+
+class DailyFileWriter:
+    """
+    按天切分的日志文件writer（仅由后台写线程调用）
+    
+    文件名为 {prefix}_{YYYY-MM-DD}.log；跨天或启动时压缩此前各天的文件，
+    并删除超过保留天数的文件
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        prefix: str,
+        retention_days: int,
+        compress: bool = True,
+        today: Callable[[], date] = date.today
+    ):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.retention_days = retention_days
+        self.compress = compress
+        self._today = today
+        self._day: Optional[date] = None
+        self._file = None
+    
+    def path_for(self, day: date) -> Path:
+        return self.directory / f"{self.prefix}_{day:%Y-%m-%d}.log"
+    
+    def __call__(self, message: str):
+        today = self._today()
+        if today != self._day:
+            self._rotate(today)
+        self._file.write(message)
+        self._file.flush()
+    
+    def _rotate(self, today: date):
+        if self._file is not None:
+            self._file.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._day = today
+        self._cleanup(today)
+        self._file = open(self.path_for(today), "a", encoding="utf-8")
+    
+    def _file_day(self, path: Path) -> Optional[date]:
+        """从文件名解析日期，不属于本writer的文件返回None"""
+        name = path.name[len(self.prefix) + 1:]
+        try:
+            return datetime.strptime(name[:10], "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    
+    def _cleanup(self, today: date):
+        cutoff = today - timedelta(days=self.retention_days)
+        for path in self.directory.glob(f"{self.prefix}_*.log*"):
+            day = self._file_day(path)
+            if day is None or day >= today:
+                continue
+            if day < cutoff:
+                path.unlink(missing_ok=True)
+            elif self.compress and path.suffix == ".log":
+                with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                path.unlink()
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._day = None
+
+
+class AccessLogSampler:
+    """
+    访问日志采样
+    
+    按最长匹配的路由前缀取采样率（0~1），未匹配时使用默认采样率
+    """
+    
+    def __init__(
+        self,
+        default_rate: float = 1.0,
+        route_rates: Optional[Dict[str, float]] = None,
+        stats: Optional[LogStats] = None,
+        rng: Callable[[], float] = random.random
+    ):
+        self.stats = stats or LogStats()
+        self._rng = rng
+        self.configure(default_rate, route_rates)
+    
+    def configure(self, default_rate: float = 1.0, route_rates: Optional[Dict[str, float]] = None):
+        self.default_rate = default_rate
+        self._routes = sorted((route_rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+    
+    def rate_for(self, path: str) -> float:
+        for prefix, rate in self._routes:
+            if path.startswith(prefix):
+                return rate
+        return self.default_rate
+    
+    def should_log(self, path: str) -> bool:
+        rate = self.rate_for(path)
+        if rate >= 1 or (rate > 0 and self._rng() < rate):
+            return True
+        self.stats.incr("sampled_out")
+        return False
+
+
+# 全局实例
+log_stats = LogStats()
+log_queue = LogQueue(stats=log_stats)
+access_log_sampler = AccessLogSampler(stats=log_stats)
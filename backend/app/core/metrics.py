@@ -0,0 +1,303 @@
+"""
+运行指标
+
+基于prometheus_client，/metrics 以Prometheus文本格式输出：
+- Counter / Gauge / Histogram: 带标签的计数、数值与耗时分布（prometheus_client原生类型）
+- CallbackCollector: 抓取时回调取值（如数据库连接池状态、日志队列长度）
+
+多worker部署（gunicorn）时设置环境变量 PROMETHEUS_MULTIPROC_DIR（见start.sh），
+各worker把计数与耗时写入该目录，/metrics 汇总全部worker；回调指标只反映处理本次抓取的worker。
+"""
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.core.log_pipeline import log_stats, log_queue
+from app.core.startup import startup_timer
+
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 外部调用（LLM、爬虫、导出）耗时分桶（秒）
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+# Redis命令耗时分桶（秒）
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class CallbackCollector:
+    """抓取时回调取值的指标，回调返回 {标签值元组: 值}"""
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[LabelValues, float]],
+        metric_type: str = "gauge"
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.metric_type = metric_type
+        self._callback = callback
+    
+    def collect(self):
+        family_class = CounterMetricFamily if self.metric_type == "counter" else GaugeMetricFamily
+        family = family_class(self.name, self.documentation, labels=self.labelnames)
+        for label_values, value in self._callback().items():
+            family.add_metric([str(v) for v in label_values], value)
+        yield family
+
+
+# 回调指标注册表（不写入多进程目录，抓取时由当前worker回调取值）
+callback_registry = CollectorRegistry()
+
+
+def register_callback(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str],
+    callback: Callable[[], Dict[LabelValues, float]],
+    metric_type: str = "gauge"
+) -> CallbackCollector:
+    """注册回调指标"""
+    collector = CallbackCollector(name, documentation, labelnames, callback, metric_type)
+    callback_registry.register(collector)
+    return collector
+
+
+def render_metrics() -> bytes:
+    """以Prometheus文本格式输出全部指标（多进程模式下汇总各worker）"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(callback_registry)
+
+
+@contextmanager
+def track_duration(histogram: Histogram, **labels):
+    """
+    统计with块的耗时
+    
+    标签包含status且未指定时，按是否抛出异常自动填入success/error
+    """
+    start = time.perf_counter()
+    status = "success"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        if "status" in histogram._labelnames and "status" not in labels:
+            labels = {**labels, "status": status}
+        histogram.labels(**labels).observe(time.perf_counter() - start)
+
+
+def timed(histogram: Histogram, **labels):
+    """统计函数耗时的装饰器，支持异步函数（status规则同track_duration）"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_duration(histogram, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_duration(histogram, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================== HTTP ====================
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP请求数", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP请求耗时（秒）", ["method", "route"], buckets=DEFAULT_BUCKETS
+)
+
+
+# ==================== 日志管道 ====================
+
+register_callback(
+    "log_records_total", "日志管道记录数（enqueued/written/dropped/sampled_out/write_errors）", ["event"],
+    lambda: {(event,): count for event, count in log_stats.snapshot().items()},
+    metric_type="counter"
+)
+register_callback(
+    "log_queue_size", "日志队列中待写出的记录数", [], lambda: {(): log_queue.qsize()}
+)
+
+
+# ==================== 启动 ====================
+
+register_callback(
+    "app_startup_seconds", "启动各阶段耗时（秒），phase=ready为启动到就绪的总耗时", ["phase"],
+    lambda: {
+        (phase,): ms / 1000
+        for phase, ms in {**startup_timer.phases, "ready": startup_timer.ready_ms}.items()
+        if ms is not None
+    }
+)
+
+
+# ==================== 数据库连接池 ====================
+
+# 连接池名称 -> AsyncEngine
+_pools: Dict[str, Any] = {}
+
+
+def register_pool(name: str, engine):
+    """登记需要导出连接池状态的引擎"""
+    _pools[name] = engine
+
+
+def _pool_values(method: str) -> Dict[LabelValues, float]:
+    values = {}
+    for name, engine in _pools.items():
+        getter = getattr(engine.pool, method, None)
+        if callable(getter):
+            values[(name,)] = getter()
+    return values
+
+
+for _metric_name, _method, _doc in (
+    ("db_pool_size", "size", "连接池容量"),
+    ("db_pool_checked_out", "checkedout", "已借出的连接数"),
+    ("db_pool_checked_in", "checkedin", "池中空闲连接数"),
+    ("db_pool_overflow", "overflow", "溢出连接数（超过pool_size的部分，未用满时为负数）"),
+):
+    register_callback(_metric_name, _doc, ["pool"], functools.partial(_pool_values, _method))
+
+
+def pool_usage() -> Dict[str, Dict[str, Any]]:
+    """
+    各连接池的占用情况
+    
+    saturation = 已借出连接数 / (pool_size + max_overflow)，接近1时新请求将排队等待连接；
+    不限溢出（max_overflow<0）或连接池不支持统计时为None
+    """
+    usage = {}
+    for name, engine in _pools.items():
+        pool = engine.pool
+        if not callable(getattr(pool, "checkedout", None)):
+            continue
+        size = pool.size()
+        max_overflow = getattr(pool, "_max_overflow", 0)
+        capacity = size + max_overflow if max_overflow >= 0 else None
+        checked_out = pool.checkedout()
+        usage[name] = {
+            "size": size,
+            "max_overflow": max_overflow,
+            "checked_out": checked_out,
+            "saturation": round(checked_out / capacity, 4) if capacity else None,
+        }
+    return usage
+
+
+register_callback(
+    "db_pool_saturation", "连接池占用率（已借出 / (pool_size + max_overflow)）", ["pool"],
+    lambda: {
+        (name,): usage["saturation"]
+        for name, usage in pool_usage().items()
+        if usage["saturation"] is not None
+    }
+)
+
+
+# ==================== SQL查询 ====================
+
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "每个请求执行的SQL查询数", ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds", "每个请求的数据库耗时（秒）", ["route"], buckets=DEFAULT_BUCKETS
+)
+DB_REPEATED_QUERY_REQUESTS = Counter(
+    "db_repeated_query_requests_total", "出现疑似N+1重复查询的请求数", ["route"]
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total",
+    "只读会话数（target=replica/primary；reason=ok/no_replica/read_after_write/replica_down）",
+    ["target", "reason"]
+)
+
+
+# ==================== 限流 ====================
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "被限流拒绝的请求数"
+)
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "rate_limit_backend_errors_total", "限流Redis调用失败次数（期间使用进程内计数）"
+)
+
+
+# ==================== 主节点选举 ====================
+
+# 多进程模式下汇总为存活worker中的主节点数
+LEADER_STATUS = Gauge(
+    "leader_election_is_leader", "本进程是否为主节点（1/0）", ["name"], multiprocess_mode="livesum"
+)
+LEADER_TRANSITIONS = Counter(
+    "leader_election_transitions_total", "主节点身份变化次数（event=elected/revoked）", ["name", "event"]
+)
+
+
+# ==================== Redis ====================
+
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "Redis命令耗时（秒）", ["command", "status"], buckets=FAST_BUCKETS
+)
+
+
+# ==================== LLM ====================
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "LLM调用耗时（秒）", ["client", "model", "status"], buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "LLM消耗的token数", ["client", "model", "type"]
+)
+
+
+def record_llm_tokens(client: str, model: str, input_tokens: Optional[int], output_tokens: Optional[int]):
+    """记录一次LLM调用的token数（响应未返回用量时忽略）"""
+    for token_type, tokens in (("input", input_tokens), ("output", output_tokens)):
+        if isinstance(tokens, int) and tokens > 0:
+            LLM_TOKENS.labels(client=client, model=model, type=token_type).inc(tokens)
+
+
+# ==================== 后台任务 ====================
+
+EXPORT_JOB_DURATION = Histogram(
+    "export_job_duration_seconds", "报价单导出耗时（秒）", ["template", "status"], buckets=SLOW_BUCKETS
+)
+CRAWLER_JOB_DURATION = Histogram(
+    "crawler_job_duration_seconds", "爬虫任务耗时（秒）", ["task_type", "status"], buckets=SLOW_BUCKETS
+)
+JOBS_ENQUEUED = Counter(
+    "jobs_enqueued_total", "加入后台任务队列的任务数", ["name"]
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds", "后台任务单次执行耗时（秒，status=succeeded/retrying/failed）", ["name", "status"],
+    buckets=SLOW_BUCKETS
+)
@@ -7,21 +7,32 @@
 3. 请求追踪ID
 4. 性能监控
 """
+import re
 import time
 import uuid
 import traceback
-from typing import Callable, Any
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 from fastapi import FastAPI, Request, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from pydantic import ValidationError
 from loguru import logger
 import sys
 
+from app.core.log_pipeline import log_queue, access_log_sampler, write_stderr, DailyFileWriter
+from app.core.metrics import (
+    HTTP_REQUESTS, HTTP_REQUEST_DURATION,
+    DB_QUERIES_PER_REQUEST, DB_TIME_PER_REQUEST, DB_REPEATED_QUERY_REQUESTS
+)
+from app.core.query_profiler import QueryProfile, profile_queries
+
 
 # ==================== 自定义异常类 ====================
 
@@ -105,10 +116,26 @@ class AuthorizationException(AppException):
 
 # ==================== 日志配置 ====================
 
+def _default_request_id(record) -> bool:
+    """日志过滤器：请求之外的日志使用占位请求ID"""
+    record["extra"].setdefault("request_id", "-")
+    return True
+
+
 def configure_logging(app_name: str = "报价侠"):
-    """配置loguru日志"""
-    # 移除默认处理器
+    """
+    配置loguru日志
+    
+    各处理器只格式化并入队，控制台与文件写出由日志管道的后台线程完成；
+    LOG_JSON开启时输出结构化JSON，访问日志按LOG_ACCESS_SAMPLE_*采样
+    """
+    from app.core.config import settings
+    
+    # 移除默认处理器，写出此前配置的剩余日志
     logger.remove()
+    log_queue.close_writers()
+    log_queue.maxsize = settings.LOG_QUEUE_SIZE
+    access_log_sampler.configure(settings.LOG_ACCESS_SAMPLE_RATE, settings.LOG_ACCESS_SAMPLE_ROUTES)
     
     # 控制台输出格式
     console_format = (
@@ -128,35 +155,34 @@ def configure_logging(app_name: str = "报价侠"):
         "{message}"
     )
     
+    json_output = settings.LOG_JSON
+    
     # 添加控制台处理器
     logger.add(
-        sys.stderr,
+        log_queue.sink(write_stderr),
         format=console_format,
-        level="INFO",
-        colorize=True,
-        filter=lambda record: record["extra"].setdefault("request_id", "-")
+        level=settings.LOG_LEVEL,
+        colorize=not json_output and sys.stderr.isatty(),
+        serialize=json_output,
+        filter=_default_request_id
     )
     
     # 添加文件处理器 - 一般日志
     logger.add(
-        f"logs/{app_name}_{{time:YYYY-MM-DD}}.log",
+        log_queue.sink(DailyFileWriter("logs", app_name, retention_days=30)),
         format=file_format,
-        level="INFO",
-        rotation="00:00",
-        retention="30 days",
-        compression="gz",
-        filter=lambda record: record["extra"].setdefault("request_id", "-")
+        level=settings.LOG_LEVEL,
+        serialize=json_output,
+        filter=_default_request_id
     )
     
     # 添加文件处理器 - 错误日志
     logger.add(
-        f"logs/{app_name}_error_{{time:YYYY-MM-DD}}.log",
+        log_queue.sink(DailyFileWriter("logs", f"{app_name}_error", retention_days=60)),
         format=file_format,
         level="ERROR",
-        rotation="00:00",
-        retention="60 days",
-        compression="gz",
-        filter=lambda record: record["extra"].setdefault("request_id", "-")
+        serialize=json_output,
+        filter=_default_request_id
     )
     
     return logger
@@ -164,111 +190,214 @@ def configure_logging(app_name: str = "报价侠"):
 
 # ==================== 请求上下文 ====================
 
+# 当前请求的上下文；contextvars保证并发请求之间互不可见
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+
+# 客户端令牌：区分共享同一出口IP（代理、NAT）的客户端，用于写后读一致性
+CLIENT_TOKEN_HEADER = "X-Client-Token"
+CLIENT_TOKEN_COOKIE = "client_token"
+_CLIENT_TOKEN_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
 class RequestContext:
-    """请求上下文管理"""
-    
-    _context = {}
+    """请求上下文管理（基于contextvars，每个请求独立）"""
     
     @classmethod
     def set(cls, key: str, value: Any):
-        cls._context[key] = value
+        context = _request_context.get()
+        if context is None:
+            context = {}
+            _request_context.set(context)
+        context[key] = value
     
     @classmethod
     def get(cls, key: str, default: Any = None) -> Any:
-        return cls._context.get(key, default)
+        context = _request_context.get()
+        if context is None:
+            return default
+        return context.get(key, default)
     
     @classmethod
     def clear(cls):
-        cls._context.clear()
+        _request_context.set(None)
     
     @classmethod
     def get_request_id(cls) -> str:
         return cls.get("request_id", "-")
+    
+    @classmethod
+    def issue_client_token(cls) -> Optional[str]:
+        """
+        获取客户端令牌，请求未携带时签发新令牌
+        
+        新令牌由RequestContextMiddleware通过Cookie和X-Client-Token响应头返回；不在请求内时返回None
+        """
+        context = _request_context.get()
+        if context is None or "request_id" not in context:
+            return None
+        if not context.get("client_token"):
+            context["client_token"] = context["issued_client_token"] = uuid.uuid4().hex
+        return context["client_token"]
+
+
+def _read_client_token(scope: Scope) -> Optional[str]:
+    """读取请求携带的客户端令牌（X-Client-Token头优先，其次Cookie），格式不符时忽略"""
+    headers = Headers(scope=scope)
+    value = headers.get(CLIENT_TOKEN_HEADER) or cookie_parser(headers.get("cookie", "")).get(CLIENT_TOKEN_COOKIE)
+    if value and _CLIENT_TOKEN_PATTERN.fullmatch(value):
+        return value
+    return None
 
 
 # ==================== 中间件 ====================
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """请求日志中间件"""
+class RequestContextMiddleware:
+    """
+    请求上下文中间件（纯ASGI）
+    
+    1. 生成请求ID，写入请求上下文、request.state和日志上下文
+    2. 记录访问日志（按路由采样；慢请求、5xx与异常总是记录），超过阈值时记录慢请求警告
+    3. 添加响应头 X-Request-ID 和 X-Process-Time（开始响应时的耗时）
+    4. 按路由模板记录请求数与耗时指标
+    5. 统计请求内的SQL查询次数与耗时，同一语句重复执行达到阈值时记录疑似N+1；
+       debug_headers开启时通过 X-DB-Query-Count / X-DB-Time / X-DB-Repeated-Queries 响应头返回
+    
+    只包装send以修改响应头，不缓冲响应体，StreamingResponse和后台任务原样透传
+    """
+    
+    # 慢请求阈值（毫秒）
+    SLOW_REQUEST_THRESHOLD = 1000
+    
+    # 日志中查询字符串的最大长度
+    MAX_QUERY_LOG_LENGTH = 200
+    
+    # 同一语句形态在一个请求内执行达到该次数时视为疑似N+1
+    SQL_REPEAT_THRESHOLD = 5
     
-    async def dispatch(self, request: Request, call_next: Callable):
+    def __init__(
+        self,
+        app: ASGIApp,
+        slow_request_threshold: float = SLOW_REQUEST_THRESHOLD,
+        sql_repeat_threshold: int = SQL_REPEAT_THRESHOLD,
+        debug_headers: bool = False
+    ):
+        self.app = app
+        self.slow_request_threshold = slow_request_threshold
+        self.sql_repeat_threshold = sql_repeat_threshold
+        self.debug_headers = debug_headers
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # 生成请求ID
-        request_id = str(uuid.uuid4())[:8]
-        request.state.request_id = request_id
-        RequestContext.set("request_id", request_id)
+        request_id = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["request_id"] = request_id
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        context = {"request_id": request_id, "client_ip": client_ip, "client_token": _read_client_token(scope)}
+        token = _request_context.set(context)
         
         # 记录开始时间
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # 获取请求信息
-        client_ip = request.client.host if request.client else "unknown"
-        method = request.method
-        path = request.url.path
-        query = str(request.query_params) if request.query_params else ""
+        method = scope["method"]
+        path = scope["path"]
+        query = scope.get("query_string", b"").decode("latin-1")[:self.MAX_QUERY_LOG_LENGTH]
+        status_code = None
+        profile: Optional[QueryProfile] = None
         
-        # 日志绑定请求ID
-        with logger.contextualize(request_id=request_id):
-            # 记录请求开始
-            logger.info(f"请求开始 | {method} {path} | IP: {client_ip} | Query: {query}")
-            
-            try:
-                # 处理请求
-                response = await call_next(request)
-                
-                # 计算耗时
-                process_time = round((time.time() - start_time) * 1000, 2)
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = round((time.perf_counter() - start_time) * 1000, 2)
+                message.setdefault("headers", [])
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("X-Process-Time", f"{process_time}ms")
+                issued_token = context.get("issued_client_token")
+                if issued_token:
+                    headers.append(CLIENT_TOKEN_HEADER, issued_token)
+                    headers.append("Set-Cookie", f"{CLIENT_TOKEN_COOKIE}={issued_token}; Path=/; HttpOnly; SameSite=Lax")
+                if self.debug_headers and profile is not None:
+                    headers.append("X-DB-Query-Count", str(profile.count))
+                    headers.append("X-DB-Time", f"{profile.duration_ms}ms")
+                    headers.append(
+                        "X-DB-Repeated-Queries", str(len(profile.repeated(self.sql_repeat_threshold)))
+                    )
+            await send(message)
+        
+        try:
+            # 日志绑定请求ID，统计请求内的SQL查询
+            with logger.contextualize(request_id=request_id), profile_queries() as profile:
+                # 记录请求开始（DEBUG级别未启用时不格式化）
+                logger.debug("请求开始 | {} {} | IP: {} | Query: {}", method, path, client_ip, query)
                 
-                # 记录请求完成
-                logger.info(
-                    f"请求完成 | {method} {path} | "
-                    f"Status: {response.status_code} | "
-                    f"耗时: {process_time}ms"
-                )
+                try:
+                    await self.app(scope, receive, send_with_headers)
+                except Exception as e:
+                    process_time = round((time.perf_counter() - start_time) * 1000, 2)
+                    self._record_metrics(scope, method, status_code or 500, process_time, profile)
+                    logger.error(
+                        f"请求异常 | {method} {path} | "
+                        f"Error: {str(e)} | "
+                        f"耗时: {process_time}ms"
+                    )
+                    raise
                 
-                # 添加响应头
-                response.headers["X-Request-ID"] = request_id
-                response.headers["X-Process-Time"] = f"{process_time}ms"
+                # 响应体发送完毕后的总耗时
+                process_time = round((time.perf_counter() - start_time) * 1000, 2)
+                is_slow = process_time > self.slow_request_threshold
+                self._record_metrics(scope, method, status_code, process_time, profile)
                 
-                return response
+                # 访问日志按路由采样
+                if is_slow or (status_code or 500) >= 500 or access_log_sampler.should_log(path):
+                    logger.info(
+                        f"请求完成 | {method} {path} | "
+                        f"Status: {status_code} | "
+                        f"耗时: {process_time}ms | "
+                        f"SQL: {profile.count}次/{profile.duration_ms}ms | "
+                        f"Query: {query}"
+                    )
                 
-            except Exception as e:
-                # 计算耗时
-                process_time = round((time.time() - start_time) * 1000, 2)
+                # 记录疑似N+1查询
+                repeated = profile.repeated(self.sql_repeat_threshold)
+                if repeated:
+                    shape, count = repeated[0]
+                    logger.warning(
+                        f"疑似N+1查询 | {method} {path} | "
+                        f"{len(repeated)}种语句重复执行，最多{count}次: {shape[:300]}"
+                    )
                 
-                # 记录异常
-                logger.error(
-                    f"请求异常 | {method} {path} | "
-                    f"Error: {str(e)} | "
-                    f"耗时: {process_time}ms"
-                )
-                raise
-            finally:
-                RequestContext.clear()
-
-
-class PerformanceMiddleware(BaseHTTPMiddleware):
-    """性能监控中间件"""
-    
-    # 慢请求阈值（毫秒）
-    SLOW_REQUEST_THRESHOLD = 1000
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        start_time = time.time()
-        
-        response = await call_next(request)
-        
-        process_time = (time.time() - start_time) * 1000
-        
-        # 记录慢请求
-        if process_time > self.SLOW_REQUEST_THRESHOLD:
-            request_id = getattr(request.state, "request_id", "-")
-            with logger.contextualize(request_id=request_id):
-                logger.warning(
-                    f"慢请求警告 | {request.method} {request.url.path} | "
-                    f"耗时: {process_time:.2f}ms"
-                )
-        
-        return response
+                # 记录慢请求
+                if is_slow:
+                    logger.warning(
+                        f"慢请求警告 | {method} {path} | "
+                        f"耗时: {process_time:.2f}ms"
+                    )
+        finally:
+            _request_context.reset(token)
+    
+    def _record_metrics(
+        self,
+        scope: Scope,
+        method: str,
+        status_code: Optional[int],
+        process_time: float,
+        profile: QueryProfile
+    ):
+        """记录请求指标；route取路由模板（如 /api/v1/quotes/{quote_id}），避免按实际路径产生大量标签"""
+        route = scope.get("route")
+        route_path = getattr(route, "path_format", None) or "unmatched"
+        HTTP_REQUESTS.labels(method=method, route=route_path, status=status_code).inc()
+        HTTP_REQUEST_DURATION.labels(method=method, route=route_path).observe(process_time / 1000)
+        DB_QUERIES_PER_REQUEST.labels(route=route_path).observe(profile.count)
+        DB_TIME_PER_REQUEST.labels(route=route_path).observe(profile.duration)
+        if profile.max_repeat >= self.sql_repeat_threshold:
+            DB_REPEATED_QUERY_REQUESTS.labels(route=route_path).inc()
 
 
 # ==================== 异常处理器 ====================
@@ -414,9 +543,13 @@ def register_exception_handlers(app: FastAPI):
 
 def register_middlewares(app: FastAPI):
     """注册中间件"""
-    # 注意：中间件按照添加的相反顺序执行
-    app.add_middleware(PerformanceMiddleware)
-    app.add_middleware(RequestLoggingMiddleware)
+    from app.core.config import settings
+    
+    app.add_middleware(
+        RequestContextMiddleware,
+        sql_repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
+        debug_headers=settings.APP_DEBUG
+    )
 
 
 def setup_error_handling(app: FastAPI):
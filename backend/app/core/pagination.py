@@ -0,0 +1,282 @@
+"""
+分页工具
+
+提供基于游标的键集分页（keyset pagination）与低成本的总数统计：
+- 游标为排序键取值的Base64编码，对客户端不透明
+- 有游标时按 (排序键) > (游标值) 定位，与页码深度无关
+- 总数支持精确计数、短时缓存的计数、执行计划估算或不统计
+"""
+import base64
+import hashlib
+import json
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from uuid import UUID
+
+from fastapi import Query
+from sqlalchemy import and_, or_, select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+from loguru import logger
+
+from app.core.redis_client import get_redis
+
+
+# 总数统计配置
+COUNT_CACHE_PREFIX = "count_cache:"
+COUNT_CACHE_TTL = 30  # cached模式的总数缓存时间（秒）
+COUNT_MODES = ("exact", "cached", "estimate", "none")
+# 列表接口的总数统计方式查询参数：count: str = CountMode
+CountMode = Query(
+    "exact",
+    pattern=f"^({'|'.join(COUNT_MODES)})$",
+    description="总数统计方式：exact精确/cached精确(短时缓存)/estimate估算/none不统计"
+)
+
+SORT_KEY_PREFIX = "_sort_"
+
+
+class SortKey(NamedTuple):
+    """排序键：表达式取值必须非空，且所有排序键组合后唯一"""
+    expression: Any
+    descending: bool = False
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序不匹配"""
+
+
+def _encode_value(value: Any) -> Any:
+    """将排序键取值转换为可JSON序列化的形式"""
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, UUID):
+        return {"uuid": str(value)}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    """还原 _encode_value 的结果"""
+    if isinstance(value, dict) and len(value) == 1:
+        (tag, raw), = value.items()
+        if tag == "dt":
+            return datetime.fromisoformat(raw)
+        if tag == "d":
+            return date.fromisoformat(raw)
+        if tag == "uuid":
+            return UUID(raw)
+        if tag == "dec":
+            return Decimal(raw)
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """编码游标"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    """解析游标，格式错误或键数量不符时抛出 InvalidCursorError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in values]
+    except Exception as e:
+        raise InvalidCursorError(f"无效的分页游标: {cursor}") from e
+    
+    if not isinstance(values, list) or len(values) != expected_length or any(v is None for v in values):
+        raise InvalidCursorError(f"无效的分页游标: {cursor}")
+    return values
+
+
+def keyset_condition(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    """
+    构造"位于游标之后"的条件
+    
+    所有键排序方向相同时使用行值比较 (a, b) > (x, y)，可直接利用复合索引；
+    方向混合时展开为 a > x OR (a = x AND b > y) ...
+    """
+    directions = {key.descending for key in keys}
+    if len(directions) == 1:
+        left = tuple_(*[key.expression for key in keys])
+        right = tuple_(*values)
+        return left < right if keys[0].descending else left > right
+    
+    clauses = []
+    for i, key in enumerate(keys):
+        equal = [keys[j].expression == values[j] for j in range(i)]
+        after = key.expression < values[i] if key.descending else key.expression > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    keys: Sequence[SortKey],
+    page_size: int,
+    cursor: Optional[str] = None,
+    page: int = 1
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    执行分页查询
+    
+    传入cursor时使用键集分页（忽略page），否则按page偏移；
+    两种方式都会返回下一页游标，客户端可从任意页切换为游标翻页
+    
+    Args:
+        db: 数据库会话
+        query: 未排序、未分页的查询
+        keys: 排序键
+        page_size: 每页数量
+        cursor: 上一页返回的next_cursor
+        page: 页码（无游标时生效）
+    
+    Returns:
+        (当前页的行, 下一页游标)，行内依次为原查询的各列与排序键列；没有更多数据时游标为None
+    """
+    labels = [f"{SORT_KEY_PREFIX}{i}" for i in range(len(keys))]
+    query = query.add_columns(*[key.expression.label(label) for key, label in zip(keys, labels)])
+    query = query.order_by(*[
+        key.expression.desc() if key.descending else key.expression
+        for key in keys
+    ])
+    
+    if cursor:
+        query = query.where(keyset_condition(keys, decode_cursor(cursor, len(keys))))
+    elif page > 1:
+        query = query.offset((page - 1) * page_size)
+    
+    # 多取一行用于判断是否还有下一页
+    result = await db.execute(query.limit(page_size + 1))
+    rows = result.all()
+    
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor([last[label] for label in labels])
+    
+    return rows, next_cursor
+
+
+class CountCache:
+    """总数缓存（cached模式）：进程内字典 + Redis（可选）"""
+    
+    def __init__(self, ttl: int = COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._local: Dict[str, Tuple[int, float]] = {}
+    
+    @staticmethod
+    def make_key(query: Select) -> str:
+        """按SQL文本与参数生成缓存键"""
+        compiled = query.compile()
+        params = json.dumps(compiled.params, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(f"{compiled}|{params}".encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[int]:
+        """读取缓存，未命中返回None"""
+        cached = self._local.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+        
+        try:
+            redis = await get_redis()
+            if redis is None:
+                return None
+            
+            value = await redis.get(f"{COUNT_CACHE_PREFIX}{key}")
+            if value is not None:
+                self._local[key] = (int(value), time.monotonic())
+                return int(value)
+        except Exception as e:
+            logger.warning(f"[Pagination] 读取总数缓存失败: {e}")
+        
+        return None
+    
+    async def set(self, key: str, total: int) -> None:
+        """写入缓存"""
+        now = time.monotonic()
+        # 顺带清理过期条目，避免进程内字典无限增长
+        self._local = {k: v for k, v in self._local.items() if now - v[1] < self.ttl}
+        self._local[key] = (total, now)
+        
+        try:
+            redis = await get_redis()
+            if redis is None:
+                return
+            
+            await redis.set(f"{COUNT_CACHE_PREFIX}{key}", total, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"[Pagination] 写入总数缓存失败: {e}")
+
+
+count_cache = CountCache()
+
+
+async def _estimate_count(db: AsyncSession, query: Select) -> Optional[int]:
+    """读取PostgreSQL执行计划的行数估算，不可用时返回None"""
+    if db.bind is None or db.bind.dialect.name != "postgresql":
+        return None
+    
+    compiled = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+    # 直接交给驱动执行，避免SQL文本中的 :name 与 % 被再次解析为参数
+    connection = await db.connection()
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _exact_count(db: AsyncSession, query: Select) -> int:
+    """执行COUNT查询"""
+    count_query = select(func.count()).select_from(query.order_by(None).subquery())
+    result = await db.execute(count_query)
+    return result.scalar() or 0
+
+
+async def count_total(db: AsyncSession, query: Select, mode: str = "exact") -> Optional[int]:
+    """
+    统计查询结果总数
+    
+    Args:
+        db: 数据库会话
+        query: 未排序、未分页的查询
+        mode: exact-精确计数；cached-精确计数并短时缓存（可能滞后于写入）；estimate-执行计划估算；none-不统计
+    
+    Returns:
+        总数，mode为none时返回None
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"不支持的总数统计方式: {mode}")
+    if mode == "none":
+        return None
+    
+    if mode == "estimate":
+        try:
+            estimate = await _estimate_count(db, query)
+            if estimate is not None:
+                return estimate
+        except Exception as e:
+            logger.warning(f"[Pagination] 总数估算失败，改用精确计数: {e}")
+    
+    if mode != "cached":
+        return await _exact_count(db, query)
+    
+    key = count_cache.make_key(query)
+    total = await count_cache.get(key)
+    if total is not None:
+        return total
+    
+    total = await _exact_count(db, query)
+    await count_cache.set(key, total)
+    return total
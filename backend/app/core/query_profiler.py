@@ -0,0 +1,109 @@
+"""
+SQL查询分析
+
+通过SQLAlchemy引擎事件统计当前上下文（请求/测试）中执行的查询：
+- 查询次数与数据库耗时
+- 按语句形态（参数、字面量、IN列表归一化后）计数，同一形态重复多次即疑似N+1
+
+profile_queries() 开启一次统计，统计对象保存在contextvars中，
+嵌套统计时内层的查询同时计入外层。未开启统计时事件处理直接返回。
+"""
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\$?\?|\$\d+|%\(\w+\)s|%s|:\w+|__\[POSTCOMPILE_\w+\])"
+_IN_LIST = re.compile(rf"\bIN\s*\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """归一化SQL语句：去掉字面量与参数差异，IN列表折叠为一项"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    """一次统计的结果"""
+    
+    def __init__(self, parent: Optional["QueryProfile"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, int] = defaultdict(int)
+    
+    def record(self, statement: str, duration: float):
+        shape = statement_shape(statement)
+        profile = self
+        while profile is not None:
+            profile.count += 1
+            profile.duration += duration
+            profile.shapes[shape] += 1
+            profile = profile.parent
+    
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration * 1000, 2)
+    
+    @property
+    def max_repeat(self) -> int:
+        """同一语句形态的最大执行次数"""
+        return max(self.shapes.values(), default=0)
+    
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """执行次数达到阈值的语句形态，按次数降序"""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+@contextmanager
+def profile_queries():
+    """统计with块内当前上下文执行的查询"""
+    profile = QueryProfile(parent=_current_profile.get())
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current_profile.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_profile.get() is not None:
+        context._profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profiler_start", None)
+    if start is None:
+        return
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - start)
+
+
+def install_query_profiler():
+    """在所有引擎上注册查询统计事件（重复调用无副作用）"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
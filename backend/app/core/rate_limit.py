@@ -0,0 +1,242 @@
+"""
+请求限流
+
+按客户端IP的滑动窗口限流（当前窗口计数 + 上一窗口计数按剩余比例加权），
+每个请求按路由计费：LLM与导出等重接口消耗更多额度，计费为0的路由不限流。
+
+- Redis可用时通过Lua脚本原子地检查并计数，多worker共享额度
+- Redis未初始化或调用失败时退回进程内计数，并在一段时间后重试Redis
+"""
+import math
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from loguru import logger
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import redis_client as redis_module
+from app.core.metrics import RATE_LIMIT_REJECTIONS, RATE_LIMIT_BACKEND_ERRORS
+
+
+class RateLimitResult(NamedTuple):
+    """限流判定结果"""
+    allowed: bool
+    remaining: int
+    retry_after: float  # 秒，allowed为True时为0
+
+
+def _sliding_window(
+    current: int,
+    previous: int,
+    limit: int,
+    window_ms: int,
+    elapsed_ms: int,
+    cost: int
+) -> Tuple[bool, int, int]:
+    """
+    滑动窗口判定（与Lua脚本逻辑一致）
+    
+    返回 (是否放行, 剩余额度, 需等待的毫秒数)
+    """
+    weighted_previous = previous * (window_ms - elapsed_ms) / window_ms
+    used = weighted_previous + current
+    if used + cost <= limit:
+        return True, int(limit - used - cost), 0
+    
+    if current + cost > limit or previous == 0:
+        # 当前窗口内无法满足，等到下一窗口
+        wait_ms = window_ms - elapsed_ms
+    else:
+        # 等上一窗口的权重衰减到足以放行
+        wait_ms = math.ceil(window_ms - (limit - current - cost) * window_ms / previous) - elapsed_ms
+    return False, max(int(limit - used), 0), max(wait_ms, 1)
+
+
+# KEYS: 当前窗口键, 上一窗口键
+# ARGV: 限额, 窗口毫秒数, 窗口内已过毫秒数, 本次计费
+_SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window_ms = tonumber(ARGV[2])
+local elapsed_ms = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = previous * (window_ms - elapsed_ms) / window_ms + current
+
+if used + cost <= limit then
+    redis.call('INCRBY', KEYS[1], cost)
+    redis.call('PEXPIRE', KEYS[1], window_ms * 2)
+    return {1, math.floor(limit - used - cost), 0}
+end
+
+local wait_ms
+if current + cost > limit or previous == 0 then
+    wait_ms = window_ms - elapsed_ms
+else
+    wait_ms = math.ceil(window_ms - (limit - current - cost) * window_ms / previous) - elapsed_ms
+end
+return {0, math.max(math.floor(limit - used), 0), math.max(wait_ms, 1)}
+"""
+
+
+class LocalRateLimitStore:
+    """进程内滑动窗口计数（Redis不可用时使用）"""
+    
+    # 超过该键数时清理过期窗口
+    MAX_KEYS = 10000
+    
+    def __init__(self):
+        # 键 -> [窗口序号, 当前窗口计数, 上一窗口计数]
+        self._windows: Dict[str, List[int]] = {}
+    
+    def hit(self, key: str, limit: int, window_ms: int, now_ms: int, cost: int) -> Tuple[bool, int, int]:
+        index, elapsed_ms = divmod(now_ms, window_ms)
+        state = self._windows.get(key)
+        if state is None:
+            if len(self._windows) >= self.MAX_KEYS:
+                self._prune(index)
+            state = self._windows[key] = [index, 0, 0]
+        elif state[0] != index:
+            # 进入新窗口：上一窗口相邻时保留其计数，否则清零
+            state[2] = state[1] if state[0] == index - 1 else 0
+            state[1] = 0
+            state[0] = index
+        
+        allowed, remaining, wait_ms = _sliding_window(state[1], state[2], limit, window_ms, elapsed_ms, cost)
+        if allowed:
+            state[1] += cost
+        return allowed, remaining, wait_ms
+    
+    def _prune(self, index: int):
+        for key in [key for key, state in self._windows.items() if state[0] < index - 1]:
+            del self._windows[key]
+
+
+class RateLimiter:
+    """滑动窗口限流器"""
+    
+    # Redis调用失败后，该时长（秒）内直接使用进程内计数
+    REDIS_RETRY_INTERVAL = 5.0
+    
+    def __init__(
+        self,
+        limit: int,
+        window: int,
+        key_prefix: str = "ratelimit",
+        redis_getter: Callable[[], object] = lambda: redis_module.redis_client,
+        clock: Callable[[], float] = time.time
+    ):
+        self.limit = limit
+        self.window_ms = int(window * 1000)
+        self.key_prefix = key_prefix
+        self._redis_getter = redis_getter
+        self._clock = clock
+        self._local = LocalRateLimitStore()
+        self._scripts: Dict[int, object] = {}
+        self._redis_retry_at = 0.0
+    
+    async def hit(self, identifier: str, cost: int = 1) -> RateLimitResult:
+        """计入一次请求，返回是否放行"""
+        now_ms = int(self._clock() * 1000)
+        allowed, remaining, wait_ms = await self._hit_redis(identifier, now_ms, cost)
+        return RateLimitResult(bool(allowed), int(remaining), int(wait_ms) / 1000)
+    
+    async def _hit_redis(self, identifier: str, now_ms: int, cost: int) -> Tuple[bool, int, int]:
+        client = self._redis_getter()
+        if client is None or now_ms / 1000 < self._redis_retry_at:
+            return self._hit_local(identifier, now_ms, cost)
+        
+        index, elapsed_ms = divmod(now_ms, self.window_ms)
+        keys = [
+            f"{self.key_prefix}:{identifier}:{index}",
+            f"{self.key_prefix}:{identifier}:{index - 1}",
+        ]
+        try:
+            script = self._scripts.get(id(client))
+            if script is None:
+                script = self._scripts[id(client)] = client.register_script(_SLIDING_WINDOW_SCRIPT)
+            allowed, remaining, wait_ms = await script(
+                keys=keys, args=[self.limit, self.window_ms, elapsed_ms, cost]
+            )
+            return allowed == 1, remaining, wait_ms
+        except (RedisError, OSError) as e:
+            RATE_LIMIT_BACKEND_ERRORS.inc()
+            self._redis_retry_at = now_ms / 1000 + self.REDIS_RETRY_INTERVAL
+            logger.warning(f"限流Redis调用失败，{self.REDIS_RETRY_INTERVAL}秒内使用进程内计数: {e}")
+            return self._hit_local(identifier, now_ms, cost)
+    
+    def _hit_local(self, identifier: str, now_ms: int, cost: int) -> Tuple[bool, int, int]:
+        return self._local.hit(identifier, self.limit, self.window_ms, now_ms, cost)
+
+
+class RateLimitMiddleware:
+    """
+    按客户端IP限流的ASGI中间件
+    
+    路由计费按最长匹配的路径前缀取值，未匹配时为1；超出额度返回429，
+    并通过 Retry-After 告知客户端需等待的秒数
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        limit: int,
+        window: int,
+        route_costs: Optional[Dict[str, int]] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
+        self.app = app
+        self.limiter = limiter or RateLimiter(limit, window)
+        self._routes = sorted((route_costs or {}).items(), key=lambda item: len(item[0]), reverse=True)
+    
+    def cost_for(self, path: str) -> int:
+        for prefix, cost in self._routes:
+            if path.startswith(prefix):
+                return cost
+        return 1
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
+        path = scope["path"]
+        cost = self.cost_for(path)
+        if cost <= 0:
+            await self.app(scope, receive, send)
+            return
+        
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        result = await self.limiter.hit(client_ip, cost)
+        if result.allowed:
+            await self.app(scope, receive, send)
+            return
+        
+        RATE_LIMIT_REJECTIONS.inc()
+        retry_after = max(math.ceil(result.retry_after), 1)
+        logger.warning(f"请求被限流 | {scope['method']} {path} | IP: {client_ip} | 计费: {cost} | 需等待: {retry_after}s")
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "success": False,
+                "error": {
+                    "code": "TOO_MANY_REQUESTS",
+                    "message": f"请求过于频繁，请{retry_after}秒后重试",
+                    "details": {"limit": self.limiter.limit, "retry_after": retry_after},
+                    "timestamp": datetime.now().isoformat(),
+                    "request_id": scope.get("state", {}).get("request_id", "-"),
+                    "path": path
+                }
+            },
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(self.limiter.limit),
+                "X-RateLimit-Remaining": str(result.remaining)
+            }
+        )
+        await response(scope, receive, send)
@@ -1,10 +1,28 @@
 """
 Redis客户端管理
 """
+import time
+
 import redis.asyncio as redis
 from loguru import logger
 
 from app.core.config import settings
+from app.core.metrics import REDIS_COMMAND_DURATION
+
+
+class InstrumentedRedis(redis.Redis):
+    """记录命令耗时指标的Redis客户端"""
+    
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await super().execute_command(*args, **options)
+            status = "success"
+            return result
+        finally:
+            REDIS_COMMAND_DURATION.labels(command=command, status=status).observe(time.perf_counter() - start)
 
 # Redis客户端
 redis_client: redis.Redis = None
@@ -14,7 +32,7 @@ async def init_redis():
     """初始化Redis连接"""
     global redis_client
     try:
-        redis_client = redis.from_url(
+        redis_client = InstrumentedRedis.from_url(
             settings.REDIS_URL,
             encoding="utf-8",
             decode_responses=True,
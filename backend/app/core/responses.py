@@ -0,0 +1,42 @@
+"""
+快速JSON响应
+
+FastJSONResponse 基于orjson序列化，作为应用的默认响应类。
+
+端点返回普通值时，FastAPI会先按response_model重新校验，或用jsonable_encoder逐层遍历，
+之后才序列化。大列表接口可以直接返回 FastJSONResponse(...) 跳过这一步：
+- pydantic模型由pydantic-core直接输出JSON，结果与按response_model序列化一致
+- 已构造好的dict/list由orjson输出，Decimal等类型按jsonable_encoder的规则转换
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """orjson不支持的类型"""
+    if isinstance(obj, Decimal):
+        return decimal_encoder(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为JSON字节串"""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json(by_alias=True).encode("utf-8")
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """基于orjson的JSON响应"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
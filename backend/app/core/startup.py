@@ -0,0 +1,69 @@
+"""
+启动耗时
+
+记录模块导入与生命周期各启动阶段的耗时，在 /health/detailed 与 /metrics 中输出，
+用于观察容器冷启动与扩容后的就绪时间。
+
+较慢的可选依赖（LLM SDK、Excel、OSS、调度与爬虫库）在首次使用时才导入，
+scripts/check_import_time.py 检查它们没有被重新引入启动路径。
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+
+# 不应在导入应用时加载的模块
+DEFERRED_MODULES = (
+    "dashscope",
+    "openai",
+    "openpyxl",
+    "oss2",
+    "apscheduler",
+    "aiohttp",
+    "bs4",
+    "pandas",
+    "PIL",
+)
+
+
+class StartupTimer:
+    """启动阶段计时"""
+    
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._start = clock()
+        self.started_at = time.time()
+        self.phases: Dict[str, float] = {}
+        self.ready_ms: Optional[float] = None
+    
+    def _elapsed_ms(self, since: float) -> float:
+        return round((self._clock() - since) * 1000, 2)
+    
+    def mark(self, name: str):
+        """记录从开始计时到现在的耗时（如模块导入完成）"""
+        self.phases[name] = self._elapsed_ms(self._start)
+    
+    @contextmanager
+    def phase(self, name: str):
+        """记录with块的耗时"""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self._elapsed_ms(start)
+    
+    def mark_ready(self):
+        """启动完成，开始接收流量"""
+        self.ready_ms = self._elapsed_ms(self._start)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "ready": self.ready_ms is not None,
+            "ready_ms": self.ready_ms,
+            "phases_ms": dict(self.phases),
+        }
+
+
+# 全局实例：main.py最先导入本模块，计时覆盖其余模块的导入
+startup_timer = StartupTimer()
@@ -31,6 +31,7 @@ class CrawlerTask(Base):
     records_crawled = Column(Integer, comment="爬取记录数")
     records_updated = Column(Integer, comment="更新记录数")
     error_message = Column(Text, comment="错误信息")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     
     __table_args__ = (
         {'comment': '爬虫任务表'}
@@ -4,6 +4,7 @@
 from datetime import datetime
 from decimal import Decimal
 from sqlalchemy import Column, String, Text, DateTime, Integer, Boolean, Numeric, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -108,3 +109,18 @@ class PricingModelPrice(Base):
     
     # 关系
     model = relationship("PricingModel", back_populates="prices")
+
+
+class PricingModelDocument(Base):
+    """
+    定价模型文档表（物化）
+    
+    每个model_code一行，变体、价格与分类预先嵌套为JSONB文档；
+    由数据库函数 refresh_pricing_model_documents 在快照发布或管理端修改后整体/按模型重建
+    """
+    __tablename__ = "pricing_model_document"
+    
+    model_code = Column(String(100), primary_key=True, comment="模型代码")
+    snapshot_id = Column(Integer, comment="构建时的最新快照ID")
+    document = Column(JSONB, nullable=False, comment="定价文档")
+    built_at = Column(DateTime, default=func.now(), comment="构建时间")
@@ -3,7 +3,8 @@
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, Enum, Index
+from typing import Dict, Optional
+from sqlalchemy import Column, String, Text, DateTime, Enum, Index, event
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 
@@ -16,6 +17,47 @@ except ImportError:
 from app.core.database import Base
 
 
+# 类别到模态的映射
+CATEGORY_TO_MODALITY = {
+    "AI-大模型-文本生成": "text",
+    "AI-大模型-视觉理解": "image",
+    "AI-大模型-语音": "audio",
+    "AI-大模型-多模态": "multimodal",
+    "AI-大模型-向量": "text_embedding",
+    "AI-大模型-重排序": "rerank",
+}
+
+
+def classify_category(category: Optional[str]) -> Dict[str, Optional[str]]:
+    """根据产品类别推断模态、能力与模型类型"""
+    category = category or ""
+    lowered = category.lower()
+    
+    if "生成" in category:
+        capability = "generation"
+    elif "理解" in category:
+        capability = "understanding"
+    elif "大模型" in category:
+        capability = "both"
+    else:
+        capability = None
+    
+    if "向量" in category or "embedding" in lowered:
+        model_type = "multimodal_embedding" if "多模态" in category else "text_embedding"
+    elif "重排序" in category or "rerank" in lowered:
+        model_type = "rerank"
+    elif "大模型" in category or "llm" in lowered:
+        model_type = "llm"
+    else:
+        model_type = None
+    
+    return {
+        "modality": CATEGORY_TO_MODALITY.get(category, "unknown"),
+        "capability": capability,
+        "model_type": model_type,
+    }
+
+
 class Product(Base):
     """产品主表"""
     __tablename__ = "products"
@@ -26,6 +68,10 @@ class Product(Base):
     vendor = Column(String(50), nullable=False, default="aliyun", comment="厂商")
     status = Column(String(50), default="active", comment="状态")
     description = Column(Text, comment="产品描述")
+    # 由category推导的分类字段，写入时自动维护，用于筛选
+    modality = Column(String(50), index=True, comment="模态")
+    capability = Column(String(50), index=True, comment="能力类型")
+    model_type = Column(String(50), index=True, comment="模型类型")
     # 向量字段：有pgvector时使用Vector类型，否则使用Text
     if HAS_PGVECTOR:
         description_vector = Column(Vector(1536), comment="描述向量")
@@ -40,6 +86,14 @@ class Product(Base):
     )
 
 
+@event.listens_for(Product, "before_insert")
+@event.listens_for(Product, "before_update")
+def _sync_product_classification(mapper, connection, target: Product):
+    """写入产品时根据category刷新分类字段"""
+    for field, value in classify_category(target.category).items():
+        setattr(target, field, value)
+
+
 class ProductPrice(Base):
     """产品价格表"""
     __tablename__ = "product_prices"
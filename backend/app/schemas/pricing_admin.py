@@ -108,9 +108,10 @@ class PricingModelAdminResponse(BaseModel):
 
 class PaginatedPricingModelResponse(BaseModel):
     """分页模型列表响应"""
-    total: int = Field(..., description="总记录数")
+    total: Optional[int] = Field(..., description="总记录数（count=none时为空，count=estimate时为估算值）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
     data: List[PricingModelAdminResponse] = Field(..., description="数据列表")
 
 
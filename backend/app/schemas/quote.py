@@ -199,9 +199,10 @@ class QuoteListResponse(BaseModel):
 
 class PaginatedQuoteListResponse(BaseModel):
     """分页报价单列表响应"""
-    total: int = Field(..., description="总记录数")
+    total: Optional[int] = Field(..., description="总记录数（count=none时为空，count=estimate时为估算值）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
     data: List[QuoteListResponse] = Field(..., description="数据列表")
 
 
@@ -230,6 +231,7 @@ class FilterOption(BaseModel):
     """筛选选项"""
     code: str = Field(..., description="代码")
     name: str = Field(..., description="显示名称")
+    count: Optional[int] = Field(None, description="该选项下的模型数量")
 
 
 class FilterOptionsResponse(BaseModel):
@@ -268,9 +270,10 @@ class ModelListItem(BaseModel):
 
 class PaginatedModelListResponse(BaseModel):
     """分页模型列表响应"""
-    total: int = Field(..., description="总记录数")
+    total: Optional[int] = Field(..., description="总记录数（count=none时为空，count=estimate时为估算值）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示没有更多数据")
     data: List[ModelListItem] = Field(..., description="数据列表")
 
 
@@ -314,8 +317,9 @@ class ProductSearchResultItem(BaseModel):
     
     model_id: str = Field(..., description="模型ID")
     model_name: str = Field(..., description="模型名称")
-    match_type: str = Field(..., description="匹配类型")
+    match_type: str = Field(..., description="匹配类型：exact/prefix/contains/fuzzy")
     search_term: str = Field(..., description="搜索词")
+    score: float = Field(default=1.0, description="相似度（0-1）")
 
 
 class ProductSearchResponse(BaseModel):
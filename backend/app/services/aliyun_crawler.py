@@ -2,7 +2,6 @@
 阿里云产品爬虫 - 爬取阿里云官网产品和价格信息
 """
 from typing import List, Dict, Any
-from aiohttp import ClientSession
 import logging
 import json
 import re
@@ -46,6 +45,8 @@ class AliyunCrawler(BaseCrawler):
         result = CrawlerResult("aliyun_products")
         
         try:
+            from aiohttp import ClientSession
+            
             async with ClientSession() as session:
                 for product_code, config in self.product_urls.items():
                     try:
@@ -136,6 +137,8 @@ class AliyunCrawler(BaseCrawler):
                 result.finish()
                 return result.prices
             
+            from aiohttp import ClientSession
+            
             async with ClientSession() as session:
                 # 爬取定价页面
                 html = await self.fetch(session, config["pricing_url"])
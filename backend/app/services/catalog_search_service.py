@@ -0,0 +1,458 @@
+"""
+目录关键词检索服务
+
+为模型目录（pricing_model / products）提供关键词检索：
+- 数据库启用pg_trgm时，ILIKE '%kw%' 与相似度排序走GIN三元组索引
+- 短关键词（自动完成）走 lower(col) LIKE 'kw%' 前缀路径，命中text_pattern_ops索引
+- 未启用pg_trgm时（如测试环境），使用进程内三元组索引检索
+"""
+import bisect
+import time
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Sequence, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_, case, text
+from sqlalchemy.sql.elements import ColumnElement
+from loguru import logger
+
+from app.core.pagination import SortKey
+from app.models.pricing import PricingModel
+from app.models.product import Product
+
+
+# 检索配置
+MIN_TRIGRAM_LENGTH = 3  # 少于3个字符的关键词无法形成有效三元组，走前缀路径
+SIMILARITY_THRESHOLD = 0.3  # 与pg_trgm.similarity_threshold默认值一致
+LOCAL_INDEX_TTL = 300  # 进程内索引缓存时间（秒）
+
+# 匹配等级：数值越小越靠前
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_CONTAINS = 2
+MATCH_FUZZY = 3
+
+MATCH_TYPE_NAMES = {
+    MATCH_EXACT: "exact",
+    MATCH_PREFIX: "prefix",
+    MATCH_CONTAINS: "contains",
+    MATCH_FUZZY: "fuzzy",
+}
+
+# 批量名称解析的模糊匹配：每个名称通过LATERAL子查询取最佳候选，一次往返完成
+FUZZY_NAME_MATCH_SQL = text("""
+    SELECT t.term, m.product_code, m.product_name, m.score
+    FROM unnest(CAST(:terms AS text[]), CAST(:patterns AS text[])) AS t(term, pattern)
+    CROSS JOIN LATERAL (
+        SELECT p.product_code, p.product_name,
+               (p.product_name ILIKE t.pattern ESCAPE '\\'
+                OR p.product_code ILIKE t.pattern ESCAPE '\\') AS is_contained,
+               GREATEST(similarity(p.product_name, t.term),
+                        similarity(p.product_code, t.term)) AS score
+        FROM products p
+        WHERE p.product_name ILIKE t.pattern ESCAPE '\\'
+           OR p.product_code ILIKE t.pattern ESCAPE '\\'
+           OR p.product_name % t.term
+           OR p.product_code % t.term
+        ORDER BY is_contained DESC, score DESC, p.product_code
+        LIMIT 1
+    ) m
+""")
+
+
+def trigrams(value: str) -> Set[str]:
+    """生成字符串的三元组集合（小写，首部补两个空格、尾部补一个空格，与pg_trgm一致）"""
+    padded = f"  {value.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """三元组相似度（Jaccard系数）"""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+class TrigramIndex:
+    """
+    进程内三元组索引
+    
+    每个文档由一个key和若干待检索字段组成，支持：
+    - prefix_search: 基于有序字段表的二分前缀检索
+    - search: 三元组倒排召回 + 精确/前缀/包含/相似度排序
+    """
+    
+    def __init__(self):
+        self._fields: List[Tuple[str, ...]] = []
+        self._keys: List[Any] = []
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._sorted_values: List[Tuple[str, int]] = []
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def add(self, key: Any, *values: Optional[str]):
+        """添加文档，空字段会被忽略"""
+        doc_id = len(self._keys)
+        fields = tuple(v.strip().lower() for v in values if v and v.strip())
+        self._keys.append(key)
+        self._fields.append(fields)
+        for value in fields:
+            for gram in trigrams(value):
+                self._postings[gram].add(doc_id)
+            bisect.insort(self._sorted_values, (value, doc_id))
+    
+    def _rank(self, doc_id: int, keyword: str) -> Tuple[int, float]:
+        """计算文档的匹配等级与最高相似度"""
+        fields = self._fields[doc_id]
+        score = max((similarity(value, keyword) for value in fields), default=0.0)
+        if any(value == keyword for value in fields):
+            return MATCH_EXACT, score
+        if any(value.startswith(keyword) for value in fields):
+            return MATCH_PREFIX, score
+        if any(keyword in value for value in fields):
+            return MATCH_CONTAINS, score
+        return MATCH_FUZZY, score
+    
+    def prefix_search(self, prefix: str, limit: int = 20) -> List[Tuple[Any, int, float]]:
+        """前缀检索，返回 (key, 匹配等级, 相似度) 列表"""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        
+        doc_ids: List[int] = []
+        seen = set()
+        start = bisect.bisect_left(self._sorted_values, (prefix, -1))
+        for value, doc_id in self._sorted_values[start:]:
+            if not value.startswith(prefix):
+                break
+            if doc_id not in seen:
+                seen.add(doc_id)
+                doc_ids.append(doc_id)
+        
+        return self._ordered(doc_ids, prefix, limit)
+    
+    def search(
+        self,
+        keyword: str,
+        limit: int = 20,
+        threshold: float = SIMILARITY_THRESHOLD
+    ) -> List[Tuple[Any, int, float]]:
+        """
+        关键词检索
+        
+        包含关键词的文档全部召回，其余文档需相似度达到threshold
+        
+        Returns:
+            按 (匹配等级, -相似度) 排序的 (key, 匹配等级, 相似度) 列表
+        """
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+        if len(keyword) < MIN_TRIGRAM_LENGTH:
+            return self.prefix_search(keyword, limit)
+        
+        candidates: Set[int] = set()
+        for gram in trigrams(keyword):
+            candidates |= self._postings.get(gram, set())
+        
+        matched = []
+        for doc_id in candidates:
+            rank, score = self._rank(doc_id, keyword)
+            if rank < MATCH_FUZZY or score >= threshold:
+                matched.append(doc_id)
+        
+        return self._ordered(matched, keyword, limit)
+    
+    def _ordered(self, doc_ids: List[int], keyword: str, limit: int) -> List[Tuple[Any, int, float]]:
+        """按匹配等级、相似度、字段长度排序并截断"""
+        ranked = []
+        for doc_id in doc_ids:
+            rank, score = self._rank(doc_id, keyword)
+            shortest = min((len(v) for v in self._fields[doc_id]), default=0)
+            ranked.append((rank, -score, shortest, doc_id))
+        ranked.sort()
+        return [
+            (self._keys[doc_id], rank, round(-neg_score, 4))
+            for rank, neg_score, _, doc_id in ranked[:limit]
+        ]
+
+
+class CatalogSearchService:
+    """目录关键词检索服务"""
+    
+    PRICING_COLUMNS = (PricingModel.model_code, PricingModel.model_name, PricingModel.display_name)
+    
+    def __init__(self):
+        self._trgm_enabled: Optional[bool] = None
+        # 进程内索引缓存：{名称: (索引, 加载时间)}
+        self._indexes: Dict[str, Tuple[TrigramIndex, float]] = {}
+    
+    @staticmethod
+    def escape_like(keyword: str) -> str:
+        """转义LIKE通配符，关键词中的 % 和 _ 按字面匹配"""
+        return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    
+    def keyword_condition(self, columns: Sequence[Any], keyword: str) -> ColumnElement:
+        """任一列包含关键词（启用pg_trgm时由GIN三元组索引加速）"""
+        pattern = f"%{self.escape_like(keyword.strip())}%"
+        return or_(*[column.ilike(pattern, escape="\\") for column in columns])
+    
+    def prefix_condition(self, columns: Sequence[Any], keyword: str) -> ColumnElement:
+        """任一列以关键词开头（命中 lower(col) text_pattern_ops 索引）"""
+        pattern = f"{self.escape_like(keyword.strip().lower())}%"
+        return or_(*[func.lower(column).like(pattern, escape="\\") for column in columns])
+    
+    def match_rank(self, columns: Sequence[Any], keyword: str) -> ColumnElement:
+        """匹配等级表达式：精确 < 前缀 < 包含 < 相似"""
+        keyword = keyword.strip().lower()
+        return case(
+            (or_(*[func.lower(column) == keyword for column in columns]), MATCH_EXACT),
+            (self.prefix_condition(columns, keyword), MATCH_PREFIX),
+            (self.keyword_condition(columns, keyword), MATCH_CONTAINS),
+            else_=MATCH_FUZZY
+        )
+    
+    @staticmethod
+    def similarity_score(columns: Sequence[Any], keyword: str) -> ColumnElement:
+        """各列三元组相似度的最大值（需要pg_trgm）"""
+        keyword = keyword.strip().lower()
+        return func.greatest(*[func.similarity(column, keyword) for column in columns])
+    
+    async def relevance_keys(
+        self,
+        db: AsyncSession,
+        columns: Sequence[Any],
+        keyword: str
+    ) -> List[SortKey]:
+        """关键词相关度排序键，未启用pg_trgm时仅按匹配等级排序"""
+        keys = [SortKey(self.match_rank(columns, keyword))]
+        if await self.is_trgm_enabled(db):
+            keys.append(SortKey(self.similarity_score(columns, keyword), descending=True))
+        return keys
+    
+    async def is_trgm_enabled(self, db: AsyncSession) -> bool:
+        """检查数据库是否启用了pg_trgm扩展（进程内缓存）"""
+        if self._trgm_enabled is not None:
+            return self._trgm_enabled
+        
+        try:
+            if db.bind is None or db.bind.dialect.name != "postgresql":
+                self._trgm_enabled = False
+            else:
+                result = await db.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                )
+                self._trgm_enabled = result.scalar() is not None
+        except Exception as e:
+            logger.warning(f"[CatalogSearch] 检测pg_trgm失败，使用进程内索引: {e}")
+            return False
+        
+        logger.info(f"[CatalogSearch] pg_trgm {'已启用' if self._trgm_enabled else '未启用'}")
+        return self._trgm_enabled
+    
+    def invalidate(self):
+        """
+        清除进程内索引，下次检索时重建
+        
+        产品或定价模型写入后调用；只影响当前进程，其他进程（含执行爬虫的worker之外的API进程）
+        只能等待LOCAL_INDEX_TTL过期，即跨进程最多滞后LOCAL_INDEX_TTL秒
+        """
+        self._indexes.clear()
+    
+    async def _get_index(self, db: AsyncSession, name: str) -> TrigramIndex:
+        """获取（必要时重建）进程内索引"""
+        cached = self._indexes.get(name)
+        if cached is not None and time.monotonic() - cached[1] < LOCAL_INDEX_TTL:
+            return cached[0]
+        
+        index = TrigramIndex()
+        if name == "pricing_model":
+            result = await db.execute(
+                select(PricingModel.id, *self.PRICING_COLUMNS).order_by(PricingModel.id)
+            )
+            for row in result.all():
+                index.add(row.id, row.model_code, row.model_name, row.display_name)
+        else:
+            result = await db.execute(
+                select(Product.product_code, Product.product_name).order_by(Product.product_code)
+            )
+            for row in result.all():
+                index.add((row.product_code, row.product_name), row.product_code, row.product_name)
+        
+        self._indexes[name] = (index, time.monotonic())
+        logger.info(f"[CatalogSearch] 进程内索引已加载: {name} {len(index)} 条")
+        return index
+    
+    async def search_pricing_models(
+        self,
+        db: AsyncSession,
+        keyword: str,
+        limit: int = 20
+    ) -> List[Tuple[PricingModel, str, float]]:
+        """
+        定价模型检索（自动完成）
+        
+        同一model_code的多个变体只返回相关度最高的一条
+        
+        Returns:
+            (模型, 匹配类型, 相似度) 列表，按相关度降序
+        """
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+        
+        if not await self.is_trgm_enabled(db):
+            return await self._search_pricing_local(db, keyword, limit)
+        
+        columns = self.PRICING_COLUMNS
+        if len(keyword) < MIN_TRIGRAM_LENGTH:
+            condition = self.prefix_condition(columns, keyword)
+        else:
+            condition = or_(
+                self.keyword_condition(columns, keyword),
+                *[column.op("%")(keyword) for column in columns]
+            )
+        
+        rank = self.match_rank(columns, keyword)
+        score = self.similarity_score(columns, keyword)
+        ranked = select(
+            PricingModel.id,
+            rank.label("rank"),
+            score.label("score"),
+            func.row_number().over(
+                partition_by=PricingModel.model_code,
+                order_by=(rank, score.desc(), PricingModel.id)
+            ).label("rn")
+        ).where(condition).subquery()
+        
+        query = (
+            select(PricingModel, ranked.c.rank, ranked.c.score)
+            .join(ranked, ranked.c.id == PricingModel.id)
+            .where(ranked.c.rn == 1)
+            .order_by(ranked.c.rank, ranked.c.score.desc(), PricingModel.model_code)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return [
+            (model, MATCH_TYPE_NAMES[rank], round(float(score or 0), 4))
+            for model, rank, score in result.all()
+        ]
+    
+    async def _search_pricing_local(
+        self,
+        db: AsyncSession,
+        keyword: str,
+        limit: int
+    ) -> List[Tuple[PricingModel, str, float]]:
+        """进程内索引检索，再按ID回表"""
+        index = await self._get_index(db, "pricing_model")
+        # 多取一些候选，用于同一model_code变体去重后仍能填满limit
+        hits = index.search(keyword, limit=limit * 5)
+        if not hits:
+            return []
+        
+        result = await db.execute(
+            select(PricingModel).where(PricingModel.id.in_([key for key, _, _ in hits]))
+        )
+        models = {m.id: m for m in result.scalars().all()}
+        
+        matches = []
+        seen_codes = set()
+        for model_id, rank, score in hits:
+            model = models.get(model_id)
+            if model is None or model.model_code in seen_codes:
+                continue
+            seen_codes.add(model.model_code)
+            matches.append((model, MATCH_TYPE_NAMES[rank], score))
+            if len(matches) >= limit:
+                break
+        return matches
+    
+    async def resolve_product_names(
+        self,
+        db: AsyncSession,
+        names: List[str]
+    ) -> Dict[str, Tuple[str, str, str, float]]:
+        """
+        批量解析模型名称
+        
+        先用一次查询完成所有精确匹配（product_code或product_name，忽略大小写），
+        剩余名称再用一次三元组相似度查询取最佳候选
+        
+        Args:
+            db: 数据库会话
+            names: 待解析的名称列表
+        
+        Returns:
+            {规范化名称(小写): (product_code, product_name, 匹配类型, 相似度)}，未匹配的名称不出现
+        """
+        terms = list(dict.fromkeys(n.strip().lower() for n in names if n and n.strip()))
+        if not terms:
+            return {}
+        
+        if not await self.is_trgm_enabled(db):
+            return await self._resolve_product_names_local(db, terms)
+        
+        resolved: Dict[str, Tuple[str, str, str, float]] = {}
+        
+        # 第一轮：精确匹配，product_code优先于product_name
+        exact_query = select(Product.product_code, Product.product_name).where(
+            or_(
+                func.lower(Product.product_code).in_(terms),
+                func.lower(Product.product_name).in_(terms)
+            )
+        ).order_by(Product.product_code)
+        result = await db.execute(exact_query)
+        by_code, by_name = {}, {}
+        for row in result.all():
+            by_code[row.product_code.lower()] = row
+            by_name.setdefault(row.product_name.lower(), row)
+        for term in terms:
+            row = by_code.get(term) or by_name.get(term)
+            if row is not None:
+                resolved[term] = (row.product_code, row.product_name, MATCH_TYPE_NAMES[MATCH_EXACT], 1.0)
+        
+        # 第二轮：剩余名称一次性做包含/相似度匹配
+        remaining = [term for term in terms if term not in resolved]
+        if remaining:
+            result = await db.execute(FUZZY_NAME_MATCH_SQL, {
+                "terms": remaining,
+                "patterns": [f"%{self.escape_like(term)}%" for term in remaining]
+            })
+            for row in result.all():
+                fields = (row.product_code.lower(), row.product_name.lower())
+                if any(value.startswith(row.term) for value in fields):
+                    match_type = MATCH_PREFIX
+                elif any(row.term in value for value in fields):
+                    match_type = MATCH_CONTAINS
+                else:
+                    match_type = MATCH_FUZZY
+                resolved[row.term] = (
+                    row.product_code,
+                    row.product_name,
+                    MATCH_TYPE_NAMES[match_type],
+                    round(float(row.score or 0), 4)
+                )
+        
+        return resolved
+    
+    async def _resolve_product_names_local(
+        self,
+        db: AsyncSession,
+        terms: List[str]
+    ) -> Dict[str, Tuple[str, str, str, float]]:
+        """进程内索引批量解析"""
+        index = await self._get_index(db, "products")
+        resolved = {}
+        for term in terms:
+            hits = index.search(term, limit=1)
+            if hits:
+                (product_code, product_name), rank, score = hits[0]
+                resolved[term] = (product_code, product_name, MATCH_TYPE_NAMES[rank], score)
+        return resolved
+
+
+# 创建全局服务实例
+catalog_search_service = CatalogSearchService()
@@ -3,13 +3,16 @@
 """
 import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 from datetime import datetime
 import logging
-from aiohttp import ClientSession, ClientTimeout
-from bs4 import BeautifulSoup
 import json
 
+# aiohttp与bs4导入较慢，运行爬虫时才加载
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+    from bs4 import BeautifulSoup
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +33,8 @@ class BaseCrawler(ABC):
             max_retries: 最大重试次数
             retry_delay: 重试延迟(秒)
         """
+        from aiohttp import ClientTimeout
+        
         self.timeout = ClientTimeout(total=timeout)
         self.max_retries = max_retries
         self.retry_delay = retry_delay
@@ -55,7 +60,7 @@ class BaseCrawler(ABC):
     
     async def fetch(
         self,
-        session: ClientSession,
+        session: "ClientSession",
         url: str,
         method: str = "GET",
         **kwargs
@@ -104,8 +109,10 @@ class BaseCrawler(ABC):
         
         return None
     
-    def parse_html(self, html: str) -> BeautifulSoup:
+    def parse_html(self, html: str) -> "BeautifulSoup":
         """解析HTML"""
+        from bs4 import BeautifulSoup
+        
         return BeautifulSoup(html, "html.parser")
     
     @abstractmethod
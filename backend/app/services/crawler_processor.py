@@ -9,7 +9,9 @@ from sqlalchemy import select
 import logging
 
 from app.models.product import Product, ProductPrice
+from app.services.catalog_search_service import catalog_search_service
 from app.services.crawler_base import CrawlerResult
+from app.services.spec_assembly_service import spec_assembly_service
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +50,9 @@ class CrawlerDataProcessor:
                     update_count += 1
             
             await db.commit()
+            if update_count:
+                catalog_search_service.invalidate()
+                spec_assembly_service.invalidate()
             logger.info(f"数据处理完成,更新 {update_count} 条记录")
         
         except Exception as e:
@@ -1,34 +1,62 @@
 """
 爬虫调度服务 - 定时触发爬虫任务并管理任务状态
+
+多worker部署时通过主节点选举，整个集群只有一个进程运行定时调度；
+其他进程不创建调度器与爬虫实例，主节点退出后由其余进程自动接管。
 """
 import asyncio
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
 from datetime import datetime
 from uuid import uuid4
 import logging
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.jobs import JobContext, job_handler
+from app.core.leader_election import LeaderElection
 from app.models.crawler import CrawlerTask, TaskStatus
 from app.services.aliyun_crawler import AliyunCrawler
 from app.services.volcano_crawler import VolcanoCrawler
+from app.services.crawler_base import BaseCrawler
 from app.services.crawler_processor import CrawlerDataProcessor
 from app.core.redis_client import get_redis
+from app.core.metrics import CRAWLER_JOB_DURATION
 
 logger = logging.getLogger(__name__)
 
+# 任务类型 -> 爬虫类
+CRAWLERS = {
+    "aliyun": AliyunCrawler,
+    "volcano": VolcanoCrawler,
+}
+
 
 class CrawlerScheduler:
     """爬虫调度器"""
     
     def __init__(self):
-        self.scheduler = AsyncIOScheduler()
+        self.scheduler = None  # 启动时创建（apscheduler不在导入时加载）
         self.is_running = False
-        self.aliyun_crawler = AliyunCrawler()
-        self.volcano_crawler = VolcanoCrawler()
-        self.processor = CrawlerDataProcessor()
+        # 爬虫与数据处理器在首次执行任务时创建
+        self._crawlers: Dict[str, BaseCrawler] = {}
+        self._processor: Optional[CrawlerDataProcessor] = None
+    
+    def get_crawler(self, task_type: str) -> BaseCrawler:
+        """获取任务类型对应的爬虫实例"""
+        crawler = self._crawlers.get(task_type)
+        if crawler is None:
+            if task_type not in CRAWLERS:
+                raise ValueError(f"未知的任务类型: {task_type}")
+            crawler = self._crawlers[task_type] = CRAWLERS[task_type]()
+        return crawler
+    
+    @property
+    def processor(self) -> CrawlerDataProcessor:
+        if self._processor is None:
+            self._processor = CrawlerDataProcessor()
+        return self._processor
     
     def start(self):
         """启动调度器"""
@@ -36,6 +64,12 @@ class CrawlerScheduler:
             logger.warning("调度器已在运行")
             return
         
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+        from apscheduler.triggers.cron import CronTrigger
+        
+        if self.scheduler is None:
+            self.scheduler = AsyncIOScheduler()
+        
         # 配置定时任务 - 每周日凌晨2点执行
         self.scheduler.add_job(
             self.run_all_crawlers,
@@ -92,12 +126,19 @@ class CrawlerScheduler:
         # 增量更新逻辑可以后续实现
         # 例如:只更新价格变化的产品
     
-    async def run_crawler(self, task_type: str) -> Dict[str, Any]:
+    async def run_crawler(
+        self,
+        task_type: str,
+        task_id: Optional[str] = None,
+        progress: Optional[Callable[[float, str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
         """
         运行单个爬虫任务
         
         Args:
             task_type: 任务类型(aliyun/volcano)
+            task_id: 任务ID（手动触发时已创建待执行的任务记录），为空时新建
+            progress: 进度回调(百分比, 说明)
         
         Returns:
             任务执行结果
@@ -108,29 +149,31 @@ class CrawlerScheduler:
             logger.warning(f"爬虫任务 {task_type} 已在执行中,跳过")
             return {"status": "skipped", "reason": "task_running"}
         
-        task_id = str(uuid4())
+        task_id = task_id or str(uuid4())
+        start = time.perf_counter()
+        status = "failed"
         
         try:
-            # 创建任务记录
+            # 创建任务记录（已有待执行记录时更新为运行中）
             async for db in get_db():
-                task = CrawlerTask(
-                    task_id=task_id,
-                    task_type=task_type,
-                    status=TaskStatus.RUNNING,
-                    start_time=datetime.now()
-                )
-                db.add(task)
+                task = await db.get(CrawlerTask, task_id)
+                if task is None:
+                    task = CrawlerTask(task_id=task_id, task_type=task_type)
+                    db.add(task)
+                task.status = TaskStatus.RUNNING
+                task.start_time = datetime.now()
+                task.end_time = None
+                task.error_message = None
                 await db.commit()
                 break
             
             # 执行爬虫
-            if task_type == "aliyun":
-                result = await self.aliyun_crawler.crawl_all()
-            elif task_type == "volcano":
-                result = await self.volcano_crawler.crawl_all()
-            else:
-                raise ValueError(f"未知的任务类型: {task_type}")
+            if progress:
+                await progress(10, "正在爬取")
+            result = await self.get_crawler(task_type).crawl_all()
             
+            if progress:
+                await progress(70, "正在处理数据")
             # 处理爬取的数据
             async for db in get_db():
                 update_count = await self.processor.process_crawler_result(
@@ -150,6 +193,7 @@ class CrawlerScheduler:
                 
                 break
             
+            status = "success" if result.success else "failed"
             logger.info(f"爬虫任务 {task_type} 完成: {result.to_dict()}")
             return result.to_dict()
         
@@ -157,21 +201,26 @@ class CrawlerScheduler:
             logger.error(f"爬虫任务 {task_type} 失败: {str(e)}", exc_info=True)
             
             # 更新任务状态为失败
-            async for db in get_db():
-                task = await db.get(CrawlerTask, task_id)
-                if task:
-                    task.status = TaskStatus.FAILED
-                    task.end_time = datetime.now()
-                    task.error_message = str(e)
-                    await db.commit()
-                break
+            await self._mark_failed(task_id, str(e))
             
             return {"status": "failed", "error": str(e)}
         
         finally:
+            CRAWLER_JOB_DURATION.labels(task_type=task_type, status=status).observe(time.perf_counter() - start)
             # 释放锁
             await self._release_lock(task_type)
     
+    async def _mark_failed(self, task_id: str, error: str):
+        """将任务记录标记为失败"""
+        async for db in get_db():
+            task = await db.get(CrawlerTask, task_id)
+            if task:
+                task.status = TaskStatus.FAILED
+                task.end_time = datetime.now()
+                task.error_message = error
+                await db.commit()
+            break
+    
     async def _acquire_lock(self, task_type: str, timeout: int = 3600) -> bool:
         """
         获取分布式锁
@@ -199,6 +248,8 @@ class CrawlerScheduler:
 
 # 全局调度器实例
 _scheduler: Optional[CrawlerScheduler] = None
+# 调度器主节点选举（CRAWLER_LEADER_ELECTION关闭时每个进程都运行调度器）
+_election: Optional[LeaderElection] = None
 
 
 def get_crawler_scheduler() -> CrawlerScheduler:
@@ -209,15 +260,69 @@ def get_crawler_scheduler() -> CrawlerScheduler:
     return _scheduler
 
 
+async def _crawler_job_failed(job_id: str, payload: Dict[str, Any], error: str):
+    """爬虫任务最终失败（含重试耗尽、worker崩溃后超过最大次数）时，将任务记录标记为失败"""
+    task_id = payload.get("task_id")
+    if task_id:
+        await get_crawler_scheduler()._mark_failed(task_id, error)
+
+
+@job_handler("crawler.run", on_failure=_crawler_job_failed)
+async def run_crawler_job(ctx: JobContext, task_type: str, task_id: str) -> Dict[str, Any]:
+    """
+    后台任务队列中的爬虫任务
+    
+    执行异常或同类型任务正在执行（未获取到锁）时抛出，由队列按退避策略重试；
+    重试耗尽后任务记录由 _crawler_job_failed 标记为失败
+    """
+    result = await get_crawler_scheduler().run_crawler(task_type, task_id=task_id, progress=ctx.report_progress)
+    if result.get("status") == "skipped":
+        raise RuntimeError("同类型爬虫任务正在执行,已跳过")
+    if result.get("status") == "failed":
+        raise RuntimeError(result.get("error") or "爬虫任务失败")
+    return result
+
+
+async def _on_elected():
+    get_crawler_scheduler().start()
+
+
+async def _on_revoked():
+    get_crawler_scheduler().stop()
+
+
 async def start_crawler_scheduler():
-    """启动爬虫调度器"""
-    scheduler = get_crawler_scheduler()
-    scheduler.start()
-    logger.info("爬虫调度器服务已启动")
+    """启动爬虫调度器（启用选举时仅主节点运行）"""
+    global _election
+    if not settings.CRAWLER_LEADER_ELECTION:
+        get_crawler_scheduler().start()
+        logger.info("爬虫调度器服务已启动")
+        return
+    
+    if _election is None:
+        _election = LeaderElection(
+            "crawler_scheduler",
+            lease_seconds=settings.CRAWLER_LEADER_LEASE_SECONDS,
+            on_elected=_on_elected,
+            on_revoked=_on_revoked
+        )
+    await _election.start()
+    role = "主节点" if _election.is_leader else "备用节点"
+    logger.info(f"爬虫调度器服务已启动（{role}: {_election.identity}）")
 
 
 async def stop_crawler_scheduler():
-    """停止爬虫调度器"""
-    scheduler = get_crawler_scheduler()
-    scheduler.stop()
+    """停止爬虫调度器，主节点释放租约由其他进程接管"""
+    if _election is not None:
+        await _election.stop()
+    else:
+        get_crawler_scheduler().stop()
     logger.info("爬虫调度器服务已停止")
+
+
+def get_scheduler_status() -> Dict[str, Any]:
+    """调度器运行状态与主节点身份"""
+    status = {"running": _scheduler is not None and _scheduler.is_running}
+    if _election is not None:
+        status["leader"] = _election.snapshot()
+    return status
@@ -0,0 +1,144 @@
+"""
+豆包目录服务
+
+豆包定价数据由导入脚本按快照整批写入，快照内数据不再变化。
+本服务将最新快照的元信息、分类、供应商、服务类型及各维度计数
+一次性构建为目录对象，按快照版本缓存，豆包各接口直接读取，不再逐请求扫表。
+"""
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from loguru import logger
+
+from app.models.doubao import DoubaoSnapshot, DoubaoCategory, DoubaoModel
+from app.services.snapshot_cache import doubao_snapshot_cache
+
+
+EMPTY_CATALOG: Dict[str, Any] = {
+    "snapshot": None,
+    "categories": [],
+    "providers": [],
+    "service_types": [],
+    "filters": {"categories": [], "providers": [], "service_types": []},
+    "facets": {"categories": {}, "providers": {}, "service_types": {}},
+}
+
+
+class DoubaoCatalogService:
+    """豆包目录服务"""
+    
+    async def get_catalog(self, db: AsyncSession) -> Dict[str, Any]:
+        """
+        获取最新快照的目录
+        
+        Returns:
+            snapshot: 快照元信息（无快照时为None）
+            categories: 激活分类列表（按sort_order）
+            providers: 有上架模型的供应商及模型数
+            service_types: 服务类型列表
+            filters: 筛选选项（分类名、供应商、服务类型）
+            facets: 上架模型按分类、供应商、服务类型的计数
+        """
+        return await doubao_snapshot_cache.get_or_build(db, "catalog", lambda: self._build_catalog(db))
+    
+    async def get_snapshot_id(self, db: AsyncSession) -> Optional[int]:
+        """获取最新快照ID，无快照时返回None"""
+        snapshot = (await self.get_catalog(db))["snapshot"]
+        return snapshot["id"] if snapshot else None
+    
+    async def _build_catalog(self, db: AsyncSession) -> Dict[str, Any]:
+        """查询并构建目录：快照、分类、模型分组计数共三次查询"""
+        snapshot_result = await db.execute(
+            select(DoubaoSnapshot).where(
+                DoubaoSnapshot.is_latest == True
+            ).order_by(DoubaoSnapshot.crawl_time.desc()).limit(1)
+        )
+        snapshot = snapshot_result.scalars().first()
+        if not snapshot:
+            return EMPTY_CATALOG
+        
+        category_result = await db.execute(
+            select(DoubaoCategory).where(
+                DoubaoCategory.snapshot_id == snapshot.id,
+                DoubaoCategory.is_active == True
+            ).order_by(DoubaoCategory.sort_order)
+        )
+        categories = category_result.scalars().all()
+        category_names = {cat.id: cat.name for cat in categories}
+        
+        # 一次分组扫描得到所有维度的计数
+        group_result = await db.execute(
+            select(
+                DoubaoModel.category_id,
+                DoubaoModel.provider,
+                DoubaoModel.service_type,
+                DoubaoModel.status,
+                func.count(DoubaoModel.id).label("model_count")
+            ).where(
+                DoubaoModel.snapshot_id == snapshot.id
+            ).group_by(
+                DoubaoModel.category_id,
+                DoubaoModel.provider,
+                DoubaoModel.service_type,
+                DoubaoModel.status
+            )
+        )
+        
+        all_providers = set()
+        all_service_types = set()
+        facets = {
+            "categories": defaultdict(int),
+            "providers": defaultdict(int),
+            "service_types": defaultdict(int),
+        }
+        for row in group_result.all():
+            if row.provider:
+                all_providers.add(row.provider)
+            if row.service_type:
+                all_service_types.add(row.service_type)
+            if row.status != 'active':
+                continue
+            
+            if row.category_id in category_names:
+                facets["categories"][category_names[row.category_id]] += row.model_count
+            facets["providers"][row.provider] += row.model_count
+            if row.service_type:
+                facets["service_types"][row.service_type] += row.model_count
+        
+        catalog = {
+            "snapshot": {
+                "id": snapshot.id,
+                "source_url": snapshot.source_url,
+                "crawl_time": snapshot.crawl_time.isoformat() if snapshot.crawl_time else None,
+                "total_count": snapshot.total_count,
+                "status": snapshot.status
+            },
+            "categories": [
+                {
+                    "id": cat.id,
+                    "code": cat.code,
+                    "name": cat.name,
+                    "model_count": cat.model_count
+                }
+                for cat in categories
+            ],
+            "providers": [
+                {"name": name, "model_count": model_count}
+                for name, model_count in facets["providers"].items()
+            ],
+            "service_types": sorted(all_service_types),
+            "filters": {
+                "categories": sorted({name for name in category_names.values() if name}),
+                "providers": sorted(all_providers),
+                "service_types": sorted(all_service_types),
+            },
+            "facets": {key: dict(counts) for key, counts in facets.items()},
+        }
+        logger.info(f"[DoubaoCatalog] 目录已构建: 快照 {snapshot.id}, {len(categories)} 个分类")
+        return catalog
+
+
+# 创建全局服务实例
+doubao_catalog_service = DoubaoCatalogService()
@@ -7,10 +7,8 @@ from decimal import Decimal
 from pathlib import Path
 import logging
 from io import BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
 
+from app.core.metrics import EXPORT_JOB_DURATION, timed
 from app.models.quote import QuoteSheet, QuoteItem
 from app.services.oss_uploader import get_oss_uploader
 
@@ -21,6 +19,9 @@ class ExcelExporter:
     """Excel导出器"""
     
     def __init__(self):
+        # openpyxl导入较慢，首次导出时才加载
+        from openpyxl.styles import Font, Border, Side, PatternFill
+        
         self.title_font = Font(name='微软雅黑', size=16, bold=True)
         self.header_font = Font(name='微软雅黑', size=11, bold=True, color="FFFFFF")
         self.normal_font = Font(name='微软雅黑', size=10)
@@ -35,6 +36,7 @@ class ExcelExporter:
             bottom=Side(style='thin')
         )
     
+    @timed(EXPORT_JOB_DURATION, template="standard")
     async def generate_standard_quote(
         self,
         quote: QuoteSheet,
@@ -50,6 +52,9 @@ class ExcelExporter:
         Returns:
             Excel文件字节流
         """
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment
+        
         wb = Workbook()
         ws = wb.active
         ws.title = "报价单"
@@ -244,6 +249,7 @@ class ExcelExporter:
         # 目前先返回标准版本
         return await self.generate_standard_quote(quote, items)
     
+    @timed(EXPORT_JOB_DURATION, template="simplified")
     async def generate_simplified_quote(
         self,
         quote: QuoteSheet,
@@ -259,6 +265,9 @@ class ExcelExporter:
         Returns:
             Excel文件字节流
         """
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment
+        
         wb = Workbook()
         ws = wb.active
         ws.title = "简化报价单"
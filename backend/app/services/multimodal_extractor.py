@@ -9,20 +9,50 @@ Extracts quotation-related information from various file formats:
 """
 import os
 import io
+import json
 import base64
+import asyncio
+import hashlib
+import importlib.util
 import tempfile
-from typing import Dict, Any, List, Optional, BinaryIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, BinaryIO, Tuple, TYPE_CHECKING
 from pathlib import Path
 from loguru import logger
 
-import dashscope
-from dashscope import MultiModalConversation
+# Pillow is imported on first use; only check that it is installed
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
 
-from app.core.config import settings
+if TYPE_CHECKING:
+    from PIL import Image
 
+from app.core.redis_client import get_redis
+from app.agents.bailian_client import configure_dashscope
 
-# Configure API Key
-dashscope.api_key = settings.DASHSCOPE_API_KEY
+# Concurrency configuration
+MAX_CONCURRENT_EXTRACTIONS = 4  # Files processed in parallel (parse + LLM call)
+
+# Result cache configuration
+EXTRACTION_CACHE_PREFIX = "extract_cache:"
+EXTRACTION_CACHE_TTL = 86400  # 24 hours TTL
+EXTRACTION_CACHE_MAX_ENTRIES = 256  # In-process LRU size
+
+# Chunked extraction configuration (large PDF/Word documents)
+CHUNK_MAX_CHARS = 8000  # Max characters per chunk sent to the model
+MAX_CONCURRENT_CHUNKS = 4  # Chunk requests in flight per document
+MAX_DOCUMENT_CHUNKS = 40  # Chunks beyond this are dropped
+
+# Image pre-processing configuration (qwen-vl-max)
+IMAGE_MAX_PIXELS = 1280 * 28 * 28  # The VL model downsamples anything larger
+IMAGE_JPEG_QUALITY = 85
+IMAGE_CACHE_PREFIX = "pixels:"  # Cache key prefix for decoded-pixel dedupe
+
+# Worker pool for CPU-bound document parsing (pypdf, python-docx, pandas)
+_parse_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_EXTRACTIONS,
+    thread_name_prefix="extractor"
+)
 
 # Extraction prompt template
 EXTRACTION_PROMPT = """Please analyze this document/image and extract quotation-related information.
@@ -52,15 +82,90 @@ If certain fields are not found, set them to null.
 Respond ONLY with the JSON, no additional text."""
 
 
+class ExtractionCache:
+    """
+    Extraction result cache keyed by file content hash.
+    
+    Keeps a small in-process LRU in front of Redis so that re-uploading
+    the same document returns without parsing or calling the model again.
+    Redis is optional: when unavailable only the local LRU is used.
+    """
+    
+    def __init__(self, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES, ttl: int = EXTRACTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(content: bytes, filename: str) -> str:
+        """
+        Build cache key from file content and extension.
+        
+        The extension is part of the key because the same bytes are parsed
+        differently depending on the declared type (e.g. .txt vs .csv).
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        file_ext = Path(filename).suffix.lower().lstrip('.')
+        return f"{digest}:{file_ext}"
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get cached result, or None on miss"""
+        if key in self._local:
+            self._local.move_to_end(key)
+            return self._local[key]
+        
+        try:
+            redis = await get_redis()
+            if redis is None:
+                return None
+            
+            data = await redis.get(f"{EXTRACTION_CACHE_PREFIX}{key}")
+            if data:
+                result = json.loads(data)
+                self._remember(key, result)
+                return result
+        except Exception as e:
+            logger.warning(f"[Extractor] Cache read failed for {key}: {e}")
+        
+        return None
+    
+    async def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store result in local LRU and Redis"""
+        self._remember(key, result)
+        
+        try:
+            redis = await get_redis()
+            if redis is None:
+                return
+            
+            data = json.dumps(result, ensure_ascii=False, default=str)
+            await redis.set(f"{EXTRACTION_CACHE_PREFIX}{key}", data, ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"[Extractor] Cache write failed for {key}: {e}")
+    
+    def clear(self) -> None:
+        """Clear the in-process cache"""
+        self._local.clear()
+    
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        self._local[key] = result
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+
 class MultimodalExtractor:
     """Multimodal information extractor using Qwen VL models"""
     
     SUPPORTED_IMAGE_TYPES = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
     SUPPORTED_DOC_TYPES = {'.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx', '.csv'}
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_EXTRACTIONS):
         self.vl_model = "qwen-vl-max"
         self.text_model = "qwen-max"
+        self.cache = ExtractionCache()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
     
     async def extract_from_file(
         self,
@@ -71,6 +176,9 @@ class MultimodalExtractor:
         """
         Extract information from uploaded file
         
+        Results are cached by content hash; identical files uploaded
+        concurrently share a single extraction.
+        
         Args:
             file_content: File binary content
             filename: Original filename
@@ -82,6 +190,70 @@ class MultimodalExtractor:
         file_ext = Path(filename).suffix.lower()
         logger.info(f"[Extractor] Processing file: {filename}, type: {file_ext}")
         
+        if file_ext not in self.SUPPORTED_IMAGE_TYPES | self.SUPPORTED_DOC_TYPES:
+            return {
+                "success": False,
+                "error": f"Unsupported file type: {file_ext}",
+                "supported_types": list(self.SUPPORTED_IMAGE_TYPES | self.SUPPORTED_DOC_TYPES)
+            }
+        
+        cache_key = ExtractionCache.make_key(file_content, filename)
+        
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"[Extractor] Cache hit for {filename}")
+            return {**cached, "filename": filename, "cached": True}
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._extract_and_cache(cache_key, file_content, filename))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        
+        result = await asyncio.shield(task)
+        return {**result, "filename": filename}
+    
+    async def extract_many(
+        self,
+        files: List[Tuple[bytes, str, Optional[str]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract information from several files concurrently
+        
+        Concurrency is bounded by the extractor semaphore, so total latency
+        is roughly that of the slowest file rather than the sum.
+        
+        Args:
+            files: List of (content, filename, mime_type) tuples
+            
+        Returns:
+            Extraction results in the same order as the input
+        """
+        results = await asyncio.gather(
+            *(self.extract_from_file(content, filename, mime_type) for content, filename, mime_type in files),
+            return_exceptions=True
+        )
+        
+        return [
+            result if not isinstance(result, BaseException)
+            else {"success": False, "filename": filename, "error": str(result)}
+            for result, (_, filename, _) in zip(results, files)
+        ]
+    
+    async def _extract_and_cache(self, cache_key: str, file_content: bytes, filename: str) -> Dict[str, Any]:
+        """Run extraction under the concurrency limit and cache successful results"""
+        async with self._semaphore:
+            result = await self._dispatch(file_content, filename)
+        
+        if result.get("success"):
+            await self.cache.set(cache_key, result)
+        
+        return result
+    
+    async def _dispatch(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        """Route file to the extractor for its type"""
+        file_ext = Path(filename).suffix.lower()
+        
         try:
             if file_ext in self.SUPPORTED_IMAGE_TYPES:
                 return await self._extract_from_image(file_content, filename)
@@ -111,14 +283,25 @@ class MultimodalExtractor:
         """Extract information from image using Qwen-VL"""
         logger.info(f"[Extractor] Using {self.vl_model} for image extraction")
         
-        # Encode image to base64
-        base64_image = base64.b64encode(content).decode('utf-8')
-        
         # Determine image format
         file_ext = Path(filename).suffix.lower().lstrip('.')
         if file_ext == 'jpg':
             file_ext = 'jpeg'
         
+        # Decode, rotate, downscale and re-encode off the event loop
+        image_bytes, file_ext, image_hash = await self._run_in_worker(self._preprocess_image, content, file_ext)
+        logger.info(f"[Extractor] Image {filename}: {len(content)} -> {len(image_bytes)} bytes")
+        
+        # Pixel-identical images (lossless re-encodes, stripped metadata) share one extraction
+        if image_hash:
+            cached = await self.cache.get(f"{IMAGE_CACHE_PREFIX}{image_hash}")
+            if cached is not None:
+                logger.info(f"[Extractor] Pixel hash hit for {filename}")
+                return {**cached, "filename": filename, "cached": True}
+        
+        # Encode image to base64
+        base64_image = base64.b64encode(image_bytes).decode('utf-8')
+        
         # Build multimodal message
         messages = [
             {
@@ -134,8 +317,12 @@ class MultimodalExtractor:
             }
         ]
         
+        configure_dashscope()
+        from dashscope import MultiModalConversation
+        
         try:
-            response = MultiModalConversation.call(
+            response = await asyncio.to_thread(
+                MultiModalConversation.call,
                 model=self.vl_model,
                 messages=messages
             )
@@ -143,13 +330,16 @@ class MultimodalExtractor:
             if response.status_code == 200:
                 content_text = response.output.choices[0].message.content[0].get("text", "")
                 extracted = self._parse_extraction_result(content_text)
-                return {
+                result = {
                     "success": True,
                     "source_type": "image",
                     "filename": filename,
                     "extracted_data": extracted,
                     "raw_response": content_text
                 }
+                if image_hash:
+                    await self.cache.set(f"{IMAGE_CACHE_PREFIX}{image_hash}", result)
+                return result
             else:
                 return {
                     "success": False,
@@ -165,18 +355,9 @@ class MultimodalExtractor:
         logger.info("[Extractor] Extracting from PDF")
         
         try:
-            import pypdf
-            
-            # Read PDF from bytes
-            pdf_reader = pypdf.PdfReader(io.BytesIO(content))
-            text_content = []
-            
-            for page in pdf_reader.pages:
-                text_content.append(page.extract_text() or "")
-            
-            full_text = "\n".join(text_content)
+            pages = await self._run_in_worker(self._parse_pdf, content)
             
-            if not full_text.strip():
+            if not any(page.strip() for page in pages):
                 return {
                     "success": False,
                     "error": "PDF appears to be image-based. Please upload as image.",
@@ -184,7 +365,7 @@ class MultimodalExtractor:
                 }
             
             # Use text model to extract structured data
-            return await self._extract_from_text_content(full_text, filename, "pdf")
+            return await self._extract_from_segments(pages, filename, "pdf")
             
         except ImportError:
             return {
@@ -198,22 +379,8 @@ class MultimodalExtractor:
         logger.info("[Extractor] Extracting from Word document")
         
         try:
-            from docx import Document
-            
-            doc = Document(io.BytesIO(content))
-            text_content = []
-            
-            for para in doc.paragraphs:
-                text_content.append(para.text)
-            
-            # Also extract from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = [cell.text for cell in row.cells]
-                    text_content.append(" | ".join(row_text))
-            
-            full_text = "\n".join(text_content)
-            return await self._extract_from_text_content(full_text, filename, "docx")
+            sections = await self._run_in_worker(self._parse_word, content)
+            return await self._extract_from_segments(sections, filename, "docx")
             
         except ImportError:
             return {
@@ -244,9 +411,7 @@ class MultimodalExtractor:
         """Extract information from Excel file"""
         logger.info("[Extractor] Extracting from Excel file")
         
-        try:
-            import pandas as pd
-        except ImportError:
+        if importlib.util.find_spec("pandas") is None:
             return {
                 "success": False,
                 "error": "Excel processing requires pandas. Install with: pip install pandas openpyxl",
@@ -255,28 +420,11 @@ class MultimodalExtractor:
         
         try:
             file_ext = Path(filename).suffix.lower()
+            full_text = await self._run_in_worker(self._parse_table, content, file_ext)
             
-            if file_ext == '.csv':
-                # Try different encodings for CSV
-                df = None
-                for encoding in ['utf-8', 'gbk', 'gb2312']:
-                    try:
-                        df = pd.read_csv(io.BytesIO(content), encoding=encoding)
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                if df is None:
-                    return {"success": False, "error": "Unable to decode CSV file", "filename": filename}
-            else:
-                df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
-            
-            # Convert DataFrame to text representation
-            text_content = df.to_string()
+            if full_text is None:
+                return {"success": False, "error": "Unable to decode CSV file", "filename": filename}
             
-            # Also include CSV format for better parsing
-            csv_content = df.to_csv(index=False)
-            
-            full_text = f"Table Data:\n{text_content}\n\nCSV Format:\n{csv_content}"
             return await self._extract_from_text_content(full_text, filename, "excel")
             
         except Exception as e:
@@ -287,6 +435,168 @@ class MultimodalExtractor:
                 "filename": filename
             }
     
+    async def _extract_from_segments(
+        self,
+        segments: List[str],
+        filename: str,
+        source_type: str
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce extraction over document pages/sections
+        
+        Small documents go through a single model call. Larger ones are
+        packed into chunks, extracted concurrently and merged in chunk order.
+        """
+        chunks = self._build_chunks(segments)
+        
+        if len(chunks) <= 1:
+            return await self._extract_from_text_content("\n".join(segments), filename, source_type)
+        
+        if len(chunks) > MAX_DOCUMENT_CHUNKS:
+            logger.warning(
+                f"[Extractor] {filename} split into {len(chunks)} chunks, "
+                f"only the first {MAX_DOCUMENT_CHUNKS} are extracted"
+            )
+            chunks = chunks[:MAX_DOCUMENT_CHUNKS]
+        
+        logger.info(f"[Extractor] Extracting {filename} in {len(chunks)} chunks")
+        
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+        
+        async def extract_chunk(chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._extract_from_text_content(chunk, filename, source_type)
+        
+        results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks))
+        succeeded = [r for r in results if r.get("success")]
+        
+        if not succeeded:
+            return results[0]
+        
+        return {
+            "success": True,
+            "source_type": source_type,
+            "filename": filename,
+            "extracted_data": self._merge_extractions([r["extracted_data"] for r in succeeded]),
+            "raw_text": "\n".join(segments)[:5000],  # Include first 5000 chars
+            "chunks": {
+                "total": len(chunks),
+                "succeeded": len(succeeded)
+            }
+        }
+    
+    @staticmethod
+    def _build_chunks(segments: List[str], max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+        """
+        Pack pages/sections into chunks of at most max_chars
+        
+        Segments are kept whole where possible; oversized segments are split
+        on line boundaries (or hard-split if a single line is too long).
+        """
+        pieces = []
+        for segment in segments:
+            if not segment.strip():
+                continue
+            if len(segment) <= max_chars:
+                pieces.append(segment)
+                continue
+            
+            current = ""
+            for line in segment.split("\n"):
+                while len(line) > max_chars:
+                    if current:
+                        pieces.append(current)
+                        current = ""
+                    pieces.append(line[:max_chars])
+                    line = line[max_chars:]
+                if current and len(current) + len(line) + 1 > max_chars:
+                    pieces.append(current)
+                    current = line
+                else:
+                    current = f"{current}\n{line}" if current else line
+            if current:
+                pieces.append(current)
+        
+        chunks = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    @staticmethod
+    def _merge_extractions(extractions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge per-chunk extraction results in chunk order
+        
+        - products: deduplicated by (name, quantity, unit_price), first seen order;
+          missing fields are filled from later duplicates
+        - customer: field-wise first non-null value
+        - scalar fields: first non-null value
+        - notes / raw_text: distinct non-empty values joined by newline
+        """
+        merged: Dict[str, Any] = {
+            "products": [],
+            "customer": None,
+            "quote_date": None,
+            "validity": None,
+            "total_amount": None,
+            "notes": None,
+            "raw_text": None
+        }
+        product_index: Dict[tuple, Dict[str, Any]] = {}
+        notes: List[str] = []
+        raw_texts: List[str] = []
+        
+        for data in extractions:
+            if not isinstance(data, dict) or data.get("parse_error"):
+                continue
+            
+            for product in data.get("products") or []:
+                if not isinstance(product, dict) or not product.get("name"):
+                    continue
+                key = (
+                    str(product.get("name")).strip().lower(),
+                    str(product.get("quantity")),
+                    str(product.get("unit_price"))
+                )
+                existing = product_index.get(key)
+                if existing is None:
+                    product_index[key] = dict(product)
+                    merged["products"].append(product_index[key])
+                else:
+                    for field, value in product.items():
+                        if existing.get(field) is None and value is not None:
+                            existing[field] = value
+            
+            customer = data.get("customer")
+            if isinstance(customer, dict):
+                if merged["customer"] is None:
+                    merged["customer"] = dict(customer)
+                else:
+                    for field, value in customer.items():
+                        if merged["customer"].get(field) is None and value is not None:
+                            merged["customer"][field] = value
+            
+            for field in ("quote_date", "validity", "total_amount"):
+                if merged[field] is None and data.get(field) is not None:
+                    merged[field] = data[field]
+            
+            for field, collected in (("notes", notes), ("raw_text", raw_texts)):
+                value = data.get(field)
+                if value and value not in collected:
+                    collected.append(str(value))
+        
+        merged["notes"] = "\n".join(notes) or None
+        merged["raw_text"] = "\n".join(raw_texts) or None
+        return merged
+    
     async def _extract_from_text_content(
         self, 
         text: str, 
@@ -294,6 +604,7 @@ class MultimodalExtractor:
         source_type: str
     ) -> Dict[str, Any]:
         """Use text model to extract structured data from text content"""
+        configure_dashscope()
         from dashscope import Generation
         
         # Truncate if too long
@@ -307,7 +618,8 @@ class MultimodalExtractor:
         ]
         
         try:
-            response = Generation.call(
+            response = await asyncio.to_thread(
+                Generation.call,
                 model=self.text_model,
                 messages=messages,
                 result_format="message"
@@ -334,9 +646,145 @@ class MultimodalExtractor:
             logger.error(f"[Extractor] Text extraction failed: {e}")
             return {"success": False, "error": str(e), "filename": filename}
     
+    @staticmethod
+    async def _run_in_worker(func, *args):
+        """Run a blocking parser in the extraction worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_parse_executor, func, *args)
+    
+    @staticmethod
+    def _preprocess_image(content: bytes, file_ext: str) -> Tuple[bytes, str, Optional[str]]:
+        """
+        Prepare an image for the VL model (blocking, runs in worker pool)
+        
+        Applies EXIF orientation, downscales to IMAGE_MAX_PIXELS and re-encodes
+        as JPEG. The original bytes are kept when re-encoding would not make
+        them smaller, or when Pillow is unavailable or cannot decode the file.
+        
+        Returns:
+            (image bytes, image format, pixel hash or None)
+        """
+        if not PIL_AVAILABLE:
+            return content, file_ext, None
+        
+        from PIL import Image, ImageOps
+        
+        try:
+            with Image.open(io.BytesIO(content)) as opened:
+                rotated = opened.getexif().get(0x0112, 1) != 1  # EXIF Orientation tag
+                image = ImageOps.exif_transpose(opened)
+                image_hash = MultimodalExtractor._pixel_hash(image)
+                
+                width, height = image.size
+                resized = width * height > IMAGE_MAX_PIXELS
+                if resized:
+                    scale = (IMAGE_MAX_PIXELS / (width * height)) ** 0.5
+                    image = image.resize(
+                        (max(1, int(width * scale)), max(1, int(height * scale))),
+                        Image.LANCZOS
+                    )
+                
+                if image.mode not in ("RGB", "L"):
+                    rgba = image.convert("RGBA")
+                    image = Image.new("RGB", rgba.size, (255, 255, 255))
+                    image.paste(rgba, mask=rgba.split()[-1])
+                
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+        except Exception as e:
+            logger.warning(f"[Extractor] Image pre-processing failed, sending original: {e}")
+            return content, file_ext, None
+        
+        encoded = buffer.getvalue()
+        if not resized and not rotated and len(encoded) >= len(content):
+            return content, file_ext, image_hash
+        
+        return encoded, "jpeg", image_hash
+    
+    @staticmethod
+    def _pixel_hash(image: "Image.Image") -> str:
+        """
+        SHA-256 of the decoded, orientation-normalised pixels
+        
+        Unlike a perceptual hash this only matches images whose pixels are
+        identical, so two similar screenshots never share an extraction.
+        """
+        digest = hashlib.sha256(f"{image.mode}:{image.width}x{image.height}:".encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _parse_pdf(content: bytes) -> List[str]:
+        """Read PDF text per page (blocking, runs in worker pool)"""
+        import pypdf
+        
+        # Read PDF from bytes
+        pdf_reader = pypdf.PdfReader(io.BytesIO(content))
+        text_content = []
+        
+        for page in pdf_reader.pages:
+            text_content.append(page.extract_text() or "")
+        
+        return text_content
+    
+    @staticmethod
+    def _parse_word(content: bytes) -> List[str]:
+        """Read Word document as sections split at headings, tables last (blocking, runs in worker pool)"""
+        from docx import Document
+        
+        doc = Document(io.BytesIO(content))
+        sections = []
+        current = []
+        
+        for para in doc.paragraphs:
+            style_name = (para.style.name if para.style is not None else "") or ""
+            if current and (style_name.startswith("Heading") or style_name.startswith("标题")):
+                sections.append("\n".join(current))
+                current = []
+            current.append(para.text)
+        
+        if current:
+            sections.append("\n".join(current))
+        
+        # Also extract from tables
+        for table in doc.tables:
+            rows = []
+            for row in table.rows:
+                row_text = [cell.text for cell in row.cells]
+                rows.append(" | ".join(row_text))
+            sections.append("\n".join(rows))
+        
+        return sections
+    
+    @staticmethod
+    def _parse_table(content: bytes, file_ext: str) -> Optional[str]:
+        """Render CSV/Excel as text (blocking, runs in worker pool); None if CSV cannot be decoded"""
+        import pandas as pd
+        
+        if file_ext == '.csv':
+            # Try different encodings for CSV
+            df = None
+            for encoding in ['utf-8', 'gbk', 'gb2312']:
+                try:
+                    df = pd.read_csv(io.BytesIO(content), encoding=encoding)
+                    break
+                except UnicodeDecodeError:
+                    continue
+            if df is None:
+                return None
+        else:
+            df = pd.read_excel(io.BytesIO(content), engine='openpyxl')
+        
+        # Convert DataFrame to text representation
+        text_content = df.to_string()
+        
+        # Also include CSV format for better parsing
+        csv_content = df.to_csv(index=False)
+        
+        return f"Table Data:\n{text_content}\n\nCSV Format:\n{csv_content}"
+    
     def _parse_extraction_result(self, response_text: str) -> Dict[str, Any]:
         """Parse JSON from model response"""
-        import json
         import re
         
         # Try to extract JSON from response
@@ -4,7 +4,6 @@ OSS上传服务 - 将文件上传到阿里云OSS
 from typing import Optional
 from datetime import datetime, timedelta
 import logging
-import oss2
 from pathlib import Path
 
 from app.core.config import settings
@@ -23,8 +22,9 @@ class OSSUploader:
         self.endpoint = settings.OSS_ENDPOINT
         self.bucket_name = settings.OSS_BUCKET_NAME
         
-        # 初始化Auth和Bucket
+        # 初始化Auth和Bucket（oss2导入较慢，首次使用上传器时才加载）
         if self.access_key_id and self.access_key_secret:
+            import oss2
             self.auth = oss2.Auth(self.access_key_id, self.access_key_secret)
             self.bucket = oss2.Bucket(self.auth, self.endpoint, self.bucket_name)
         else:
@@ -107,6 +107,7 @@ class OSSUploader:
                 logger.info(f"模板上传成功: {object_key}")
                 
                 # 模板文件设置为公共读
+                import oss2
                 self.bucket.put_object_acl(object_key, oss2.OBJECT_ACL_PUBLIC_READ)
                 
                 # 生成公共访问URL
@@ -153,6 +154,7 @@ class OSSUploader:
         
         try:
             templates = []
+            import oss2
             for obj in oss2.ObjectIterator(self.bucket, prefix='templates/'):
                 templates.append({
                     "name": obj.key.split('/')[-1],
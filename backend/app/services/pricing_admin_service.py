@@ -4,7 +4,7 @@
 """
 from typing import Optional, Dict, Any, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, update, delete
+from sqlalchemy import select, update, delete
 from sqlalchemy.orm import selectinload
 from loguru import logger
 
@@ -19,6 +19,12 @@ from app.schemas.pricing_admin import (
     PaginatedPricingModelResponse,
     CategoryResponse,
 )
+from app.core.pagination import SortKey, paginate, count_total
+from app.core.facets import Facet, facet_counts
+from app.services.catalog_search_service import catalog_search_service
+from app.services.snapshot_cache import pricing_snapshot_cache
+from app.services.spec_assembly_service import spec_assembly_service
+from app.services.pricing_document_service import pricing_document_service
 
 
 class PricingAdminService:
@@ -48,9 +54,11 @@ class PricingAdminService:
         keyword: Optional[str] = None,
         status: Optional[str] = "active",
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedPricingModelResponse:
-        """列表查询模型（支持筛选/分页）"""
+        """列表查询模型（支持筛选/分页，传入cursor时按键集分页）"""
         try:
             # 构建基础查询
             query = select(PricingModel)
@@ -70,26 +78,17 @@ class PricingAdminService:
                 query = query.where(PricingModel.supports_cache == supports_cache)
             if keyword:
                 query = query.where(
-                    or_(
-                        PricingModel.model_name.ilike(f"%{keyword}%"),
-                        PricingModel.model_code.ilike(f"%{keyword}%"),
-                        PricingModel.display_name.ilike(f"%{keyword}%")
-                    )
+                    catalog_search_service.keyword_condition(catalog_search_service.PRICING_COLUMNS, keyword)
                 )
 
             # 计算总数
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db.execute(count_query)
-            total = total_result.scalar() or 0
+            total = await count_total(db, query, count)
 
-            # 分页
-            offset = (page - 1) * page_size
-            query = query.offset(offset).limit(page_size)
-            query = query.order_by(PricingModel.id.desc())
-
-            # 执行查询
-            result = await db.execute(query)
-            models = result.scalars().all()
+            # 分页（按id倒序，最新创建的在前）
+            rows, next_cursor = await paginate(
+                db, query, [SortKey(PricingModel.id, descending=True)], page_size, cursor=cursor, page=page
+            )
+            models = [row[0] for row in rows]
 
             # 批量获取价格信息
             model_ids = [m.id for m in models]
@@ -153,6 +152,7 @@ class PricingAdminService:
                 total=total,
                 page=page,
                 page_size=page_size,
+                next_cursor=next_cursor,
                 data=data
             )
         except Exception as e:
@@ -252,8 +252,13 @@ class PricingAdminService:
             )
 
             db.add(model)
+            await db.flush()
+            await pricing_document_service.refresh(db, [model.model_code])
             await db.commit()
             await db.refresh(model)
+            catalog_search_service.invalidate()
+            spec_assembly_service.invalidate()
+            await pricing_snapshot_cache.invalidate()
 
             logger.info(f"创建模型成功: {model.model_code} (ID: {model.id})")
             return model
@@ -279,12 +284,18 @@ class PricingAdminService:
                 return None
 
             # 更新非空字段
+            original_code = model.model_code
             update_data = data.model_dump(exclude_unset=True, exclude_none=True)
             for field, value in update_data.items():
                 setattr(model, field, value)
 
+            await db.flush()
+            await pricing_document_service.refresh(db, [original_code, model.model_code])
             await db.commit()
             await db.refresh(model)
+            catalog_search_service.invalidate()
+            spec_assembly_service.invalidate()
+            await pricing_snapshot_cache.invalidate()
 
             logger.info(f"更新模型成功: ID={model_id}")
             return model
@@ -310,7 +321,11 @@ class PricingAdminService:
 
             # 软删除：设置 status 为 inactive
             model.status = "inactive"
+            await db.flush()
+            await pricing_document_service.refresh(db, [model.model_code])
             await db.commit()
+            spec_assembly_service.invalidate()
+            await pricing_snapshot_cache.invalidate()
 
             logger.info(f"删除模型成功（软删除）: ID={model_id}")
             return True
@@ -332,7 +347,10 @@ class PricingAdminService:
                 .values(status="inactive")
             )
             result = await db.execute(stmt)
+            await pricing_document_service.refresh_models(db, model_ids)
             await db.commit()
+            spec_assembly_service.invalidate()
+            await pricing_snapshot_cache.invalidate()
 
             affected_count = result.rowcount
             logger.info(f"批量删除模型成功（软删除）: 影响 {affected_count} 条记录")
@@ -406,6 +424,8 @@ class PricingAdminService:
             )
 
             db.add(price)
+            await db.flush()
+            await pricing_document_service.refresh(db, [model.model_code])
             await db.commit()
             await db.refresh(price)
 
@@ -436,6 +456,8 @@ class PricingAdminService:
             for field, value in update_data.items():
                 setattr(price, field, value)
 
+            await db.flush()
+            await pricing_document_service.refresh_models(db, [price.model_id])
             await db.commit()
             await db.refresh(price)
 
@@ -461,6 +483,8 @@ class PricingAdminService:
                 return False
 
             await db.delete(price)
+            await db.flush()
+            await pricing_document_service.refresh_models(db, [price.model_id])
             await db.commit()
 
             logger.info(f"删除价格成功: ID={price_id}")
@@ -503,37 +527,26 @@ class PricingAdminService:
         self,
         db: AsyncSession
     ) -> Dict[str, Any]:
-        """获取筛选选项"""
+        """获取筛选选项（一次分面查询得到各维度取值及上架模型数）"""
         try:
-            # 获取所有模式
-            modes_query = select(PricingModel.mode).where(
-                PricingModel.mode.isnot(None),
-                PricingModel.status == "active"
-            ).distinct()
-            modes_result = await db.execute(modes_query)
-            modes = [m for m in modes_result.scalars().all() if m]
-
-            # 获取所有 Token 阶梯
-            tiers_query = select(PricingModel.token_tier).where(
-                PricingModel.token_tier.isnot(None),
-                PricingModel.status == "active"
-            ).distinct()
-            tiers_result = await db.execute(tiers_query)
-            token_tiers = [t for t in tiers_result.scalars().all() if t]
-
-            # 获取所有分辨率
-            res_query = select(PricingModel.resolution).where(
-                PricingModel.resolution.isnot(None),
-                PricingModel.status == "active"
-            ).distinct()
-            res_result = await db.execute(res_query)
-            resolutions = [r for r in res_result.scalars().all() if r]
-
-            return {
-                "modes": modes,
-                "token_tiers": token_tiers,
-                "resolutions": resolutions
+            counts = await facet_counts(
+                db,
+                select(PricingModel.id).where(PricingModel.status == "active"),
+                [
+                    Facet("modes", PricingModel.mode),
+                    Facet("token_tiers", PricingModel.token_tier),
+                    Facet("resolutions", PricingModel.resolution),
+                ]
+            )
+            result = {
+                name: sorted(value for value in values if value)
+                for name, values in counts.items()
+            }
+            result["counts"] = {
+                name: {value: count for value, count in values.items() if value}
+                for name, values in counts.items()
             }
+            return result
         except Exception as e:
             logger.error(f"获取筛选选项失败: {e}")
             raise
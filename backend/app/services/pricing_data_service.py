@@ -4,13 +4,32 @@
 from typing import List, Optional, Dict, Any
 from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_, distinct
+from sqlalchemy import select, func, or_, and_
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.elements import ColumnElement
 from loguru import logger
 
 from app.models.pricing import (
     PricingModel, PricingModelPrice, PricingCategory, PricingDimension
 )
+from app.core.pagination import SortKey, paginate, count_total
+from app.core.facets import Facet, facet_counts
+from app.services.catalog_search_service import catalog_search_service
+from app.services.snapshot_cache import pricing_snapshot_cache
+from app.services.pricing_document_service import pricing_document_service
+
+
+# 定价文档包含全部字段，按关联查询的返回结构投影，两种读取路径的响应一致
+MODEL_LIST_PRICE_FIELDS = ("dimension_code", "unit_price", "unit", "currency")
+VARIANT_FIELDS = (
+    "id", "model_name", "display_name", "mode", "token_tier", "resolution",
+    "supports_batch", "supports_cache", "remark", "rule_text",
+)
+VARIANT_PRICE_FIELDS = ("dimension_code", "unit_price", "unit", "mode", "token_tier", "resolution")
+
+
+def _project(item: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    return {field: item.get(field) for field in fields}
 
 
 class PricingDataService:
@@ -40,53 +59,105 @@ class PricingDataService:
         "image_gen": "图像生成",
     }
     
-    async def get_filter_options(self, db: AsyncSession) -> Dict[str, Any]:
-        """获取所有筛选维度的可选项"""
+    @staticmethod
+    def _filter_conditions(
+        category: Optional[str] = None,
+        mode: Optional[str] = None,
+        token_tier: Optional[str] = None,
+        resolution: Optional[str] = None,
+        supports_batch: Optional[bool] = None,
+        supports_cache: Optional[bool] = None,
+        keyword: Optional[str] = None
+    ) -> Dict[str, ColumnElement]:
+        """构建筛选条件，键为筛选维度名（列表查询与分面计数共用；category条件需关联PricingCategory）"""
+        conditions = {}
+        if category:
+            conditions["category"] = PricingCategory.code == category
+        for name, column, value in (
+            ("mode", PricingModel.mode, mode),
+            ("token_tier", PricingModel.token_tier, token_tier),
+            ("resolution", PricingModel.resolution, resolution),
+        ):
+            if value:
+                conditions[name] = column == value
+        if supports_batch is not None:
+            conditions["supports_batch"] = PricingModel.supports_batch == supports_batch
+        if supports_cache is not None:
+            conditions["supports_cache"] = PricingModel.supports_cache == supports_cache
+        if keyword:
+            conditions["keyword"] = catalog_search_service.keyword_condition(
+                catalog_search_service.PRICING_COLUMNS, keyword
+            )
+        return conditions
+    
+    async def get_filter_options(
+        self,
+        db: AsyncSession,
+        category: Optional[str] = None,
+        mode: Optional[str] = None,
+        token_tier: Optional[str] = None,
+        resolution: Optional[str] = None,
+        supports_batch: Optional[bool] = None,
+        supports_cache: Optional[bool] = None,
+        keyword: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        获取所有筛选维度的可选项及计数
+        
+        所有维度的计数由一次分面查询得到，为上架模型数，并按当前筛选条件计算
+        （某维度的计数不应用该维度自身的筛选）
+        """
         try:
-            # 获取所有分类
-            categories_query = select(PricingCategory).where(PricingCategory.is_active == True)
-            categories_result = await db.execute(categories_query)
-            categories = [
-                {"code": cat.code, "name": cat.name}
-                for cat in categories_result.scalars().all()
-            ]
-            
-            # 获取所有模式类型
-            modes_query = select(distinct(PricingModel.mode)).where(PricingModel.mode.isnot(None))
-            modes_result = await db.execute(modes_query)
-            modes = [
-                {"code": mode, "name": mode}
-                for mode in modes_result.scalars().all() if mode
-            ]
+            query = select(PricingModel.id).outerjoin(
+                PricingCategory, PricingModel.category_id == PricingCategory.id
+            )
+            counts = await facet_counts(
+                db,
+                query,
+                [
+                    Facet("category", PricingCategory.code),
+                    Facet("mode", PricingModel.mode),
+                    Facet("token_tier", PricingModel.token_tier),
+                    Facet("resolution", PricingModel.resolution),
+                    Facet("supports_batch", PricingModel.supports_batch),
+                    Facet("supports_cache", PricingModel.supports_cache),
+                ],
+                conditions=[PricingModel.status == 'active'],
+                filters=self._filter_conditions(
+                    category, mode, token_tier, resolution, supports_batch, supports_cache, keyword
+                )
+            )
             
-            # 获取所有Token阶梯
-            tiers_query = select(distinct(PricingModel.token_tier)).where(PricingModel.token_tier.isnot(None))
-            tiers_result = await db.execute(tiers_query)
-            token_tiers = [
-                {"code": tier, "name": tier}
-                for tier in tiers_result.scalars().all() if tier
+            # 分类列表复用按快照缓存的分类树（包含暂无模型的分类）
+            tree = await self.get_categories_with_models(db)
+            categories = [
+                {
+                    "code": node["category_code"],
+                    "name": node["category_name"],
+                    "count": counts["category"].get(node["category_code"], 0)
+                }
+                for node in tree
             ]
             
-            # 获取所有分辨率
-            res_query = select(distinct(PricingModel.resolution)).where(PricingModel.resolution.isnot(None))
-            res_result = await db.execute(res_query)
-            resolutions = [
-                {"code": res, "name": res}
-                for res in res_result.scalars().all() if res
-            ]
+            def options(name: str) -> List[Dict[str, Any]]:
+                return [
+                    {"code": value, "name": value, "count": count}
+                    for value, count in sorted(counts[name].items())
+                    if value
+                ]
             
             return {
                 "categories": categories,
-                "modes": modes,
-                "token_tiers": token_tiers,
-                "resolutions": resolutions,
+                "modes": options("mode"),
+                "token_tiers": options("token_tier"),
+                "resolutions": options("resolution"),
                 "batch_options": [
-                    {"code": "true", "name": "支持Batch半价"},
-                    {"code": "false", "name": "不支持Batch"}
+                    {"code": "true", "name": "支持Batch半价", "count": counts["supports_batch"].get(True, 0)},
+                    {"code": "false", "name": "不支持Batch", "count": counts["supports_batch"].get(False, 0)}
                 ],
                 "cache_options": [
-                    {"code": "true", "name": "支持上下文缓存"},
-                    {"code": "false", "name": "不支持缓存"}
+                    {"code": "true", "name": "支持上下文缓存", "count": counts["supports_cache"].get(True, 0)},
+                    {"code": "false", "name": "不支持缓存", "count": counts["supports_cache"].get(False, 0)}
                 ]
             }
         except Exception as e:
@@ -104,59 +175,53 @@ class PricingDataService:
         supports_cache: Optional[bool] = None,
         keyword: Optional[str] = None,
         page: int = 1,
-        page_size: int = 50
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> Dict[str, Any]:
-        """根据筛选条件查询模型列表"""
+        """
+        根据筛选条件查询模型列表
+        
+        传入cursor时按键集分页（忽略page），count控制总数统计方式：exact/cached/estimate/none
+        """
         try:
-            # 构建基础查询
+            # 构建基础查询并应用筛选条件
             query = select(PricingModel).where(PricingModel.status == 'active')
-            
-            # 应用筛选条件
             if category:
-                query = query.join(PricingCategory).where(PricingCategory.code == category)
-                
-            if mode:
-                query = query.where(PricingModel.mode == mode)
-                
-            if token_tier:
-                query = query.where(PricingModel.token_tier == token_tier)
-                
-            if resolution:
-                query = query.where(PricingModel.resolution == resolution)
-                
-            if supports_batch is not None:
-                query = query.where(PricingModel.supports_batch == supports_batch)
-                
-            if supports_cache is not None:
-                query = query.where(PricingModel.supports_cache == supports_cache)
-                
-            if keyword:
-                query = query.where(
-                    or_(
-                        PricingModel.model_name.ilike(f"%{keyword}%"),
-                        PricingModel.model_code.ilike(f"%{keyword}%"),
-                        PricingModel.display_name.ilike(f"%{keyword}%")
-                    )
-                )
+                query = query.join(PricingCategory)
+            for condition in self._filter_conditions(
+                category, mode, token_tier, resolution, supports_batch, supports_cache, keyword
+            ).values():
+                query = query.where(condition)
             
-            # 计算总数
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db.execute(count_query)
-            total = total_result.scalar() or 0
+            keyword_columns = catalog_search_service.PRICING_COLUMNS
             
-            # 分页
-            offset = (page - 1) * page_size
-            query = query.offset(offset).limit(page_size)
-            query = query.order_by(PricingModel.model_name)
+            # 计算总数
+            total = await count_total(db, query, count)
             
-            # 执行查询
-            result = await db.execute(query)
-            models = result.scalars().all()
+            # 分页：关键词搜索按相关度优先，id保证排序键唯一
+            sort_keys = []
+            if keyword:
+                sort_keys = await catalog_search_service.relevance_keys(db, keyword_columns, keyword)
+            sort_keys += [SortKey(PricingModel.model_name), SortKey(PricingModel.id)]
+            rows, next_cursor = await paginate(db, query, sort_keys, page_size, cursor=cursor, page=page)
+            models = [row[0] for row in rows]
             
-            # 批量获取价格信息
+            # 批量获取价格信息：优先读取定价文档中各变体的价格
             model_ids = [m.id for m in models]
             prices_map = {}
+            documents = None
             if model_ids:
+                documents = await pricing_document_service.get_documents(
+                    db, [m.model_code for m in models if m.model_code]
+                )
+            if documents is not None:
+                prices_map = {
+                    variant["id"]: [_project(price, MODEL_LIST_PRICE_FIELDS) for price in variant["prices"]]
+                    for document in documents.values()
+                    for variant in document["variants"]
+                }
+            elif model_ids:
                 prices_query = select(PricingModelPrice).where(
                     PricingModelPrice.model_id.in_(model_ids)
                 )
@@ -194,6 +259,7 @@ class PricingDataService:
                 "total": total,
                 "page": page,
                 "page_size": page_size,
+                "next_cursor": next_cursor,
                 "data": data
             }
         except Exception as e:
@@ -207,6 +273,23 @@ class PricingDataService:
     ) -> Dict[str, Any]:
         """获取指定模型的完整定价信息"""
         try:
+            # 定价文档已按model_code预先嵌套好变体与价格，一次主键查询即可返回
+            document = await pricing_document_service.get_document(db, model_code)
+            if document is not None:
+                variants = [
+                    {
+                        **_project(variant, VARIANT_FIELDS),
+                        "prices": [_project(price, VARIANT_PRICE_FIELDS) for price in variant["prices"]]
+                    }
+                    for variant in document["variants"]
+                ]
+                return {
+                    "found": True,
+                    "model_code": model_code,
+                    "variants_count": len(variants),
+                    "variants": variants
+                }
+            
             # 查询所有匹配的模型记录（可能有多个变体）
             # 精确匹配 model_code 或 model_name
             models_query = select(PricingModel).where(
@@ -331,18 +414,9 @@ class PricingDataService:
         keyword: str,
         limit: int = 20
     ) -> List[Dict[str, Any]]:
-        """模型搜索（用于自动完成）"""
+        """模型搜索（用于自动完成），按相关度排序"""
         try:
-            query = select(PricingModel).where(
-                or_(
-                    PricingModel.model_code.ilike(f"%{keyword}%"),
-                    PricingModel.model_name.ilike(f"%{keyword}%"),
-                    PricingModel.display_name.ilike(f"%{keyword}%")
-                )
-            ).distinct(PricingModel.model_code).limit(limit)
-            
-            result = await db.execute(query)
-            models = result.scalars().all()
+            matches = await catalog_search_service.search_pricing_models(db, keyword, limit)
             
             return [
                 {
@@ -350,9 +424,11 @@ class PricingDataService:
                     "model_name": m.model_name,
                     "display_name": m.display_name,
                     "supports_batch": m.supports_batch,
-                    "supports_cache": m.supports_cache
+                    "supports_cache": m.supports_cache,
+                    "match_type": match_type,
+                    "score": score
                 }
-                for m in models
+                for m, match_type, score in matches
             ]
         except Exception as e:
             logger.error(f"搜索模型失败: {e}")
@@ -362,44 +438,77 @@ class PricingDataService:
         self,
         db: AsyncSession
     ) -> List[Dict[str, Any]]:
-        """获取分类及其模型列表（树形结构）"""
+        """
+        获取分类及其模型列表（树形结构）
+        
+        一次关联查询取出全部分类与模型，单遍聚合；结果按定价快照版本缓存
+        """
         try:
-            # 获取所有分类
-            categories_query = select(PricingCategory).where(
-                PricingCategory.is_active == True
-            ).order_by(PricingCategory.sort_order)
-            categories_result = await db.execute(categories_query)
-            categories = categories_result.scalars().all()
-            
-            result = []
-            for cat in categories:
-                # 获取该分类下的模型
-                models_query = select(PricingModel).where(
-                    PricingModel.category_id == cat.id,
-                    PricingModel.status == 'active'
-                ).distinct(PricingModel.model_code)
-                models_result = await db.execute(models_query)
-                models = models_result.scalars().all()
-                
-                result.append({
-                    "category_code": cat.code,
-                    "category_name": cat.name,
-                    "model_count": len(models),
-                    "models": [
-                        {
-                            "model_code": m.model_code,
-                            "model_name": m.model_name,
-                            "display_name": m.display_name
-                        }
-                        for m in models
-                    ]
-                })
-            
-            return result
+            return await pricing_snapshot_cache.get_or_build(
+                db, "category_tree", lambda: self._build_category_tree(db)
+            )
         except Exception as e:
             logger.error(f"获取分类模型树失败: {e}")
             raise
-
+    
+    async def _build_category_tree(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        """查询并聚合分类模型树"""
+        query = select(
+            PricingCategory.id.label("category_id"),
+            PricingCategory.code.label("category_code"),
+            PricingCategory.name.label("category_name"),
+            PricingModel.model_code,
+            PricingModel.model_name,
+            PricingModel.display_name,
+        ).outerjoin(
+            PricingModel,
+            and_(
+                PricingModel.category_id == PricingCategory.id,
+                PricingModel.status == 'active'
+            )
+        ).where(
+            PricingCategory.is_active == True
+        ).order_by(
+            PricingCategory.sort_order,
+            PricingCategory.id,
+            PricingModel.model_code,
+            PricingModel.id
+        )
+        result = await db.execute(query)
+        
+        # 行已按分类、模型代码排序：分类切换时新建节点，同一model_code只保留第一条
+        tree = []
+        node = None
+        last_model_code = None
+        for row in result.all():
+            if node is None or node["category_id"] != row.category_id:
+                node = {
+                    "category_id": row.category_id,
+                    "category_code": row.category_code,
+                    "category_name": row.category_name,
+                    "models": []
+                }
+                tree.append(node)
+                last_model_code = None
+            
+            if row.model_code is None or row.model_code == last_model_code:
+                continue
+            last_model_code = row.model_code
+            node["models"].append({
+                "model_code": row.model_code,
+                "model_name": row.model_name,
+                "display_name": row.display_name
+            })
+        
+        return [
+            {
+                "category_code": node["category_code"],
+                "category_name": node["category_name"],
+                "model_count": len(node["models"]),
+                "models": node["models"]
+            }
+            for node in tree
+        ]
 
 # 创建全局服务实例
 pricing_data_service = PricingDataService()
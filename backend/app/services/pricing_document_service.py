@@ -0,0 +1,170 @@
+"""
+定价文档服务
+
+pricing_model_document 为每个model_code保存一份预先嵌套好的JSONB定价文档
+（分类、变体及各变体价格），读取单个模型只需一次主键查询，无需再关联
+pricing_model / pricing_model_price / pricing_category 并在Python中重新分组。
+
+文档由数据库函数 refresh_pricing_model_documents 构建：
+- 定价同步SQL发布新快照后整体重建
+- 管理端修改模型/价格时在同一事务内按model_code重建
+- 进程检测到文档落后于最新快照时，在后台用独立的主库会话整体重建
+
+数据库不是PostgreSQL、尚未执行迁移或文档落后于最新快照时，服务返回None，
+调用方回退到关联查询。读取路径不写库，也不回滚调用方的会话，可在只读副本上使用。
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, text
+from loguru import logger
+
+from app.core.database import async_session_maker
+from app.models.pricing import PricingModelDocument
+from app.services.snapshot_cache import pricing_snapshot_cache
+
+
+class PricingDocumentService:
+    """定价文档服务"""
+    
+    def __init__(self):
+        self._enabled: Optional[bool] = None
+        # 文档已确认与之一致的快照ID
+        self._fresh_snapshot_id: Optional[int] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+    
+    async def is_enabled(self, db: AsyncSession) -> bool:
+        """检查数据库是否支持定价文档（结果缓存）"""
+        if self._enabled is not None:
+            return self._enabled
+        
+        if db.bind is None or db.bind.dialect.name != "postgresql":
+            self._enabled = False
+            return False
+        
+        try:
+            result = await db.execute(
+                text("SELECT to_regprocedure('refresh_pricing_model_documents(text[])') IS NOT NULL")
+            )
+            self._enabled = bool(result.scalar())
+        except Exception as e:
+            logger.warning(f"[PricingDocument] 检查定价文档失败: {e}")
+            self._enabled = False
+        
+        if not self._enabled:
+            logger.info("[PricingDocument] 未找到定价文档函数，使用关联查询")
+        return self._enabled
+    
+    async def refresh(self, db: AsyncSession, model_codes: Optional[Iterable[str]] = None) -> int:
+        """
+        重建定价文档（在调用方事务内执行，由调用方提交）
+        
+        Args:
+            model_codes: 需要重建的模型代码，None表示全部重建
+        
+        Returns:
+            写入的文档数量
+        """
+        if not await self.is_enabled(db):
+            return 0
+        
+        codes = None if model_codes is None else [c for c in dict.fromkeys(model_codes) if c]
+        if codes == []:
+            return 0
+        
+        result = await db.execute(
+            text("SELECT refresh_pricing_model_documents(CAST(:codes AS text[]))"),
+            {"codes": codes}
+        )
+        count = result.scalar() or 0
+        if codes is None:
+            logger.info(f"[PricingDocument] 定价文档已整体重建: {count} 个模型")
+        return count
+    
+    async def refresh_models(self, db: AsyncSession, model_ids: Iterable[int]) -> int:
+        """按模型ID重建所属model_code的文档"""
+        model_ids = list(model_ids)
+        if not model_ids or not await self.is_enabled(db):
+            return 0
+        
+        result = await db.execute(
+            text("""
+                SELECT refresh_pricing_model_documents(
+                    ARRAY(SELECT DISTINCT model_code FROM pricing_model WHERE id = ANY(CAST(:ids AS integer[])))
+                )
+            """),
+            {"ids": model_ids}
+        )
+        return result.scalar() or 0
+    
+    async def is_fresh(self, db: AsyncSession) -> bool:
+        """
+        检查文档是否与最新快照一致（只读，快照版本检查有间隔，确认后不访问数据库）
+        
+        文档落后时在后台重建，本次返回False
+        """
+        snapshot_id, _ = await pricing_snapshot_cache.current_version(db)
+        if snapshot_id == self._fresh_snapshot_id:
+            return True
+        
+        result = await db.execute(select(func.max(PricingModelDocument.snapshot_id)))
+        if result.scalar() == snapshot_id:
+            self._fresh_snapshot_id = snapshot_id
+            return True
+        
+        self._schedule_rebuild(snapshot_id)
+        return False
+    
+    def _schedule_rebuild(self, snapshot_id: Optional[int]):
+        """启动后台重建（同一进程同时只有一个重建任务）"""
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return
+        logger.info(f"[PricingDocument] 定价文档落后于最新快照 {snapshot_id}，后台重建")
+        self._rebuild_task = asyncio.create_task(self._rebuild(snapshot_id))
+    
+    async def _rebuild(self, snapshot_id: Optional[int]):
+        """在独立的主库会话中整体重建文档，失败时下次检查再重试"""
+        try:
+            async with async_session_maker() as session:
+                await self.refresh(session)
+                await session.commit()
+            self._fresh_snapshot_id = snapshot_id
+        except Exception as e:
+            logger.warning(f"[PricingDocument] 重建定价文档失败: {e}")
+    
+    async def get_documents(
+        self,
+        db: AsyncSession,
+        model_codes: List[str]
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        批量读取定价文档
+        
+        Returns:
+            model_code到文档的映射；不支持定价文档或文档落后于最新快照时返回None
+        """
+        if not await self.is_enabled(db) or not await self.is_fresh(db):
+            return None
+        
+        codes = list(dict.fromkeys(model_codes))
+        if not codes:
+            return {}
+        
+        result = await db.execute(
+            select(PricingModelDocument.model_code, PricingModelDocument.document).where(
+                PricingModelDocument.model_code.in_(codes)
+            )
+        )
+        return {row.model_code: row.document for row in result.all()}
+    
+    async def get_document(self, db: AsyncSession, model_code: str) -> Optional[Dict[str, Any]]:
+        """读取单个模型的定价文档，不存在或不支持时返回None"""
+        documents = await self.get_documents(db, [model_code])
+        if documents is None:
+            return None
+        return documents.get(model_code)
+
+
+# 创建全局服务实例
+pricing_document_service = PricingDocumentService()
@@ -36,7 +36,7 @@ class TokenPricingRule(PricingRule):
             output_cost = Decimal(str(output_token_price)) * Decimal(str(output_tokens))
             total_price = (input_cost + output_cost) / Decimal("1000")
             
-            logger.info(f"Token分别计费: 输入({input_token_price}×{input_tokens}) + 输出({output_token_price}×{output_tokens}) / 1000 = {total_price}")
+            logger.debug("Token分别计费: 输入({}×{}) + 输出({}×{}) / 1000 = {}", input_token_price, input_tokens, output_token_price, output_tokens, total_price)
             return total_price
         else:
             # 统一计费模式: token_price × estimated_tokens × call_frequency
@@ -45,7 +45,7 @@ class TokenPricingRule(PricingRule):
             call_frequency = context.get("call_frequency", 1)
             
             total_price = Decimal(str(token_price)) * Decimal(str(estimated_tokens)) * Decimal(str(call_frequency))
-            logger.info(f"Token统一计费: {token_price} × {estimated_tokens} × {call_frequency} = {total_price}")
+            logger.debug("Token统一计费: {} × {} × {} = {}", token_price, estimated_tokens, call_frequency, total_price)
             return total_price
 
 
@@ -61,7 +61,7 @@ class ThinkingModeRule(PricingRule):
         
         if thinking_mode_ratio > 0:
             additional_cost = base_price * Decimal(str(multiplier - 1)) * Decimal(str(thinking_mode_ratio))
-            logger.info(f"思考模式额外成本: {base_price} × {multiplier - 1} × {thinking_mode_ratio} = {additional_cost}")
+            logger.debug("思考模式额外成本: {} × {} × {} = {}", base_price, multiplier - 1, thinking_mode_ratio, additional_cost)
             return base_price + additional_cost
         
         return base_price
@@ -81,7 +81,7 @@ class BatchDiscountRule(PricingRule):
             batch_price = base_price * Decimal(str(batch_ratio)) * batch_discount
             normal_price = base_price * Decimal(str(1 - batch_ratio))
             total_price = batch_price + normal_price
-            logger.info(f"Batch折扣: Batch部分={batch_price}, 正常部分={normal_price}, 总计={total_price}")
+            logger.debug("Batch折扣: Batch部分={}, 正常部分={}, 总计={}", batch_price, normal_price, total_price)
             return total_price
         
         return base_price
@@ -107,7 +107,7 @@ class TieredDiscountRule(PricingRule):
             if quantity >= tier["threshold"]:
                 discount = Decimal(str(tier["discount"]))
                 discounted_price = base_price * discount
-                logger.info(f"阶梯折扣: 数量{quantity} >= {tier['threshold']}, 折扣={discount}, 价格={discounted_price}")
+                logger.debug("阶梯折扣: 数量{} >= {}, 折扣={}, 价格={}", quantity, tier['threshold'], discount, discounted_price)
                 return discounted_price
         
         return base_price
@@ -121,7 +121,7 @@ class PackagePricingRule(PricingRule):
     
     def apply(self, base_price: Decimal, context: Dict[str, Any]) -> Decimal:
         """使用固定套餐价格"""
-        logger.info(f"套餐计费: 使用固定价格 {self.package_price}")
+        logger.debug("套餐计费: 使用固定价格 {}", self.package_price)
         return self.package_price
 
 
@@ -137,7 +137,7 @@ class CombinationDiscountRule(PricingRule):
         
         if has_combination:
             discounted_price = base_price * self.discount_rate
-            logger.info(f"组合优惠: {base_price} × {self.discount_rate} = {discounted_price}")
+            logger.debug("组合优惠: {} × {} = {}", base_price, self.discount_rate, discounted_price)
             return discounted_price
         
         return base_price
@@ -178,7 +178,7 @@ class PricingEngine:
                 "calculation_breakdown": str
             }
         """
-        logger.info(f"开始计算价格: 基础单价={base_price}, 上下文={context}")
+        logger.debug("开始计算价格: 基础单价={}, 上下文={}", base_price, context)
         
         product_type = context.get("product_type", "standard")
         current_price = base_price
@@ -210,7 +210,7 @@ class PricingEngine:
             "calculation_breakdown": self._generate_breakdown(base_price, current_price, discount_details)
         }
         
-        logger.info(f"计算完成: {result}")
+        logger.debug("计算完成: {}", result)
         return result
     
     def _calculate_llm_price(
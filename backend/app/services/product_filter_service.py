@@ -2,12 +2,13 @@
 商品筛选服务
 """
 from typing import List, Optional, Dict, Any
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 from loguru import logger
 
-from app.models.product import Product, ProductPrice, ProductSpec
+from app.models.product import Product, ProductPrice, ProductSpec, CATEGORY_TO_MODALITY, classify_category
 from app.schemas.quote import (
     FilterOption, FilterOptionsResponse, 
     ModelListItem, PaginatedModelListResponse,
@@ -15,20 +16,16 @@ from app.schemas.quote import (
     ProductSearchResultItem, ProductSearchResponse,
     ModelPricing
 )
+from app.core.pagination import SortKey, paginate, count_total
+from app.core.facets import Facet, facet_counts
+from app.services.catalog_search_service import catalog_search_service
 
 
 class ProductFilterService:
     """商品筛选服务"""
     
     # 类别到模态的映射
-    CATEGORY_TO_MODALITY = {
-        "AI-大模型-文本生成": "text",
-        "AI-大模型-视觉理解": "image",
-        "AI-大模型-语音": "audio",
-        "AI-大模型-多模态": "multimodal",
-        "AI-大模型-向量": "text_embedding",
-        "AI-大模型-重排序": "rerank",
-    }
+    CATEGORY_TO_MODALITY = CATEGORY_TO_MODALITY
     
     # 模态显示名称映射
     MODALITY_NAMES = {
@@ -67,73 +64,103 @@ class ProductFilterService:
     @staticmethod
     def map_category_to_modality(category: str) -> str:
         """将数据库category映射为前端modality"""
-        return ProductFilterService.CATEGORY_TO_MODALITY.get(category, "unknown")
+        return classify_category(category)["modality"]
     
     @staticmethod
     def map_category_to_capability(category: str) -> Optional[str]:
         """根据类别推断能力类型"""
-        if "生成" in category:
-            return "generation"
-        elif "理解" in category:
-            return "understanding"
-        elif "大模型" in category:
-            return "both"
-        return None
+        return classify_category(category)["capability"]
     
     @staticmethod
     def map_category_to_model_type(category: str) -> Optional[str]:
         """根据类别推断模型类型"""
-        if "向量" in category or "embedding" in category.lower():
-            if "多模态" in category:
-                return "multimodal_embedding"
-            return "text_embedding"
-        elif "重排序" in category or "rerank" in category.lower():
-            return "rerank"
-        elif "大模型" in category or "llm" in category.lower():
-            return "llm"
-        return None
+        return classify_category(category)["model_type"]
     
-    async def get_filter_options(self, db: AsyncSession) -> FilterOptionsResponse:
-        """获取所有筛选维度的可选项"""
+    @staticmethod
+    def _filter_conditions(
+        modality: Optional[str] = None,
+        capability: Optional[str] = None,
+        model_type: Optional[str] = None,
+        vendor: Optional[str] = None,
+        keyword: Optional[str] = None
+    ) -> Dict[str, ColumnElement]:
+        """构建筛选条件，键为筛选维度名（列表查询与分面计数共用）"""
+        conditions = {}
+        if vendor:
+            conditions["vendor"] = Product.vendor == vendor
+        if keyword:
+            conditions["keyword"] = catalog_search_service.keyword_condition(
+                (Product.product_name, Product.product_code), keyword
+            )
+        
+        # 分类筛选：modality/capability/model_type均为写入时维护的索引列，支持逗号分隔多选
+        for name, column, value in (
+            ("modality", Product.modality, modality),
+            ("capability", Product.capability, capability),
+            ("model_type", Product.model_type, model_type),
+        ):
+            if value:
+                conditions[name] = column.in_([v.strip() for v in value.split(",")])
+        return conditions
+    
+    async def get_filter_options(
+        self,
+        db: AsyncSession,
+        modality: Optional[str] = None,
+        capability: Optional[str] = None,
+        model_type: Optional[str] = None,
+        vendor: Optional[str] = None,
+        keyword: Optional[str] = None
+    ) -> FilterOptionsResponse:
+        """
+        获取所有筛选维度的可选项及计数
+        
+        计数为上架模型数，并按当前筛选条件计算（某维度的计数不应用该维度自身的筛选）；
+        地域计数为在该地域有价格的模型数
+        """
         try:
-            # 获取所有地域
-            regions_query = select(ProductPrice.region).distinct()
-            regions_result = await db.execute(regions_query)
+            query = select(Product.product_code).outerjoin(
+                ProductPrice, ProductPrice.product_code == Product.product_code
+            )
+            counts = await facet_counts(
+                db,
+                query,
+                [
+                    Facet("region", ProductPrice.region),
+                    Facet("modality", Product.modality),
+                    Facet("capability", Product.capability),
+                    Facet("model_type", Product.model_type),
+                ],
+                conditions=[Product.status == "active"],
+                filters=self._filter_conditions(modality, capability, model_type, vendor, keyword),
+                count_key=Product.product_code
+            )
+            
+            # 地域、模态取实际出现的值；能力类型与模型类型为固定列表
             regions = [
                 FilterOption(
                     code=region,
-                    name=self.REGION_NAMES.get(region, region)
+                    name=self.REGION_NAMES.get(region, region),
+                    count=count
                 )
-                for region in regions_result.scalars().all()
+                for region, count in sorted(counts["region"].items())
+                if region is not None
             ]
             
-            # 获取所有模态（从category映射）
-            categories_query = select(Product.category).distinct()
-            categories_result = await db.execute(categories_query)
-            modalities_set = set()
-            for category in categories_result.scalars().all():
-                modality = self.map_category_to_modality(category)
-                if modality != "unknown":
-                    modalities_set.add(modality)
-            
             modalities = [
-                FilterOption(code=m, name=self.MODALITY_NAMES.get(m, m))
-                for m in sorted(modalities_set)
+                FilterOption(code=m, name=self.MODALITY_NAMES.get(m, m), count=count)
+                for m, count in sorted(counts["modality"].items())
+                if m is not None and m != "unknown"
             ]
             
-            # 能力类型（固定列表）
             capabilities = [
-                FilterOption(code="understanding", name="理解"),
-                FilterOption(code="generation", name="生成"),
-                FilterOption(code="both", name="理解并生成"),
+                FilterOption(code=code, name=name, count=counts["capability"].get(code, 0))
+                for code, name in self.CAPABILITY_NAMES.items()
             ]
             
-            # 模型类型（固定列表）
             model_types = [
-                FilterOption(code="llm", name="大语言模型"),
-                FilterOption(code="text_embedding", name="文本向量"),
-                FilterOption(code="multimodal_embedding", name="多模态向量"),
-                FilterOption(code="rerank", name="重排序"),
+                FilterOption(code=code, name=name, count=counts["model_type"].get(code, 0))
+                for code, name in self.MODEL_TYPE_NAMES.items()
             ]
             
             return FilterOptionsResponse(
@@ -156,101 +183,46 @@ class ProductFilterService:
         vendor: Optional[str] = None,
         keyword: Optional[str] = None,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedModelListResponse:
-        """根据筛选条件查询模型列表"""
+        """
+        根据筛选条件查询模型列表
+        
+        传入cursor时按键集分页（忽略page），count控制总数统计方式：exact/cached/estimate/none
+        """
         try:
-            # 构建基础查询
+            # 构建基础查询并应用筛选条件
             query = select(Product).where(Product.status == "active")
-                
-            # 应用筛选条件
-            if vendor:
-                query = query.where(Product.vendor == vendor)
-                
-            if keyword:
-                query = query.where(
-                    or_(
-                        Product.product_name.ilike(f"%{keyword}%"),
-                        Product.product_code.ilike(f"%{keyword}%")
-                    )
-                )
-                
-            # 根据modality筛选（需要映射category）
-            if modality:
-                modalities = [m.strip() for m in modality.split(",")]
-                category_filters = []
-                for mod in modalities:
-                    for cat, mod_value in self.CATEGORY_TO_MODALITY.items():
-                        if mod_value == mod:
-                            category_filters.append(Product.category == cat)
-                if category_filters:
-                    query = query.where(or_(*category_filters))
-                
-            # 根据capability筛选
-            if capability:
-                capability_filters = []
-                for cap in capability.split(","):
-                    cap = cap.strip()
-                    if cap == "generation":
-                        capability_filters.append(Product.category.ilike("%生成%"))
-                    elif cap == "understanding":
-                        capability_filters.append(Product.category.ilike("%理解%"))
-                    elif cap == "both":
-                        capability_filters.append(Product.category.ilike("%大模型%"))
-                if capability_filters:
-                    query = query.where(or_(*capability_filters))
-                
-            # 根据model_type筛选
-            if model_type:
-                type_filters = []
-                for mt in model_type.split(","):
-                    mt = mt.strip()
-                    if mt == "text_embedding":
-                        type_filters.append(and_(
-                            Product.category.ilike("%向量%"),
-                            ~Product.category.ilike("%多模态%")
-                        ))
-                    elif mt == "multimodal_embedding":
-                        type_filters.append(and_(
-                            Product.category.ilike("%向量%"),
-                            Product.category.ilike("%多模态%")
-                        ))
-                    elif mt == "rerank":
-                        type_filters.append(Product.category.ilike("%重排序%"))
-                    elif mt == "llm":
-                        type_filters.append(and_(
-                            Product.category.ilike("%大模型%"),
-                            ~Product.category.ilike("%向量%"),
-                            ~Product.category.ilike("%重排序%")
-                        ))
-                if type_filters:
-                    query = query.where(or_(*type_filters))
-                
+            for condition in self._filter_conditions(modality, capability, model_type, vendor, keyword).values():
+                query = query.where(condition)
+            
+            keyword_columns = (Product.product_name, Product.product_code)
+            
             # 计算总数
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db.execute(count_query)
-            total = total_result.scalar() or 0
-                
-            # 分页
-            offset = (page - 1) * page_size
-            query = query.offset(offset).limit(page_size)
-            query = query.order_by(Product.vendor, Product.product_name)
-                
-            # 执行查询
-            result = await db.execute(query)
-            products = result.scalars().all()
-                
+            total = await count_total(db, query, count)
+            
+            # 分页：关键词搜索按相关度优先，product_code保证排序键唯一
+            sort_keys = []
+            if keyword:
+                sort_keys = await catalog_search_service.relevance_keys(db, keyword_columns, keyword)
+            sort_keys += [SortKey(Product.vendor), SortKey(Product.product_name), SortKey(Product.product_code)]
+            rows, next_cursor = await paginate(db, query, sort_keys, page_size, cursor=cursor, page=page)
+            products = [row[0] for row in rows]
+            
             if not products:
                 return PaginatedModelListResponse(
                     total=total,
                     page=page,
                     page_size=page_size,
-                    data=[]
+                    data=[],
+                    next_cursor=next_cursor
                 )
-                
+            
             # 批量获取价格和规格信息（解决N+1查询问题）
             product_codes = [p.product_code for p in products]
-                
+            
             # 批量查询价格
             target_region = region or "cn-beijing"
             prices_query = select(ProductPrice).where(
@@ -261,7 +233,7 @@ class ProductFilterService:
             )
             prices_result = await db.execute(prices_query)
             prices_map = {p.product_code: p for p in prices_result.scalars().all()}
-                
+            
             # 批量查询规格
             specs_query = select(ProductSpec).where(
                 ProductSpec.product_code.in_(product_codes)
@@ -272,7 +244,7 @@ class ProductFilterService:
                 if spec.product_code not in specs_by_product:
                     specs_by_product[spec.product_code] = []
                 specs_by_product[spec.product_code].append(spec)
-                
+            
             # 构建响应数据
             data = []
             for product in products:
@@ -286,7 +258,7 @@ class ProductFilterService:
                         output_price=price.pricing_variables.get("output_price"),
                         unit=price.unit or "千Token"
                     )
-                    
+                
                 # 获取规格信息
                 specs = specs_by_product.get(product.product_code, [])
                 context_specs = []
@@ -297,26 +269,27 @@ class ProductFilterService:
                             context_specs.append(str(spec.spec_values.get("value", "")))
                         if spec.spec_values.get("supports_thinking"):
                             supports_thinking = True
-                    
+                
                 item = ModelListItem(
                     model_id=product.product_code,
                     model_name=product.product_name,
                     vendor=product.vendor,
                     category=product.category,
-                    modality=self.map_category_to_modality(product.category),
-                    capability=self.map_category_to_capability(product.category),
+                    modality=product.modality or "unknown",
+                    capability=product.capability,
                     context_specs=context_specs,
                     supports_thinking=supports_thinking,
                     pricing=pricing_data,
                     status=product.status
                 )
                 data.append(item)
-                
+            
             return PaginatedModelListResponse(
                 total=total,
                 page=page,
                 page_size=page_size,
-                data=data
+                data=data,
+                next_cursor=next_cursor
             )
         except Exception as e:
             logger.error(f"筛选模型失败: {e}")
@@ -328,50 +301,34 @@ class ProductFilterService:
         names: List[str],
         region: str = "cn-beijing"
     ) -> ProductSearchResponse:
-        """批量名称搜索"""
+        """
+        批量名称搜索
+        
+        所有名称的精确匹配与模糊匹配分别只执行一次查询，与名称数量无关
+        """
         found = []
         not_found = []
         
+        try:
+            resolved = await catalog_search_service.resolve_product_names(db, names)
+        except Exception as e:
+            logger.error(f"批量搜索 {len(names)} 个名称失败: {e}")
+            return ProductSearchResponse(found=[], not_found=list(names))
+        
         for name in names:
-            try:
-                # 精确匹配
-                exact_query = select(Product).where(
-                    or_(
-                        func.lower(Product.product_code) == name.lower(),
-                        func.lower(Product.product_name) == name.lower()
-                    )
-                )
-                exact_result = await db.execute(exact_query)
-                product = exact_result.scalars().first()
-                
-                if product:
-                    found.append(ProductSearchResultItem(
-                        model_id=product.product_code,
-                        model_name=product.product_name,
-                        match_type="exact",
-                        search_term=name
-                    ))
-                    continue
-                
-                # 模糊匹配
-                fuzzy_query = select(Product).where(
-                    Product.product_name.ilike(f"%{name}%")
-                ).limit(1)
-                fuzzy_result = await db.execute(fuzzy_query)
-                product = fuzzy_result.scalars().first()
-                
-                if product:
-                    found.append(ProductSearchResultItem(
-                        model_id=product.product_code,
-                        model_name=product.product_name,
-                        match_type="fuzzy",
-                        search_term=name
-                    ))
-                else:
-                    not_found.append(name)
-            except Exception as e:
-                logger.error(f"搜索 {name} 失败: {e}")
+            match = resolved.get(name.strip().lower())
+            if match is None:
                 not_found.append(name)
+                continue
+            
+            product_code, product_name, match_type, score = match
+            found.append(ProductSearchResultItem(
+                model_id=product_code,
+                model_name=product_name,
+                match_type=match_type,
+                search_term=name,
+                score=score
+            ))
         
         return ProductSearchResponse(found=found, not_found=not_found)
     
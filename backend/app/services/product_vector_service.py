@@ -0,0 +1,295 @@
+"""
+产品语义检索服务
+
+为products.description_vector批量生成向量，并提供"按使用场景找模型"的向量检索：
+- 数据库列为vector(1536)时，检索走数据库HNSW索引
+- 数据库列为Text（未启用pgvector扩展）时，向量以JSON文本存储，检索使用进程内NumPy索引
+
+检索模式按数据库中description_vector列的实际类型判断，而不是仅看Python包是否安装
+"""
+import json
+import time
+from typing import List, Optional, Dict, Any
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, text
+from loguru import logger
+
+from app.agents.bailian_client import bailian_client
+from app.models.product import Product, HAS_PGVECTOR
+
+
+# 向量配置
+EMBEDDING_DIMENSION = 1536
+REFRESH_CHUNK_SIZE = 100  # 每批读取并回写的产品数
+LOCAL_INDEX_TTL = 300  # 进程内索引缓存时间（秒），便于感知其他进程的刷新
+
+
+class LocalVectorIndex:
+    """进程内向量索引（Text存储模式下的NumPy检索）"""
+    
+    def __init__(self, rows: List[Dict[str, Any]], matrix: np.ndarray):
+        self.rows = rows
+        self.matrix = matrix
+    
+    @classmethod
+    def build(cls, records: List[Dict[str, Any]]) -> "LocalVectorIndex":
+        """
+        从产品记录构建索引
+        
+        Args:
+            records: 包含model_id/model_name/category/vendor/vector的字典列表
+        """
+        rows = []
+        vectors = []
+        for record in records:
+            vector = record.get("vector")
+            if vector is None or len(vector) != EMBEDDING_DIMENSION:
+                continue
+            rows.append({k: v for k, v in record.items() if k != "vector"})
+            vectors.append(vector)
+        
+        if not vectors:
+            return cls([], np.zeros((0, EMBEDDING_DIMENSION), dtype=np.float32))
+        
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return cls(rows, matrix / norms)
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def search(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """余弦相似度Top-K检索"""
+        if not self.rows:
+            return []
+        
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        
+        scores = self.matrix @ (query / norm)
+        
+        if category:
+            mask = np.array([row["category"] == category for row in self.rows])
+            scores = np.where(mask, scores, -np.inf)
+        
+        k = min(top_k, len(self.rows))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        
+        return [
+            {**self.rows[i], "score": round(float(scores[i]), 4)}
+            for i in ordered
+            if np.isfinite(scores[i])
+        ]
+
+
+class ProductVectorService:
+    """产品语义检索服务"""
+    
+    def __init__(self):
+        self._index: Optional[LocalVectorIndex] = None
+        self._index_loaded_at = 0.0
+        self._vector_column: Optional[bool] = None
+    
+    @staticmethod
+    def build_embedding_text(product: Product) -> str:
+        """拼接用于向量化的产品文本"""
+        parts = [product.product_name, product.product_code, product.category, product.description]
+        return "\n".join(part for part in parts if part)
+    
+    @staticmethod
+    def _to_column_value(vector: List[float]) -> Any:
+        """转换为description_vector列的存储格式（取决于ORM列类型）"""
+        if HAS_PGVECTOR:
+            return vector
+        return json.dumps(vector)
+    
+    @staticmethod
+    def _from_column_value(value: Any) -> Optional[List[float]]:
+        """解析description_vector列的值"""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return None
+        return list(value)
+    
+    def invalidate(self):
+        """清除进程内索引，下次检索时重建"""
+        self._index = None
+        self._index_loaded_at = 0.0
+    
+    async def is_vector_column(self, db: AsyncSession) -> bool:
+        """检查数据库中description_vector列是否为pgvector类型（进程内缓存）"""
+        if self._vector_column is not None:
+            return self._vector_column
+        
+        try:
+            if not HAS_PGVECTOR or db.bind is None or db.bind.dialect.name != "postgresql":
+                self._vector_column = False
+            else:
+                result = await db.execute(
+                    text(
+                        "SELECT udt_name FROM information_schema.columns "
+                        "WHERE table_name = :table AND column_name = 'description_vector' "
+                        "AND table_schema = ANY(current_schemas(false))"
+                    ),
+                    {"table": Product.__tablename__}
+                )
+                self._vector_column = result.scalar() == "vector"
+        except Exception as e:
+            logger.warning(f"[VectorService] 检测向量列类型失败，使用进程内索引: {e}")
+            return False
+        
+        logger.info(f"[VectorService] 向量检索模式: {'pgvector' if self._vector_column else '进程内索引'}")
+        return self._vector_column
+    
+    async def refresh_embeddings(
+        self,
+        db: AsyncSession,
+        only_missing: bool = True,
+        chunk_size: int = REFRESH_CHUNK_SIZE
+    ) -> Dict[str, int]:
+        """
+        批量生成产品描述向量
+        
+        按product_code分块读取产品，每块一次批量向量化、一次批量回写
+        
+        Args:
+            db: 数据库会话
+            only_missing: 仅处理尚未生成向量的产品
+            chunk_size: 每块产品数
+        
+        Returns:
+            {"updated": 更新数量, "chunks": 分块数量}
+        """
+        last_code = ""
+        updated = 0
+        chunks = 0
+        
+        while True:
+            query = select(Product).where(Product.product_code > last_code)
+            if only_missing:
+                query = query.where(Product.description_vector.is_(None))
+            query = query.order_by(Product.product_code).limit(chunk_size)
+            
+            result = await db.execute(query)
+            products = result.scalars().all()
+            if not products:
+                break
+            
+            vectors = await bailian_client.embed_texts(
+                [self.build_embedding_text(p) for p in products]
+            )
+            
+            await db.execute(
+                update(Product),
+                [
+                    {"product_code": p.product_code, "description_vector": self._to_column_value(v)}
+                    for p, v in zip(products, vectors)
+                ]
+            )
+            await db.flush()
+            
+            updated += len(products)
+            chunks += 1
+            last_code = products[-1].product_code
+            logger.info(f"[VectorService] 已生成向量 {updated} 条")
+        
+        self.invalidate()
+        return {"updated": updated, "chunks": chunks}
+    
+    async def _get_local_index(self, db: AsyncSession) -> LocalVectorIndex:
+        """获取（必要时重建）进程内向量索引"""
+        if self._index is not None and time.monotonic() - self._index_loaded_at < LOCAL_INDEX_TTL:
+            return self._index
+        
+        query = select(
+            Product.product_code,
+            Product.product_name,
+            Product.category,
+            Product.vendor,
+            Product.description_vector
+        ).where(
+            Product.status == "active",
+            Product.description_vector.isnot(None)
+        )
+        result = await db.execute(query)
+        
+        self._index = LocalVectorIndex.build([
+            {
+                "model_id": row.product_code,
+                "model_name": row.product_name,
+                "category": row.category,
+                "vendor": row.vendor,
+                "vector": self._from_column_value(row.description_vector)
+            }
+            for row in result.all()
+        ])
+        self._index_loaded_at = time.monotonic()
+        logger.info(f"[VectorService] 进程内向量索引已加载: {len(self._index)} 条")
+        return self._index
+    
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        top_k: int = 10,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        语义检索：根据使用场景描述查找最相关的模型
+        
+        Args:
+            db: 数据库会话
+            query: 场景描述，如"智能客服多轮对话"
+            top_k: 返回数量
+            category: 可选的类别过滤
+        
+        Returns:
+            按相似度降序的模型列表，score为余弦相似度
+        """
+        if not await self.is_vector_column(db):
+            index = await self._get_local_index(db)
+            if not len(index):
+                return []
+            vector = await bailian_client.embed_text(query)
+            return index.search(vector, top_k, category)
+        
+        vector = await bailian_client.embed_text(query)
+        distance = Product.description_vector.cosine_distance(vector)
+        stmt = select(Product, distance.label("distance")).where(
+            Product.status == "active",
+            Product.description_vector.isnot(None)
+        )
+        if category:
+            stmt = stmt.where(Product.category == category)
+        stmt = stmt.order_by(distance).limit(top_k)
+        
+        result = await db.execute(stmt)
+        return [
+            {
+                "model_id": product.product_code,
+                "model_name": product.product_name,
+                "category": product.category,
+                "vendor": product.vendor,
+                "score": round(1 - float(dist), 4)
+            }
+            for product, dist in result.all()
+        ]
+
+
+# 创建全局服务实例
+product_vector_service = ProductVectorService()
@@ -23,6 +23,7 @@ from app.schemas.quote import (
 from app.services.pricing_engine import pricing_engine
 from app.services.product_filter_service import ProductFilterService
 from app.core.redis_client import get_redis
+from app.core.pagination import SortKey, paginate, count_total
 
 
 class QuoteService:
@@ -331,9 +332,9 @@ class QuoteService:
                 product_name=product.product_name,
                 region=item_data.region,
                 region_name=self.product_filter_service.REGION_NAMES.get(item_data.region, item_data.region),
-                modality=self.product_filter_service.map_category_to_modality(product.category),
-                capability=self.product_filter_service.map_category_to_capability(product.category),
-                model_type=self.product_filter_service.map_category_to_model_type(product.category),
+                modality=product.modality or "unknown",
+                capability=product.capability,
+                model_type=product.model_type,
                 input_tokens=item_data.input_tokens,
                 output_tokens=item_data.output_tokens,
                 inference_mode=item_data.inference_mode,
@@ -768,9 +769,9 @@ class QuoteService:
                         product_name=product.product_name,
                         region=item_data.region,
                         region_name=self.product_filter_service.REGION_NAMES.get(item_data.region, item_data.region),
-                        modality=self.product_filter_service.map_category_to_modality(product.category),
-                        capability=self.product_filter_service.map_category_to_capability(product.category),
-                        model_type=self.product_filter_service.map_category_to_model_type(product.category),
+                        modality=product.modality or "unknown",
+                        capability=product.capability,
+                        model_type=product.model_type,
                         input_tokens=item_data.input_tokens,
                         output_tokens=item_data.output_tokens,
                         inference_mode=item_data.inference_mode,
@@ -839,9 +840,15 @@ class QuoteService:
         status: Optional[str] = None,
         created_by: Optional[str] = None,
         page: int = 1,
-        page_size: int = 20
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        count: str = "exact"
     ) -> PaginatedQuoteListResponse:
-        """分页查询报价单列表"""
+        """
+        分页查询报价单列表
+        
+        传入cursor时按 (created_at, quote_id) 键集分页，翻页成本与页码无关
+        """
         try:
             # 构建查询
             query = select(QuoteSheet).where(QuoteSheet.status != "deleted")
@@ -856,16 +863,15 @@ class QuoteService:
                 query = query.where(QuoteSheet.created_by == created_by)
             
             # 计算总数
-            count_query = select(func.count()).select_from(query.subquery())
-            total_result = await db.execute(count_query)
-            total = total_result.scalar() or 0
+            total = await count_total(db, query, count)
             
-            # 分页
-            offset = (page - 1) * page_size
-            query = query.order_by(desc(QuoteSheet.created_at)).offset(offset).limit(page_size)
-            
-            result = await db.execute(query)
-            quotes = result.scalars().all()
+            # 分页：created_at相同时以quote_id区分，保证排序稳定
+            sort_keys = [
+                SortKey(QuoteSheet.created_at, descending=True),
+                SortKey(QuoteSheet.quote_id, descending=True)
+            ]
+            rows, next_cursor = await paginate(db, query, sort_keys, page_size, cursor=cursor, page=page)
+            quotes = [row[0] for row in rows]
             
             # 转换为响应格式
             data = [
@@ -887,6 +893,7 @@ class QuoteService:
                 total=total,
                 page=page,
                 page_size=page_size,
+                next_cursor=next_cursor,
                 data=data
             )
         except Exception as e:
@@ -0,0 +1,122 @@
+"""
+快照版本缓存
+
+定价数据（阿里云定价、豆包定价）按快照整批导入，快照之间内容不变，适合按"快照版本"缓存只读结果：
+- 版本 = 最新快照ID + 失效代数（管理端修改数据时递增，经Redis在多进程间共享）
+- 版本每隔 SNAPSHOT_CHECK_INTERVAL 秒检查一次，期间命中缓存不访问数据库
+- 版本变化时清空该缓存下的全部条目
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from loguru import logger
+
+from app.core.redis_client import get_redis
+from app.models.pricing import PricingSnapshot
+from app.models.doubao import DoubaoSnapshot
+
+
+# 缓存配置
+SNAPSHOT_CHECK_INTERVAL = 30  # 版本检查间隔（秒）
+GENERATION_KEY_PREFIX = "snapshot_generation:"
+
+T = TypeVar("T")
+
+
+class SnapshotCache:
+    """按快照版本缓存的只读数据"""
+    
+    def __init__(self, name: str, snapshot_model: Any, check_interval: int = SNAPSHOT_CHECK_INTERVAL):
+        """
+        Args:
+            name: 缓存名称，用于日志与Redis失效代数键
+            snapshot_model: 快照模型类，需包含 id 与 is_latest 字段
+            check_interval: 版本检查间隔（秒）
+        """
+        self.name = name
+        self.snapshot_model = snapshot_model
+        self.check_interval = check_interval
+        self._entries: Dict[str, Any] = {}
+        self._version: Optional[Tuple[Optional[int], int]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    @property
+    def generation_key(self) -> str:
+        return f"{GENERATION_KEY_PREFIX}{self.name}"
+    
+    async def _load_generation(self) -> int:
+        """读取失效代数，Redis不可用时为0"""
+        try:
+            redis = await get_redis()
+            if redis is None:
+                return 0
+            value = await redis.get(self.generation_key)
+            return int(value) if value else 0
+        except Exception as e:
+            logger.warning(f"[SnapshotCache] 读取{self.name}失效代数失败: {e}")
+            return 0
+    
+    async def current_version(self, db: AsyncSession) -> Tuple[Optional[int], int]:
+        """获取当前版本（检查间隔内直接返回上次结果）"""
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return self._version
+        
+        result = await db.execute(
+            select(func.max(self.snapshot_model.id)).where(self.snapshot_model.is_latest == True)
+        )
+        version = (result.scalar(), await self._load_generation())
+        
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"[SnapshotCache] {self.name} 版本变化 {self._version} -> {version}，清空缓存")
+            self._entries.clear()
+            self._version = version
+        self._checked_at = time.monotonic()
+        return version
+    
+    async def get_or_build(
+        self,
+        db: AsyncSession,
+        key: str,
+        builder: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        读取缓存，未命中时调用builder构建
+        
+        同一进程内并发的未命中只构建一次
+        """
+        await self.current_version(db)
+        if key in self._entries:
+            return self._entries[key]
+        
+        async with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            version = self._version
+            value = await builder()
+            # 构建期间版本未变化才写入，避免缓存旧数据
+            if version == self._version:
+                self._entries[key] = value
+            return value
+    
+    async def invalidate(self):
+        """数据被修改后调用：清空本进程缓存，并递增共享失效代数通知其他进程"""
+        self._entries.clear()
+        self._version = None
+        self._checked_at = 0.0
+        
+        try:
+            redis = await get_redis()
+            if redis is not None:
+                await redis.incr(self.generation_key)
+        except Exception as e:
+            logger.warning(f"[SnapshotCache] 递增{self.name}失效代数失败: {e}")
+
+
+# 创建全局缓存实例
+pricing_snapshot_cache = SnapshotCache("pricing", PricingSnapshot)
+doubao_snapshot_cache = SnapshotCache("doubao", DoubaoSnapshot)
@@ -0,0 +1,318 @@
+"""
+模型规格组装服务
+
+为报价向导第三步（/products/specs）组装模型规格与价格：
+- 中文显示名称经 MODEL_NAME_MAPPING 映射为产品代码或代码前缀（如 'qwen3-'）
+- 映射值编译为前缀树，与进程内产品代码表匹配后得到每个映射值对应的全部产品代码
+- 产品与价格通过一次关联查询取回，不再逐个产品查询价格
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from loguru import logger
+
+from app.models.product import Product, ProductPrice
+from app.services.catalog_search_service import catalog_search_service, LOCAL_INDEX_TTL
+
+
+# 中文显示名称到数据库product_code的映射
+MODEL_NAME_MAPPING = {
+    # 通义千问系列
+    '通义千问Max': 'qwen-max',
+    '通义千问Plus': 'qwen-plus',
+    '通义千问Turbo': 'qwen-turbo',
+    '通义千问Long': 'qwen-long',
+    '通义千问Flash': 'qwen-flash',
+    'QwQ': 'qwq-plus',
+    'QVQ': 'qvq-max',
+    '通义千问数学模型': 'qwen-math-plus',
+    '通义千问Coder': 'qwen-coder-plus',
+    '通义千问翻译模型': 'qwen-mt-turbo',
+    '通义千问数据挖掘模型': 'qwen-doc-turbo',
+    '通义千问深入研究模型': 'qwen-plus',
+    '通义法睿': 'farui-plus',
+    # 行业模型
+    '意图理解': 'tongyi-intent-detect-v3',
+    '角色扮演': 'qwen-plus-character',
+    '界面交互': 'gui-plus',
+    # 开源版模型
+    'Qwen3': 'qwen3-',
+    'QwQ-开源版': 'qwq-32b',
+    'QwQ-Preview': 'qwq-32b-preview',
+    'Qwen2.5': 'qwen2.5-',
+    'Qwen2': 'qwen2-',
+    'Qwen1.5': 'qwen1.5-',
+    'Qwen-Math': 'qwen-math-',
+    'Qwen-Coder': 'qwen-coder-',
+    # 向量模型
+    '通用文本向量': 'text-embedding-v3',
+    '文本向量': 'text-embedding-',
+    '多模态向量': 'multimodal-embedding-one-peace-v1',
+    'OpenNLU': 'opennlu-',
+    '文本排序模型': 'gte-rerank-',
+    # 语音模型 - 语音合成
+    'CosyVoice': 'cosyvoice-',
+    'Qwen-TTS': 'qwen-tts-',
+    'Qwen-TTS-RealTime': 'qwen-tts-realtime',
+    'Qwen-TTS声音复刻': 'cosyvoice-clone',
+    'Qwen-TTS声音设计': 'cosyvoice-',
+    # 语音模型 - 语音识别
+    '通义千问ASR': 'qwen3-asr-flash',
+    '通义千问ASR-Realtime': 'qwen3-asr-flash-realtime',
+    'Paraformer': 'paraformer-',
+    'SenseVoice': 'sensevoice-',
+    'Fun-ASR': 'fun-asr',
+    'Gummy语音识别/翻译': 'gummy-',
+    # Omni多模态
+    '通义千问Omni': 'qwen3-omni-flash',
+    '通义千问Omni-Realtime': 'qwen3-omni-flash-realtime',
+    'Qwen-Omni(开源)': 'qwen-omni-',
+    'Qwen3-Omni-Captioner(开源)': 'qwen3-omni-',
+    '通义千问3-LiveTranslate-Flash-Realtime': 'qwen3-livetranslate-flash-realtime',
+    # 视觉理解
+    '通义千问VL': 'qwen-vl-',
+    '通义千问OCR': 'qwen-vl-ocr',
+    'Qwen-VL(开源)': 'qwen2-vl-',
+    # 图像生成
+    '通义千问文生图': 'qwen-image-',
+    '通义千问图像编辑': 'qwen-image-edit',
+    '通义千问图像翻译': 'qwen-vl-translate',
+    '通义-文生图-Z-Image': 'z-image-',
+    '通义万相文生图': 'wanx-v1',
+    '通义万相': 'wanx-',
+    '通义万相图像生成与编辑': 'wanx-',
+    '通义万相通用图像编辑': 'wanx2.1-imageedit',
+    '通义万相涂鸦作画': 'wanx-sketch-',
+    '人像风格重绘': 'wanx-style-repaint-',
+    '图像背景生成': 'image-background-generation',
+    '图像画面扩展': 'image-outpainting',
+    '人物写真生成-FaceChain': 'facechain-',
+    '创意文字生成-WordArt锦书': 'wordart-',
+    'FLUX': 'flux-',
+    # 视频生成
+    '通义万相-文生视频': 'wanx2.1-t2v-',
+    '文生视频': 'wanx2.1-t2v-',
+    '通义万相-图生视频-基于首帧': 'wanx2.1-i2v-',
+    '通义万相-图生视频-基于首尾帧': 'wanx2.1-i2v-plus',
+    '图生视频': 'wanx2.1-i2v-',
+    '通义万相-参考生视频': 'wanx-ref2v',
+    '通义万相-通用视频编辑': 'wanx-video-',
+    '通义万相-数字人': 'wanx-digital-human',
+    '通义万相-图生动作': 'wanx-motion-',
+    '通义万相-视频换人': 'wanx-video-faceswap',
+    '舞动人像AnimateAnyone': 'animate-anyone',
+    '灵动人像LivePortrait': 'liveportrait-',
+}
+
+
+class PrefixTrie:
+    """前缀树：插入若干模式，查询给定字符串以哪些模式开头"""
+    
+    def __init__(self, patterns: Optional[List[str]] = None):
+        self._root: Dict[str, Any] = {}
+        for pattern in patterns or []:
+            self.insert(pattern)
+    
+    def insert(self, pattern: str):
+        """插入模式（忽略大小写）"""
+        node = self._root
+        for char in pattern.lower():
+            node = node.setdefault(char, {})
+        node[None] = pattern
+    
+    def prefixes_of(self, value: str) -> List[str]:
+        """返回value命中的全部模式，按长度从短到长"""
+        matches = []
+        node = self._root
+        for char in value.lower():
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                matches.append(node[None])
+        return matches
+
+
+class SpecAssemblyService:
+    """模型规格组装服务"""
+    
+    def __init__(self, mapping: Optional[Dict[str, str]] = None):
+        self.mapping = MODEL_NAME_MAPPING if mapping is None else mapping
+        self.trie = PrefixTrie(list(set(self.mapping.values())))
+        # 映射值 -> 产品代码列表
+        self._resolved: Optional[Dict[str, List[str]]] = None
+        self._loaded_at = 0.0
+    
+    def invalidate(self):
+        """
+        清除映射解析结果，下次请求时重新加载产品代码
+        
+        产品或定价模型写入后调用；只影响当前进程，其他进程在LOCAL_INDEX_TTL内过期
+        """
+        self._resolved = None
+    
+    async def _get_resolved(self, db: AsyncSession) -> Dict[str, List[str]]:
+        """加载产品代码并按前缀树归入各映射值（进程内缓存）"""
+        if self._resolved is not None and time.monotonic() - self._loaded_at < LOCAL_INDEX_TTL:
+            return self._resolved
+        
+        result = await db.execute(select(Product.product_code).order_by(Product.product_code))
+        resolved: Dict[str, List[str]] = {}
+        for code in result.scalars().all():
+            for pattern in self.trie.prefixes_of(code):
+                resolved.setdefault(pattern, []).append(code)
+        
+        self._resolved = resolved
+        self._loaded_at = time.monotonic()
+        logger.info(f"[SpecAssembly] 名称映射已解析: {len(resolved)} 个映射值")
+        return resolved
+    
+    async def resolve_codes(self, db: AsyncSession, model_name: str) -> Optional[List[str]]:
+        """
+        将显示名称解析为产品代码列表
+        
+        Returns:
+            名称在映射表中时返回匹配的产品代码（可能为空列表）；不在映射表中返回None
+        """
+        mapped_code = self.mapping.get(model_name)
+        if mapped_code is None:
+            return None
+        resolved = await self._get_resolved(db)
+        return resolved.get(mapped_code, [])
+    
+    async def get_specs(self, db: AsyncSession, model_name: str) -> Dict[str, Any]:
+        """获取模型规格配置"""
+        codes = await self.resolve_codes(db, model_name)
+        
+        if codes is None:
+            # 未映射的名称按包含匹配（走三元组索引）
+            condition = catalog_search_service.keyword_condition(
+                (Product.product_name, Product.product_code), model_name
+            )
+        elif codes:
+            condition = Product.product_code.in_(codes)
+        else:
+            condition = None
+        
+        found = False
+        specs_list = []
+        if condition is not None:
+            # 产品与价格一次取回；外连接保留无价格的产品，用于区分"找到但无规格"
+            query = select(
+                Product.product_code, Product.product_name, ProductPrice
+            ).outerjoin(
+                ProductPrice, ProductPrice.product_code == Product.product_code
+            ).where(condition).order_by(Product.product_code, ProductPrice.region)
+            result = await db.execute(query)
+            
+            for row in result.all():
+                found = True
+                if row.ProductPrice is not None:
+                    specs_list.append(self._product_spec(row.product_code, row.product_name, row.ProductPrice))
+        
+        if found:
+            return {"specs": specs_list}
+        
+        # 如果在products表找不到，尝试从pricing_model表查询
+        specs_list = await self._pricing_model_specs(db, model_name, self.mapping.get(model_name))
+        if specs_list:
+            return {"specs": specs_list}
+        return {"specs": [], "message": f"未找到模型: {model_name}"}
+    
+    @staticmethod
+    def _product_spec(product_code: str, product_name: str, price: ProductPrice) -> Dict[str, Any]:
+        """由产品价格记录构建规格配置"""
+        pricing_vars = price.pricing_variables or {}
+        return {
+            "id": str(price.price_id),
+            "product_code": product_code,
+            "model_name": product_name,
+            "region": price.region,
+            "mode": pricing_vars.get("mode", "标准"),
+            "token_range": pricing_vars.get("token_range", "无阶梯计价"),
+            "input_price": pricing_vars.get("input_price"),
+            "output_price": pricing_vars.get("output_price"),
+            "unit": price.unit or "千Token",
+            "billing_mode": price.billing_mode,
+            "remark": pricing_vars.get("remark", ""),
+            "display_config": {
+                "show_mode": pricing_vars.get("mode") is not None,
+                "show_token_range": pricing_vars.get("token_range") is not None,
+                "price_unit": f"/{price.unit or '千Token'}"
+            }
+        }
+    
+    async def _pricing_model_specs(
+        self,
+        db: AsyncSession,
+        model_name: str,
+        mapped_code: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """从pricing_model表构建规格配置"""
+        pricing_query = text("""
+            SELECT pm.id, pm.model_code, pm.model_name, pm.display_name,
+                   pmp.dimension_code, pmp.unit_price, pmp.unit, pmp.rule_text,
+                   pc.name as category_name
+            FROM pricing_model pm
+            JOIN pricing_model_price pmp ON pm.id = pmp.model_id
+            JOIN pricing_category pc ON pm.category_id = pc.id
+            WHERE pm.display_name ILIKE :search_pattern ESCAPE '\\'
+               OR pm.model_name ILIKE :search_pattern ESCAPE '\\'
+               OR pm.model_code ILIKE :code_pattern ESCAPE '\\'
+            ORDER BY pm.model_name, pmp.dimension_code
+        """)
+        
+        escaped_name = catalog_search_service.escape_like(model_name)
+        code_pattern = (
+            f"{catalog_search_service.escape_like(mapped_code)}%" if mapped_code else f"%{escaped_name}%"
+        )
+        pricing_result = await db.execute(
+            pricing_query,
+            {"search_pattern": f"%{escaped_name}%", "code_pattern": code_pattern}
+        )
+        
+        # 按模型分组价格
+        model_prices = {}
+        for row in pricing_result.fetchall():
+            model_key = row.model_code or row.model_name
+            if model_key not in model_prices:
+                model_prices[model_key] = {
+                    'model_name': row.display_name or row.model_name,
+                    'model_code': row.model_code,
+                    'category': row.category_name,
+                    'prices': {}
+                }
+            model_prices[model_key]['prices'][row.dimension_code] = {
+                'unit_price': float(row.unit_price) if row.unit_price else None,
+                'unit': row.unit,
+                'rule_text': row.rule_text
+            }
+        
+        specs_list = []
+        for idx, (model_key, model_data) in enumerate(model_prices.items()):
+            prices = model_data['prices']
+            specs_list.append({
+                "id": f"pricing_{model_key}_{idx}",
+                "product_code": model_data['model_code'],
+                "model_name": model_data['model_name'],
+                "region": "中国内地",
+                "mode": "标准",
+                "token_range": prices.get('input_token', {}).get('rule_text') or "无阶梯计价",
+                "input_price": prices.get('input_token', {}).get('unit_price'),
+                "output_price": prices.get('output_token', {}).get('unit_price'),
+                "unit": prices.get('input_token', {}).get('unit') or "千Token",
+                "billing_mode": "token",
+                "remark": "",
+                "display_config": {
+                    "show_mode": True,
+                    "show_token_range": True,
+                    "price_unit": f"/{prices.get('input_token', {}).get('unit') or '千Token'}"
+                }
+            })
+        return specs_list
+
+
+# 创建全局服务实例
+spec_assembly_service = SpecAssemblyService()
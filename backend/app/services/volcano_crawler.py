@@ -2,7 +2,6 @@
 火山引擎爬虫 - 爬取火山引擎产品和价格信息
 """
 from typing import List, Dict, Any
-from aiohttp import ClientSession
 import logging
 from .crawler_base import BaseCrawler, CrawlerResult
 
@@ -44,6 +43,8 @@ class VolcanoCrawler(BaseCrawler):
         result = CrawlerResult("volcano_products")
         
         try:
+            from aiohttp import ClientSession
+            
             async with ClientSession() as session:
                 for product_code, config in self.product_urls.items():
                     try:
@@ -121,6 +122,8 @@ class VolcanoCrawler(BaseCrawler):
                 result.finish()
                 return result.prices
             
+            from aiohttp import ClientSession
+            
             async with ClientSession() as session:
                 # 爬取定价页面
                 html = await self.fetch(session, config["pricing_url"])
@@ -0,0 +1,13 @@
+"""
+Gunicorn配置（gunicorn启动时自动加载当前目录下的本文件，命令行参数见start.sh）
+
+设置 PROMETHEUS_MULTIPROC_DIR 时，worker退出后标记其指标文件，
+避免已退出worker的存活型Gauge（如主节点状态）继续被汇总
+"""
+import os
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -3,16 +3,27 @@ FastAPI应用主入口
 """
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+
+# 最先导入，启动计时覆盖其余模块的导入
+from app.core.startup import startup_timer
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from app.core.config import settings
 from app.core.database import init_db
 from app.core.redis_client import init_redis
+from app.core.health_monitor import health_monitor
+from app.core.jobs import job_worker
 from app.core.middleware import setup_error_handling
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.log_pipeline import log_stats, log_queue
+from app.core.metrics import render_metrics
 from app.api.v1 import api_router
-from app.services.crawler_scheduler import start_crawler_scheduler, stop_crawler_scheduler
+from app.services.crawler_scheduler import start_crawler_scheduler, stop_crawler_scheduler, get_scheduler_status
 
 
 @asynccontextmanager
@@ -20,19 +31,33 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时初始化
     logger.info("初始化数据库连接...")
-    await init_db()
+    with startup_timer.phase("database"):
+        await init_db()
     
     logger.info("初始化Redis连接...")
-    await init_redis()
+    with startup_timer.phase("redis"):
+        await init_redis()
     
     logger.info("启动爬虫调度器...")
-    await start_crawler_scheduler()
+    with startup_timer.phase("scheduler"):
+        await start_crawler_scheduler()
+    
+    if settings.JOB_WORKER_ENABLED:
+        job_worker.start()
     
-    logger.info(f"{settings.APP_NAME} 启动完成")
+    health_monitor.start()
+    
+    startup_timer.mark_ready()
+    logger.info(f"{settings.APP_NAME} 启动完成，耗时 {startup_timer.ready_ms}ms")
     
     yield
     
     # 关闭时清理
+    await health_monitor.stop()
+    
+    logger.info("停止后台任务worker...")
+    await job_worker.stop()
+    
     logger.info("停止爬虫调度器...")
     await stop_crawler_scheduler()
     
@@ -46,11 +71,21 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="一站式智能化报价平台",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json"
 )
 
+# 配置限流（位于CORS内层，429响应同样带CORS头）
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limit=settings.RATE_LIMIT_PER_IP,
+        window=settings.RATE_LIMIT_WINDOW,
+        route_costs=settings.RATE_LIMIT_ROUTE_COSTS
+    )
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -58,6 +93,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Request-ID", "X-Client-Token"],
 )
 
 # 设置错误处理和日志中间件
@@ -69,6 +105,9 @@ os.makedirs("logs", exist_ok=True)
 # 注册路由
 app.include_router(api_router, prefix="/api/v1")
 
+# 模块导入与应用构建完成
+startup_timer.mark("import")
+
 
 @app.get("/")
 async def root():
@@ -87,47 +126,42 @@ async def health_check():
 
 
 @app.get("/health/detailed")
-async def detailed_health_check():
+async def detailed_health_check(history: bool = False):
     """
     详细健康检查 - 包含数据库和Redis状态
     用于监控和自动恢复判断
+    
+    返回后台探测的缓存结果（history=true时附带最近的探测记录），不在请求中访问依赖
     """
-    from app.core.database import engine
-    from app.core.redis_client import redis_client
-    from sqlalchemy import text
     import time
     
+    await health_monitor.ensure_fresh()
+    snapshot = health_monitor.snapshot(include_history=history)
+    
     health_status = {
-        "status": "healthy",
+        **snapshot,
         "timestamp": time.time(),
-        "version": settings.APP_VERSION,
-        "checks": {}
+        "version": settings.APP_VERSION
     }
     
-    # 检查数据库连接
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        health_status["checks"]["database"] = {"status": "healthy", "message": "连接正常"}
-    except Exception as e:
-        health_status["checks"]["database"] = {"status": "unhealthy", "message": str(e)}
-        health_status["status"] = "degraded"
-    
-    # 检查Redis连接
-    try:
-        if redis_client:
-            await redis_client.ping()
-            health_status["checks"]["redis"] = {"status": "healthy", "message": "连接正常"}
-        else:
-            health_status["checks"]["redis"] = {"status": "unhealthy", "message": "客户端未初始化"}
-            health_status["status"] = "degraded"
-    except Exception as e:
-        health_status["checks"]["redis"] = {"status": "unhealthy", "message": str(e)}
-        health_status["status"] = "degraded"
+    # 日志管道计数（丢弃数持续增长说明日志写出跟不上）
+    health_status["logging"] = {**log_stats.snapshot(), "queue_size": log_queue.qsize()}
+    
+    # 启动耗时（导入与各初始化阶段）
+    health_status["startup"] = startup_timer.snapshot()
+    
+    # 爬虫调度（多worker部署时仅主节点运行）
+    health_status["scheduler"] = get_scheduler_status()
     
     return health_status
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus指标"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health/live")
 async def liveness_check():
     """存活检查 - 仅检查应用是否响应"""
@@ -138,25 +172,20 @@ async def liveness_check():
 async def readiness_check():
     """
     就绪检查 - 检查应用是否准备好接收流量
+    
+    依据后台探测的缓存结果，关键依赖（数据库、Redis）异常或结果过期时返回503
     """
-    from app.core.database import engine
-    from app.core.redis_client import redis_client
-    from sqlalchemy import text
-    
-    try:
-        # 检查数据库
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        
-        # 检查Redis
-        if redis_client:
-            await redis_client.ping()
-        
+    await health_monitor.ensure_fresh()
+    if health_monitor.is_ready():
         return {"ready": True}
-    except Exception as e:
-        logger.warning(f"就绪检查失败: {e}")
-        from fastapi import Response
-        return Response(content='{"ready": false}', status_code=503, media_type="application/json")
+    
+    failed = {
+        name: check["message"]
+        for name, check in health_monitor.snapshot()["checks"].items()
+        if check["critical"] and check["status"] != "healthy"
+    }
+    logger.warning(f"就绪检查失败: {failed}")
+    return Response(content='{"ready": false}', status_code=503, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+启动导入耗时检查
+
+以 python -X importtime 导入 main，检查：
+1. 总导入耗时不超过预算（多次运行取最小值，降低抖动）
+2. 较慢的可选依赖（见 app.core.startup.DEFERRED_MODULES）没有在启动时导入
+
+使用方法:
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 1500 --runs 5 --top 20
+
+超出预算或导入了延迟加载的模块时以非0状态退出，可用于CI。
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# 添加项目根目录到路径
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.core.startup import DEFERRED_MODULES
+
+# import time:      self [us] | cumulative | imported package
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def run_importtime(module: str = "main") -> List[Tuple[str, int, int, int]]:
+    """在子进程中导入模块，返回 (模块名, 缩进层级, 自身耗时us, 累计耗时us)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时检查")
+    parser.add_argument("--module", default="main", help="要导入的模块")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="导入耗时预算（毫秒）")
+    parser.add_argument("--runs", type=int, default=3, help="运行次数，取最小值")
+    parser.add_argument("--top", type=int, default=15, help="输出累计耗时最高的模块数")
+    args = parser.parse_args()
+    
+    best_total = None
+    best_entries = []
+    for _ in range(args.runs):
+        entries = run_importtime(args.module)
+        total = next((cumulative for name, _, _, cumulative in entries if name == args.module), 0) / 1000
+        if best_total is None or total < best_total:
+            best_total, best_entries = total, entries
+    
+    print(f"导入 {args.module}: {best_total:.1f}ms（预算 {args.budget_ms:.0f}ms，{args.runs}次取最小值）")
+    
+    # 顶层包与应用模块按累计耗时排序
+    top: Dict[str, int] = {}
+    for name, _, _, cumulative in best_entries:
+        if name.startswith("app.") or "." not in name:
+            top[name] = max(top.get(name, 0), cumulative)
+    top.pop(args.module, None)
+    print(f"\n累计耗时最高的 {args.top} 个模块:")
+    for name, cumulative in sorted(top.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+    
+    failed = False
+    imported = {name.split(".")[0] for name, _, _, _ in best_entries}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    if eager:
+        failed = True
+        print(f"\n❌ 以下模块应延迟到首次使用时导入: {', '.join(eager)}")
+    if best_total > args.budget_ms:
+        failed = True
+        print(f"\n❌ 导入耗时超出预算: {best_total:.1f}ms > {args.budget_ms:.0f}ms")
+    
+    if not failed:
+        print("\n✅ 导入耗时检查通过")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
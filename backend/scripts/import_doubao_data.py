@@ -149,6 +149,8 @@ async def import_doubao_data():
             print(f"  - 快照ID: {snapshot.id}")
             print(f"  - 总模型数: {total_models}")
             
+            await invalidate_catalog_cache()
+            
             return True
             
         except Exception as e:
@@ -161,6 +163,21 @@ async def import_doubao_data():
             await engine.dispose()
 
 
+async def invalidate_catalog_cache():
+    """通知运行中的服务进程重建豆包目录缓存（Redis不可用时各进程在版本检查时自行发现新快照）"""
+    from app.core.redis_client import init_redis, close_redis
+    from app.services.snapshot_cache import doubao_snapshot_cache
+    
+    try:
+        await init_redis()
+        await doubao_snapshot_cache.invalidate()
+        print("已通知服务刷新豆包目录缓存")
+    except Exception as e:
+        print(f"警告: 刷新豆包目录缓存失败（服务将在版本检查时自动刷新）: {e}")
+    finally:
+        await close_redis()
+
+
 async def create_tables():
     """创建数据库表（如果不存在）"""
     from app.core.database import Base
@@ -7,6 +7,8 @@
     python scripts/performance_test.py --service pricing
     python scripts/performance_test.py --service quote
     python scripts/performance_test.py --service filter
+    python scripts/performance_test.py --service middleware
+    python scripts/performance_test.py --service serialization
     python scripts/performance_test.py --all
 """
 import argparse
@@ -319,6 +321,208 @@ def test_quote_calculation(iterations: int = 500) -> PerformanceMetrics:
     return metrics
 
 
+async def _run_asgi_requests(app, iterations: int, metrics: PerformanceMetrics):
+    """直接以ASGI调用驱动应用，不经过网络与HTTP客户端"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 12345), "server": ("bench", 80),
+    }
+    
+    for i in range(iterations):
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+        response_complete = asyncio.Event()
+        
+        async def receive():
+            if requests:
+                return requests.pop()
+            # 响应发送完毕后再通知断开，与真实服务器行为一致
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete.set()
+        
+        try:
+            start = time.perf_counter()
+            await app(dict(scope), receive, send)
+            metrics.record(time.perf_counter() - start)
+        except Exception as e:
+            metrics.record_error()
+            if i < 5:
+                print(f"  错误 {i}: {e}")
+
+
+def test_middleware_overhead(iterations: int = 500) -> List[PerformanceMetrics]:
+    """对比中间件开销：无中间件 / 原BaseHTTPMiddleware双中间件 / 纯ASGI请求上下文中间件"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import PlainTextResponse
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from loguru import logger
+    from app.core.middleware import RequestContextMiddleware
+    
+    print(f"\n🧩 测试 中间件开销 ({iterations} 次迭代)...")
+    
+    class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+        """原请求日志中间件（对照组）"""
+        
+        async def dispatch(self, request: Request, call_next):
+            start_time = time.time()
+            request.state.request_id = str(uuid4())[:8]
+            with logger.contextualize(request_id=request.state.request_id):
+                logger.info(f"请求开始 | {request.method} {request.url.path}")
+                response = await call_next(request)
+                process_time = round((time.time() - start_time) * 1000, 2)
+                logger.info(f"请求完成 | {request.method} {request.url.path} | Status: {response.status_code}")
+                response.headers["X-Request-ID"] = request.state.request_id
+                response.headers["X-Process-Time"] = f"{process_time}ms"
+                return response
+    
+    class LegacyPerformanceMiddleware(BaseHTTPMiddleware):
+        """原性能监控中间件（对照组）"""
+        
+        async def dispatch(self, request: Request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            if (time.time() - start_time) * 1000 > 1000:
+                logger.warning(f"慢请求警告 | {request.method} {request.url.path}")
+            return response
+    
+    def create_app(*middlewares):
+        app = FastAPI()
+        for middleware in middlewares:
+            app.add_middleware(middleware)
+        
+        @app.get("/ping")
+        async def ping():
+            return PlainTextResponse("pong")
+        
+        return app
+    
+    # 只比较中间件本身的开销，不输出日志
+    logger.remove()
+    
+    cases = [
+        ("Middleware(无)", create_app()),
+        ("Middleware(BaseHTTPMiddleware x2)", create_app(LegacyPerformanceMiddleware, LegacyLoggingMiddleware)),
+        ("Middleware(RequestContextMiddleware)", create_app(RequestContextMiddleware)),
+    ]
+    
+    results = []
+    for name, app in cases:
+        metrics = PerformanceMetrics(name)
+        # 预热
+        asyncio.run(_run_asgi_requests(app, 50, PerformanceMetrics(name)))
+        asyncio.run(_run_asgi_requests(app, iterations, metrics))
+        results.append(metrics)
+    
+    return results
+
+
+def test_serialization(iterations: int = 100, batch_size: int = 1000) -> List[PerformanceMetrics]:
+    """对比响应序列化：FastAPI默认路径（response_model校验/jsonable_encoder + json）与 FastJSONResponse，每次序列化batch_size个模型"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.core.responses import FastJSONResponse
+    from app.schemas.quote import PaginatedQuoteListResponse, QuoteListResponse
+    
+    print(f"\n🧾 测试 响应序列化 ({iterations} 次迭代，每次 {batch_size} 个模型)...")
+    
+    now = datetime.now()
+    # 定价模型列表（dict，含嵌套价格数组），对应 /products/pricing/models
+    pricing_payload = {
+        "total": batch_size,
+        "page": 1,
+        "page_size": batch_size,
+        "next_cursor": None,
+        "data": [
+            {
+                "model_code": f"qwen-model-{i}",
+                "model_name": f"通义千问模型{i}",
+                "category": "text_qwen",
+                "supports_batch": i % 2 == 0,
+                "supports_cache": i % 3 == 0,
+                "prices": [
+                    {
+                        "mode": "非思考模式",
+                        "token_tier": f"{tier * 32}K<Token≤{(tier + 1) * 32}K",
+                        "input_price": Decimal("0.0008") * (tier + 1),
+                        "output_price": Decimal("0.002") * (tier + 1),
+                        "unit": "千Token",
+                        "updated_at": now,
+                    }
+                    for tier in range(4)
+                ],
+            }
+            for i in range(batch_size)
+        ],
+    }
+    # 报价单列表（pydantic模型），对应 /quotes/
+    quote_payload = PaginatedQuoteListResponse(
+        total=batch_size,
+        page=1,
+        page_size=batch_size,
+        next_cursor=None,
+        data=[
+            QuoteListResponse(
+                quote_id=uuid4(),
+                quote_no=f"QT{i:08d}",
+                customer_name=f"客户{i}",
+                project_name="智能客服项目",
+                status="draft",
+                total_amount=Decimal("12345.67"),
+                created_by="sales",
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(batch_size)
+        ],
+    )
+    quote_field = create_response_field(name="Response_get_quotes", type_=PaginatedQuoteListResponse)
+    loop = asyncio.new_event_loop()
+    
+    def default_dict():
+        return JSONResponse(jsonable_encoder(pricing_payload)).body
+    
+    def fast_dict():
+        return FastJSONResponse(pricing_payload).body
+    
+    def default_model():
+        content = loop.run_until_complete(serialize_response(field=quote_field, response_content=quote_payload))
+        return JSONResponse(content).body
+    
+    def fast_model():
+        return FastJSONResponse(quote_payload).body
+    
+    cases = [
+        ("Serialization(dict, jsonable_encoder+json)", default_dict),
+        ("Serialization(dict, FastJSONResponse)", fast_dict),
+        ("Serialization(model, response_model校验+json)", default_model),
+        ("Serialization(model, FastJSONResponse)", fast_model),
+    ]
+    
+    results = []
+    for name, func in cases:
+        metrics = PerformanceMetrics(name)
+        func()  # 预热
+        for i in range(iterations):
+            try:
+                start = time.perf_counter()
+                func()
+                metrics.record(time.perf_counter() - start)
+            except Exception as e:
+                metrics.record_error()
+                if i < 5:
+                    print(f"  错误 {i}: {e}")
+        results.append(metrics)
+    loop.close()
+    
+    return results
+
+
 def print_report(metrics: PerformanceMetrics, threshold_ms: float = 500):
     """打印性能报告"""
     report = metrics.report()
@@ -351,7 +555,7 @@ def print_report(metrics: PerformanceMetrics, threshold_ms: float = 500):
 
 def main():
     parser = argparse.ArgumentParser(description="服务层性能测试")
-    parser.add_argument("--service", choices=["pricing", "quote", "filter", "excel"],
+    parser.add_argument("--service", choices=["pricing", "quote", "filter", "excel", "middleware", "serialization"],
                         help="指定要测试的服务")
     parser.add_argument("--all", action="store_true", help="测试所有服务")
     parser.add_argument("--iterations", type=int, default=500, help="迭代次数")
@@ -385,6 +589,16 @@ def main():
         print_report(metrics, threshold_ms=1000)  # Excel导出允许更长时间
         results.append(metrics)
     
+    if args.all or args.service == "middleware":
+        for metrics in test_middleware_overhead(args.iterations):
+            print_report(metrics, threshold_ms=5)
+            results.append(metrics)
+    
+    if args.all or args.service == "serialization":
+        for metrics in test_serialization(min(args.iterations, 100)):
+            print_report(metrics, threshold_ms=50)
+            results.append(metrics)
+    
     if not args.all and not args.service:
         print("\n请指定 --service 或 --all 参数")
         parser.print_help()
@@ -68,6 +68,11 @@ ensure_directories
 export PYTHONPATH="${BACKEND_DIR}:${PYTHONPATH}"
 export PYTHONUNBUFFERED=1
 
+# 多worker指标：各worker写入同一目录，/metrics 汇总全部worker（启动前清空上次运行的文件）
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/baojiaxia_prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 log_info "启动 Gunicorn 服务..."
 log_info "Workers: $WORKERS"
 log_info "绑定地址: ${BIND_HOST}:${BIND_PORT}"
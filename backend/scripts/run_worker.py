@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+后台任务worker
+
+独立于API进程执行任务队列中的任务（爬虫、批量导出等），可按需部署多个实例。
+API进程默认不执行任务（JOB_WORKER_ENABLED=false），start.sh 与 systemd（llm-quotation-worker）会一并启动本worker。
+
+使用方法:
+    python scripts/run_worker.py
+    python scripts/run_worker.py --concurrency 8
+
+收到SIGTERM/SIGINT时停止领取新任务，等待执行中的任务完成（超时后取消，
+未确认的任务由其他worker在可见性超时后接管）。
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.jobs import JobWorker, job_queue
+from app.core.redis_client import init_redis, close_redis
+
+
+async def run(concurrency: int, shutdown_timeout: float):
+    await init_redis()
+    worker = JobWorker(
+        job_queue,
+        concurrency=concurrency,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+        retry_backoff=settings.JOB_RETRY_BACKOFF
+    )
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    
+    worker.start()
+    await stop.wait()
+    
+    logger.info("正在停止worker...")
+    await worker.stop(timeout=shutdown_timeout)
+    await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后台任务worker")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY, help="并发任务数")
+    parser.add_argument("--shutdown-timeout", type=float, default=60, help="停止时等待执行中任务的秒数")
+    args = parser.parse_args()
+    
+    asyncio.run(run(args.concurrency, args.shutdown_timeout))
+
+
+if __name__ == "__main__":
+    main()
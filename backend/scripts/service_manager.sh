@@ -23,6 +23,9 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 BACKEND_DIR="$(dirname "$SCRIPT_DIR")"
 SERVICE_NAME="llm-quotation-backend"
 SERVICE_FILE="${SCRIPT_DIR}/${SERVICE_NAME}.service"
+# 后台任务worker（PartOf后端服务，随其启动、停止和重启）
+WORKER_SERVICE_NAME="llm-quotation-worker"
+WORKER_SERVICE_FILE="${SCRIPT_DIR}/${WORKER_SERVICE_NAME}.service"
 SYSTEMD_DIR="/etc/systemd/system"
 LOGROTATE_FILE="${SCRIPT_DIR}/llm-quotation-logrotate"
 LOGROTATE_DIR="/etc/logrotate.d"
@@ -100,6 +103,14 @@ install_service() {
         exit 1
     fi
     
+    if [ -f "$WORKER_SERVICE_FILE" ]; then
+        cp "$WORKER_SERVICE_FILE" "${SYSTEMD_DIR}/${WORKER_SERVICE_NAME}.service"
+        print_success "worker服务文件已复制到 ${SYSTEMD_DIR}"
+    else
+        print_error "服务文件不存在: $WORKER_SERVICE_FILE"
+        exit 1
+    fi
+    
     # 设置启动脚本权限
     chmod +x "${SCRIPT_DIR}/production_start.sh"
     print_success "启动脚本权限已设置"
@@ -116,6 +127,7 @@ install_service() {
     
     # 启用开机自启
     systemctl enable "$SERVICE_NAME"
+    systemctl enable "$WORKER_SERVICE_NAME"
     print_success "服务已设置为开机自启"
     
     print_success "服务安装完成！"
@@ -125,6 +137,7 @@ install_service() {
     echo "  停止: sudo systemctl stop $SERVICE_NAME"
     echo "  状态: sudo systemctl status $SERVICE_NAME"
     echo "  日志: sudo journalctl -u $SERVICE_NAME -f"
+    echo "  worker日志: sudo journalctl -u $WORKER_SERVICE_NAME -f"
 }
 
 # 卸载服务
@@ -138,13 +151,21 @@ uninstall_service() {
         print_success "服务已停止"
     fi
     
+    if systemctl is-active --quiet "$WORKER_SERVICE_NAME"; then
+        systemctl stop "$WORKER_SERVICE_NAME"
+    fi
+    
     # 禁用开机自启
+    if systemctl is-enabled --quiet "$WORKER_SERVICE_NAME" 2>/dev/null; then
+        systemctl disable "$WORKER_SERVICE_NAME"
+    fi
     if systemctl is-enabled --quiet "$SERVICE_NAME" 2>/dev/null; then
         systemctl disable "$SERVICE_NAME"
         print_success "已禁用开机自启"
     fi
     
     # 删除服务文件
+    rm -f "${SYSTEMD_DIR}/${WORKER_SERVICE_NAME}.service"
     if [ -f "${SYSTEMD_DIR}/${SERVICE_NAME}.service" ]; then
         rm "${SYSTEMD_DIR}/${SERVICE_NAME}.service"
         print_success "服务文件已删除"
@@ -207,6 +228,7 @@ show_status() {
     echo ""
     print_info "服务状态:"
     systemctl status "$SERVICE_NAME" --no-pager || true
+    systemctl status "$WORKER_SERVICE_NAME" --no-pager || true
     echo ""
     
     # 显示健康检查结果
@@ -126,9 +126,18 @@ start_dev() {
     echo "======================================"
     echo ""
     
+    start_worker
     uvicorn main:app --reload --host 0.0.0.0 --port 8000
 }
 
+# 启动后台任务worker（爬虫、批量导出等不在API进程内执行），脚本退出时一并停止
+start_worker() {
+    print_info "启动后台任务worker..."
+    python3 scripts/run_worker.py &
+    WORKER_PID=$!
+    trap 'kill -TERM $WORKER_PID 2>/dev/null; wait $WORKER_PID 2>/dev/null' EXIT
+}
+
 # 生产模式启动
 start_prod() {
     print_info "以生产模式启动服务..."
@@ -140,6 +149,12 @@ start_prod() {
     echo "======================================"
     echo ""
     
+    # 多worker指标：各worker写入同一目录，/metrics 汇总全部worker（启动前清空上次运行的文件）
+    export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/baojiaxia_prometheus}
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+    
+    start_worker
     gunicorn main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
 }
 
@@ -10380,6 +10380,14 @@ BEGIN
     RAISE NOTICE '数据导入完成';
 END $$;
 
+-- 重建定价文档（需先执行数据库迁移创建 refresh_pricing_model_documents）
+DO $$
+BEGIN
+    IF to_regprocedure('refresh_pricing_model_documents(text[])') IS NOT NULL THEN
+        PERFORM refresh_pricing_model_documents();
+    END IF;
+END $$;
+
 -- =====================================================
 -- 4. 验证结果
 -- =====================================================
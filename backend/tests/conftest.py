@@ -11,11 +11,16 @@ from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
+# 测试请求均来自同一客户端，关闭全局限流（限流逻辑见 test_rate_limit.py）
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
 
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db
 from app.core.config import settings
 from main import app
 
+# 查询预算：@pytest.mark.query_budget / query_budget fixture
+pytest_plugins = ["tests.plugins.query_budget"]
+
 # 使用开发数据库进行测试（事务隔离）
 # 也可以设置 TEST_DATABASE_URL 环境变量使用独立测试数据库
 TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", os.getenv("DATABASE_URL"))
@@ -77,6 +82,7 @@ async def client(db_session: AsyncSession):
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     # 使用 ASGITransport 来测试 FastAPI 应用
     transport = ASGITransport(app=app)
@@ -0,0 +1,65 @@
+"""
+查询预算插件
+
+限制测试（或测试中的代码块）执行的SQL查询数，防止N+1查询回归：
+    
+    @pytest.mark.query_budget(5)
+    async def test_list(client):
+        await client.get("/api/v1/products")
+    
+    async def test_specs(client, query_budget):
+        with query_budget(3, max_repeated=1):
+            await client.get("/api/v1/products/specs", params={"model_names": "qwen-max"})
+
+max_repeated 限制同一语句形态的最大执行次数。标记只统计测试函数本身，不含fixture准备数据的查询。
+"""
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+from app.core.query_profiler import QueryProfile, install_query_profiler, profile_queries
+
+
+def _check_budget(profile: QueryProfile, max_queries: int, max_repeated: Optional[int]):
+    problems = []
+    if profile.count > max_queries:
+        problems.append(f"执行了{profile.count}次查询，预算为{max_queries}次")
+    if max_repeated is not None and profile.max_repeat > max_repeated:
+        problems.append(f"同一语句最多执行{profile.max_repeat}次，预算为{max_repeated}次")
+    if problems:
+        details = "\n".join(f"  {count}× {shape[:200]}" for shape, count in profile.repeated(1))
+        pytest.fail("超出查询预算: " + "；".join(problems) + f"\n{details}", pytrace=False)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(max_queries, max_repeated=None): 限制测试执行的SQL查询数"
+    )
+    install_query_profiler()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        yield
+        return
+    
+    with profile_queries() as profile:
+        outcome = yield
+    if outcome.excinfo is None:
+        max_queries = marker.args[0] if marker.args else marker.kwargs["max_queries"]
+        _check_budget(profile, max_queries, marker.kwargs.get("max_repeated"))
+
+
+@pytest.fixture
+def query_budget():
+    """返回上下文管理器，断言代码块内的查询数不超过预算"""
+    @contextmanager
+    def budget(max_queries: int, max_repeated: Optional[int] = None):
+        with profile_queries() as profile:
+            yield profile
+        _check_budget(profile, max_queries, max_repeated)
+    
+    return budget
@@ -255,3 +255,80 @@ class TestPricingEngineIntegration:
         
         # Thinking mode should increase price
         assert thinking_result["final_price"] > base_result["final_price"]
+
+
+class TestModelPriceLookup:
+    """Tests for batched model price lookups"""
+    
+    @staticmethod
+    def _row(code: str, name: str, input_price: float = 0.01):
+        """Build a fake products/product_prices join row"""
+        row = MagicMock()
+        row.product_code = code
+        row.product_name = name
+        row.category = "AI-大模型-文本生成"
+        row.unit = "千Token"
+        row.billing_mode = "token"
+        row.pricing_variables = {"input_price": input_price, "output_price": input_price * 3}
+        return row
+    
+    @staticmethod
+    def _mock_session(rows):
+        """Patch async_session_maker to return the given rows"""
+        session = MagicMock()
+        session.execute = AsyncMock(return_value=MagicMock(fetchall=MagicMock(return_value=rows)))
+        session_cm = MagicMock()
+        session_cm.__aenter__ = AsyncMock(return_value=session)
+        session_cm.__aexit__ = AsyncMock(return_value=False)
+        return patch("app.agents.tools.async_session_maker", return_value=session_cm), session
+    
+    @pytest.mark.asyncio
+    async def test_get_model_prices_single_query(self):
+        """All names are resolved from one query with exact > prefix > contains ranking"""
+        rows = [
+            self._row("qwen-max", "通义千问Max", 0.02),
+            self._row("qwen-max-latest", "通义千问Max-Latest", 0.024),
+            self._row("qwen-plus", "通义千问Plus", 0.0008),
+            self._row("qwen3-coder-plus", "Qwen3-Coder-Plus", 0.004),
+        ]
+        session_patch, session = self._mock_session(rows)
+        
+        with session_patch:
+            prices = await FunctionTools.get_model_prices(["qwen-max", "qwen-plus", "coder", "qwen-max", "gpt-4"])
+        
+        assert session.execute.await_count == 1
+        assert list(prices) == ["qwen-max", "qwen-plus", "coder", "gpt-4"]
+        assert prices["qwen-max"]["model_id"] == "qwen-max"
+        assert prices["qwen-plus"]["pricing"]["input_price"] == 0.0008
+        assert prices["coder"]["model_id"] == "qwen3-coder-plus"
+        assert prices["gpt-4"]["found"] is False
+    
+    def test_match_prefers_prefix_over_contains(self):
+        """A prefix match wins over a substring match, shortest code first"""
+        rows = [
+            self._row("my-qwen-turbo", "Custom"),
+            self._row("qwen-turbo-latest", "通义千问Turbo-Latest"),
+            self._row("qwen-turbo-2024", "通义千问Turbo-2024-Long"),
+        ]
+        
+        assert FunctionTools._match_product("qwen-turbo", rows).product_code == "qwen-turbo-2024"
+    
+    @pytest.mark.asyncio
+    async def test_generate_quote_item_single_lookup(self):
+        """Quote item generation looks up the price only once"""
+        price_info = {
+            "found": True,
+            "model_id": "qwen-max",
+            "model_name": "通义千问Max",
+            "category": "AI-大模型-文本生成",
+            "pricing": {"input_price": 0.02, "output_price": 0.06, "unit": "千Token"}
+        }
+        
+        with patch.object(FunctionTools, "get_model_prices", new_callable=AsyncMock,
+                          return_value={"qwen-max": price_info}) as mock_prices:
+            result = await FunctionTools.generate_quote_item("qwen-max", daily_calls=1000)
+        
+        assert mock_prices.await_count == 1
+        assert result["success"] is True
+        # (1000/1000*0.02 + 500/1000*0.06) * 1000 * 30 = 1500
+        assert result["quote_item"]["monthly_cost"] == 1500.0
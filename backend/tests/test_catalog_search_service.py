@@ -0,0 +1,242 @@
+"""
+目录关键词检索服务测试
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock, AsyncMock
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.pricing import PricingModel
+from app.services.catalog_search_service import (
+    TrigramIndex,
+    CatalogSearchService,
+    MATCH_EXACT,
+    MATCH_PREFIX,
+    MATCH_CONTAINS,
+    MATCH_FUZZY,
+    similarity,
+)
+
+
+@pytest.fixture
+def sample_index():
+    """四个定价模型的进程内索引"""
+    index = TrigramIndex()
+    index.add(1, "qwen-max", "qwen-max", "通义千问Max")
+    index.add(2, "qwen-max-latest", "qwen-max-latest", "通义千问Max最新版")
+    index.add(3, "qwen-plus", "qwen-plus", "通义千问Plus")
+    index.add(4, "deepseek-v3", "deepseek-v3", None)
+    return index
+
+
+def _mock_session(dialect: str = "sqlite"):
+    """构造指定方言的AsyncSession替身"""
+    db = MagicMock()
+    db.bind.dialect.name = dialect
+    db.execute = AsyncMock()
+    return db
+
+
+class TestTrigramIndex:
+    """进程内三元组索引测试"""
+    
+    def test_similarity(self):
+        """相同字符串相似度为1，无共同三元组为0"""
+        assert similarity("qwen-max", "QWEN-MAX") == 1.0
+        assert similarity("qwen-max", "xyz") == 0.0
+        assert 0 < similarity("qwen-max", "qwen-maks") < 1
+    
+    def test_search_ranks_exact_prefix_contains(self, sample_index):
+        """精确匹配优先，其次前缀，再次包含"""
+        results = sample_index.search("qwen-max")
+        
+        assert [(key, rank) for key, rank, _ in results] == [
+            (1, MATCH_EXACT),
+            (2, MATCH_PREFIX),
+            (3, MATCH_FUZZY),
+        ]
+        assert results[0][2] == 1.0
+        
+        contains = sample_index.search("max-latest")
+        assert contains[0][:2] == (2, MATCH_CONTAINS)
+    
+    def test_search_tolerates_typos(self, sample_index):
+        """拼写错误按相似度召回"""
+        results = sample_index.search("deepseek-v2")
+        
+        assert results[0][0] == 4
+        assert results[0][1] == MATCH_FUZZY
+        assert results[0][2] >= 0.3
+    
+    def test_short_keyword_uses_prefix_path(self, sample_index):
+        """不足三个字符的关键词只做前缀检索"""
+        results = sample_index.search("de")
+        
+        assert [key for key, _, _ in results] == [4]
+        assert results[0][1] == MATCH_PREFIX
+    
+    def test_prefix_search_matches_any_field(self, sample_index):
+        """前缀检索覆盖所有字段，同一文档只返回一次"""
+        results = sample_index.prefix_search("通义千问m")
+        
+        assert [key for key, _, _ in results] == [1, 2]
+    
+    def test_no_match(self, sample_index):
+        """无关关键词返回空列表"""
+        assert sample_index.search("完全无关的词") == []
+        assert sample_index.search("  ") == []
+
+
+class TestCatalogSearchService:
+    """目录检索服务测试"""
+    
+    def test_escape_like(self):
+        """LIKE通配符按字面匹配"""
+        assert CatalogSearchService.escape_like("100%_a\\b") == "100\\%\\_a\\\\b"
+    
+    def test_keyword_condition_uses_escape(self):
+        """包含条件使用转义后的ILIKE"""
+        service = CatalogSearchService()
+        condition = service.keyword_condition([PricingModel.model_code], "qwen_max")
+        compiled = condition.compile(dialect=postgresql.dialect())
+        
+        assert list(compiled.params.values()) == ["%qwen\\_max%"]
+        assert "ILIKE" in str(compiled)
+        assert "ESCAPE" in str(compiled)
+    
+    @pytest.mark.asyncio
+    async def test_relevance_keys_compile_with_similarity(self):
+        """启用pg_trgm时排序包含similarity"""
+        service = CatalogSearchService()
+        service._trgm_enabled = True
+        
+        keys = await service.relevance_keys(_mock_session("postgresql"), service.PRICING_COLUMNS, "qwen")
+        sql = str(select(PricingModel.id).order_by(*[k.expression for k in keys]).compile(dialect=postgresql.dialect()))
+        
+        assert [k.descending for k in keys] == [False, True]
+        
+        assert "CASE" in sql
+        assert "similarity" in sql
+        assert "greatest" in sql
+    
+    @pytest.mark.asyncio
+    async def test_trgm_disabled_for_non_postgres(self):
+        """非PostgreSQL数据库不查询pg_extension"""
+        service = CatalogSearchService()
+        db = _mock_session("sqlite")
+        
+        assert await service.is_trgm_enabled(db) is False
+        db.execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_search_pricing_models_local_fallback(self):
+        """未启用pg_trgm时使用进程内索引，同一model_code只返回一条"""
+        service = CatalogSearchService()
+        db = _mock_session("sqlite")
+        
+        rows = [
+            SimpleNamespace(id=1, model_code="qwen-max", model_name="qwen-max", display_name="通义千问Max"),
+            SimpleNamespace(id=2, model_code="qwen-max", model_name="qwen-max", display_name="通义千问Max-Batch"),
+            SimpleNamespace(id=3, model_code="qwen-max-latest", model_name="qwen-max-latest", display_name="通义千问Max最新版"),
+            SimpleNamespace(id=4, model_code="qwen-plus", model_name="qwen-plus", display_name="通义千问Plus"),
+        ]
+        index_result = MagicMock()
+        index_result.all.return_value = rows
+        models_result = MagicMock()
+        models_result.scalars.return_value.all.return_value = rows
+        db.execute.side_effect = [index_result, models_result]
+        
+        matches = await service.search_pricing_models(db, "Qwen-Max", limit=5)
+        
+        assert [(m.id, match_type) for m, match_type, _ in matches] == [
+            (1, "exact"),
+            (3, "prefix"),
+            (4, "fuzzy"),
+        ]
+        
+        # 索引已缓存，再次检索只回表一次
+        db.execute.side_effect = [models_result]
+        await service.search_pricing_models(db, "qwen", limit=5)
+        assert db.execute.await_count == 3
+    
+    def test_invalidate_rebuilds_index(self):
+        """invalidate后重新加载索引"""
+        service = CatalogSearchService()
+        service._indexes["pricing_model"] = (TrigramIndex(), 0.0)
+        service.invalidate()
+        
+        assert service._indexes == {}
+
+
+class TestResolveProductNames:
+    """批量名称解析测试"""
+    
+    PRODUCTS = [
+        SimpleNamespace(product_code="qwen-max", product_name="通义千问-Max"),
+        SimpleNamespace(product_code="qwen-plus", product_name="通义千问-Plus"),
+        SimpleNamespace(product_code="text-embedding-v3", product_name="通用文本向量-v3"),
+    ]
+    
+    @pytest.mark.asyncio
+    async def test_local_resolution_single_round_trip(self):
+        """无pg_trgm时加载一次索引即可解析任意数量名称"""
+        service = CatalogSearchService()
+        db = _mock_session("sqlite")
+        index_result = MagicMock()
+        index_result.all.return_value = self.PRODUCTS
+        db.execute.return_value = index_result
+        
+        names = ["QWEN-MAX", "通义千问-plus", "text-embeding-v3", "unknown-model"] * 25
+        resolved = await service.resolve_product_names(db, names)
+        
+        assert db.execute.await_count == 1
+        assert resolved["qwen-max"] == ("qwen-max", "通义千问-Max", "exact", 1.0)
+        assert resolved["通义千问-plus"][:3] == ("qwen-plus", "通义千问-Plus", "exact")
+        assert resolved["text-embeding-v3"][:3] == ("text-embedding-v3", "通用文本向量-v3", "fuzzy")
+        assert "unknown-model" not in resolved
+    
+    @pytest.mark.asyncio
+    async def test_trgm_resolution_two_queries(self):
+        """启用pg_trgm时精确匹配与模糊匹配各一次查询"""
+        service = CatalogSearchService()
+        service._trgm_enabled = True
+        db = _mock_session("postgresql")
+        
+        exact_result = MagicMock()
+        exact_result.all.return_value = [self.PRODUCTS[0]]
+        fuzzy_result = MagicMock()
+        fuzzy_result.all.return_value = [
+            SimpleNamespace(term="qwen-pl", product_code="qwen-plus", product_name="通义千问-Plus", score=0.6),
+            SimpleNamespace(term="embedding", product_code="text-embedding-v3", product_name="通用文本向量-v3", score=0.45),
+        ]
+        db.execute.side_effect = [exact_result, fuzzy_result]
+        
+        resolved = await service.resolve_product_names(db, ["qwen-max", "Qwen-Pl", "embedding", "nothing_here"])
+        
+        assert db.execute.await_count == 2
+        fuzzy_params = db.execute.await_args_list[1].args[1]
+        assert fuzzy_params == {
+            "terms": ["qwen-pl", "embedding", "nothing_here"],
+            "patterns": ["%qwen-pl%", "%embedding%", "%nothing\\_here%"],
+        }
+        assert resolved["qwen-max"][2] == "exact"
+        assert resolved["qwen-pl"][2:] == ("prefix", 0.6)
+        assert resolved["embedding"][2:] == ("contains", 0.45)
+        assert "nothing_here" not in resolved
+    
+    @pytest.mark.asyncio
+    async def test_search_by_names_keeps_request_order(self):
+        """search_by_names按请求顺序返回，重复名称各自保留"""
+        from app.services.product_filter_service import ProductFilterService
+        
+        resolved = {"qwen-max": ("qwen-max", "通义千问-Max", "exact", 1.0)}
+        with patch(
+            "app.services.product_filter_service.catalog_search_service.resolve_product_names",
+            new=AsyncMock(return_value=resolved)
+        ):
+            response = await ProductFilterService().search_by_names(MagicMock(), ["qwen-max", "missing", " Qwen-Max "])
+        
+        assert [item.search_term for item in response.found] == ["qwen-max", " Qwen-Max "]
+        assert response.found[0].score == 1.0
+        assert response.not_found == ["missing"]
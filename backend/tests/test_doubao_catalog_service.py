@@ -0,0 +1,107 @@
+"""
+豆包目录服务测试
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.database import Base
+from app.models.doubao import DoubaoSnapshot, DoubaoCategory, DoubaoModel
+from app.services.doubao_catalog_service import DoubaoCatalogService
+from app.services.snapshot_cache import SnapshotCache
+
+
+DOUBAO_TABLES = [DoubaoSnapshot.__table__, DoubaoCategory.__table__, DoubaoModel.__table__]
+
+
+def _model(id, category_id, provider, service_type, status="active", snapshot_id=2):
+    return {
+        "id": id, "snapshot_id": snapshot_id, "category_id": category_id, "provider": provider,
+        "model_name": f"model-{id}", "service_type": service_type, "price": 0.001,
+        "unit": "元/千tokens", "status": status,
+    }
+
+
+@pytest.fixture
+async def session():
+    """内存SQLite会话：旧快照1与最新快照2"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=DOUBAO_TABLES))
+        await conn.execute(insert(DoubaoSnapshot.__table__), [
+            {"id": 1, "source_url": "https://example.com", "is_latest": False, "total_count": 1,
+             "crawl_time": datetime(2025, 12, 1, 8, 0)},
+            {"id": 2, "source_url": "https://example.com", "is_latest": True, "total_count": 4,
+             "crawl_time": datetime(2026, 1, 1, 8, 0)},
+        ])
+        await conn.execute(insert(DoubaoCategory.__table__), [
+            {"id": 1, "snapshot_id": 1, "code": "llm", "name": "旧分类", "sort_order": 1, "model_count": 1},
+            {"id": 2, "snapshot_id": 2, "code": "deep_thinking", "name": "深度思考模型", "sort_order": 2, "model_count": 1},
+            {"id": 3, "snapshot_id": 2, "code": "llm", "name": "大语言模型", "sort_order": 1, "model_count": 3},
+        ])
+        await conn.execute(insert(DoubaoModel.__table__), [
+            _model(1, 1, "字节跳动", "推理（输入）", snapshot_id=1),
+            _model(2, 3, "字节跳动", "推理（输入）"),
+            _model(3, 3, "字节跳动", "推理（输出）"),
+            _model(4, 3, "深度求索", None, status="inactive"),
+            _model(5, 2, "深度求索", "推理（输入）"),
+        ])
+    
+    async with AsyncSession(engine) as db:
+        yield db
+    await engine.dispose()
+
+
+@pytest.fixture
+def cache():
+    cache = SnapshotCache("test", DoubaoSnapshot)
+    with patch("app.services.doubao_catalog_service.doubao_snapshot_cache", cache), \
+            patch("app.services.snapshot_cache.get_redis", new=AsyncMock(return_value=None)):
+        yield cache
+
+
+class TestDoubaoCatalogService:
+    """豆包目录测试"""
+    
+    @pytest.mark.asyncio
+    async def test_catalog_contents(self, session, cache):
+        """目录只包含最新快照，计数只统计上架模型"""
+        catalog = await DoubaoCatalogService().get_catalog(session)
+        
+        assert catalog["snapshot"]["id"] == 2
+        assert catalog["snapshot"]["crawl_time"] == "2026-01-01T08:00:00"
+        assert [c["code"] for c in catalog["categories"]] == ["llm", "deep_thinking"]
+        assert sorted((p["name"], p["model_count"]) for p in catalog["providers"]) == [("字节跳动", 2), ("深度求索", 1)]
+        assert catalog["service_types"] == ["推理（输入）", "推理（输出）"]
+        assert catalog["filters"]["providers"] == ["字节跳动", "深度求索"]
+        assert catalog["facets"] == {
+            "categories": {"大语言模型": 2, "深度思考模型": 1},
+            "providers": {"字节跳动": 2, "深度求索": 1},
+            "service_types": {"推理（输入）": 2, "推理（输出）": 1},
+        }
+    
+    @pytest.mark.asyncio
+    async def test_cached_until_new_snapshot(self, session, cache):
+        """同一快照内复用目录，导入新快照后重建"""
+        service = DoubaoCatalogService()
+        await service.get_catalog(session)
+        
+        with patch.object(session, "execute", side_effect=AssertionError("should hit cache")):
+            assert await service.get_snapshot_id(session) == 2
+        
+        await session.execute(DoubaoSnapshot.__table__.update().values(is_latest=False))
+        await session.execute(insert(DoubaoSnapshot.__table__).values(id=3, source_url="https://example.com", is_latest=True))
+        cache.check_interval = 0
+        
+        catalog = await service.get_catalog(session)
+        assert catalog["snapshot"]["id"] == 3
+        assert catalog["categories"] == []
+    
+    @pytest.mark.asyncio
+    async def test_no_snapshot(self, session, cache):
+        """没有最新快照时返回空目录"""
+        await session.execute(DoubaoSnapshot.__table__.update().values(is_latest=False))
+        
+        assert await DoubaoCatalogService().get_snapshot_id(session) is None
@@ -0,0 +1,128 @@
+"""
+分面计数测试
+"""
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.database import Base
+from app.core.facets import Facet, facet_counts
+from app.models.pricing import PricingSnapshot, PricingCategory, PricingModel
+
+
+PRICING_TABLES = [PricingSnapshot.__table__, PricingCategory.__table__, PricingModel.__table__]
+
+FACETS = [
+    Facet("category", PricingCategory.code),
+    Facet("mode", PricingModel.mode),
+    Facet("supports_batch", PricingModel.supports_batch),
+]
+
+
+def _model(id, category_id, mode, supports_batch, status="active"):
+    return {
+        "id": id, "category_id": category_id, "model_code": f"m{id}", "model_name": f"m{id}",
+        "display_name": f"m{id}", "mode": mode, "supports_batch": supports_batch, "status": status,
+    }
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=PRICING_TABLES))
+        await conn.execute(insert(PricingCategory.__table__), [
+            {"id": 1, "code": "llm", "name": "文本生成"},
+            {"id": 2, "code": "video", "name": "视频生成"},
+        ])
+        await conn.execute(insert(PricingModel.__table__), [
+            _model(1, 1, "仅思考模式", True),
+            _model(2, 1, "仅非思考模式", False),
+            _model(3, 1, "仅思考模式", False),
+            _model(4, 2, None, True),
+            _model(5, 2, "仅思考模式", True, status="inactive"),
+        ])
+    
+    async with AsyncSession(engine) as db:
+        yield db
+    await engine.dispose()
+
+
+def _universe():
+    return select(PricingModel.id).outerjoin(PricingCategory, PricingModel.category_id == PricingCategory.id)
+
+
+class TestFacetCounts:
+    """分面计数（SQLite内存统计路径）"""
+    
+    async def test_counts_all_facets_in_one_query(self, session):
+        session.execute = AsyncMock(wraps=session.execute)
+        counts = await facet_counts(
+            session, _universe(), FACETS, conditions=[PricingModel.status == "active"]
+        )
+        
+        assert session.execute.await_count == 1
+        assert counts["category"] == {"llm": 3, "video": 1}
+        assert counts["mode"] == {"仅思考模式": 2, "仅非思考模式": 1, None: 1}
+        assert counts["supports_batch"] == {True: 2, False: 2}
+    
+    async def test_filter_excludes_own_facet(self, session):
+        counts = await facet_counts(
+            session,
+            _universe(),
+            FACETS,
+            conditions=[PricingModel.status == "active"],
+            filters={"category": PricingCategory.code == "llm", "mode": PricingModel.mode == "仅思考模式"}
+        )
+        
+        # 分类计数只应用模式筛选：llm下2个思考模型，video下无
+        assert counts["category"] == {"llm": 2, "video": 0}
+        # 模式计数只应用分类筛选
+        assert counts["mode"] == {"仅思考模式": 2, "仅非思考模式": 1, None: 0}
+        # 其他维度应用全部筛选
+        assert counts["supports_batch"] == {True: 1, False: 1}
+    
+    async def test_count_key_deduplicates_joined_rows(self, session):
+        query = select(PricingCategory.id).outerjoin(
+            PricingModel, PricingModel.category_id == PricingCategory.id
+        )
+        counts = await facet_counts(
+            session, query, [Facet("category", PricingCategory.code)], count_key=PricingCategory.id
+        )
+        
+        assert counts["category"] == {"llm": 1, "video": 1}
+
+
+class TestGroupingSets:
+    """PostgreSQL使用GROUPING SETS"""
+    
+    async def test_postgresql_query_and_result_mapping(self):
+        db = MagicMock()
+        db.bind.dialect.name = "postgresql"
+        rows = [
+            MagicMock(_mapping={"value_0": "llm", "grouping_0": 0, "count_0": 3,
+                                "value_1": None, "grouping_1": 1, "count_1": 3,
+                                "value_2": None, "grouping_2": 1, "count_2": 3}),
+            MagicMock(_mapping={"value_0": None, "grouping_0": 1, "count_0": 2,
+                                "value_1": "仅思考模式", "grouping_1": 0, "count_1": 2,
+                                "value_2": None, "grouping_2": 1, "count_2": 2}),
+            MagicMock(_mapping={"value_0": None, "grouping_0": 1, "count_0": 1,
+                                "value_1": None, "grouping_1": 0, "count_1": 1,
+                                "value_2": None, "grouping_2": 1, "count_2": 1}),
+        ]
+        result = MagicMock()
+        result.all.return_value = rows
+        db.execute = AsyncMock(return_value=result)
+        
+        counts = await facet_counts(
+            db, _universe(), FACETS,
+            conditions=[PricingModel.status == "active"],
+            filters={"mode": PricingModel.mode == "仅思考模式"}
+        )
+        
+        assert counts == {"category": {"llm": 3}, "mode": {"仅思考模式": 2, None: 1}, "supports_batch": {}}
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "GROUP BY GROUPING SETS" in sql
+        assert sql.count("FILTER (WHERE") == 3
@@ -0,0 +1,158 @@
+"""
+后台健康检查测试
+"""
+import asyncio
+
+from app.core.health_monitor import DEGRADED, HEALTHY, UNHEALTHY, HealthMonitor
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingProbe:
+    """记录调用次数，可切换为失败或挂起"""
+    
+    def __init__(self, fail: bool = False, delay: float = 0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+    
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("connection refused")
+
+
+def _monitor(clock=None, pools=None, **kwargs) -> HealthMonitor:
+    return HealthMonitor(
+        interval=10,
+        timeout=0.5,
+        history_size=3,
+        pools=pools or (lambda: {}),
+        clock=clock or FakeClock(),
+        **kwargs
+    )
+
+
+class TestProbing:
+    """探测结果与历史"""
+    
+    async def test_records_status_latency_and_bounded_history(self):
+        probe = CountingProbe()
+        monitor = _monitor()
+        monitor.add_check("database", probe)
+        
+        for _ in range(2):
+            await monitor.run_checks()
+        probe.fail = True
+        for _ in range(2):
+            await monitor.run_checks()
+        
+        snapshot = monitor.snapshot(include_history=True)
+        check = snapshot["checks"]["database"]
+        assert check["status"] == UNHEALTHY
+        assert check["message"] == "connection refused"
+        assert check["latency_ms"] >= 0
+        assert [item["status"] for item in check["history"]] == [HEALTHY, UNHEALTHY, UNHEALTHY]
+        assert check["healthy_ratio"] == round(1 / 3, 4)
+        assert snapshot["status"] == DEGRADED
+    
+    async def test_timeout_marks_unhealthy(self):
+        monitor = _monitor()
+        monitor.add_check("redis", CountingProbe(delay=5))
+        
+        await monitor.run_checks()
+        
+        result = monitor.latest("redis")
+        assert result.status == UNHEALTHY
+        assert "超时" in result.message
+
+
+class TestCaching:
+    """健康检查接口使用缓存结果"""
+    
+    async def test_fresh_results_are_not_reprobed(self):
+        clock = FakeClock()
+        probe = CountingProbe()
+        monitor = _monitor(clock)
+        monitor.add_check("database", probe)
+        
+        await monitor.ensure_fresh()
+        clock.now += 25
+        await monitor.ensure_fresh()
+        assert probe.calls == 1
+        
+        clock.now += 10
+        assert monitor.is_stale()
+        assert not monitor.is_ready()
+        await monitor.ensure_fresh()
+        assert probe.calls == 2
+        assert monitor.is_ready()
+    
+    async def test_concurrent_refreshes_share_one_probe(self):
+        probe = CountingProbe(delay=0.05)
+        monitor = _monitor()
+        monitor.add_check("database", probe)
+        
+        await asyncio.gather(*(monitor.ensure_fresh() for _ in range(10)))
+        
+        assert probe.calls == 1
+    
+    async def test_background_loop_updates_results(self):
+        probe = CountingProbe()
+        monitor = HealthMonitor(interval=0.01, pools=lambda: {})
+        monitor.add_check("database", probe)
+        
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        
+        assert probe.calls >= 2
+        assert monitor.is_ready()
+
+
+class TestReadiness:
+    """就绪与降级"""
+    
+    async def test_non_critical_failure_only_degrades(self):
+        monitor = _monitor()
+        monitor.add_check("database", CountingProbe())
+        monitor.add_check("database_replica", CountingProbe(fail=True), critical=False)
+        
+        await monitor.run_checks()
+        
+        assert monitor.is_ready()
+        assert monitor.snapshot()["status"] == DEGRADED
+    
+    async def test_critical_failure_is_not_ready(self):
+        monitor = _monitor()
+        monitor.add_check("database", CountingProbe())
+        monitor.add_check("redis", CountingProbe(fail=True))
+        
+        await monitor.run_checks()
+        
+        assert not monitor.is_ready()
+    
+    async def test_pool_saturation_and_loop_lag_degrade(self):
+        usage = {"primary": {"size": 20, "max_overflow": 10, "checked_out": 29, "saturation": 0.9667}}
+        monitor = _monitor(pools=lambda: usage)
+        monitor.add_check("database", CountingProbe())
+        await monitor.run_checks()
+        
+        snapshot = monitor.snapshot()
+        assert snapshot["db_pools"]["primary"]["status"] == DEGRADED
+        assert snapshot["status"] == DEGRADED
+        assert monitor.is_ready()
+        
+        usage["primary"]["saturation"] = 0.1
+        monitor._lag_samples.append(0.8)
+        snapshot = monitor.snapshot()
+        assert snapshot["event_loop"] == {"status": DEGRADED, "lag_ms": 800.0, "max_lag_ms": 800.0}
+        assert snapshot["status"] == DEGRADED
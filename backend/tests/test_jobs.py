@@ -0,0 +1,300 @@
+"""
+后台任务队列测试
+"""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.api.v1.endpoints import crawler as crawler_endpoint
+from app.api.v1.endpoints import jobs as jobs_endpoint
+from app.core.jobs import JobQueue, JobQueueUnavailable, JobStatus, JobWorker, job_handler
+from app.models.crawler import CrawlerTask, TaskStatus
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """只实现任务队列用到的命令（单个流、单个消费组），空闲时间按FakeClock计算"""
+    
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.hashes = {}
+        self.zsets = {}
+        self.entries = []  # [(消息ID, 字段)]
+        self.delivered = 0  # 消费组已投递到的位置
+        self.pending = {}  # 消息ID -> (消费者, 最近投递时间)
+        self._seq = 0
+    
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+    
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+    
+    async def expire(self, key, seconds):
+        return True
+    
+    async def xadd(self, name, fields):
+        self._seq += 1
+        message_id = f"{self._seq}-0"
+        self.entries.append((message_id, dict(fields)))
+        return message_id
+    
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        return True
+    
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        messages = self.entries[self.delivered:self.delivered + count]
+        self.delivered += len(messages)
+        for message_id, _ in messages:
+            self.pending[message_id] = (consumername, self.clock())
+        return [["jobs:stream", messages]] if messages else []
+    
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        claimed = []
+        for message_id, fields in self.entries:
+            owner = self.pending.get(message_id)
+            if owner and (self.clock() - owner[1]) * 1000 >= min_idle_time and len(claimed) < count:
+                self.pending[message_id] = (consumername, self.clock())
+                claimed.append((message_id, fields))
+        return ["0-0", claimed, []]
+    
+    async def xclaim(self, name, groupname, consumername, min_idle_time, message_ids, justid=False):
+        for message_id in message_ids:
+            self.pending[message_id] = (consumername, self.clock())
+        return message_ids
+    
+    async def xack(self, name, groupname, *message_ids):
+        for message_id in message_ids:
+            self.pending.pop(message_id, None)
+    
+    async def xdel(self, name, *message_ids):
+        index = {message_id for message_id, _ in self.entries[:self.delivered]} & set(message_ids)
+        self.delivered -= len(index)
+        self.entries = [entry for entry in self.entries if entry[0] not in message_ids]
+    
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+    
+    async def eval(self, script, numkeys, delayed_key, stream, now, limit):
+        zset = self.zsets.get(delayed_key, {})
+        due = sorted((score, job_id) for job_id, score in zset.items() if score <= now)[:limit]
+        for _, job_id in due:
+            del zset[job_id]
+            await self.xadd(stream, {"job_id": job_id})
+        return [job_id for _, job_id in due]
+
+
+calls = []
+gates = {}
+failures = []
+
+
+async def record_failure(job_id, payload, error):
+    failures.append((job_id, payload, error))
+
+
+@job_handler("test.echo")
+async def echo_job(ctx, value):
+    await ctx.report_progress(50, "处理中")
+    calls.append((ctx.job_id, (await ctx.queue.get(ctx.job_id))["progress"]))
+    return {"value": value}
+
+
+@job_handler("test.flaky", on_failure=record_failure)
+async def flaky_job(ctx, failures):
+    if ctx.attempt <= failures:
+        raise RuntimeError(f"第{ctx.attempt}次失败")
+    return {"attempt": ctx.attempt}
+
+
+@job_handler("test.wait")
+async def wait_job(ctx, gate):
+    await gates[gate].wait()
+    return {"gate": gate}
+
+
+def _setup(concurrency: int = 4):
+    clock = FakeClock()
+    redis = FakeRedis(clock)
+    queue = JobQueue(redis_getter=lambda: redis, clock=clock)
+    worker = JobWorker(queue, concurrency=concurrency, visibility_timeout=60, retry_backoff=10)
+    return clock, redis, queue, worker
+
+
+class TestJobQueue:
+    """入队、执行与结果"""
+    
+    async def test_job_runs_and_reports_progress(self):
+        _, redis, queue, worker = _setup()
+        
+        job_id = await queue.enqueue("test.echo", {"value": 42})
+        assert (await queue.get(job_id))["status"] == JobStatus.QUEUED
+        
+        assert await worker.poll() == 1
+        await worker.drain()
+        
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.SUCCEEDED
+        assert job["result"] == {"value": 42}
+        assert job["progress"] == 100
+        assert job["attempts"] == 1
+        assert (job_id, 50.0) in calls
+        assert not redis.pending and not redis.entries
+    
+    async def test_unknown_handler_and_missing_redis(self):
+        _, _, queue, _ = _setup()
+        with pytest.raises(ValueError):
+            await queue.enqueue("test.missing")
+        
+        offline = JobQueue(redis_getter=lambda: None)
+        with pytest.raises(JobQueueUnavailable):
+            await offline.enqueue("test.echo", {"value": 1})
+    
+    async def test_concurrency_is_bounded(self):
+        _, _, queue, worker = _setup(concurrency=2)
+        gates["bounded"] = asyncio.Event()
+        job_ids = [await queue.enqueue("test.wait", {"gate": "bounded"}) for _ in range(3)]
+        
+        assert await worker.poll() == 2
+        assert await worker.poll() == 0
+        
+        gates["bounded"].set()
+        await worker.drain()
+        assert await worker.poll() == 1
+        await worker.drain()
+        assert [(await queue.get(job_id))["status"] for job_id in job_ids] == [JobStatus.SUCCEEDED] * 3
+
+
+class TestRetries:
+    """失败重试与故障接管"""
+    
+    async def test_retries_with_backoff(self):
+        clock, _, queue, worker = _setup()
+        job_id = await queue.enqueue("test.flaky", {"failures": 1})
+        
+        await worker.poll()
+        await worker.drain()
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.RETRYING
+        assert job["retry_at"] == clock.now + 10
+        
+        # 退避时间未到不重新执行
+        assert await worker.poll() == 0
+        clock.now += 10
+        assert await worker.poll() == 1
+        await worker.drain()
+        
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.SUCCEEDED
+        assert job["result"] == {"attempt": 2}
+    
+    async def test_fails_after_max_attempts(self):
+        clock, _, queue, worker = _setup()
+        job_id = await queue.enqueue("test.flaky", {"failures": 5}, max_attempts=2)
+        
+        await worker.poll()
+        await worker.drain()
+        clock.now += 10
+        await worker.poll()
+        await worker.drain()
+        
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.FAILED
+        assert job["error"] == "第2次失败"
+        assert job["attempts"] == 2
+        # 只在最终失败时回调一次
+        assert [f for f in failures if f[0] == job_id] == [(job_id, {"failures": 5}, "第2次失败")]
+    
+    async def test_failure_hook_after_crash_on_last_attempt(self):
+        clock, redis, queue, crashed = _setup()
+        job_id = await queue.enqueue("test.flaky", {"failures": 5}, max_attempts=1)
+        
+        # 最后一次执行期间worker崩溃，接管后超过最大次数
+        await queue.update(job_id, status=JobStatus.RUNNING, attempts=1)
+        await redis.xreadgroup("jobs:workers", crashed.consumer, {"jobs:stream": ">"}, count=1)
+        clock.now += 61
+        standby = JobWorker(queue, visibility_timeout=60)
+        assert await standby.poll() == 1
+        await standby.drain()
+        
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.FAILED
+        assert job["error"] == "超过最大重试次数"
+        assert (job_id, {"failures": 5}, "超过最大重试次数") in failures
+        assert not redis.pending
+    
+    async def test_unacked_job_is_taken_over_after_visibility_timeout(self):
+        clock, redis, queue, crashed = _setup()
+        gates["crash"] = asyncio.Event()
+        job_id = await queue.enqueue("test.wait", {"gate": "crash"})
+        
+        # 第一个worker领取后被终止，消息未确认
+        await crashed.poll()
+        await asyncio.sleep(0)
+        await crashed.stop(timeout=0)
+        assert (await queue.get(job_id))["status"] == JobStatus.RUNNING
+        
+        standby = JobWorker(queue, visibility_timeout=60)
+        assert await standby.poll() == 0
+        clock.now += 61
+        gates["crash"].set()
+        assert await standby.poll() == 1
+        await standby.drain()
+        
+        job = await queue.get(job_id)
+        assert job["status"] == JobStatus.SUCCEEDED
+        assert job["attempts"] == 2
+        assert not redis.pending
+
+
+class TestJobsEndpoint:
+    """任务状态查询接口"""
+    
+    async def test_get_job(self, monkeypatch):
+        _, _, queue, _ = _setup()
+        monkeypatch.setattr(jobs_endpoint, "job_queue", queue)
+        job_id = await queue.enqueue("test.echo", {"value": 1})
+        
+        app = FastAPI()
+        app.include_router(jobs_endpoint.router, prefix="/jobs")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get(f"/jobs/{job_id}")
+            assert response.status_code == 200
+            assert response.json()["status"] == "queued"
+            assert response.json()["name"] == "test.echo"
+            
+            assert (await client.get("/jobs/missing")).status_code == 404
+
+
+class TestCrawlerTaskStaleness:
+    """手动触发爬虫任务时失效记录的判断"""
+    
+    async def test_stale_rows(self, monkeypatch):
+        _, _, queue, _ = _setup()
+        monkeypatch.setattr(crawler_endpoint, "job_queue", queue)
+        
+        def task(status):
+            return CrawlerTask(task_id="t1", task_type="aliyun", status=status)
+        
+        # 刚提交、尚未入队的待执行记录在宽限期内仍有效（并发触发不会误判）
+        assert not await crawler_endpoint._is_stale(task(TaskStatus.PENDING), past_grace_period=False)
+        assert await crawler_endpoint._is_stale(task(TaskStatus.PENDING), past_grace_period=True)
+        # 定时调度的运行中记录没有后台任务
+        assert not await crawler_endpoint._is_stale(task(TaskStatus.RUNNING), past_grace_period=True)
+        
+        await queue.enqueue("test.echo", {"value": 1}, job_id="t1")
+        assert not await crawler_endpoint._is_stale(task(TaskStatus.PENDING), past_grace_period=True)
+        await queue.update("t1", status=JobStatus.FAILED)
+        assert await crawler_endpoint._is_stale(task(TaskStatus.RUNNING), past_grace_period=False)
+        
+        monkeypatch.setattr(crawler_endpoint, "job_queue", JobQueue(redis_getter=lambda: None))
+        assert not await crawler_endpoint._is_stale(task(TaskStatus.PENDING), past_grace_period=True)
@@ -0,0 +1,159 @@
+"""
+主节点选举测试
+"""
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.leader_election import LeaderElection, _RELEASE_SCRIPT, _RENEW_SCRIPT
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """只实现选举用到的命令，过期时间按FakeClock计算"""
+    
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.keys = {}
+        self.down = False
+    
+    def _get(self, key):
+        value, expires_at = self.keys.get(key, (None, 0))
+        return value if self.clock() < expires_at else None
+    
+    async def set(self, key, value, px=None, nx=False):
+        if self.down:
+            raise RedisConnectionError("connection refused")
+        if nx and self._get(key) is not None:
+            return None
+        self.keys[key] = (value, self.clock() + px / 1000)
+        return True
+    
+    async def eval(self, script, numkeys, key, identity, *args):
+        if self.down:
+            raise RedisConnectionError("connection refused")
+        if self._get(key) != identity:
+            return 0
+        if script == _RENEW_SCRIPT:
+            self.keys[key] = (identity, self.clock() + args[0] / 1000)
+        elif script == _RELEASE_SCRIPT:
+            del self.keys[key]
+        return 1
+
+
+class Recorder:
+    """记录主节点回调"""
+    
+    def __init__(self):
+        self.events = []
+    
+    async def elected(self):
+        self.events.append("elected")
+    
+    async def revoked(self):
+        self.events.append("revoked")
+
+
+def _election(redis, clock, identity, recorder=None) -> LeaderElection:
+    recorder = recorder or Recorder()
+    return LeaderElection(
+        "test",
+        lease_seconds=30,
+        on_elected=recorder.elected,
+        on_revoked=recorder.revoked,
+        redis_getter=lambda: redis,
+        identity=identity,
+        clock=clock
+    )
+
+
+class TestLeaderElection:
+    """租约选举与故障转移"""
+    
+    async def test_only_one_leader(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        recorders = [Recorder() for _ in range(3)]
+        elections = [_election(redis, clock, f"worker-{i}", recorders[i]) for i in range(3)]
+        
+        results = [await election.run_once() for election in elections]
+        
+        assert results == [True, False, False]
+        assert [recorder.events for recorder in recorders] == [["elected"], [], []]
+    
+    async def test_renewal_keeps_leadership(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        leader = _election(redis, clock, "worker-a")
+        standby = _election(redis, clock, "worker-b")
+        await leader.run_once()
+        
+        for _ in range(5):
+            clock.now += leader.renew_interval
+            assert await leader.run_once()
+            assert not await standby.run_once()
+    
+    async def test_failover_after_lease_expires(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        recorder = Recorder()
+        leader = _election(redis, clock, "worker-a")
+        standby = _election(redis, clock, "worker-b", recorder)
+        await leader.run_once()
+        
+        # 主节点卡住不再续约
+        clock.now += 29
+        assert not await standby.run_once()
+        clock.now += 2
+        assert await standby.run_once()
+        assert recorder.events == ["elected"]
+        
+        # 旧主节点恢复后发现租约已被接管
+        assert not await leader.run_once()
+    
+    async def test_release_hands_over_immediately(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        recorder = Recorder()
+        leader = _election(redis, clock, "worker-a", recorder)
+        standby = _election(redis, clock, "worker-b")
+        await leader.run_once()
+        
+        await leader.stop()
+        
+        assert recorder.events == ["elected", "revoked"]
+        assert await standby.run_once()
+    
+    async def test_steps_down_before_lease_expires_when_redis_is_down(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        recorder = Recorder()
+        leader = _election(redis, clock, "worker-a", recorder)
+        await leader.run_once()
+        
+        redis.down = True
+        clock.now += leader.renew_interval
+        assert await leader.run_once()
+        clock.now += leader.renew_interval
+        assert not await leader.run_once()
+        assert recorder.events == ["elected", "revoked"]
+    
+    async def test_failed_start_releases_lease(self):
+        clock = FakeClock()
+        redis = FakeRedis(clock)
+        
+        async def broken():
+            raise RuntimeError("scheduler failed")
+        
+        leader = LeaderElection(
+            "test", on_elected=broken, redis_getter=lambda: redis, identity="worker-a", clock=clock
+        )
+        standby = _election(redis, clock, "worker-b")
+        
+        assert not await leader.run_once()
+        assert await standby.run_once()
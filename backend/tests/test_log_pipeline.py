@@ -0,0 +1,112 @@
+"""
+日志管道测试
+"""
+import gzip
+import json
+import threading
+from datetime import date
+
+from loguru import logger
+
+from app.core.log_pipeline import AccessLogSampler, DailyFileWriter, LogQueue, LogStats
+
+
+class TestLogQueue:
+    """有界日志队列"""
+    
+    def test_writes_in_background_thread(self):
+        log_queue = LogQueue(maxsize=100)
+        written = []
+        sink = log_queue.sink(lambda message: written.append((message, threading.current_thread().name)))
+        
+        sink("hello\n")
+        assert log_queue.flush()
+        log_queue.stop()
+        
+        assert written == [("hello\n", "log-writer")]
+        assert log_queue.stats.snapshot()["written"] == 1
+    
+    def test_drops_when_full_without_blocking(self):
+        log_queue = LogQueue(maxsize=2)
+        release = threading.Event()
+        sink = log_queue.sink(lambda message: release.wait(5))
+        
+        for i in range(10):
+            sink(f"line {i}\n")
+        stats = log_queue.stats.snapshot()
+        release.set()
+        log_queue.stop()
+        
+        # 后台线程最多取走1条，队列中2条，其余丢弃
+        assert stats["enqueued"] + stats["dropped"] == 10
+        assert stats["dropped"] >= 7
+    
+    def test_writer_errors_are_counted(self):
+        log_queue = LogQueue(maxsize=10)
+        
+        def failing_writer(message):
+            raise OSError("disk full")
+        
+        sink = log_queue.sink(failing_writer)
+        sink("line\n")
+        log_queue.flush()
+        log_queue.stop()
+        
+        assert log_queue.stats.snapshot()["write_errors"] == 1
+    
+    def test_loguru_json_output(self):
+        log_queue = LogQueue(maxsize=10)
+        written = []
+        handler_id = logger.add(log_queue.sink(written.append), serialize=True, level="INFO")
+        try:
+            logger.bind(request_id="abc").info("structured")
+            log_queue.flush()
+        finally:
+            logger.remove(handler_id)
+            log_queue.stop()
+        
+        record = json.loads(written[0])["record"]
+        assert record["message"] == "structured"
+        assert record["extra"]["request_id"] == "abc"
+
+
+class TestDailyFileWriter:
+    """按天切分的日志文件"""
+    
+    def test_rotates_compresses_and_cleans_up(self, tmp_path):
+        today = [date(2026, 1, 10)]
+        (tmp_path / "app_2025-12-01.log").write_text("expired\n")
+        (tmp_path / "app_error_2026-01-09.log").write_text("other writer\n")
+        writer = DailyFileWriter(str(tmp_path), "app", retention_days=30, today=lambda: today[0])
+        
+        writer("day one\n")
+        today[0] = date(2026, 1, 11)
+        writer("day two\n")
+        writer.close()
+        
+        assert not (tmp_path / "app_2025-12-01.log").exists()
+        assert (tmp_path / "app_error_2026-01-09.log").exists()
+        with gzip.open(tmp_path / "app_2026-01-10.log.gz", "rt", encoding="utf-8") as f:
+            assert f.read() == "day one\n"
+        assert (tmp_path / "app_2026-01-11.log").read_text(encoding="utf-8") == "day two\n"
+
+
+class TestAccessLogSampler:
+    """访问日志采样"""
+    
+    def test_longest_prefix_rate(self):
+        sampler = AccessLogSampler(0.5, {"/health": 0.0, "/health/detailed": 1.0})
+        
+        assert sampler.rate_for("/api/v1/products") == 0.5
+        assert sampler.rate_for("/health/live") == 0.0
+        assert sampler.rate_for("/health/detailed") == 1.0
+    
+    def test_sampling_and_counter(self):
+        values = iter([0.05, 0.5])
+        stats = LogStats()
+        sampler = AccessLogSampler(0.1, {"/health": 0.0}, stats=stats, rng=lambda: next(values))
+        
+        assert sampler.should_log("/api/v1/products") is True
+        assert sampler.should_log("/api/v1/products") is False
+        assert sampler.should_log("/health") is False
+        assert stats.snapshot()["sampled_out"] == 2
@@ -0,0 +1,90 @@
+"""
+运行指标测试
+"""
+import pytest
+from types import SimpleNamespace
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram, generate_latest
+
+from app.core import metrics
+from app.core.metrics import CallbackCollector, timed
+from app.core.middleware import RequestContextMiddleware
+
+
+class TestMetricHelpers:
+    """回调指标与耗时统计"""
+    
+    def test_callback_collector_render(self):
+        registry = CollectorRegistry()
+        registry.register(CallbackCollector(
+            "queue_size", "队列长度", ["queue"], lambda: {("export",): 3, ('a"b',): 1}
+        ))
+        registry.register(CallbackCollector(
+            "events_total", "事件数", [], lambda: {(): 5}, metric_type="counter"
+        ))
+        
+        text = generate_latest(registry).decode()
+        assert "# TYPE queue_size gauge" in text
+        assert 'queue_size{queue="export"} 3.0' in text
+        assert 'queue_size{queue="a\\"b"} 1.0' in text
+        assert "# TYPE events_total counter" in text
+        assert "events_total 5.0" in text
+    
+    async def test_timed_fills_status(self):
+        registry = CollectorRegistry()
+        histogram = Histogram("job_seconds", "耗时", ["template", "status"], registry=registry)
+        
+        @timed(histogram, template="standard")
+        async def export(fail: bool):
+            if fail:
+                raise RuntimeError("boom")
+            return "ok"
+        
+        assert await export(False) == "ok"
+        with pytest.raises(RuntimeError):
+            await export(True)
+        
+        assert registry.get_sample_value("job_seconds_count", {"template": "standard", "status": "success"}) == 1
+        assert registry.get_sample_value("job_seconds_count", {"template": "standard", "status": "error"}) == 1
+    
+    def test_pool_gauges(self, monkeypatch):
+        pool = SimpleNamespace(size=lambda: 20, checkedout=lambda: 3, checkedin=lambda: 2, overflow=lambda: -15)
+        monkeypatch.setattr(metrics, "_pools", {"primary": SimpleNamespace(pool=pool)})
+        
+        text = metrics.render_metrics().decode()
+        assert 'db_pool_checked_out{pool="primary"} 3.0' in text
+        assert 'db_pool_overflow{pool="primary"} -15.0' in text
+    
+    def test_multiprocess_render(self, monkeypatch, tmp_path):
+        """设置PROMETHEUS_MULTIPROC_DIR时从多进程目录汇总，回调指标照常输出"""
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        
+        text = metrics.render_metrics().decode()
+        assert "log_queue_size" in text
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestHttpMetrics:
+    """中间件按路由模板记录请求指标"""
+    
+    async def test_records_route_template(self):
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+        
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+        
+        before = _sample("http_requests_total", method="GET", route="/items/{item_id}", status="200")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/items/1")
+            await client.get("/items/2")
+            await client.get("/missing")
+        
+        assert _sample("http_requests_total", method="GET", route="/items/{item_id}", status="200") == before + 2
+        assert _sample("http_requests_total", method="GET", route="unmatched", status="404") >= 1
+        assert _sample("http_request_duration_seconds_count", method="GET", route="/items/{item_id}") >= 2
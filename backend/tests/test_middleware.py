@@ -0,0 +1,117 @@
+"""
+请求上下文中间件测试
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from loguru import logger
+
+from app.core.middleware import RequestContext, RequestContextMiddleware
+
+
+def _create_app(slow_request_threshold: float = RequestContextMiddleware.SLOW_REQUEST_THRESHOLD) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, slow_request_threshold=slow_request_threshold)
+    app.state.background_request_ids = []
+    
+    @app.get("/context")
+    async def context(request: Request, delay: float = 0):
+        await asyncio.sleep(delay)
+        return {"context": RequestContext.get_request_id(), "state": request.state.request_id}
+    
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i};"
+        return StreamingResponse(chunks(), media_type="text/plain")
+    
+    @app.get("/background")
+    async def background(background_tasks: BackgroundTasks):
+        background_tasks.add_task(
+            lambda: app.state.background_request_ids.append(RequestContext.get_request_id())
+        )
+        return {"ok": True}
+    
+    return app
+
+
+@pytest.fixture
+def log_messages():
+    messages = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="INFO")
+    yield messages
+    logger.remove(handler_id)
+
+
+class TestRequestContextMiddleware:
+    """纯ASGI请求上下文中间件"""
+    
+    async def test_adds_headers_and_request_id(self):
+        app = _create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/context")
+        
+        request_id = response.headers["X-Request-ID"]
+        assert response.headers["X-Process-Time"].endswith("ms")
+        assert response.json() == {"context": request_id, "state": request_id}
+        # 请求结束后上下文已重置
+        assert RequestContext.get_request_id() == "-"
+    
+    async def test_concurrent_requests_are_isolated(self):
+        app = _create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            responses = await asyncio.gather(*[
+                client.get("/context", params={"delay": 0.01 * (5 - i)}) for i in range(5)
+            ])
+        
+        request_ids = [response.headers["X-Request-ID"] for response in responses]
+        assert len(set(request_ids)) == 5
+        for request_id, response in zip(request_ids, responses):
+            assert response.json()["context"] == request_id
+    
+    async def test_streaming_response_is_not_buffered(self):
+        app = _create_app()
+        messages = []
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+        response_complete = asyncio.Event()
+        
+        async def receive():
+            if requests:
+                return requests.pop()
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_complete.set()
+        
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+        
+        assert messages[0]["type"] == "http.response.start"
+        assert any(name == b"x-request-id" for name, _ in messages[0]["headers"])
+        bodies = [m["body"] for m in messages[1:] if m["body"]]
+        assert bodies == [b"chunk-0;", b"chunk-1;", b"chunk-2;"]
+    
+    async def test_background_task_sees_request_context(self):
+        app = _create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/background")
+        
+        assert app.state.background_request_ids == [response.headers["X-Request-ID"]]
+    
+    async def test_logs_slow_request(self, log_messages):
+        app = _create_app(slow_request_threshold=0)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/context")
+        
+        assert any(message.startswith("请求完成 | GET /context | Status: 200") for message in log_messages)
+        assert any(message.startswith("慢请求警告 | GET /context") for message in log_messages)
@@ -0,0 +1,304 @@
+"""
+Unit tests for MultimodalExtractor concurrency and result caching
+"""
+import io
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+
+from app.services.multimodal_extractor import MultimodalExtractor, ExtractionCache, IMAGE_MAX_PIXELS
+
+
+def _mock_generation_response(text: str = '{"products": [{"name": "qwen-max", "quantity": 1}]}'):
+    """Build a fake dashscope Generation response"""
+    response = MagicMock()
+    response.status_code = 200
+    response.output.choices = [MagicMock()]
+    response.output.choices[0].message.content = text
+    return response
+
+
+class TestExtractionCache:
+    """Tests for ExtractionCache"""
+    
+    def test_make_key_depends_on_content_and_extension(self):
+        """Same bytes with different extensions must not share a key"""
+        key_txt = ExtractionCache.make_key(b"a,b\n1,2", "data.txt")
+        key_csv = ExtractionCache.make_key(b"a,b\n1,2", "data.csv")
+        key_other = ExtractionCache.make_key(b"a,b\n1,3", "data.csv")
+        
+        assert key_txt != key_csv
+        assert key_csv != key_other
+        assert key_csv == ExtractionCache.make_key(b"a,b\n1,2", "renamed.CSV")
+    
+    @pytest.mark.asyncio
+    async def test_local_lru_eviction(self):
+        """Oldest entries are evicted once the LRU is full"""
+        cache = ExtractionCache(max_entries=2)
+        
+        await cache.set("k1", {"success": True})
+        await cache.set("k2", {"success": True})
+        await cache.get("k1")
+        await cache.set("k3", {"success": True})
+        
+        assert await cache.get("k1") is not None
+        assert await cache.get("k2") is None
+        assert await cache.get("k3") is not None
+
+
+class TestMultimodalExtractor:
+    """Tests for MultimodalExtractor"""
+    
+    @pytest.mark.asyncio
+    async def test_reupload_served_from_cache(self):
+        """Re-uploading identical content does not call the model again"""
+        extractor = MultimodalExtractor()
+        
+        with patch("dashscope.Generation.call", return_value=_mock_generation_response()) as mock_call:
+            first = await extractor.extract_from_file(b"need qwen-max x1", "rfp.txt")
+            second = await extractor.extract_from_file(b"need qwen-max x1", "rfp-copy.txt")
+        
+        assert first["success"] is True
+        assert second["success"] is True
+        assert second["cached"] is True
+        assert second["filename"] == "rfp-copy.txt"
+        assert second["extracted_data"] == first["extracted_data"]
+        assert mock_call.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_extraction_not_cached(self):
+        """Failed results are retried on the next upload"""
+        extractor = MultimodalExtractor()
+        failed = MagicMock(status_code=500, message="quota exceeded")
+        
+        with patch("dashscope.Generation.call", return_value=failed) as mock_call:
+            await extractor.extract_from_file(b"content", "a.txt")
+            await extractor.extract_from_file(b"content", "a.txt")
+        
+        assert mock_call.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_unsupported_type(self):
+        """Unsupported extensions are rejected without touching the cache"""
+        extractor = MultimodalExtractor()
+        result = await extractor.extract_from_file(b"data", "archive.zip")
+        
+        assert result["success"] is False
+        assert "Unsupported file type" in result["error"]
+        assert extractor.cache._local == {}
+    
+    @pytest.mark.asyncio
+    async def test_extract_many_runs_concurrently(self):
+        """A batch finishes in about the time of the slowest file"""
+        extractor = MultimodalExtractor(max_concurrency=4)
+        
+        def slow_call(**kwargs):
+            time.sleep(0.2)
+            return _mock_generation_response()
+        
+        files = [(f"file {i}".encode(), f"f{i}.txt", "text/plain") for i in range(4)]
+        
+        with patch("dashscope.Generation.call", side_effect=slow_call):
+            start = time.perf_counter()
+            results = await extractor.extract_many(files)
+            elapsed = time.perf_counter() - start
+        
+        assert [r["filename"] for r in results] == ["f0.txt", "f1.txt", "f2.txt", "f3.txt"]
+        assert all(r["success"] for r in results)
+        assert elapsed < 0.6
+    
+    @pytest.mark.asyncio
+    async def test_extract_many_deduplicates_identical_files(self):
+        """Identical files in one batch share a single extraction"""
+        extractor = MultimodalExtractor()
+        
+        with patch("dashscope.Generation.call", return_value=_mock_generation_response()) as mock_call:
+            results = await extractor.extract_many([
+                (b"same", "a.txt", None),
+                (b"same", "b.txt", None),
+            ])
+        
+        assert [r["filename"] for r in results] == ["a.txt", "b.txt"]
+        assert mock_call.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_extract_many_isolates_errors(self):
+        """An exception for one file does not fail the batch"""
+        extractor = MultimodalExtractor()
+        
+        with patch.object(extractor, "_dispatch", side_effect=[RuntimeError("boom"), {"success": True}]):
+            results = await extractor.extract_many([
+                (b"one", "a.txt", None),
+                (b"two", "b.txt", None),
+            ])
+        
+        assert results[0] == {"success": False, "filename": "a.txt", "error": "boom"}
+        assert results[1]["success"] is True
+
+
+class TestChunkedExtraction:
+    """Tests for chunked map-reduce extraction of large documents"""
+    
+    def test_build_chunks_packs_segments(self):
+        """Small pages are packed together up to the chunk limit"""
+        pages = ["a" * 40, "b" * 40, "c" * 40, "", "d" * 10]
+        chunks = MultimodalExtractor._build_chunks(pages, max_chars=100)
+        
+        assert chunks == ["a" * 40 + "\n" + "b" * 40, "c" * 40 + "\n" + "d" * 10]
+    
+    def test_build_chunks_splits_oversized_segment(self):
+        """Oversized pages are split on line boundaries, no chunk exceeds the limit"""
+        page = "\n".join(f"line-{i:03d}" + "x" * 20 for i in range(20))
+        chunks = MultimodalExtractor._build_chunks([page, "x" * 250], max_chars=100)
+        
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert "".join(chunks).replace("\n", "") == (page + "x" * 250).replace("\n", "")
+    
+    def test_merge_extractions_is_deterministic(self):
+        """Products are deduplicated in chunk order and scalars take the first value"""
+        merged = MultimodalExtractor._merge_extractions([
+            {
+                "products": [{"name": "qwen-max", "quantity": 10, "unit_price": None}],
+                "customer": {"name": "ABC公司", "contact": None},
+                "quote_date": None,
+                "notes": "含税"
+            },
+            {"raw_text": "bad", "parse_error": True},
+            {
+                "products": [
+                    {"name": "Qwen-Max ", "quantity": 10, "unit_price": None, "total": 400},
+                    {"name": "qwen-plus", "quantity": 5}
+                ],
+                "customer": {"name": "其他", "contact": "13800000000"},
+                "quote_date": "2026-01-01",
+                "notes": "含税"
+            }
+        ])
+        
+        assert [p["name"] for p in merged["products"]] == ["qwen-max", "qwen-plus"]
+        assert merged["products"][0]["total"] == 400
+        assert merged["customer"] == {"name": "ABC公司", "contact": "13800000000"}
+        assert merged["quote_date"] == "2026-01-01"
+        assert merged["notes"] == "含税"
+    
+    @pytest.mark.asyncio
+    async def test_large_document_extracted_per_chunk(self):
+        """Each chunk gets its own model call and results are merged"""
+        extractor = MultimodalExtractor()
+        pages = [f"page {i}\n" + "x" * 5000 for i in range(3)]
+        
+        responses = [
+            _mock_generation_response(f'{{"products": [{{"name": "model-{i}", "quantity": {i}}}]}}')
+            for i in range(3)
+        ]
+        
+        with patch("dashscope.Generation.call", side_effect=responses) as mock_call:
+            result = await extractor._extract_from_segments(pages, "tender.pdf", "pdf")
+        
+        assert mock_call.call_count == 3
+        assert result["success"] is True
+        assert result["chunks"] == {"total": 3, "succeeded": 3}
+        assert len(result["extracted_data"]["products"]) == 3
+
+
+class TestImagePreprocessing:
+    """Tests for image pre-processing before multimodal upload"""
+    
+    @staticmethod
+    def _make_photo(size=(2000, 1500), orientation=None, fmt="JPEG") -> bytes:
+        """Build a noisy test photo, optionally with an EXIF orientation tag"""
+        image = Image.effect_noise(size, 64).convert("RGB")
+        buffer = io.BytesIO()
+        if orientation:
+            exif = Image.Exif()
+            exif[0x0112] = orientation
+            image.save(buffer, format=fmt, quality=95, exif=exif)
+        else:
+            image.save(buffer, format=fmt, quality=95)
+        return buffer.getvalue()
+    
+    def test_large_photo_downscaled_and_reencoded(self):
+        """Phone-sized photos are reduced to the model's useful resolution"""
+        content = self._make_photo(fmt="PNG")
+        processed, fmt, image_hash = MultimodalExtractor._preprocess_image(content, "png")
+        
+        with Image.open(io.BytesIO(processed)) as image:
+            assert image.width * image.height <= IMAGE_MAX_PIXELS
+            assert image.format == "JPEG"
+        assert fmt == "jpeg"
+        assert len(processed) < len(content) / 4
+        assert len(image_hash) == 64
+    
+    def test_exif_rotation_applied(self):
+        """EXIF orientation 6 (rotate 90°) swaps width and height"""
+        content = self._make_photo(size=(400, 200), orientation=6)
+        processed, fmt, _ = MultimodalExtractor._preprocess_image(content, "jpeg")
+        
+        with Image.open(io.BytesIO(processed)) as image:
+            assert image.size == (200, 400)
+    
+    def test_small_image_kept_when_not_smaller(self):
+        """Re-encoding is skipped when it would not reduce the payload"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (32, 32), (255, 255, 255)).save(buffer, format="PNG")
+        content = buffer.getvalue()
+        
+        processed, fmt, _ = MultimodalExtractor._preprocess_image(content, "png")
+        
+        assert processed == content
+        assert fmt == "png"
+    
+    def test_undecodable_image_sent_as_is(self):
+        """Corrupt images fall back to the original bytes"""
+        processed, fmt, image_hash = MultimodalExtractor._preprocess_image(b"not an image", "png")
+        
+        assert (processed, fmt, image_hash) == (b"not an image", "png", None)
+    
+    @pytest.mark.asyncio
+    async def test_pixel_duplicate_served_from_cache(self):
+        """A lossless re-encode of the same picture does not call the VL model again"""
+        original = self._make_photo(size=(800, 600))
+        with Image.open(io.BytesIO(original)) as image:
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            copy = buffer.getvalue()
+        
+        response = MagicMock()
+        response.status_code = 200
+        response.output.choices = [MagicMock()]
+        response.output.choices[0].message.content = [{"text": '{"products": []}'}]
+        
+        extractor = MultimodalExtractor()
+        with patch("dashscope.MultiModalConversation.call", return_value=response) as mock_call:
+            first = await extractor.extract_from_file(original, "photo.jpg")
+            second = await extractor.extract_from_file(copy, "photo.png")
+        
+        assert first["success"] is True
+        assert second["cached"] is True
+        assert mock_call.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_similar_images_not_shared(self):
+        """Screenshots differing in a few pixels get their own extraction"""
+        first_image = Image.new("RGB", (64, 64), (255, 255, 255))
+        second_image = first_image.copy()
+        second_image.putpixel((10, 10), (250, 250, 250))
+        uploads = []
+        for image in (first_image, second_image):
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            uploads.append(buffer.getvalue())
+        
+        response = MagicMock()
+        response.status_code = 200
+        response.output.choices = [MagicMock()]
+        response.output.choices[0].message.content = [{"text": '{"products": []}'}]
+        
+        extractor = MultimodalExtractor()
+        with patch("dashscope.MultiModalConversation.call", return_value=response) as mock_call:
+            await extractor.extract_from_file(uploads[0], "a.png")
+            second = await extractor.extract_from_file(uploads[1], "b.png")
+        
+        assert second.get("cached") is not True
+        assert mock_call.call_count == 2
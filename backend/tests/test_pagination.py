@@ -0,0 +1,169 @@
+"""
+键集分页与总数统计测试
+"""
+import uuid
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.pagination import (
+    SortKey,
+    InvalidCursorError,
+    CountCache,
+    encode_cursor,
+    decode_cursor,
+    paginate,
+    count_total,
+)
+
+
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("group_name", String(20), nullable=False),
+    Column("score", Integer, nullable=False),
+)
+
+
+@pytest.fixture
+async def session():
+    """内存SQLite会话，包含50条数据：score有大量重复，需要id作为唯一排序键"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+        await conn.execute(insert(items), [
+            {"id": i, "group_name": "even" if i % 2 == 0 else "odd", "score": i % 5}
+            for i in range(1, 51)
+        ])
+    
+    async with AsyncSession(engine) as db:
+        yield db
+    await engine.dispose()
+
+
+async def _collect(db, query, keys, page_size):
+    """沿next_cursor翻完所有页"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = await paginate(db, query, keys, page_size, cursor=cursor)
+        ids.extend(row.id for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+class TestCursorCodec:
+    """游标编解码测试"""
+    
+    def test_round_trip_typed_values(self):
+        """日期、UUID、Decimal等类型编码后可原样还原"""
+        values = [
+            datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            Decimal("1.25"),
+            "通义千问",
+            42,
+        ]
+        cursor = encode_cursor(values)
+        
+        assert "=" not in cursor
+        assert decode_cursor(cursor, len(values)) == values
+    
+    @pytest.mark.parametrize("cursor", ["not-base64!!", encode_cursor([1]), encode_cursor([1, None])])
+    def test_invalid_cursor(self, cursor):
+        """格式错误、键数量不符或含空值的游标被拒绝"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor, 2)
+
+
+class TestPaginate:
+    """键集分页测试"""
+    
+    @pytest.mark.asyncio
+    async def test_cursor_pages_cover_all_rows_once(self, session):
+        """沿游标翻页不重复、不遗漏，顺序与整体排序一致"""
+        keys = [SortKey(items.c.score), SortKey(items.c.id)]
+        ids, pages = await _collect(session, select(items.c.id), keys, page_size=7)
+        
+        expected = [i for _, i in sorted((i % 5, i) for i in range(1, 51))]
+        assert ids == expected
+        assert pages == 8
+    
+    @pytest.mark.asyncio
+    async def test_mixed_directions(self, session):
+        """升降序混合的排序键同样正确"""
+        keys = [SortKey(items.c.group_name), SortKey(items.c.score, descending=True), SortKey(items.c.id)]
+        query = select(items.c.id).where(items.c.id <= 20)
+        ids, _ = await _collect(session, query, keys, page_size=3)
+        
+        expected = [i for _, _, i in sorted(
+            ("even" if i % 2 == 0 else "odd", -(i % 5), i) for i in range(1, 21)
+        )]
+        assert ids == expected
+    
+    @pytest.mark.asyncio
+    async def test_page_then_cursor(self, session):
+        """页码翻页返回的游标可接续到下一页"""
+        keys = [SortKey(items.c.id, descending=True)]
+        
+        page_two, cursor = await paginate(session, select(items.c.id), keys, 10, page=2)
+        page_three, _ = await paginate(session, select(items.c.id), keys, 10, cursor=cursor)
+        
+        assert [row.id for row in page_two] == list(range(40, 30, -1))
+        assert [row.id for row in page_three] == list(range(30, 20, -1))
+    
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, session):
+        """最后一页不返回游标"""
+        rows, cursor = await paginate(session, select(items.c.id), [SortKey(items.c.id)], 50)
+        
+        assert len(rows) == 50
+        assert cursor is None
+
+
+class TestCountTotal:
+    """总数统计测试"""
+    
+    @pytest.mark.asyncio
+    async def test_cached_count_is_reused(self, session):
+        """cached模式在TTL内复用缓存"""
+        query = select(items.c.id).where(items.c.group_name == "odd")
+        
+        with patch("app.core.pagination.count_cache", CountCache()), \
+                patch("app.core.pagination.get_redis", new=AsyncMock(return_value=None)):
+            assert await count_total(session, query, "cached") == 25
+            with patch.object(session, "execute", side_effect=AssertionError("should hit cache")):
+                assert await count_total(session, query, "cached") == 25
+    
+    @pytest.mark.asyncio
+    async def test_exact_count_bypasses_cache(self, session):
+        """exact模式不读写缓存，每次都执行COUNT"""
+        cache = CountCache()
+        query = select(items.c.id).where(items.c.group_name == "odd")
+        
+        with patch("app.core.pagination.count_cache", cache), \
+                patch("app.core.pagination.get_redis", new=AsyncMock(return_value=None)):
+            await cache.set(CountCache.make_key(query), 999)
+            assert await count_total(session, query) == 25
+            assert await count_total(session, query, "cached") == 999
+    
+    def test_cache_key_depends_on_parameters(self):
+        """不同筛选参数使用不同的缓存键"""
+        odd = select(items.c.id).where(items.c.group_name == "odd")
+        even = select(items.c.id).where(items.c.group_name == "even")
+        
+        assert CountCache.make_key(odd) != CountCache.make_key(even)
+        assert CountCache.make_key(odd) == CountCache.make_key(select(items.c.id).where(items.c.group_name == "odd"))
+    
+    @pytest.mark.asyncio
+    async def test_estimate_falls_back_to_exact_and_none_skips(self, session):
+        """非PostgreSQL无法估算时退回精确计数；none不统计"""
+        with patch("app.core.pagination.count_cache", CountCache()), \
+                patch("app.core.pagination.get_redis", new=AsyncMock(return_value=None)):
+            assert await count_total(session, select(items.c.id), "estimate") == 50
+        assert await count_total(session, select(items.c.id), "none") is None
@@ -0,0 +1,149 @@
+"""
+定价文档服务测试
+"""
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.services.pricing_document_service import PricingDocumentService
+from app.services.pricing_data_service import PricingDataService
+from app.services.snapshot_cache import SnapshotCache
+
+
+DOCUMENT = {
+    "model_code": "qwen-max",
+    "category": {"code": "text_qwen", "name": "通义千问"},
+    "variants": [
+        {"id": 1, "model_name": "qwen-max", "display_name": "通义千问Max", "status": "active",
+         "prices": [{"dimension_code": "input_token", "unit_price": 0.0024, "unit": "千Token"}]},
+        {"id": 2, "model_name": "qwen-max", "display_name": "通义千问Max-Batch", "status": "active",
+         "prices": [{"dimension_code": "input_token", "unit_price": 0.0012, "unit": "千Token"}]},
+    ],
+}
+
+
+def _mock_session(dialect: str = "postgresql"):
+    db = MagicMock()
+    db.bind.dialect.name = dialect
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    db.rollback = AsyncMock()
+    return db
+
+
+def _scalar_result(value):
+    result = MagicMock()
+    result.scalar.return_value = value
+    return result
+
+
+def _enabled_service() -> PricingDocumentService:
+    service = PricingDocumentService()
+    service._enabled = True
+    return service
+
+
+class TestPricingDocumentService:
+    """定价文档服务测试"""
+    
+    @pytest.mark.asyncio
+    async def test_disabled_for_non_postgres(self):
+        """非PostgreSQL数据库返回None，调用方回退到关联查询"""
+        service = PricingDocumentService()
+        db = _mock_session("sqlite")
+        
+        assert await service.get_document(db, "qwen-max") is None
+        assert await service.refresh(db) == 0
+        db.execute.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_refresh_deduplicates_codes(self):
+        """按模型重建时去重并忽略空代码；空列表不访问数据库"""
+        service = _enabled_service()
+        db = _mock_session()
+        db.execute.return_value = _scalar_result(1)
+        
+        assert await service.refresh(db, []) == 0
+        db.execute.assert_not_called()
+        
+        await service.refresh(db, ["qwen-max", None, "qwen-max", "qwen-plus"])
+        assert db.execute.await_args.args[1] == {"codes": ["qwen-max", "qwen-plus"]}
+        
+        await service.refresh(db)
+        assert db.execute.await_args.args[1] == {"codes": None}
+    
+    @pytest.mark.asyncio
+    async def test_stale_documents_fall_back_and_rebuild_in_background(self):
+        """文档落后于最新快照时返回None；重建使用独立会话，不提交或回滚调用方会话"""
+        service = _enabled_service()
+        db = _mock_session()
+        documents_result = MagicMock()
+        documents_result.all.return_value = [MagicMock(model_code="qwen-max", document=DOCUMENT)]
+        db.execute.side_effect = [
+            _scalar_result(5),          # 最新快照ID
+            _scalar_result(4),          # 文档所属快照ID
+            documents_result,
+        ]
+        rebuild_session = _mock_session()
+        rebuild_session.execute.return_value = _scalar_result(120)
+        session_maker = MagicMock()
+        session_maker.return_value.__aenter__ = AsyncMock(return_value=rebuild_session)
+        session_maker.return_value.__aexit__ = AsyncMock(return_value=False)
+        
+        cache = SnapshotCache("test", MagicMock())
+        with patch("app.services.pricing_document_service.pricing_snapshot_cache", cache), \
+                patch("app.services.pricing_document_service.async_session_maker", session_maker), \
+                patch("app.services.snapshot_cache.get_redis", new=AsyncMock(return_value=None)):
+            assert await service.get_document(db, "qwen-max") is None
+            await service._rebuild_task
+            rebuild_session.commit.assert_awaited_once()
+            
+            assert await service.get_document(db, "qwen-max") == DOCUMENT
+        
+        db.commit.assert_not_called()
+        db.rollback.assert_not_called()
+        assert db.execute.await_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_failed_rebuild_keeps_falling_back(self):
+        """后台重建失败时继续回退到关联查询，下次检查再重试"""
+        service = _enabled_service()
+        db = _mock_session()
+        db.execute.side_effect = [_scalar_result(5), _scalar_result(4), _scalar_result(4)]
+        session_maker = MagicMock()
+        session_maker.return_value.__aenter__ = AsyncMock(side_effect=RuntimeError("主库不可用"))
+        session_maker.return_value.__aexit__ = AsyncMock(return_value=False)
+        
+        cache = SnapshotCache("test", MagicMock())
+        with patch("app.services.pricing_document_service.pricing_snapshot_cache", cache), \
+                patch("app.services.pricing_document_service.async_session_maker", session_maker), \
+                patch("app.services.snapshot_cache.get_redis", new=AsyncMock(return_value=None)):
+            assert await service.get_documents(db, ["qwen-max"]) is None
+            await service._rebuild_task
+            assert await service.get_documents(db, ["qwen-max"]) is None
+            await service._rebuild_task
+        
+        assert session_maker.call_count == 2
+        db.rollback.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_model_pricing_reads_document(self):
+        """get_model_pricing直接返回文档中的变体，不再关联查询"""
+        with patch(
+            "app.services.pricing_data_service.pricing_document_service.get_document",
+            new=AsyncMock(return_value=DOCUMENT)
+        ):
+            db = _mock_session()
+            result = await PricingDataService().get_model_pricing(db, "qwen-max")
+        
+        assert result["found"] is True
+        assert result["variants_count"] == 2
+        assert result["variants"][1]["prices"][0]["unit_price"] == 0.0012
+        db.execute.assert_not_called()
+        # 与关联查询的返回结构一致，不带出文档中的其他字段
+        assert set(result["variants"][0]) == {
+            "id", "model_name", "display_name", "mode", "token_tier", "resolution",
+            "supports_batch", "supports_cache", "remark", "rule_text", "prices",
+        }
+        assert set(result["variants"][0]["prices"][0]) == {
+            "dimension_code", "unit_price", "unit", "mode", "token_tier", "resolution",
+        }
@@ -2,10 +2,14 @@
 产品数据服务测试
 """
 import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
 from uuid import uuid4
 from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
-from app.models.product import Product, ProductPrice
+from app.models.product import Product, ProductPrice, classify_category
 
 
 class TestProductService:
@@ -78,3 +82,69 @@ class TestProductService:
         assert result is not None
         assert result.product_name == "查询测试产品"
         assert result.category == "计算-GPU实例"
+
+
+class TestProductClassification:
+    """产品分类字段测试"""
+    
+    @pytest.mark.parametrize("category, expected", [
+        ("AI-大模型-文本生成", {"modality": "text", "capability": "generation", "model_type": "llm"}),
+        ("AI-大模型-视觉理解", {"modality": "image", "capability": "understanding", "model_type": "llm"}),
+        ("AI-大模型-向量", {"modality": "text_embedding", "capability": "both", "model_type": "text_embedding"}),
+        ("AI-大模型-多模态向量", {"modality": "unknown", "capability": "both", "model_type": "multimodal_embedding"}),
+        ("AI-大模型-重排序", {"modality": "rerank", "capability": "both", "model_type": "rerank"}),
+        ("云服务器", {"modality": "unknown", "capability": None, "model_type": None}),
+    ])
+    def test_classify_category(self, category, expected):
+        """类别推导结果与筛选服务的映射一致"""
+        from app.services.product_filter_service import ProductFilterService
+        
+        assert classify_category(category) == expected
+        assert ProductFilterService.map_category_to_model_type(category) == expected["model_type"]
+    
+    @pytest.mark.asyncio
+    async def test_classification_maintained_on_write(self):
+        """新增与修改类别时自动刷新分类字段"""
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Product.__table__.create)
+        
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            product = Product(product_code="qwen-max", product_name="通义千问Max", category="AI-大模型-文本生成")
+            session.add(product)
+            await session.commit()
+            
+            assert (product.modality, product.capability, product.model_type) == ("text", "generation", "llm")
+            
+            product.category = "AI-大模型-重排序"
+            await session.commit()
+            
+            stored = (await session.execute(
+                select(Product.modality, Product.capability, Product.model_type)
+            )).one()
+            assert tuple(stored) == ("rerank", "both", "rerank")
+        
+        await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_filters_use_equality_on_indexed_columns(self):
+        """分类筛选为索引列等值匹配，不再对category做ILIKE"""
+        from app.services.product_filter_service import ProductFilterService
+        
+        captured = {}
+        
+        async def fake_count(db, query, mode):
+            captured["query"] = query
+            return 0
+        
+        with patch("app.services.product_filter_service.count_total", side_effect=fake_count), \
+                patch("app.services.product_filter_service.paginate", new=AsyncMock(return_value=([], None))):
+            await ProductFilterService().filter_models(
+                MagicMock(), modality="text,image", capability="generation", model_type="llm"
+            )
+        
+        sql = str(captured["query"].compile(dialect=postgresql.dialect()))
+        assert "products.modality IN" in sql
+        assert "products.capability IN" in sql
+        assert "products.model_type IN" in sql
+        assert "ILIKE" not in sql
@@ -0,0 +1,165 @@
+"""
+产品语义检索服务测试
+"""
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.agents.bailian_client import BailianClient, EMBEDDING_BATCH_SIZE
+from app.agents.tools import FunctionTools
+from app.services.product_vector_service import (
+    LocalVectorIndex,
+    ProductVectorService,
+    EMBEDDING_DIMENSION
+)
+
+
+def _unit_vector(*hot_dims: int) -> list:
+    """构造在指定维度上取值的测试向量"""
+    vector = [0.0] * EMBEDDING_DIMENSION
+    for dim in hot_dims:
+        vector[dim] = 1.0
+    return vector
+
+
+@pytest.fixture
+def sample_index():
+    """三条产品向量的本地索引"""
+    return LocalVectorIndex.build([
+        {"model_id": "qwen-turbo", "model_name": "通义千问Turbo", "category": "AI-大模型-文本生成", "vendor": "aliyun", "vector": _unit_vector(0)},
+        {"model_id": "qwen-vl-max", "model_name": "通义千问VL-Max", "category": "AI-大模型-视觉理解", "vendor": "aliyun", "vector": _unit_vector(1)},
+        {"model_id": "qwen-plus", "model_name": "通义千问Plus", "category": "AI-大模型-文本生成", "vendor": "aliyun", "vector": _unit_vector(0, 1)},
+        {"model_id": "broken", "model_name": "维度错误", "category": "AI-大模型-文本生成", "vendor": "aliyun", "vector": [1.0, 2.0]},
+    ])
+
+
+class TestLocalVectorIndex:
+    """进程内向量索引测试"""
+    
+    def test_build_skips_invalid_vectors(self, sample_index):
+        """维度不符的向量不进入索引"""
+        assert len(sample_index) == 3
+        assert sample_index.matrix.shape == (3, EMBEDDING_DIMENSION)
+        assert np.allclose(np.linalg.norm(sample_index.matrix, axis=1), 1.0)
+    
+    def test_search_orders_by_cosine_similarity(self, sample_index):
+        """按余弦相似度降序返回"""
+        results = sample_index.search(_unit_vector(0), top_k=3)
+        
+        assert [r["model_id"] for r in results] == ["qwen-turbo", "qwen-plus", "qwen-vl-max"]
+        assert results[0]["score"] == 1.0
+        assert "vector" not in results[0]
+    
+    def test_search_with_category_filter(self, sample_index):
+        """类别过滤后不返回其他类别"""
+        results = sample_index.search(_unit_vector(1), top_k=3, category="AI-大模型-文本生成")
+        
+        assert [r["model_id"] for r in results] == ["qwen-plus", "qwen-turbo"]
+    
+    def test_search_empty_index(self):
+        """空索引返回空列表"""
+        index = LocalVectorIndex.build([])
+        assert index.search(_unit_vector(0)) == []
+
+
+class TestStorageMode:
+    """检索模式检测测试"""
+    
+    @staticmethod
+    def _postgres_session(udt_name):
+        """模拟information_schema查询结果的PostgreSQL会话"""
+        db = MagicMock()
+        db.bind.dialect.name = "postgresql"
+        result = MagicMock()
+        result.scalar.return_value = udt_name
+        db.execute = AsyncMock(return_value=result)
+        return db
+    
+    @pytest.mark.asyncio
+    async def test_text_column_uses_local_index_even_with_package(self):
+        """已安装pgvector包但列为Text时，不走数据库向量检索"""
+        service = ProductVectorService()
+        db = self._postgres_session("text")
+        
+        with patch("app.services.product_vector_service.HAS_PGVECTOR", True):
+            assert await service.is_vector_column(db) is False
+            assert await service.is_vector_column(db) is False
+        
+        assert db.execute.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_vector_column_detected(self):
+        """列类型为vector时走数据库检索"""
+        service = ProductVectorService()
+        
+        with patch("app.services.product_vector_service.HAS_PGVECTOR", True):
+            assert await service.is_vector_column(self._postgres_session("vector")) is True
+    
+    @pytest.mark.asyncio
+    async def test_detection_failure_not_cached(self):
+        """检测失败时本次使用进程内索引，下次重新检测"""
+        service = ProductVectorService()
+        db = self._postgres_session("vector")
+        db.execute.side_effect = [RuntimeError("连接中断"), db.execute.return_value]
+        
+        with patch("app.services.product_vector_service.HAS_PGVECTOR", True):
+            assert await service.is_vector_column(db) is False
+            assert await service.is_vector_column(db) is True
+
+
+class TestBatchEmbedding:
+    """批量向量化测试"""
+    
+    @pytest.mark.asyncio
+    async def test_embed_texts_batches_and_keeps_order(self):
+        """超过单次上限时分批请求，结果保持输入顺序"""
+        def fake_call(model, input):
+            response = MagicMock()
+            response.status_code = 200
+            # 打乱返回顺序，验证按text_index重排
+            response.output = {"embeddings": [
+                {"text_index": i, "embedding": [float(len(text))]}
+                for i, text in reversed(list(enumerate(input)))
+            ]}
+            return response
+        
+        texts = ["x" * (i + 1) for i in range(EMBEDDING_BATCH_SIZE + 3)]
+        
+        with patch("dashscope.TextEmbedding.call", side_effect=fake_call) as mock_call:
+            vectors = await BailianClient().embed_texts(texts)
+        
+        assert mock_call.call_count == 2
+        assert vectors == [[float(i + 1)] for i in range(len(texts))]
+
+
+class TestSemanticRecommendation:
+    """语义推荐测试"""
+    
+    def test_embedding_text(self):
+        """向量化文本包含名称、代码、类别和描述"""
+        product = MagicMock(product_name="通义千问Plus", product_code="qwen-plus", category="AI-大模型-文本生成", description=None)
+        text = ProductVectorService.build_embedding_text(product)
+        
+        assert text == "通义千问Plus\nqwen-plus\nAI-大模型-文本生成"
+    
+    @pytest.mark.asyncio
+    async def test_recommend_model_uses_semantic_candidates(self):
+        """语义检索有结果时使用检索结果"""
+        price_info = {"found": True, "model_id": "qwen-vl-max", "model_name": "通义千问VL-Max", "pricing": {}}
+        
+        with patch.object(FunctionTools, "_semantic_candidates", new_callable=AsyncMock, return_value=["qwen-vl-max"]), \
+             patch.object(FunctionTools, "get_model_prices", new_callable=AsyncMock, return_value={"qwen-vl-max": price_info}) as mock_price:
+            result = await FunctionTools.recommend_model("识别发票图片")
+        
+        mock_price.assert_awaited_once_with(["qwen-vl-max"])
+        assert result["recommendations"][0]["model_id"] == "qwen-vl-max"
+    
+    @pytest.mark.asyncio
+    async def test_recommend_model_falls_back_to_keywords(self):
+        """语义检索不可用时回退到关键词映射"""
+        with patch.object(FunctionTools, "_semantic_candidates", new_callable=AsyncMock, return_value=[]), \
+             patch.object(FunctionTools, "get_model_prices", new_callable=AsyncMock,
+                          return_value={"qwen-coder-plus": {"found": False}, "qwen-max": {"found": False}}) as mock_price:
+            await FunctionTools.recommend_model("代码助手")
+        
+        mock_price.assert_awaited_once_with(["qwen-coder-plus", "qwen-max"])
@@ -0,0 +1,133 @@
+"""
+SQL查询分析测试
+"""
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.middleware import RequestContextMiddleware
+from app.core.query_profiler import profile_queries, statement_shape
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        await conn.execute(text("INSERT INTO items (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')"))
+    yield engine
+    await engine.dispose()
+
+
+async def _load_one_by_one(db: AsyncSession, ids):
+    """逐行查询（N+1）"""
+    for item_id in ids:
+        await db.execute(text("SELECT name FROM items WHERE id = :id"), {"id": item_id})
+
+
+class TestStatementShape:
+    """语句形态归一化"""
+    
+    def test_literals_and_in_lists_are_normalized(self):
+        assert statement_shape("SELECT * FROM t WHERE id = 1 AND name = 'x'") == \
+            statement_shape("SELECT *\n  FROM t WHERE id = 42 AND name = 'it''s'")
+        assert statement_shape("SELECT * FROM t WHERE id IN ($1, $2, $3)") == \
+            statement_shape("SELECT * FROM t WHERE id IN ($1)")
+        assert statement_shape("SELECT * FROM t WHERE id IN (?, ?)") == "SELECT * FROM t WHERE id IN (...)"
+    
+    def test_subquery_in_is_kept(self):
+        shape = statement_shape("SELECT * FROM t WHERE id IN (SELECT id FROM u)")
+        assert "IN (SELECT id FROM u)" in shape
+
+
+class TestQueryProfile:
+    """查询统计"""
+    
+    async def test_counts_queries_and_repeated_shapes(self, engine):
+        async with AsyncSession(engine) as db:
+            with profile_queries() as profile:
+                await _load_one_by_one(db, [1, 2, 3])
+                await db.execute(text("SELECT COUNT(*) FROM items"))
+        
+        assert profile.count == 4
+        assert profile.duration > 0
+        assert profile.max_repeat == 3
+        assert profile.repeated(3) == [("SELECT name FROM items WHERE id = ?", 3)]
+    
+    async def test_nested_profiles_propagate(self, engine):
+        async with AsyncSession(engine) as db:
+            with profile_queries() as outer:
+                await db.execute(text("SELECT 1"))
+                with profile_queries() as inner:
+                    await db.execute(text("SELECT 2"))
+        
+        assert inner.count == 1
+        assert outer.count == 2
+    
+    async def test_no_profile_outside_context(self, engine):
+        async with AsyncSession(engine) as db:
+            await db.execute(text("SELECT 1"))
+            with profile_queries() as profile:
+                pass
+        
+        assert profile.count == 0
+
+
+class TestRequestProfiling:
+    """中间件按请求统计查询"""
+    
+    def _create_app(self, engine, debug_headers: bool) -> FastAPI:
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware, sql_repeat_threshold=3, debug_headers=debug_headers)
+        
+        @app.get("/items")
+        async def list_items():
+            async with AsyncSession(engine) as db:
+                await _load_one_by_one(db, [1, 2, 3])
+            return {"ok": True}
+        
+        return app
+    
+    async def test_debug_headers_and_n_plus_one_warning(self, engine):
+        messages = []
+        handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="INFO")
+        try:
+            app = self._create_app(engine, debug_headers=True)
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get("/items")
+        finally:
+            logger.remove(handler_id)
+        
+        assert response.headers["X-DB-Query-Count"] == "3"
+        assert response.headers["X-DB-Time"].endswith("ms")
+        assert response.headers["X-DB-Repeated-Queries"] == "1"
+        assert any(message.startswith("疑似N+1查询 | GET /items") for message in messages)
+    
+    async def test_no_debug_headers_in_production(self, engine):
+        app = self._create_app(engine, debug_headers=False)
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/items")
+        
+        assert "X-DB-Query-Count" not in response.headers
+
+
+class TestQueryBudget:
+    """查询预算插件"""
+    
+    @pytest.mark.query_budget(3, max_repeated=3)
+    async def test_marker_within_budget(self, engine):
+        async with AsyncSession(engine) as db:
+            await _load_one_by_one(db, [1, 2, 3])
+    
+    async def test_fixture_fails_over_budget(self, engine, query_budget):
+        async with AsyncSession(engine) as db:
+            with pytest.raises(pytest.fail.Exception, match="超出查询预算"):
+                with query_budget(2):
+                    await _load_one_by_one(db, [1, 2, 3])
+            
+            with pytest.raises(pytest.fail.Exception, match="同一语句最多执行3次"):
+                with query_budget(10, max_repeated=1):
+                    await _load_one_by_one(db, [1, 2, 3])
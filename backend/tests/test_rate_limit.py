@@ -0,0 +1,146 @@
+"""
+请求限流测试
+"""
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.rate_limit import LocalRateLimitStore, RateLimiter, RateLimitMiddleware
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLocalRateLimitStore:
+    """进程内滑动窗口"""
+    
+    def test_limit_within_window(self):
+        store = LocalRateLimitStore()
+        results = [store.hit("ip", 3, 60000, 0, 1) for _ in range(4)]
+        
+        assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+        assert results[2][1] == 0
+        assert results[3][2] == 60000
+    
+    def test_previous_window_is_weighted(self):
+        store = LocalRateLimitStore()
+        for _ in range(10):
+            store.hit("ip", 10, 60000, 0, 1)
+        
+        # 下一窗口过去一半：上一窗口计数按50%计入
+        allowed, remaining, _ = store.hit("ip", 10, 60000, 90000, 5)
+        assert allowed and remaining == 0
+        allowed, _, wait_ms = store.hit("ip", 10, 60000, 90000, 1)
+        assert not allowed
+        # 上一窗口权重降到40%即可放行
+        assert wait_ms == 6000
+        
+        # 间隔超过一个窗口后重新计数
+        assert store.hit("ip", 10, 60000, 300000, 10)[0]
+    
+    def test_cost_weights(self):
+        store = LocalRateLimitStore()
+        assert store.hit("ip", 10, 60000, 0, 10)[0]
+        assert not store.hit("ip", 10, 60000, 0, 1)[0]
+        assert store.hit("other", 10, 60000, 0, 1)[0]
+
+
+class TestRateLimiter:
+    """Redis失败时退回进程内计数"""
+    
+    async def test_falls_back_when_redis_fails(self):
+        calls = []
+        
+        class BrokenRedis:
+            def register_script(self, script):
+                async def run(keys, args):
+                    calls.append(keys)
+                    raise RedisConnectionError("connection refused")
+                return run
+        
+        clock = FakeClock()
+        limiter = RateLimiter(2, 60, redis_getter=BrokenRedis, clock=clock)
+        
+        results = [await limiter.hit("1.2.3.4") for _ in range(3)]
+        assert [result.allowed for result in results] == [True, True, False]
+        assert results[2].retry_after > 0
+        # 失败后一段时间内不再访问Redis
+        assert len(calls) == 1
+        
+        clock.now += RateLimiter.REDIS_RETRY_INTERVAL + 1
+        await limiter.hit("1.2.3.4")
+        assert len(calls) == 2
+    
+    async def test_uses_redis_script_result(self):
+        class ScriptRedis:
+            def register_script(self, script):
+                async def run(keys, args):
+                    assert keys[0].startswith("ratelimit:1.2.3.4:")
+                    return [0, 0, 1500]
+                return run
+        
+        limiter = RateLimiter(2, 60, redis_getter=ScriptRedis, clock=FakeClock())
+        result = await limiter.hit("1.2.3.4", cost=2)
+        
+        assert not result.allowed
+        assert result.retry_after == 1.5
+
+
+class TestRateLimitMiddleware:
+    """限流中间件"""
+    
+    def _create_app(self) -> FastAPI:
+        app = FastAPI()
+        # 时钟位于窗口起点
+        limiter = RateLimiter(10, 60, redis_getter=lambda: None, clock=FakeClock(960.0))
+        app.add_middleware(
+            RateLimitMiddleware,
+            limit=10,
+            window=60,
+            route_costs={"/health": 0, "/ai": 5},
+            limiter=limiter
+        )
+        
+        @app.get("/health")
+        async def health():
+            return {"status": "ok"}
+        
+        @app.get("/items")
+        async def items():
+            return []
+        
+        @app.post("/ai/chat")
+        async def chat():
+            return {"reply": "ok"}
+        
+        return app
+    
+    async def test_rejects_with_retry_after(self):
+        app = self._create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.post("/ai/chat")).status_code == 200
+            assert (await client.post("/ai/chat")).status_code == 200
+            response = await client.get("/items")
+            
+            # 免计费路由不受影响
+            assert (await client.get("/health")).status_code == 200
+        
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "60"
+        assert response.headers["X-RateLimit-Limit"] == "10"
+        body = response.json()
+        assert body["success"] is False
+        assert body["error"]["code"] == "TOO_MANY_REQUESTS"
+    
+    def test_cost_for_longest_prefix(self):
+        middleware = RateLimitMiddleware(
+            FastAPI(), limit=10, window=60, route_costs={"/api": 2, "/api/v1/ai": 10}
+        )
+        assert middleware.cost_for("/api/v1/ai/chat") == 10
+        assert middleware.cost_for("/api/v1/quotes") == 2
+        assert middleware.cost_for("/other") == 1
@@ -0,0 +1,205 @@
+"""
+读写分离测试
+
+以两个SQLite文件分别充当主库与只读副本
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import AsyncClient, ASGITransport
+from prometheus_client import REGISTRY
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import database
+from app.core.database import ReadAfterWriteTracker, ReadReplicaRouter, get_db, get_read_db
+from app.core.middleware import RequestContextMiddleware
+
+
+items = Table("items", MetaData(), Column("id", Integer, primary_key=True), Column("source", String))
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """只实现写后读标记用到的命令"""
+    
+    def __init__(self):
+        self.keys = {}
+    
+    async def set(self, key, value, px=None):
+        self.keys[key] = value
+    
+    async def exists(self, key):
+        return int(key in self.keys)
+
+
+async def _create_database(path, source: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(items.metadata.create_all)
+        await conn.execute(insert(items).values(source=source))
+    return engine
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    primary = await _create_database(tmp_path / "primary.db", "primary")
+    replica = await _create_database(tmp_path / "replica.db", "replica")
+    yield primary, replica
+    await primary.dispose()
+    await replica.dispose()
+
+
+def _replica_down_sessions() -> float:
+    return REGISTRY.get_sample_value("db_read_sessions_total", {"target": "primary", "reason": "replica_down"}) or 0
+
+
+def _maker(engine) -> async_sessionmaker:
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _source(session: AsyncSession) -> str:
+    return (await session.execute(select(items.c.source).order_by(items.c.id))).scalars().first()
+
+
+class TestReadReplicaRouter:
+    """只读会话路由"""
+    
+    async def test_without_replica_uses_primary(self, engines):
+        primary, _ = engines
+        router = ReadReplicaRouter(_maker(primary))
+        
+        async with await router.read_session("1.2.3.4") as session:
+            assert session.info["db_role"] == "primary"
+            assert await _source(session) == "primary"
+    
+    async def test_read_after_write_is_sticky(self, engines):
+        primary, replica = engines
+        clock = FakeClock()
+        tracker = ReadAfterWriteTracker(5, redis_getter=lambda: None, clock=clock)
+        router = ReadReplicaRouter(_maker(primary), _maker(replica), tracker=tracker, clock=clock)
+        
+        async with await router.read_session("1.2.3.4") as session:
+            assert await _source(session) == "replica"
+        
+        await router.mark_written("1.2.3.4")
+        async with await router.read_session("1.2.3.4") as session:
+            assert await _source(session) == "primary"
+        async with await router.read_session("5.6.7.8") as session:
+            assert await _source(session) == "replica"
+        
+        clock.now += 6
+        async with await router.read_session("1.2.3.4") as session:
+            assert await _source(session) == "replica"
+    
+    async def test_sticky_mark_is_shared_through_redis(self):
+        redis = FakeRedis()
+        worker_a = ReadAfterWriteTracker(5, redis_getter=lambda: redis)
+        worker_b = ReadAfterWriteTracker(5, redis_getter=lambda: redis)
+        
+        await worker_a.mark("1.2.3.4")
+        
+        assert await worker_b.is_sticky("1.2.3.4")
+        assert not await worker_b.is_sticky("5.6.7.8")
+    
+    async def test_falls_back_when_replica_is_down(self, engines, tmp_path):
+        primary, _ = engines
+        broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+        clock = FakeClock()
+        router = ReadReplicaRouter(_maker(primary), _maker(broken), clock=clock)
+        before = _replica_down_sessions()
+        
+        for _ in range(2):
+            async with await router.read_session() as session:
+                assert await _source(session) == "primary"
+        
+        assert _replica_down_sessions() == before + 2
+        assert router._replica_retry_at == clock.now + ReadReplicaRouter.REPLICA_RETRY_INTERVAL
+        await broken.dispose()
+
+
+class TestWriteDetection:
+    """会话写操作标记"""
+    
+    async def test_dml_marks_session(self, engines):
+        primary, _ = engines
+        async with _maker(primary)() as session:
+            await session.execute(select(items))
+            assert not session.info.get("has_writes")
+            
+            await session.execute(update(items).values(source="updated"))
+            assert session.info["has_writes"]
+
+
+class TestDependencies:
+    """get_db写入后，同一客户端的get_read_db读主库"""
+    
+    async def test_read_your_writes(self, engines, monkeypatch):
+        primary, replica = engines
+        tracker = ReadAfterWriteTracker(5, redis_getter=lambda: None)
+        monkeypatch.setattr(database, "async_session_maker", _maker(primary))
+        monkeypatch.setattr(database, "read_router", ReadReplicaRouter(_maker(primary), _maker(replica), tracker))
+        
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+        
+        @app.get("/items")
+        async def list_items(db: AsyncSession = Depends(get_read_db)):
+            return {"role": db.info["db_role"], "count": len((await db.execute(select(items))).all())}
+        
+        @app.post("/items")
+        async def create_item(db: AsyncSession = Depends(get_db)):
+            await db.execute(insert(items).values(source="primary"))
+            return {"ok": True}
+        
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.get("/items")).json() == {"role": "replica", "count": 1}
+            await client.post("/items")
+            assert (await client.get("/items")).json() == {"role": "primary", "count": 2}
+        
+        async with primary.connect() as conn:
+            assert (await conn.execute(text("SELECT COUNT(*) FROM items"))).scalar() == 2
+    
+    async def test_stickiness_keyed_on_client_token(self, engines, monkeypatch):
+        """同一IP后的多个客户端按令牌区分；未携带令牌的客户端按IP回退"""
+        primary, replica = engines
+        tracker = ReadAfterWriteTracker(5, redis_getter=lambda: None)
+        monkeypatch.setattr(database, "async_session_maker", _maker(primary))
+        monkeypatch.setattr(database, "read_router", ReadReplicaRouter(_maker(primary), _maker(replica), tracker))
+        
+        app = FastAPI()
+        app.add_middleware(RequestContextMiddleware)
+        
+        @app.get("/items")
+        async def list_items(db: AsyncSession = Depends(get_read_db)):
+            return {"role": db.info["db_role"]}
+        
+        @app.post("/items")
+        async def create_item(db: AsyncSession = Depends(get_db)):
+            await db.execute(insert(items).values(source="primary"))
+            return {"ok": True}
+        
+        transport = ASGITransport(app=app)
+        other_token = "0" * 32
+        async with AsyncClient(transport=transport, base_url="http://test") as writer:
+            response = await writer.post("/items")
+            token = response.headers["X-Client-Token"]
+            assert writer.cookies["client_token"] == token
+            
+            # 已有令牌的客户端再次写入不重新签发
+            assert "X-Client-Token" not in (await writer.post("/items")).headers
+            assert (await writer.get("/items")).json() == {"role": "primary"}
+            
+            # 请求头中的令牌优先于Cookie
+            other = await writer.get("/items", headers={"X-Client-Token": other_token})
+            assert other.json() == {"role": "replica"}
+        
+        async with AsyncClient(transport=transport, base_url="http://test") as anonymous:
+            assert (await anonymous.get("/items")).json() == {"role": "primary"}
+
@@ -0,0 +1,90 @@
+"""
+快速JSON响应测试
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient, ASGITransport
+
+from app.core.responses import FastJSONResponse, dumps
+from app.schemas.quote import PaginatedQuoteListResponse, QuoteListResponse
+
+
+def _quote_page() -> PaginatedQuoteListResponse:
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    return PaginatedQuoteListResponse(
+        total=1,
+        page=1,
+        page_size=20,
+        data=[
+            QuoteListResponse(
+                quote_id=uuid4(),
+                quote_no="QT20240501001",
+                customer_name="测试客户",
+                status="draft",
+                total_amount=Decimal("1234.50"),
+                created_by="sales",
+                created_at=now,
+                updated_at=now
+            )
+        ]
+    )
+
+
+class TestDumps:
+    """序列化结果与FastAPI默认路径一致"""
+    
+    def test_dict_matches_jsonable_encoder(self):
+        payload = {
+            "id": uuid4(),
+            "price": Decimal("0.0008"),
+            "quota": Decimal("100"),
+            "updated_at": datetime(2024, 5, 1, 12, 0, 0),
+            "tags": {"batch"},
+            "model": _quote_page().data[0],
+            1: "非字符串键"
+        }
+        
+        assert json.loads(dumps(payload)) == json.loads(json.dumps(jsonable_encoder(payload)))
+    
+    async def test_model_matches_response_model(self):
+        app = FastAPI()
+        page = _quote_page()
+        
+        @app.get("/default", response_model=PaginatedQuoteListResponse)
+        async def default():
+            return page
+        
+        @app.get("/fast", response_model=PaginatedQuoteListResponse)
+        async def fast():
+            return FastJSONResponse(page)
+        
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            default_response = await client.get("/default")
+            fast_response = await client.get("/fast")
+        
+        assert fast_response.headers["content-type"] == "application/json"
+        assert fast_response.json() == default_response.json()
+        # response_model仍用于生成接口文档
+        schema = app.openapi()["paths"]["/fast"]["get"]["responses"]["200"]
+        assert schema["content"]["application/json"]["schema"]["$ref"].endswith("PaginatedQuoteListResponse")
+
+
+class TestDefaultResponseClass:
+    """默认响应类"""
+    
+    async def test_plain_return_values_use_orjson(self):
+        app = FastAPI(default_response_class=FastJSONResponse)
+        
+        @app.get("/items")
+        async def items():
+            return {"name": "通义千问", "price": Decimal("1.5")}
+        
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/items")
+        
+        assert response.content == '{"name":"通义千问","price":1.5}'.encode("utf-8")
@@ -0,0 +1,108 @@
+"""
+快照版本缓存与分类模型树测试
+"""
+import pytest
+from unittest.mock import patch, AsyncMock
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.database import Base
+from app.models.pricing import PricingSnapshot, PricingCategory, PricingModel
+from app.services.snapshot_cache import SnapshotCache
+from app.services.pricing_data_service import PricingDataService
+
+
+PRICING_TABLES = [PricingSnapshot.__table__, PricingCategory.__table__, PricingModel.__table__]
+
+
+@pytest.fixture
+async def session():
+    """内存SQLite会话：两个激活分类（其中一个无模型）、一个停用分类"""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=PRICING_TABLES))
+        await conn.execute(insert(PricingSnapshot.__table__), [
+            {"id": 1, "source_url": "https://example.com", "is_latest": True},
+        ])
+        await conn.execute(insert(PricingCategory.__table__), [
+            {"id": 1, "code": "text_generation", "name": "文本生成", "sort_order": 2, "is_active": True},
+            {"id": 2, "code": "embedding", "name": "文本向量", "sort_order": 1, "is_active": True},
+            {"id": 3, "code": "legacy", "name": "旧分类", "sort_order": 0, "is_active": False},
+        ])
+        await conn.execute(insert(PricingModel.__table__), [
+            {"id": 1, "snapshot_id": 1, "category_id": 1, "model_code": "qwen-plus", "model_name": "qwen-plus", "display_name": "通义千问Plus", "status": "active"},
+            {"id": 2, "snapshot_id": 1, "category_id": 1, "model_code": "qwen-max", "model_name": "qwen-max", "display_name": "通义千问Max", "status": "active"},
+            {"id": 3, "snapshot_id": 1, "category_id": 1, "model_code": "qwen-max", "model_name": "qwen-max", "display_name": "通义千问Max-Batch", "status": "active"},
+            {"id": 4, "snapshot_id": 1, "category_id": 1, "model_code": "qwen-old", "model_name": "qwen-old", "display_name": "已下线", "status": "inactive"},
+            {"id": 5, "snapshot_id": 1, "category_id": 3, "model_code": "legacy-1", "model_name": "legacy-1", "display_name": "旧模型", "status": "active"},
+        ])
+    
+    async with AsyncSession(engine) as db:
+        yield db
+    await engine.dispose()
+
+
+@pytest.fixture
+def no_redis():
+    with patch("app.services.snapshot_cache.get_redis", new=AsyncMock(return_value=None)):
+        yield
+
+
+class TestCategoryTree:
+    """分类模型树测试"""
+    
+    @pytest.mark.asyncio
+    async def test_tree_structure(self, session, no_redis):
+        """按分类排序，停用分类与非激活模型被排除，同一model_code只出现一次"""
+        cache = SnapshotCache("test", PricingSnapshot)
+        with patch("app.services.pricing_data_service.pricing_snapshot_cache", cache):
+            tree = await PricingDataService().get_categories_with_models(session)
+        
+        assert [node["category_code"] for node in tree] == ["embedding", "text_generation"]
+        assert tree[0] == {"category_code": "embedding", "category_name": "文本向量", "model_count": 0, "models": []}
+        assert tree[1]["model_count"] == 2
+        assert [m["model_code"] for m in tree[1]["models"]] == ["qwen-max", "qwen-plus"]
+        assert tree[1]["models"][0]["display_name"] == "通义千问Max"
+    
+    @pytest.mark.asyncio
+    async def test_warm_cache_skips_database(self, session, no_redis):
+        """缓存预热后版本检查间隔内不再访问数据库"""
+        cache = SnapshotCache("test", PricingSnapshot)
+        service = PricingDataService()
+        with patch("app.services.pricing_data_service.pricing_snapshot_cache", cache):
+            first = await service.get_categories_with_models(session)
+            with patch.object(session, "execute", side_effect=AssertionError("should hit cache")):
+                assert await service.get_categories_with_models(session) == first
+
+
+class TestSnapshotCache:
+    """快照版本缓存测试"""
+    
+    @pytest.mark.asyncio
+    async def test_new_snapshot_invalidates(self, session, no_redis):
+        """最新快照变化后重新构建"""
+        cache = SnapshotCache("test", PricingSnapshot, check_interval=0)
+        builder = AsyncMock(side_effect=["v1", "v2"])
+        
+        assert await cache.get_or_build(session, "key", builder) == "v1"
+        assert await cache.get_or_build(session, "key", builder) == "v1"
+        
+        await session.execute(PricingSnapshot.__table__.update().values(is_latest=False))
+        await session.execute(insert(PricingSnapshot.__table__).values(id=2, source_url="https://example.com", is_latest=True))
+        assert await cache.get_or_build(session, "key", builder) == "v2"
+        assert builder.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_invalidate_bumps_shared_generation(self, session):
+        """invalidate清空本地缓存并递增Redis失效代数"""
+        redis = AsyncMock()
+        redis.get.return_value = None
+        cache = SnapshotCache("test", PricingSnapshot)
+        builder = AsyncMock(side_effect=["v1", "v2"])
+        
+        with patch("app.services.snapshot_cache.get_redis", new=AsyncMock(return_value=redis)):
+            await cache.get_or_build(session, "key", builder)
+            await cache.invalidate()
+            assert await cache.get_or_build(session, "key", builder) == "v2"
+        
+        redis.incr.assert_awaited_once_with("snapshot_generation:test")
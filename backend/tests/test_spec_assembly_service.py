@@ -0,0 +1,154 @@
+"""
+模型规格组装服务测试
+"""
+import uuid
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from app.services.crawler_processor import CrawlerDataProcessor
+from app.services.spec_assembly_service import PrefixTrie, SpecAssemblyService
+
+
+MAPPING = {
+    '通义千问Max': 'qwen-max',
+    'Qwen3': 'qwen3-',
+    '通义千问ASR': 'qwen3-asr-flash',
+    '通义万相': 'wanx-',
+}
+
+PRODUCT_CODES = ["qwen-max", "qwen-max-latest", "qwen3-32b", "qwen3-asr-flash", "qwen3-asr-flash-realtime", "wanx-v1"]
+
+
+def _price(region: str, **pricing_variables):
+    return SimpleNamespace(
+        price_id=uuid.uuid4(),
+        region=region,
+        unit="千Token",
+        billing_mode="token",
+        pricing_variables=pricing_variables,
+    )
+
+
+def _mock_session(*results):
+    """按顺序返回各次查询结果的AsyncSession替身"""
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=list(results))
+    return db
+
+
+def _codes_result():
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = PRODUCT_CODES
+    return result
+
+
+def _rows_result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+class TestPrefixTrie:
+    """前缀树测试"""
+    
+    def test_prefixes_of(self):
+        """返回所有作为前缀的模式，由短到长"""
+        trie = PrefixTrie(["qwen3-", "qwen3-asr-flash", "wanx-"])
+        
+        assert trie.prefixes_of("qwen3-asr-flash-realtime") == ["qwen3-", "qwen3-asr-flash"]
+        assert trie.prefixes_of("QWEN3-32B") == ["qwen3-"]
+        assert trie.prefixes_of("qwen-max") == []
+
+
+class TestSpecAssemblyService:
+    """规格组装测试"""
+    
+    @pytest.mark.asyncio
+    async def test_resolve_codes(self):
+        """映射值解析为精确或前缀匹配的全部产品代码，产品代码表只加载一次"""
+        service = SpecAssemblyService(MAPPING)
+        db = _mock_session(_codes_result())
+        
+        assert await service.resolve_codes(db, 'Qwen3') == [
+            "qwen3-32b", "qwen3-asr-flash", "qwen3-asr-flash-realtime"
+        ]
+        assert await service.resolve_codes(db, '通义千问ASR') == ["qwen3-asr-flash", "qwen3-asr-flash-realtime"]
+        assert await service.resolve_codes(db, '通义千问Max') == ["qwen-max", "qwen-max-latest"]
+        assert await service.resolve_codes(db, '未映射名称') is None
+        assert db.execute.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_prefix_mapping_single_query(self):
+        """前缀映射命中多个产品时，产品与价格一次查询取回"""
+        service = SpecAssemblyService(MAPPING)
+        rows = [
+            SimpleNamespace(product_code="qwen3-32b", product_name="Qwen3-32B", ProductPrice=_price("中国内地", mode="思考")),
+            SimpleNamespace(product_code="qwen3-32b", product_name="Qwen3-32B", ProductPrice=_price("国际")),
+            SimpleNamespace(product_code="qwen3-asr-flash", product_name="Qwen3-ASR", ProductPrice=None),
+        ]
+        db = _mock_session(_codes_result(), _rows_result(rows))
+        
+        response = await service.get_specs(db, 'Qwen3')
+        
+        assert db.execute.await_count == 2
+        assert [spec["region"] for spec in response["specs"]] == ["中国内地", "国际"]
+        assert response["specs"][0]["mode"] == "思考"
+        assert response["specs"][0]["display_config"]["show_mode"] is True
+        assert response["specs"][1]["mode"] == "标准"
+        
+        # 映射已缓存，再次请求只需一次查询
+        db.execute.side_effect = [_rows_result(rows)]
+        await service.get_specs(db, 'Qwen3')
+        assert db.execute.await_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_crawler_write_invalidates_mapping(self):
+        """爬虫写入产品后清除映射解析结果与目录检索索引"""
+        service = SpecAssemblyService(MAPPING)
+        db = _mock_session(_codes_result())
+        await service.resolve_codes(db, 'Qwen3')
+        
+        processor = CrawlerDataProcessor()
+        processor._upsert_product = AsyncMock(return_value=True)
+        catalog_search = MagicMock()
+        with patch("app.services.crawler_processor.spec_assembly_service", service), \
+                patch("app.services.crawler_processor.catalog_search_service", catalog_search):
+            await processor.process_crawler_result(AsyncMock(), SimpleNamespace(products=[{}], prices=[]))
+        catalog_search.invalidate.assert_called_once()
+        
+        db.execute.side_effect = [_codes_result()]
+        await service.resolve_codes(db, 'Qwen3')
+        assert db.execute.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_products_without_prices_skip_fallback(self):
+        """找到产品但无价格时返回空规格，不回退到pricing_model"""
+        service = SpecAssemblyService(MAPPING)
+        rows = [SimpleNamespace(product_code="wanx-v1", product_name="万相", ProductPrice=None)]
+        db = _mock_session(_codes_result(), _rows_result(rows))
+        
+        assert await service.get_specs(db, '通义万相') == {"specs": []}
+        assert db.execute.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_fallback_to_pricing_model(self):
+        """products表无匹配时从pricing_model组装规格"""
+        service = SpecAssemblyService(MAPPING)
+        pricing_rows = MagicMock()
+        pricing_rows.fetchall.return_value = [
+            SimpleNamespace(model_code="deepseek-v3", model_name="deepseek-v3", display_name="DeepSeek-V3",
+                            dimension_code="input_token", unit_price=0.002, unit="千Token", rule_text=None,
+                            category_name="文本生成"),
+            SimpleNamespace(model_code="deepseek-v3", model_name="deepseek-v3", display_name="DeepSeek-V3",
+                            dimension_code="output_token", unit_price=0.008, unit="千Token", rule_text=None,
+                            category_name="文本生成"),
+        ]
+        db = _mock_session(_rows_result([]), pricing_rows)
+        
+        response = await service.get_specs(db, "deepseek")
+        
+        assert len(response["specs"]) == 1
+        assert response["specs"][0]["input_price"] == 0.002
+        assert response["specs"][0]["output_price"] == 0.008
+        assert db.execute.await_args_list[1].args[1]["code_pattern"] == "%deepseek%"
@@ -0,0 +1,59 @@
+"""
+启动耗时测试
+"""
+import os
+import subprocess
+import sys
+
+from app.core.startup import DEFERRED_MODULES, StartupTimer
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStartupTimer:
+    """启动阶段计时"""
+    
+    def test_phases_and_ready(self):
+        clock = FakeClock()
+        timer = StartupTimer(clock=clock)
+        
+        clock.now = 0.8
+        timer.mark("import")
+        with timer.phase("database"):
+            clock.now = 1.05
+        assert not timer.snapshot()["ready"]
+        
+        timer.mark_ready()
+        snapshot = timer.snapshot()
+        assert snapshot["ready"]
+        assert snapshot["ready_ms"] == 1050.0
+        assert snapshot["phases_ms"] == {"import": 800.0, "database": 250.0}
+
+
+class TestLazyImports:
+    """较慢的可选依赖不在导入应用时加载"""
+    
+    def test_deferred_modules_not_imported(self):
+        code = (
+            "import sys, main; "
+            f"print('eager:' + ','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", code],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            timeout=120
+        )
+        
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert "eager:\n" in result.stdout